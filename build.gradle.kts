@@ -257,6 +257,18 @@ tasks {
 		dependsOn(cleanDoc, makeDoc)
 	}
 
+	val benchmark by creating(JavaExec::class) {
+		group = "verification"
+		description = "Benchmark the design pipeline stages, results written to build/benchmark.json"
+		classpath = java.sourceSets["main"].runtimeClasspath
+		main = "edu.duke.cs.osprey.tools.DesignBenchmark"
+		maxHeapSize = "2g"
+		args("--out", "$buildDir/benchmark.json", "--progress")
+		if (project.hasProperty("benchmarkThreads")) {
+			args("--threads", project.property("benchmarkThreads").toString())
+		}
+	}
+
 	val pythonDevelop by creating(Exec::class) {
 		group = "develop"
 		description = "Install python package in development mode"
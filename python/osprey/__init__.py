@@ -266,13 +266,14 @@ def initExternalMemory(internalSizeMiB, tempDir=None, tempSubdir=None):
 # pythonic wrappers for Java builders #
 #-------------------------------------#
 
-def Parallelism(cpuCores=None, gpus=None, streamsPerGpu=None):
+def Parallelism(cpuCores=None, gpus=None, streamsPerGpu=None, workStealing=None):
 	'''
 	:java:classdoc:`.parallelism.Parallelism`
 
 	:builder_option cpuCores .parallelism.Parallelism$Builder#numCpus:
 	:builder_option gpus .parallelism.Parallelism$Builder#numGpus:
 	:builder_option streamsPerGpu .parallelism.Parallelism$Builder#numStreamsPerGpu:
+	:builder_option workStealing .parallelism.Parallelism$Builder#workStealing:
 	:builder_return .parallelism.Parallelism$Builder:
 	'''
 	builder = _get_builder(c.parallelism.Parallelism)()
@@ -282,6 +283,8 @@ def Parallelism(cpuCores=None, gpus=None, streamsPerGpu=None):
 		builder.setNumGpus(gpus)
 	if streamsPerGpu is not None:
 		builder.setNumStreamsPerGpu(streamsPerGpu)
+	if workStealing is not None:
+		builder.setWorkStealing(workStealing)
 
 	return builder.build()
 
@@ -446,7 +449,7 @@ def ForcefieldParams(forcefield=None):
 	return c.energy.forcefield.ForcefieldParams()
 
 
-def EnergyCalculator(confSpace, ffparams, parallelism=None, type=None, isMinimizing=None, infiniteWellEnergy=None):
+def EnergyCalculator(confSpace, ffparams, parallelism=None, type=None, isMinimizing=None, infiniteWellEnergy=None, atomPairInfoCacheFile=None):
 	'''
 	:java:classdoc:`.energy.EnergyCalculator`
 
@@ -457,6 +460,7 @@ def EnergyCalculator(confSpace, ffparams, parallelism=None, type=None, isMinimiz
 	:builder_option type .energy.EnergyCalculator$Builder#type:
 	:builder_option isMinimizing .energy.EnergyCalculator$Builder#isMinimizing:
 	:builder_option infiniteWellEnergy .energy.EnergyCalculator$Builder#infiniteWellEnergy:
+	:builder_option atomPairInfoCacheFile .energy.EnergyCalculator$Builder#atomPairInfoCacheFile:
 
 	:builder_return .energy.EnergyCalculator$Builder:
 	'''
@@ -482,6 +486,9 @@ def EnergyCalculator(confSpace, ffparams, parallelism=None, type=None, isMinimiz
 	if infiniteWellEnergy is not None:
 		builder.setInfiniteWellEnergy(jvm.boxDouble(infiniteWellEnergy))
 
+	if atomPairInfoCacheFile is not None:
+		builder.setAtomPairInfoCacheFile(jvm.toFile(atomPairInfoCacheFile))
+
 	return builder.build()
 
 
@@ -536,12 +543,15 @@ def ConfEnergyCalculatorCopy(source, ecalc):
 	return c.energy.ConfEnergyCalculator(source, ecalc)
 
 
-def EnergyMatrix(confEcalc, cacheFile=None):
+def EnergyMatrix(confEcalc, cacheFile=None, fragmentStoreFile=None, floatPrecision=useJavaDefault, pairDistanceCutoff=None):
 	'''
 	:java:methoddoc:`.ematrix.SimplerEnergyMatrixCalculator#calcEnergyMatrix`
 
 	:builder_option confEcalc .ematrix.SimplerEnergyMatrixCalculator$Builder#confEcalc:
 	:builder_option cacheFile .ematrix.SimplerEnergyMatrixCalculator$Builder#cacheFile:
+	:builder_option fragmentStoreFile .ematrix.SimplerEnergyMatrixCalculator$Builder#fragmentStoreFile:
+	:builder_option floatPrecision .ematrix.SimplerEnergyMatrixCalculator$Builder#floatPrecision:
+	:builder_option pairDistanceCutoff .ematrix.SimplerEnergyMatrixCalculator$Builder#pairDistanceCutoff:
 	'''
 	
 	builder = _get_builder(c.ematrix.SimplerEnergyMatrixCalculator)(confEcalc)
@@ -549,16 +559,26 @@ def EnergyMatrix(confEcalc, cacheFile=None):
 	if cacheFile is not None:
 		builder.setCacheFile(jvm.toFile(cacheFile))
 
+	if fragmentStoreFile is not None:
+		builder.setFragmentStoreFile(jvm.toFile(fragmentStoreFile))
+
+	if floatPrecision is not useJavaDefault:
+		builder.setFloatPrecision(floatPrecision)
+
+	if pairDistanceCutoff is not None:
+		builder.setPairDistanceCutoff(jvm.boxDouble(pairDistanceCutoff))
+
 	return builder.build().calcEnergyMatrix()
 
 
-def ReferenceEnergies(confSpace, ecalc, addResEntropy=None):
+def ReferenceEnergies(confSpace, ecalc, addResEntropy=None, fragmentStoreFile=None):
 	'''
 	:java:methoddoc:`.ematrix.SimplerEnergyMatrixCalculator#calcReferenceEnergies`
 
 	:builder_option confSpace .ematrix.SimpleReferenceEnergies$Builder#confSpace:
 	:builder_option ecalc .ematrix.SimpleReferenceEnergies$Builder#ecalc:
 	:builder_option addResEntropy .ematrix.SimpleReferenceEnergies$Builder#addResEntropy:
+	:builder_option fragmentStoreFile .ematrix.SimpleReferenceEnergies$Builder#fragmentStoreFile:
 	:builder_return .ematrix.SimpleReferenceEnergies$Builder:
 	'''
 
@@ -567,6 +587,9 @@ def ReferenceEnergies(confSpace, ecalc, addResEntropy=None):
 	if addResEntropy is not None:
 		builder.addResEntropy(addResEntropy)
 
+	if fragmentStoreFile is not None:
+		builder.setFragmentStoreFile(jvm.toFile(fragmentStoreFile))
+
 	return builder.build()
 
 
@@ -627,7 +650,7 @@ def DEE_read(confSpace, path):
 	return c.pruning.SimpleDEE.read(confSpace, jvm.toFile(path))
 
 
-def AStarTraditional(emat, confSpaceOrPmat, showProgress=True, useExternalMemory=False, maxNumNodes=useJavaDefault):
+def AStarTraditional(emat, confSpaceOrPmat, showProgress=True, useExternalMemory=False, maxNumNodes=useJavaDefault, useCompactMemory=False, useOffHeapMemory=False, numParallelNodes=useJavaDefault, deterministic=useJavaDefault, parallelism=None):
 	'''
 	:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#setTraditional`
 
@@ -640,6 +663,16 @@ def AStarTraditional(emat, confSpaceOrPmat, showProgress=True, useExternalMemory
 
 	:type useExternalMemory: boolean
 	:builder_option maxNumNodes .astar.conf.ConfAStarTree$Builder#maxNumNodes:
+	:param useCompactMemory: set to True to store A* nodes compactly.
+
+		:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#useCompactMemory`
+
+	:type useCompactMemory: boolean
+	:param bool useOffHeapMemory: set to True to store compact A* nodes outside of the JVM heap
+	:builder_option numParallelNodes .astar.conf.ConfAStarTree$Builder#numParallelNodes:
+	:builder_option deterministic .astar.conf.ConfAStarTree$Builder#deterministic:
+	:param parallelism: The parallelism used to score A* nodes, or None to score them on one thread
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
 	:builder_return .astar.conf.ConfAStarTree$Builder:
 	'''
 	builder = _get_builder(c.astar.conf.ConfAStarTree)(emat, confSpaceOrPmat)
@@ -654,7 +687,18 @@ def AStarTraditional(emat, confSpaceOrPmat, showProgress=True, useExternalMemory
 	if useExternalMemory == True:
 		builder.useExternalMemory()
 
-	return builder.build()
+	if useCompactMemory == True:
+		builder.useCompactMemory(useOffHeapMemory)
+
+	if numParallelNodes is not useJavaDefault:
+		builder.setNumParallelNodes(jvm.boxInt(numParallelNodes) if numParallelNodes is not None else None)
+	if deterministic is not useJavaDefault:
+		builder.setDeterministic(deterministic)
+
+	astar = builder.build()
+	if parallelism is not None:
+		astar.setParallelism(parallelism)
+	return astar
 
 
 def EdgeUpdater():
@@ -663,7 +707,7 @@ def EdgeUpdater():
 def NodeUpdater():
 	return c.astar.conf.scoring.mplp.NodeUpdater()
 
-def AStarMPLP(emat, confSpaceOrPmat, updater=None, numIterations=None, convergenceThreshold=None, useExternalMemory=False, maxNumNodes=useJavaDefault):
+def AStarMPLP(emat, confSpaceOrPmat, updater=None, numIterations=None, convergenceThreshold=None, useExternalMemory=False, maxNumNodes=useJavaDefault, useCompactMemory=False, useOffHeapMemory=False, numParallelNodes=useJavaDefault, deterministic=useJavaDefault, parallelism=None, warmStart=useJavaDefault, warmStartMiB=useJavaDefault):
 	'''
 	:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#setMPLP`
 
@@ -673,12 +717,24 @@ def AStarMPLP(emat, confSpaceOrPmat, updater=None, numIterations=None, convergen
 	:builder_option updater .astar.conf.ConfAStarTree$MPLPBuilder#updater:
 	:builder_option numIterations .astar.conf.ConfAStarTree$MPLPBuilder#numIterations:
 	:builder_option convergenceThreshold .astar.conf.ConfAStarTree$MPLPBuilder#convergenceThreshold:
+	:builder_option warmStart .astar.conf.ConfAStarTree$MPLPBuilder#warmStart:
+	:builder_option warmStartMiB .astar.conf.ConfAStarTree$MPLPBuilder#warmStartMiB:
 	:param useExternalMemory: set to True to use external memory.
 
 		:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#useExternalMemory`
 
 	:type useExternalMemory: boolean
 	:builder_option maxNumNodes .astar.conf.ConfAStarTree$Builder#maxNumNodes:
+	:param useCompactMemory: set to True to store A* nodes compactly.
+
+		:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#useCompactMemory`
+
+	:type useCompactMemory: boolean
+	:param bool useOffHeapMemory: set to True to store compact A* nodes outside of the JVM heap
+	:builder_option numParallelNodes .astar.conf.ConfAStarTree$Builder#numParallelNodes:
+	:builder_option deterministic .astar.conf.ConfAStarTree$Builder#deterministic:
+	:param parallelism: The parallelism used to score A* nodes, or None to score them on one thread
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
 	:builder_return .astar.conf.ConfAStarTree$Builder:
 	'''
 	mplpBuilder = _get_builder(c.astar.conf.ConfAStarTree, 'MPLPBuilder')()
@@ -692,6 +748,12 @@ def AStarMPLP(emat, confSpaceOrPmat, updater=None, numIterations=None, convergen
 	if convergenceThreshold is not None:
 		mplpBuilder.setConvergenceThreshold(convergenceThreshold)
 
+	if warmStart is not useJavaDefault:
+		mplpBuilder.setWarmStart(warmStart)
+
+	if warmStartMiB is not useJavaDefault:
+		mplpBuilder.setWarmStartMiB(warmStartMiB)
+
 	builder = _get_builder(c.astar.conf.ConfAStarTree)(emat, confSpaceOrPmat)
 	builder.setShowProgress(True)
 
@@ -704,10 +766,21 @@ def AStarMPLP(emat, confSpaceOrPmat, updater=None, numIterations=None, convergen
 	if useExternalMemory == True:
 		builder.useExternalMemory()
 
-	return builder.build()
+	if useCompactMemory == True:
+		builder.useCompactMemory(useOffHeapMemory)
+
+	if numParallelNodes is not useJavaDefault:
+		builder.setNumParallelNodes(jvm.boxInt(numParallelNodes) if numParallelNodes is not None else None)
+	if deterministic is not useJavaDefault:
+		builder.setDeterministic(deterministic)
+
+	astar = builder.build()
+	if parallelism is not None:
+		astar.setParallelism(parallelism)
+	return astar
 
 
-def GMECFinder(astar, confEcalc, confLog=None, printIntermediateConfs=None, useExternalMemory=None, resumeLog=None, confDBFile=None):
+def GMECFinder(astar, confEcalc, confLog=None, printIntermediateConfs=None, useExternalMemory=None, resumeLog=None, confDBFile=None, pipelined=None, pipelineQueueSize=None):
 	'''
 	:java:classdoc:`.gmec.SimpleGMECFinder`
 
@@ -723,6 +796,11 @@ def GMECFinder(astar, confEcalc, confLog=None, printIntermediateConfs=None, useE
 	:builder_option printIntermediateConfs .gmec.SimpleGMECFinder$Builder#printIntermediateConfsToConsole:
 	:builder_option useExternalMemory .gmec.SimpleGMECFinder$Builder#useExternalMemory:
 	:param str resumeLog: Path to log file where resume info will be written or read, so designs can be resumed.
+	:param str confDBFile: Path to the conformation database, where energies will be cached.
+		New files ending in ``.cdb`` use the compact engine, with batched writes and a smaller file.
+		Existing files use whichever engine wrote them.
+	:builder_option pipelined .gmec.SimpleGMECFinder$Builder#pipelined:
+	:builder_option pipelineQueueSize .gmec.SimpleGMECFinder$Builder#pipelineQueueSize:
 	:builder_return .gmec.SimpleGMECFinder$Builder:
 	'''
 
@@ -744,6 +822,12 @@ def GMECFinder(astar, confEcalc, confLog=None, printIntermediateConfs=None, useE
 	if confDBFile is not None:
 		builder.setConfDB(jvm.toFile(confDBFile))
 
+	if pipelined is not None:
+		builder.setPipelined(pipelined)
+
+	if pipelineQueueSize is not None:
+		builder.setPipelineQueueSize(pipelineQueueSize)
+
 	return builder.build()
 
 
@@ -795,7 +879,7 @@ def DEEPerStrandFlex(strand, pert_file_name, flex_res_list, pdb_file):
 	bbflex = c.confspace.DEEPerStrandFlex(strand,deeper_settings)
 	return bbflex
 
-def KStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDefault, stabilityThreshold=useJavaDefault, maxSimultaneousMutations=useJavaDefault, writeSequencesToConsole=False, writeSequencesToFile=None, useExternalMemory=useJavaDefault, showPfuncProgress=useJavaDefault):
+def KStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDefault, stabilityThreshold=useJavaDefault, maxSimultaneousMutations=useJavaDefault, writeSequencesToConsole=False, writeSequencesToFile=None, useExternalMemory=useJavaDefault, showPfuncProgress=useJavaDefault, sequenceParallelism=useJavaDefault, confBufferMiB=useJavaDefault, checkpointFile=None):
 	'''
 	:java:classdoc:`.kstar.KStar`
 
@@ -812,6 +896,9 @@ def KStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDe
 	:builder_option maxSimultaneousMutations .kstar.KStar$Settings$Builder#maxSimultaneousMutations:
 	:builder_option useExternalMemory .kstar.KStar$Settings$Builder#useExternalMemory:
 	:builder_option showPfuncProgress .kstar.KStar$Settings$Builder#showPfuncProgress:
+	:builder_option sequenceParallelism .kstar.KStar$Settings$Builder#sequenceParallelism:
+	:builder_option confBufferMiB .kstar.KStar$Settings$Builder#confBufferMiB:
+	:builder_option checkpointFile .kstar.KStar$Settings$Builder#checkpointFile:
 	:param bool writeSequencesToConsole: True to write sequences and scores to the console
 	:param str writeSequencesToFile: Path to the log file to write sequences scores (in TSV format), or None to skip logging
 
@@ -834,6 +921,12 @@ def KStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDe
 		settingsBuilder.setExternalMemory(useExternalMemory)
 	if showPfuncProgress is not useJavaDefault:
 		settingsBuilder.setShowPfuncProgress(showPfuncProgress)
+	if sequenceParallelism is not useJavaDefault:
+		settingsBuilder.setSequenceParallelism(sequenceParallelism)
+	if confBufferMiB is not useJavaDefault:
+		settingsBuilder.setConfBufferMiB(jvm.boxInt(confBufferMiB) if confBufferMiB is not None else None)
+	if checkpointFile is not None:
+		settingsBuilder.setCheckpointFile(jvm.toFile(checkpointFile))
 	settings = settingsBuilder.build()
 
 	return c.kstar.KStar(proteinConfSpace, ligandConfSpace, complexConfSpace, settings)
@@ -850,7 +943,7 @@ def _KStarConfSearchFactory(func):
 KStar.ConfSearchFactory = _KStarConfSearchFactory
 
 
-def BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDefault, stabilityThreshold=useJavaDefault, maxSimultaneousMutations=useJavaDefault, energyMatrixCachePattern=useJavaDefault, useExternalMemory=useJavaDefault, showPfuncProgress=useJavaDefault, numBestSequences=useJavaDefault, numConfsPerBatch=useJavaDefault, writeSequencesToConsole=False, writeSequencesToFile=None):
+def BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJavaDefault, stabilityThreshold=useJavaDefault, maxSimultaneousMutations=useJavaDefault, energyMatrixCachePattern=useJavaDefault, useExternalMemory=useJavaDefault, showPfuncProgress=useJavaDefault, numBestSequences=useJavaDefault, numConfsPerBatch=useJavaDefault, writeSequencesToConsole=False, writeSequencesToFile=None, confBufferMiB=useJavaDefault, checkpointFile=None, confTreesMiB=useJavaDefault, sequenceParallelism=useJavaDefault):
 	'''
 	:java:classdoc:`.kstar.BBKStar`
 
@@ -867,8 +960,12 @@ def BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJava
 	:builder_option maxSimultaneousMutations .kstar.KStar$Settings$Builder#maxSimultaneousMutations:
 	:builder_option useExternalMemory .kstar.KStar$Settings$Builder#useExternalMemory:
 	:builder_option showPfuncProgress .kstar.KStar$Settings$Builder#showPfuncProgress:
+	:builder_option confBufferMiB .kstar.KStar$Settings$Builder#confBufferMiB:
+	:builder_option checkpointFile .kstar.KStar$Settings$Builder#checkpointFile:
+	:builder_option sequenceParallelism .kstar.KStar$Settings$Builder#sequenceParallelism:
 	:builder_option numBestSequences .kstar.BBKStar$Settings$Builder#numBestSequences:
 	:builder_option numConfsPerBatch .kstar.BBKStar$Settings$Builder#numConfsPerBatch:
+	:builder_option confTreesMiB .kstar.BBKStar$Settings$Builder#confTreesMiB:
 	:param bool writeSequencesToConsole: True to write sequences and scores to the console
 	:param str writeSequencesToFile: Path to the log file to write sequences scores (in TSV format), or None to skip logging
 
@@ -891,6 +988,12 @@ def BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJava
 		kstarSettingsBuilder.setExternalMemory(useExternalMemory)
 	if showPfuncProgress is not useJavaDefault:
 		kstarSettingsBuilder.setShowPfuncProgress(showPfuncProgress)
+	if confBufferMiB is not useJavaDefault:
+		kstarSettingsBuilder.setConfBufferMiB(jvm.boxInt(confBufferMiB) if confBufferMiB is not None else None)
+	if checkpointFile is not None:
+		kstarSettingsBuilder.setCheckpointFile(jvm.toFile(checkpointFile))
+	if sequenceParallelism is not useJavaDefault:
+		kstarSettingsBuilder.setSequenceParallelism(sequenceParallelism)
 	kstarSettings = kstarSettingsBuilder.build()
 
 	bbkstarSettingsBuilder = _get_builder(jvm.getInnerClass(c.kstar.BBKStar, 'Settings'))()
@@ -898,6 +1001,8 @@ def BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, epsilon=useJava
 		bbkstarSettingsBuilder.setNumBestSequences(numBestSequences)
 	if numConfsPerBatch is not useJavaDefault:
 		bbkstarSettingsBuilder.setNumConfsPerBatch(numConfsPerBatch)
+	if confTreesMiB is not useJavaDefault:
+		bbkstarSettingsBuilder.setConfTreesMiB(jvm.boxInt(confTreesMiB) if confTreesMiB is not None else None)
 	bbkstarSettings = bbkstarSettingsBuilder.build()
 
 	return c.kstar.BBKStar(proteinConfSpace, ligandConfSpace, complexConfSpace, kstarSettings, bbkstarSettings)
@@ -933,7 +1038,7 @@ def SequenceAnalyzer(kstar):
 	return c.kstar.SequenceAnalyzer(kstar)
 
 
-def LUTE_train(confEcalc, emat, pmat, maxRMSE=0.1, maxOverfittingScore=1.5, randomSeed=12345, confDBPath=None):
+def LUTE_train(confEcalc, emat, pmat, maxRMSE=0.1, maxOverfittingScore=1.5, randomSeed=12345, confDBPath=None, fitter='OLSCG'):
 	'''
 	Trains a LUTE model
 
@@ -949,7 +1054,11 @@ def LUTE_train(confEcalc, emat, pmat, maxRMSE=0.1, maxOverfittingScore=1.5, rand
 	:param float maxRMSE: The maximum tolerable fit RMS error
 	:param float maxOverfittingScore: The maximum tolerable amount of overfitting (score = training set RMSE / test set RMSE)
 	:param int randomSeed: Random seed to use for conformation sampling
-	:param str confDBPath: Path to write/read confDB file, or None to omit saving the confDB to disk
+	:param str confDBPath: Path to write/read confDB file, or None to omit saving the confDB to disk.
+		New files ending in ``.cdb`` use the compact engine.
+	:param str fitter: The fitting method, one of ``OLSCG``, ``LASSO``, ``OLSPCG``, or ``LASSOCD``.
+		``OLSPCG`` and ``LASSOCD`` work on the sparse design matrix directly, use multiple threads
+		if the conformation energy calculator has them, and start each refit from the previous fit.
 
 	:returns: The LUTE model
 	:rtype: :java:ref:`.lute.LUTEState`
@@ -968,8 +1077,8 @@ def LUTE_train(confEcalc, emat, pmat, maxRMSE=0.1, maxOverfittingScore=1.5, rand
 		# make a conf table for LUTE
 		confTable = jvm.getInnerClass(c.confspace.ConfDB, 'ConfTable')(confDB, 'LUTE')
 
-		# use the OLSCG fitter for LUTE (it's a little faster than LASSO in practice)
-		fitter = jvm.getInnerClass(c.lute.LUTE, 'Fitter').OLSCG
+		# use the OLSCG fitter for LUTE by default (it's a little faster than LASSO in practice)
+		fitter = jvm.getInnerClass(c.lute.LUTE, 'Fitter').valueOf(fitter)
 
 		# train LUTE
 		lute = c.lute.LUTE(confSpace)
@@ -1014,7 +1123,7 @@ def LUTE_read(path):
 	return model
 
 
-def LUTE_ConfEnergyCalculator(confSpace, model):
+def LUTE_ConfEnergyCalculator(confSpace, model, parallelism=None):
 	'''
 	Creates a LUTE conformation energy calculator
 
@@ -1022,14 +1131,19 @@ def LUTE_ConfEnergyCalculator(confSpace, model):
 	:type confSpace: :java:ref:`.confspace.SimpleConfSpace`
 	:param model: The LUTE model
 	:type model: :java:ref:`.lute.LUTEState`
+	:param parallelism: The parallelism for LUTE searches and batch energy calculations, or None to use one thread
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
 
 	:rtype: :java:ref:`.lute.LUTEConfEnergyCalculator`
 	'''
 
-	return c.lute.LUTEConfEnergyCalculator(confSpace, model)
+	if parallelism is None:
+		return c.lute.LUTEConfEnergyCalculator(confSpace, model)
+	else:
+		return c.lute.LUTEConfEnergyCalculator(confSpace, model, parallelism)
 
 
-def LUTE_AStar(rcs, pmat, luteEcalc, showProgress=True):
+def LUTE_AStar(rcs, pmat, luteEcalc, showProgress=True, parallelism=None):
 	'''
 	:java:methoddoc:`.astar.conf.ConfAStarTree$Builder#setLUTE`
 
@@ -1038,10 +1152,15 @@ def LUTE_AStar(rcs, pmat, luteEcalc, showProgress=True):
 	:type pmat: :java:ref:`.pruning.PruningMatrix`
 	:param luteEcalc: The LUTE conformation energy calculator
 	:type luteEcalc: :java:ref:`.lute.LUTEConfEnergyCalculator`
+	:param parallelism: The parallelism for the A* search, or None to use the parallelism of the LUTE conformation energy calculator
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
 
 	:builder_return .astar.conf.ConfAStarTree$Builder:
 	'''
 
+	if parallelism is None:
+		parallelism = luteEcalc.parallelism
+
 	# filter the rcs by the pmat
 	rcs = c.astar.conf.RCs(rcs, pmat)
 
@@ -1049,10 +1168,16 @@ def LUTE_AStar(rcs, pmat, luteEcalc, showProgress=True):
 	builder.setShowProgress(showProgress)
 	builder.setLUTE(luteEcalc)
 
-	return builder.build()
+	# LUTE scores are cheap, so expand many nodes at once when using more than one thread
+	if parallelism.getParallelism() > 1:
+		builder.setNumParallelNodes(parallelism.getParallelism()*4)
+
+	astar = builder.build()
+	astar.setParallelism(parallelism)
+	return astar
 
 
-def LUTE_GMECFinder(confSpace, model, pmat, confLog=useJavaDefault, printIntermediateConfs=useJavaDefault):
+def LUTE_GMECFinder(confSpace, model, pmat, confLog=useJavaDefault, printIntermediateConfs=useJavaDefault, parallelism=None):
 	'''
 	:java:classdoc:`.lute.LUTEGMECFinder`
 
@@ -1064,11 +1189,13 @@ def LUTE_GMECFinder(confSpace, model, pmat, confLog=useJavaDefault, printInterme
 	:type pmat: :java:ref:`.pruning.PruningMatrix`
 	:param str confLog: Path to file where conformations found during conformation space search should be logged.
 	:builder_option printIntermediateConfs .gmec.SimpleGMECFinder$Builder#printIntermediateConfsToConsole:
+	:param parallelism: The parallelism for the A* search, or None to use one thread
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
 
 	:rtype: :java:ref:`.lute.LUTEGMECFinder`
 	'''
 
-	builder = _get_builder(c.lute.LUTEGMECFinder)(pmat, LUTE_ConfEnergyCalculator(confSpace, model))
+	builder = _get_builder(c.lute.LUTEGMECFinder)(pmat, LUTE_ConfEnergyCalculator(confSpace, model, parallelism))
 
 	if confLog is not useJavaDefault:
 		logFile = jvm.toFile(confLog)
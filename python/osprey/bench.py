@@ -0,0 +1,108 @@
+## This file is part of OSPREY 3.0
+## 
+## OSPREY Protein Redesign Software Version 3.0
+## Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+## 
+## OSPREY is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License version 2
+## as published by the Free Software Foundation.
+## 
+## You should have received a copy of the GNU General Public License
+## along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+## 
+## OSPREY relies on grants for its development, and since visibility
+## in the scientific literature is essential for our success, we
+## ask that users of OSPREY cite our papers. See the CITING_OSPREY
+## document in this distribution for more information.
+## 
+## Contact Info:
+##    Bruce Donald
+##    Duke University
+##    Department of Computer Science
+##    Levine Science Research Center (LSRC)
+##    Durham
+##    NC 27708-0129
+##    USA
+##    e-mail: www.cs.duke.edu/brd/
+## 
+## <signature of Bruce Donald>, Mar 1, 2018
+## Bruce Donald, Professor of Computer Science
+
+
+'''
+Benchmarks the stages of a small, fixed design pipeline
+
+Run with ``python -m osprey.bench``, optionally with ``--out results.json`` to save the results.
+See :java:ref:`.tools.DesignBenchmark` for the stages that are timed.
+'''
+
+import sys, argparse
+import osprey
+from osprey import jvm
+
+
+def run(pdbPath=None, parallelism=None, numConfs=None, pfuncEpsilon=None, randomSeed=None, showProgress=True):
+	'''
+	Runs the design pipeline benchmarks
+
+	:param str pdbPath: Path to a PDB file for the design, or None to use the bundled 1CC8 structure
+	:param parallelism: The parallel hardware to use, or None for one CPU thread
+	:type parallelism: :java:ref:`.parallelism.Parallelism`
+	:param int numConfs: Number of conformations to enumerate in the A* stages
+	:param float pfuncEpsilon: Target epsilon for the partition function stage
+	:param int randomSeed: Random seed for LUTE conformation sampling
+	:param bool showProgress: True to print results for each stage as it finishes
+
+	:returns: The benchmark report, call ``toJson()`` to get the results as JSON
+	:rtype: :java:ref:`.tools.DesignBenchmark$Report`
+	'''
+
+	builder = osprey._get_builder(osprey.c.tools.DesignBenchmark)()
+	if pdbPath is not None:
+		builder.setPdbFile(jvm.toFile(pdbPath))
+	if parallelism is not None:
+		builder.setParallelism(parallelism)
+	if numConfs is not None:
+		builder.setNumConfs(numConfs)
+	if pfuncEpsilon is not None:
+		builder.setPfuncEpsilon(pfuncEpsilon)
+	if randomSeed is not None:
+		builder.setRandomSeed(randomSeed)
+	builder.setShowProgress(showProgress)
+
+	return builder.build().run()
+
+
+def main(args=None):
+
+	parser = argparse.ArgumentParser(prog='python -m osprey.bench', description='Benchmark the Osprey design pipeline stages')
+	parser.add_argument('--pdb', help='PDB file for the design (default: bundled 1CC8 structure)')
+	parser.add_argument('--out', help='write JSON results to this file instead of stdout')
+	parser.add_argument('--threads', type=int, default=1, help='number of CPU threads')
+	parser.add_argument('--numConfs', type=int, help='number of confs to enumerate in the A* stages')
+	parser.add_argument('--epsilon', type=float, help='target epsilon for the partition function stage')
+	parser.add_argument('--seed', type=int, help='random seed for LUTE conformation sampling')
+	parser.add_argument('--heapSizeMiB', type=int, default=2048, help='size of the JVM heap in MiB')
+	args = parser.parse_args(args)
+
+	osprey.start(heapSizeMiB=args.heapSizeMiB)
+
+	report = run(
+		pdbPath=args.pdb,
+		parallelism=osprey.Parallelism(cpuCores=args.threads),
+		numConfs=args.numConfs,
+		pfuncEpsilon=args.epsilon,
+		randomSeed=args.seed
+	)
+
+	json = report.toJson()
+	if args.out is None:
+		sys.stdout.write(json)
+	else:
+		with open(args.out, 'w') as file:
+			file.write(json)
+		print('benchmark results written to %s' % args.out)
+
+
+if __name__ == '__main__':
+	main()
@@ -34,9 +34,14 @@ package edu.duke.cs.osprey.astar.conf;
 
 import java.math.BigInteger;
 import java.util.ArrayList;
+import java.util.Arrays;
 import java.util.List;
+import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.LinkedBlockingQueue;
 
 import edu.duke.cs.osprey.astar.AStarProgress;
+import edu.duke.cs.osprey.astar.conf.compact.CompactConfAStarFactory;
+import edu.duke.cs.osprey.astar.conf.compact.CompactConfAStarQueue;
 import edu.duke.cs.osprey.astar.conf.linked.LinkedConfAStarFactory;
 import edu.duke.cs.osprey.astar.conf.order.*;
 import edu.duke.cs.osprey.astar.conf.pruning.AStarPruner;
@@ -86,6 +91,22 @@ public class ConfAStarTree implements ConfSearch {
 		private AStarPruner pruner = null;
 		private Long maxNumNodes = null;
 
+		/**
+		 * If not null, pop up to this many nodes from the queue at once and expand them in parallel,
+		 * using the parallelism set with {@link ConfAStarTree#setParallelism}.
+		 * Should be at least as large as the parallelism to keep all the threads busy.
+		 * If null, nodes are expanded one at a time and only their children are scored in parallel.
+		 */
+		private Integer numParallelNodes = null;
+
+		/**
+		 * When expanding nodes in parallel, true to expand them in synchronized rounds,
+		 * so conformations with equal scores are always enumerated in the same order.
+		 * False lets expansions overlap, which keeps the threads busier, but the order
+		 * of conformations with equal scores may change from run to run.
+		 */
+		private boolean deterministic = false;
+
 		public Builder(EnergyMatrix emat, SimpleConfSpace confSpace) {
 			this(emat, new RCs(confSpace));
 		}
@@ -161,7 +182,8 @@ public class ConfAStarTree implements ConfSearch {
 				builder.updater,
 				emat,
 				builder.numIterations,
-				builder.convergenceThreshold
+				builder.convergenceThreshold,
+				builder.warmStart ? builder.warmStartMiB : null
 			);
 			return this;
 		}
@@ -190,11 +212,36 @@ public class ConfAStarTree implements ConfSearch {
 				throw new IllegalArgumentException("external memory is incompatible with bounded memory");
 			}
 
+			if (factory instanceof CompactConfAStarFactory) {
+				throw new IllegalArgumentException("external memory is incompatible with compact memory");
+			}
+
 			ExternalMemory.checkInternalLimitSet();
 			factory = new EMConfAStarFactory();
 			return this;
 		}
 		
+		/**
+		 * Store A* nodes in the queue as compact fixed-width records rather than objects,
+		 * which fits several times more nodes into the same amount of memory.
+		 *
+		 * @param offHeap True to allocate node storage outside of the JVM heap,
+		 *                so large searches aren't limited by the JVM heap size.
+		 */
+		public Builder useCompactMemory(boolean offHeap) {
+
+			// just in case...
+			if (maxNumNodes != null) {
+				throw new IllegalArgumentException("compact memory is incompatible with bounded memory");
+			}
+			if (factory instanceof EMConfAStarFactory) {
+				throw new IllegalArgumentException("compact memory is incompatible with external memory");
+			}
+
+			factory = new CompactConfAStarFactory(offHeap);
+			return this;
+		}
+
 		public Builder setShowProgress(boolean val) {
 			showProgress = val;
 			return this;
@@ -211,6 +258,9 @@ public class ConfAStarTree implements ConfSearch {
 			if (val != null && factory instanceof EMConfAStarFactory) {
 				throw new IllegalArgumentException("bounded memory is incompatible with external memory");
 			}
+			if (val != null && factory instanceof CompactConfAStarFactory) {
+				throw new IllegalArgumentException("bounded memory is incompatible with compact memory");
+			}
 
 			maxNumNodes = val;
 			return this;
@@ -219,8 +269,27 @@ public class ConfAStarTree implements ConfSearch {
 		public Builder setMaxNumNodes(int val) {
 			return setMaxNumNodes(Long.valueOf(val));
 		}
+
+		public Builder setNumParallelNodes(Integer val) {
+			if (val != null && val <= 0) {
+				throw new IllegalArgumentException("number of parallel nodes should be at least 1");
+			}
+			numParallelNodes = val;
+			return this;
+		}
+
+		public Builder setDeterministic(boolean val) {
+			deterministic = val;
+			return this;
+		}
 		
 		public ConfAStarTree build() {
+
+			// just in case...
+			if (maxNumNodes != null && numParallelNodes != null) {
+				throw new IllegalArgumentException("bounded memory is incompatible with parallel node expansion");
+			}
+
 			ConfAStarTree tree = new ConfAStarTree(
 				order,
 				gscorer,
@@ -229,7 +298,9 @@ public class ConfAStarTree implements ConfSearch {
 				rcs,
 				factory,
 				pruner,
-				maxNumNodes
+				maxNumNodes,
+				numParallelNodes,
+				deterministic
 			);
 			if (showProgress) {
 				tree.initProgress();
@@ -281,6 +352,32 @@ public class ConfAStarTree implements ConfSearch {
 		 * large numbers of MPLP iterations, optimizing this value may increase performance though.
 		 */
 		private double convergenceThreshold = 0.0001;
+
+		/**
+		 * True to start the MPLP messages of each child node from the messages of its parent node,
+		 * rather than starting over from the traditional A* heuristic at every node.
+		 *
+		 * A child differs from its parent by just one assignment, so the parent's messages are
+		 * already a sound starting point, and the messages keep improving as the search goes deeper.
+		 * Each child iterates at most once more than its parent needed to converge (up to numIterations),
+		 * so nodes near convergence get cheaper to score.
+		 *
+		 * This value doesn't affect the accuracy of the conformation search, only the speed.
+		 * Conformations with equal scores may be enumerated in a different order though.
+		 *
+		 * Generally, warm starts help most for large conformation spaces, with more than one iteration.
+		 */
+		private boolean warmStart = false;
+
+		/**
+		 * The memory budget for the messages kept for warm starts, in MiB.
+		 *
+		 * Messages for the most recently-scored nodes are kept. If the messages for a parent node
+		 * have been dropped, they are recomputed from scratch.
+		 *
+		 * Has no effect unless warmStart is true.
+		 */
+		private int warmStartMiB = 64;
 		
 		public MPLPBuilder setUpdater(MPLPUpdater val) {
 			updater = val;
@@ -296,6 +393,16 @@ public class ConfAStarTree implements ConfSearch {
 			convergenceThreshold = val;
 			return this;
 		}
+
+		public MPLPBuilder setWarmStart(boolean val) {
+			warmStart = val;
+			return this;
+		}
+
+		public MPLPBuilder setWarmStartMiB(int val) {
+			warmStartMiB = val;
+			return this;
+		}
 	}
 
 	public static MPLPBuilder MPLPBuilder() {
@@ -323,7 +430,7 @@ public class ConfAStarTree implements ConfSearch {
 	private TaskExecutor tasks;
 	private ObjectPool<ScoreContext> contexts;
 	
-	private ConfAStarTree(AStarOrder order, AStarScorer gscorer, AStarScorer hscorer, MathTools.Optimizer optimizer, RCs rcs, ConfAStarFactory factory, AStarPruner pruner, Long maxNumNodes) {
+	private ConfAStarTree(AStarOrder order, AStarScorer gscorer, AStarScorer hscorer, MathTools.Optimizer optimizer, RCs rcs, ConfAStarFactory factory, AStarPruner pruner, Long maxNumNodes, Integer numParallelNodes, boolean deterministic) {
 		this.order = order;
 		this.gscorer = gscorer;
 		this.hscorer = hscorer;
@@ -334,6 +441,8 @@ public class ConfAStarTree implements ConfSearch {
 
 		if (maxNumNodes != null) {
 			this.impl = new SimplifiedBoundedImpl(maxNumNodes);
+		} else if (numParallelNodes != null) {
+			this.impl = new ParallelImpl(numParallelNodes, deterministic);
 		} else {
 			this.impl = new UnboundedImpl();
 		}
@@ -381,6 +490,30 @@ public class ConfAStarTree implements ConfSearch {
 		return rcs.getNumConformations();
 	}
 
+	/** the number of nodes currently held by the search */
+	public long getNumNodes() {
+		return impl.getNumNodes();
+	}
+
+	/**
+	 * A rough estimate of the memory held by the nodes of the search, in bytes.
+	 * Compact queues report their allocated storage exactly, everything else
+	 * is estimated from the number of nodes.
+	 */
+	public long estimateNumBytes() {
+		return impl.estimateNumBytes();
+	}
+
+	/** rough size of a linked node, its link, and its slot in the queue */
+	private static final long NodeBytes = 72;
+
+	private static long estimateNumBytes(Queue<ConfAStarNode> queue) {
+		if (queue instanceof CompactConfAStarQueue) {
+			return ((CompactConfAStarQueue)queue).getNumArenaBytes();
+		}
+		return queue.size()*NodeBytes;
+	}
+
 	@Override
 	public ScoredConf nextConf() {
 		return impl.nextConf();
@@ -459,6 +592,8 @@ public class ConfAStarTree implements ConfSearch {
 	private interface AStarImpl {
 
 		ScoredConf nextConf();
+		long getNumNodes();
+		long estimateNumBytes();
 	}
 
 	/**
@@ -474,6 +609,16 @@ public class ConfAStarTree implements ConfSearch {
 			this.queue = factory.makeQueue(rcs);
 		}
 
+		@Override
+		public long getNumNodes() {
+			return queue.size();
+		}
+
+		@Override
+		public long estimateNumBytes() {
+			return ConfAStarTree.estimateNumBytes(queue);
+		}
+
 		@Override
 		public ScoredConf nextConf() {
 
@@ -586,6 +731,256 @@ public class ConfAStarTree implements ConfSearch {
 		}
 	}
 
+	/**
+	 * An implementation of A* that uses unbounded memory, and expands many nodes at once in parallel.
+	 *
+	 * Node positions are chosen and dynamic pruning is checked on the caller thread,
+	 * since orders and pruners aren't thread-safe, then each node's children are scored
+	 * in a task using a per-thread scoring context.
+	 *
+	 * A leaf node is only reported when it's at the head of the queue and no node still being
+	 * expanded has a better score, so conformations are enumerated in the same order as
+	 * the classic A* (up to ties).
+	 */
+	private class ParallelImpl implements AStarImpl {
+
+		private class Expansion {
+
+			final ConfAStarNode node;
+			final int nextPos;
+			final int[] nextRCs;
+
+			ConfAStarNode[] children = null;
+			Throwable error = null;
+
+			Expansion(ConfAStarNode node, int nextPos, int[] nextRCs) {
+				this.node = node;
+				this.nextPos = nextPos;
+				this.nextRCs = nextRCs;
+			}
+
+			void score() {
+				try (Checkout<ScoreContext> checkout = contexts.autoCheckout()) {
+					ScoreContext context = checkout.get();
+
+					// score the child nodes differentially against the parent node
+					node.index(context.index);
+					children = new ConfAStarNode[nextRCs.length];
+					for (int i=0; i<nextRCs.length; i++) {
+						ConfAStarNode child = node.assign(nextPos, nextRCs[i]);
+						child.setGScore(context.gscorer.calcDifferential(context.index, rcs, nextPos, nextRCs[i]), optimizer);
+						child.setHScore(context.hscorer.calcDifferential(context.index, rcs, nextPos, nextRCs[i]), optimizer);
+						children[i] = child;
+					}
+
+				} catch (Throwable t) {
+					error = t;
+				}
+			}
+
+			int pushChildren() {
+
+				if (error != null) {
+					throw new RuntimeException("can't score A* nodes", error);
+				}
+
+				int numChildren = 0;
+				for (ConfAStarNode child : children) {
+					if (Double.isFinite(child.getScore())) {
+						queue.push(child);
+						numChildren++;
+					}
+				}
+
+				if (progress != null) {
+					progress.reportInternalNode(node.getLevel(), node.getGScore(optimizer), node.getHScore(optimizer), queue.size(), numChildren);
+				}
+
+				return numChildren;
+			}
+		}
+
+		private final int numParallelNodes;
+		private final boolean deterministic;
+		private final Queue<ConfAStarNode> queue;
+		private final List<Expansion> expanding = new ArrayList<>();
+		private final BlockingQueue<Expansion> finished = new LinkedBlockingQueue<>();
+
+		private ConfAStarNode rootNode = null;
+
+		ParallelImpl(int numParallelNodes, boolean deterministic) {
+			this.numParallelNodes = numParallelNodes;
+			this.deterministic = deterministic;
+			this.queue = factory.makeQueue(rcs);
+		}
+
+		@Override
+		public long getNumNodes() {
+			return queue.size();
+		}
+
+		@Override
+		public long estimateNumBytes() {
+			return ConfAStarTree.estimateNumBytes(queue);
+		}
+
+		@Override
+		public ScoredConf nextConf() {
+
+			// do we have a root node yet?
+			if (rootNode == null) {
+
+				// should we have one?
+				if (!rcs.hasConfs()) {
+					return null;
+				}
+
+				rootNode = factory.makeRootNode(rcs.getNumPos());
+
+				// pick all the single-rotamer positions now, just like the classic A*
+				ConfAStarNode node = rootNode;
+				for (int pos=0; pos<rcs.getNumPos(); pos++) {
+					if (rcs.getNum(pos) == 1) {
+						node = node.assign(pos, rcs.get(pos)[0]);
+					}
+				}
+				assert (node.getLevel() == rcs.getNumTrivialPos());
+
+				// score and add the tail node of the chain we just created
+				node.index(confIndex);
+				node.setGScore(gscorer.calc(confIndex, rcs), optimizer);
+				node.setHScore(hscorer.calc(confIndex, rcs), optimizer);
+				queue.push(node);
+			}
+
+			while (true) {
+
+				// start expanding as many nodes as we can
+				while (expanding.size() < numParallelNodes) {
+
+					ConfAStarNode node = peekUnpruned();
+					if (node == null || isLeaf(node)) {
+						break;
+					}
+					queue.poll();
+
+					Expansion expansion = prepare(node);
+					expanding.add(expansion);
+					tasks.submit(
+						() -> {
+							expansion.score();
+							return expansion;
+						},
+						(e) -> finished.add(e)
+					);
+				}
+
+				// can we report a leaf node yet?
+				ConfAStarNode node = peekUnpruned();
+				if (node != null && isLeaf(node) && !isExpandingBetterThan(node)) {
+					queue.poll();
+
+					if (progress != null) {
+						progress.reportLeafNode(node.getGScore(optimizer), queue.size());
+					}
+
+					return new ScoredConf(
+						node.makeConf(rcs.getNumPos()),
+						node.getGScore(optimizer)
+					);
+				}
+
+				// nothing left to expand or report? we're done
+				if (expanding.isEmpty()) {
+					assert (queue.isEmpty());
+					return null;
+				}
+
+				if (deterministic) {
+
+					// wait for the whole round to finish, then add the children in a fixed order
+					tasks.waitForFinish();
+					for (Expansion expansion : expanding) {
+						expansion.pushChildren();
+					}
+					expanding.clear();
+					finished.clear();
+
+				} else {
+
+					// wait for any expansion to finish, and add its children right away
+					Expansion expansion;
+					try {
+						expansion = finished.take();
+					} catch (InterruptedException ex) {
+						throw new RuntimeException(ex);
+					}
+					expanding.remove(expansion);
+					expansion.pushChildren();
+				}
+			}
+		}
+
+		private boolean isLeaf(ConfAStarNode node) {
+			return node.getLevel() == rcs.getNumPos();
+		}
+
+		private ConfAStarNode peekUnpruned() {
+			while (!queue.isEmpty()) {
+
+				ConfAStarNode node = queue.peek();
+
+				// if this node was pruned dynamically, then ignore it
+				if (pruner != null && pruner.isPruned(node)) {
+					queue.poll();
+					continue;
+				}
+
+				return node;
+			}
+			return null;
+		}
+
+		private boolean isExpandingBetterThan(ConfAStarNode node) {
+			// children are never better than their parents, so only the nodes being expanded matter
+			for (Expansion expansion : expanding) {
+				if (expansion.node.getScore() < node.getScore()) {
+					return true;
+				}
+			}
+			return false;
+		}
+
+		private Expansion prepare(ConfAStarNode node) {
+
+			// which pos to expand next?
+			node.index(confIndex);
+			int nextPos = order.getNextPos(confIndex, rcs);
+			assert (!confIndex.isDefined(nextPos));
+			assert (confIndex.isUndefined(nextPos));
+
+			// which RCs survive pruning?
+			int[] nextRCs = new int[rcs.getNum(nextPos)];
+			int numRCs = 0;
+			for (int nextRc : rcs.get(nextPos)) {
+
+				// if this child was pruned by the pruning matrix, then skip it
+				if (isPruned(confIndex, nextPos, nextRc)) {
+					continue;
+				}
+
+				// if this child was pruned dynamically, then don't score it
+				if (pruner != null && pruner.isPruned(node, nextPos, nextRc)) {
+					continue;
+				}
+
+				nextRCs[numRCs++] = nextRc;
+			}
+
+			return new Expansion(node, nextPos, Arrays.copyOf(nextRCs, numRCs));
+		}
+	}
+
 	/**
 	 * The Simplified Memory-Bounded A* algorihm
 	 * {@cite Russell1992 Stuart S. Russell, 1992.
@@ -624,6 +1019,17 @@ public class ConfAStarTree implements ConfSearch {
 		// TODO: progress reporting?
 		// TODO: parallelism?
 
+		@Override
+		public long getNumNodes() {
+			return numNodes;
+		}
+
+		@Override
+		public long estimateNumBytes() {
+			// see the notes in ConfSMAStarNode, roughly 250 bytes per node
+			return numNodes*250;
+		}
+
 		@Override
 		public ScoredConf nextConf() {
 
@@ -1,10 +1,13 @@
 package edu.duke.cs.osprey.astar.conf;
 
 
+import edu.duke.cs.osprey.confspace.Conf;
 import edu.duke.cs.osprey.confspace.ConfSearch;
 
 import java.lang.ref.SoftReference;
 import java.math.BigInteger;
+import java.util.ArrayDeque;
+import java.util.Deque;
 import java.util.Iterator;
 import java.util.LinkedHashSet;
 import java.util.function.Supplier;
@@ -16,8 +19,14 @@ import java.util.function.Supplier;
  * collected. The remaining instances are held by soft references and
  * will be garbage collected when running low on heap space.
  *
+ * Optionally, the cache can also hold the recently used trees to a memory budget.
+ * When the estimated size of the protected trees exceeds the budget, the least
+ * recently used trees are dropped entirely, without waiting for the garbage collector.
+ *
  * Collected trees will be re-instantiated and enumerated to their
- * last known position when accessed again.
+ * last known position when accessed again. Confs with tied scores may come out of
+ * a re-instantiated tree in a different order (e.g., with parallel A* node expansion),
+ * so the cache remembers the returned confs tied at the last score and never returns a conf twice.
  */
 public class ConfSearchCache {
 
@@ -25,10 +34,18 @@ public class ConfSearchCache {
 
 		private final Supplier<ConfSearch> factory;
 
-		private long numConfs = 0;
-		private boolean isExhausted = false;
+		// the tree references and size estimate are guarded by the cache lock,
+		// since eviction changes them from other threads
 		private ConfSearch strongRef = null;
 		private SoftReference<ConfSearch> softRef = null;
+		private long numBytes = 0;
+
+		// the enumeration state is only touched by the (synchronized) search methods
+		private long numConfs = 0;
+		private boolean isExhausted = false;
+		private double lastScore = Double.NaN;
+		private final Conf.Set lastConfs = new Conf.Set();
+		private final Deque<ScoredConf> pendingConfs = new ArrayDeque<>();
 
 		private Entry(Supplier<ConfSearch> factory) {
 			this.factory = factory;
@@ -37,87 +54,140 @@ public class ConfSearchCache {
 
 		private ConfSearch getOrMakeTree() {
 
-			// check the soft ref to see if we still have a tree
+			// check the strong ref first, then the soft ref to see if we still have a tree
 			// (it could have been collected by the GC)
-			if (softRef != null) {
-				ConfSearch tree = softRef.get();
+			synchronized (ConfSearchCache.this) {
+				ConfSearch tree = strongRef;
+				if (tree == null && softRef != null) {
+					tree = softRef.get();
+				}
 				if (tree != null) {
 					markUsed(tree);
 					return tree;
 				}
 			}
 
-			// don't have a tree, make a new one
-			ConfSearch tree = factory.get();
+			// don't have a tree, make a new one and put it back to where it was
+			// (without holding the cache lock, since that can take a while)
+			ConfSearch tree = replay(factory.get());
 
-			// and put it back to where it was
-			for (int i=0; i<numConfs; i++) {
-				tree.nextConf();
+			// recently-used entries are always protected from garbage collection
+			synchronized (ConfSearchCache.this) {
+				softRef = new SoftReference<>(tree);
+				markUsed(tree);
 			}
 
-			// recently-used entries are always protected from garbage collection
-			softRef = new SoftReference<>(tree);
-			markUsed(tree);
+			return tree;
+		}
+
+		private ConfSearch replay(ConfSearch tree) {
+
+			// trees that expand nodes in parallel can return confs with tied scores in a different order,
+			// so we can't just skip the first numConfs confs of the new tree:
+			// every conf scored before the last returned score was returned already,
+			// but among the ties, only skip the ones we actually returned, and save the others for later
+			pendingConfs.clear();
+			long numSkipped = 0;
+			while (numSkipped < numConfs) {
+				ScoredConf conf = tree.nextConf();
+				if (conf == null) {
+					break;
+				}
+				if (conf.getScore() != lastScore || lastConfs.contains(conf.getAssignments())) {
+					numSkipped++;
+				} else {
+					pendingConfs.add(conf);
+				}
+			}
 
 			return tree;
 		}
 
+		/** call only while holding the cache lock */
 		private void markUsed(ConfSearch tree) {
 
 			// protect from garbage collection by holding a strong reference
 			strongRef = tree;
 
 			// if capacity restrictions are turned on, manage recency and GC protections
-			if (minCapacity != null) {
-
+			if (minCapacity != null || maxBytes != null) {
 				recentEntries.remove(this);
 				recentEntries.add(this);
+				updateNumBytes(tree);
+				evict();
+			}
+		}
 
-				// if we're over capacity, expose the least recently used trees to garbage collection
-				if (recentEntries.size() > minCapacity) {
-					Iterator<Entry> iter = recentEntries.iterator();
-
-					// get rid of the strong reference, so we only have the soft reference
-					iter.next().strongRef = null;
-					iter.remove();
-				}
+		/** call only while holding the cache lock */
+		private void updateNumBytes(ConfSearch tree) {
+			if (maxBytes != null) {
+				long numBytes = estimateNumBytes(tree);
+				protectedBytes += numBytes - this.numBytes;
+				this.numBytes = numBytes;
 			}
 		}
 
 		public void clearRefs() {
-			softRef = null;
-			strongRef = null;
+			synchronized (ConfSearchCache.this) {
+				softRef = null;
+				strongRef = null;
+				if (recentEntries.remove(this)) {
+					protectedBytes -= numBytes;
+				}
+				numBytes = 0;
+			}
 		}
 
 		public boolean isProtected() {
-			return strongRef != null;
+			synchronized (ConfSearchCache.this) {
+				return strongRef != null;
+			}
 		}
 
 		@Override
-		public BigInteger getNumConformations() {
+		public synchronized BigInteger getNumConformations() {
 			return getOrMakeTree().getNumConformations();
 		}
 
 		@Override
-		public ScoredConf nextConf() {
+		public synchronized ScoredConf nextConf() {
 
 			// no more confs? don't bother with the tree
 			if (isExhausted) {
 				return null;
 			}
 
-			// get the next conf
-			ScoredConf conf = getOrMakeTree().nextConf();
+			// get the next conf, starting with any ties left over from a replay
+			ConfSearch tree = getOrMakeTree();
+			ScoredConf conf = pendingConfs.isEmpty() ? tree.nextConf() : pendingConfs.poll();
 
 			// and keep track of which conf we're on
 			if (conf == null) {
 				isExhausted = true;
+				lastConfs.clear();
 
 				// and let GC take the tree
 				clearRefs();
 
 			} else {
 				numConfs++;
+
+				// remember the confs tied at the last score, for replays
+				if (conf.getScore() != lastScore) {
+					lastScore = conf.getScore();
+					lastConfs.clear();
+				}
+				lastConfs.add(conf.getAssignments());
+
+				// the tree probably grew, so check the memory budget again
+				if (maxBytes != null) {
+					synchronized (ConfSearchCache.this) {
+						if (recentEntries.contains(this)) {
+							updateNumBytes(tree);
+							evict();
+						}
+					}
+				}
 			}
 
 			return conf;
@@ -126,14 +196,70 @@ public class ConfSearchCache {
 
 
 	public final Integer minCapacity;
+	public final Integer maxMiB;
 
+	private final Long maxBytes;
 	private final LinkedHashSet<Entry> recentEntries = new LinkedHashSet<>();
+	private long protectedBytes = 0;
 
 	public ConfSearchCache(Integer minCapacity) {
+		this(minCapacity, null);
+	}
+
+	/**
+	 * @param minCapacity The number of recently used trees to protect from garbage collection,
+	 *                    or null to protect all trees not dropped by the memory budget.
+	 * @param maxMiB The budget for the estimated size of protected trees, in MiB,
+	 *               or null for no budget. The most recently used tree is always kept,
+	 *               even if it alone exceeds the budget.
+	 */
+	public ConfSearchCache(Integer minCapacity, Integer maxMiB) {
 		this.minCapacity = minCapacity;
+		this.maxMiB = maxMiB;
+		this.maxBytes = maxMiB != null ? maxMiB*1024L*1024L : null;
 	}
 
 	public Entry make(Supplier<ConfSearch> factory) {
 		return new Entry(factory);
 	}
+
+	/** the estimated size of the trees currently protected by the memory budget, in bytes */
+	public synchronized long getNumProtectedBytes() {
+		return protectedBytes;
+	}
+
+	/** call only while holding the cache lock */
+	private void evict() {
+
+		Iterator<Entry> iter = recentEntries.iterator();
+		while (recentEntries.size() > 1) {
+
+			boolean isOverCapacity = minCapacity != null && recentEntries.size() > minCapacity;
+			boolean isOverBudget = maxBytes != null && protectedBytes > maxBytes;
+			if (!isOverCapacity && !isOverBudget) {
+				break;
+			}
+
+			Entry entry = iter.next();
+			iter.remove();
+			protectedBytes -= entry.numBytes;
+			entry.numBytes = 0;
+
+			// get rid of the strong reference, so we only have the soft reference
+			entry.strongRef = null;
+
+			// if we're over the memory budget, drop the soft reference too,
+			// so the tree actually goes away
+			if (isOverBudget) {
+				entry.softRef = null;
+			}
+		}
+	}
+
+	private static long estimateNumBytes(ConfSearch tree) {
+		if (tree instanceof ConfAStarTree) {
+			return ((ConfAStarTree)tree).estimateNumBytes();
+		}
+		return 0;
+	}
 }
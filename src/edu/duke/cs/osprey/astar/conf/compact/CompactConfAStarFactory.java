@@ -0,0 +1,63 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.astar.conf.compact;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarFactory;
+import edu.duke.cs.osprey.astar.conf.ConfAStarNode;
+import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.externalMemory.EMConfAStarNode;
+import edu.duke.cs.osprey.externalMemory.Queue;
+
+/**
+ * Stores A* nodes in the queue as small fixed-width records instead of objects.
+ * See {@link CompactConfAStarQueue} for the record layout.
+ */
+public class CompactConfAStarFactory implements ConfAStarFactory {
+
+	public final boolean offHeap;
+
+	public CompactConfAStarFactory(boolean offHeap) {
+		this.offHeap = offHeap;
+	}
+
+	@Override
+	public Queue<ConfAStarNode> makeQueue(RCs rcs) {
+		return new CompactConfAStarQueue(rcs, offHeap);
+	}
+
+	@Override
+	public ConfAStarNode makeRootNode(int numPos) {
+		// nodes outside of the queue have to be self-contained, just like for external memory
+		return new EMConfAStarNode(numPos);
+	}
+}
@@ -0,0 +1,311 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.astar.conf.compact;
+
+import java.nio.ByteBuffer;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.NoSuchElementException;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarNode;
+import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.externalMemory.EMConfAStarNode;
+import edu.duke.cs.osprey.externalMemory.Queue;
+
+/**
+ * A binary min-heap of A* nodes, where each node is a fixed-width record in a chunked byte arena,
+ * optionally allocated off-heap so it doesn't count against the JVM heap limit.
+ *
+ * Each record is laid out as:
+ *   double gscore
+ *   float hscore
+ *   long[] assignments, bit-packed with just enough bits per position for the biggest RC
+ *
+ * The heap moves records around directly, so there are no per-node objects or pointers at all.
+ * Nodes are re-created (as {@link EMConfAStarNode}) only when they leave the queue.
+ *
+ * The h-score is rounded towards better scores when it's narrowed to a float,
+ * so heuristics stay admissible. g-scores are kept exactly, since leaf node
+ * g-scores are the conformation scores.
+ */
+public class CompactConfAStarQueue implements Queue<ConfAStarNode> {
+
+	private static final int ChunkBytes = 16*1024*1024;
+
+	private static final int GScoreOffset = 0;
+	private static final int HScoreOffset = GScoreOffset + Double.BYTES;
+	private static final int AssignmentsOffset = HScoreOffset + Float.BYTES;
+
+	public final int numPos;
+	public final boolean offHeap;
+	public final int bitsPerPos;
+	public final int recordBytes;
+
+	private final int numLongs;
+	private final long posMask;
+	private final int recordsPerChunkShift;
+	private final int recordsPerChunkMask;
+	private final List<ByteBuffer> chunks = new ArrayList<>();
+
+	private long size = 0;
+	private EMConfAStarNode head = null;
+
+	// scratch space for the record being moved around the heap
+	private double movingG;
+	private float movingH;
+	private final long[] movingAssignments;
+
+	private final int[] conf;
+
+	public CompactConfAStarQueue(RCs rcs, boolean offHeap) {
+
+		this.numPos = rcs.getNumPos();
+		this.offHeap = offHeap;
+
+		// store rc+1, so unassigned positions (-1) pack to 0
+		int maxVal = 0;
+		for (int pos=0; pos<numPos; pos++) {
+			for (int rc : rcs.get(pos)) {
+				maxVal = Math.max(maxVal, rc + 1);
+			}
+		}
+		bitsPerPos = Math.max(1, 32 - Integer.numberOfLeadingZeros(maxVal));
+		posMask = (1L << bitsPerPos) - 1;
+
+		// don't let positions straddle longs, to keep packing simple
+		int posPerLong = Long.SIZE/bitsPerPos;
+		numLongs = Math.max(1, (numPos + posPerLong - 1)/posPerLong);
+		recordBytes = AssignmentsOffset + numLongs*Long.BYTES;
+
+		// use a power of two for the records per chunk, so record addressing is just bit twiddling
+		recordsPerChunkShift = 31 - Integer.numberOfLeadingZeros(Math.max(1, ChunkBytes/recordBytes));
+		recordsPerChunkMask = (1 << recordsPerChunkShift) - 1;
+
+		movingAssignments = new long[numLongs];
+		conf = new int[numPos];
+	}
+
+	/** the number of bytes allocated for the arena, including unused space in the last chunk */
+	public long getNumArenaBytes() {
+		return (long)chunks.size()*(recordsPerChunkMask + 1)*recordBytes;
+	}
+
+	@Override
+	public void push(ConfAStarNode node) {
+
+		// pack the node into the scratch record
+		movingG = node.getGScore();
+		movingH = roundDown(node.getHScore());
+		node.getConf(conf);
+		pack(conf, movingAssignments);
+
+		// make room for one more record
+		long i = size++;
+		if ((i >>> recordsPerChunkShift) >= chunks.size()) {
+			chunks.add(offHeap ? ByteBuffer.allocateDirect(recordBytes << recordsPerChunkShift) : ByteBuffer.allocate(recordBytes << recordsPerChunkShift));
+		}
+
+		// sift up
+		double score = movingScore();
+		while (i > 0) {
+			long parent = (i - 1) >>> 1;
+			if (score(parent) <= score) {
+				break;
+			}
+			copy(parent, i);
+			i = parent;
+		}
+		writeMoving(i);
+
+		head = null;
+	}
+
+	@Override
+	public ConfAStarNode peek() {
+		if (size == 0) {
+			return null;
+		}
+		if (head == null) {
+			head = read(0);
+		}
+		return head;
+	}
+
+	@Override
+	public void pop() {
+
+		if (size == 0) {
+			throw new NoSuchElementException();
+		}
+
+		head = null;
+		size--;
+
+		if (size > 0) {
+
+			// move the last record to the root and sift down
+			readMoving(size);
+			double score = movingScore();
+			long i = 0;
+			while (true) {
+				long child = 2*i + 1;
+				if (child >= size) {
+					break;
+				}
+				double childScore = score(child);
+				if (child + 1 < size) {
+					double rightScore = score(child + 1);
+					if (rightScore < childScore) {
+						child++;
+						childScore = rightScore;
+					}
+				}
+				if (score <= childScore) {
+					break;
+				}
+				copy(child, i);
+				i = child;
+			}
+			writeMoving(i);
+		}
+
+		// release chunks we don't need anymore, but keep one spare to avoid thrashing
+		int numChunksNeeded = (int)((size + recordsPerChunkMask) >>> recordsPerChunkShift);
+		while (chunks.size() > numChunksNeeded + 1) {
+			chunks.remove(chunks.size() - 1);
+		}
+	}
+
+	@Override
+	public long size() {
+		return size;
+	}
+
+	@Override
+	public boolean isEmpty() {
+		return size == 0;
+	}
+
+	private static float roundDown(double val) {
+		float f = (float)val;
+		if (f > val) {
+			f = Math.nextDown(f);
+		}
+		return f;
+	}
+
+	private void pack(int[] conf, long[] out) {
+		int posPerLong = Long.SIZE/bitsPerPos;
+		for (int i=0; i<numLongs; i++) {
+			long packed = 0;
+			int start = i*posPerLong;
+			int stop = Math.min(numPos, start + posPerLong);
+			for (int pos=start; pos<stop; pos++) {
+				packed |= ((long)(conf[pos] + 1) & posMask) << ((pos - start)*bitsPerPos);
+			}
+			out[i] = packed;
+		}
+	}
+
+	private int unpack(long[] packed, int[] conf) {
+		int posPerLong = Long.SIZE/bitsPerPos;
+		int level = 0;
+		for (int pos=0; pos<numPos; pos++) {
+			int rc = (int)((packed[pos/posPerLong] >>> ((pos % posPerLong)*bitsPerPos)) & posMask) - 1;
+			conf[pos] = rc;
+			if (rc != EMConfAStarNode.NotAssigned) {
+				level++;
+			}
+		}
+		return level;
+	}
+
+	private ByteBuffer chunk(long i) {
+		return chunks.get((int)(i >>> recordsPerChunkShift));
+	}
+
+	private int offset(long i) {
+		return ((int)i & recordsPerChunkMask)*recordBytes;
+	}
+
+	private double score(long i) {
+		ByteBuffer buf = chunk(i);
+		int offset = offset(i);
+		return buf.getDouble(offset + GScoreOffset) + buf.getFloat(offset + HScoreOffset);
+	}
+
+	private double movingScore() {
+		return movingG + movingH;
+	}
+
+	private void copy(long src, long dst) {
+		ByteBuffer srcBuf = chunk(src);
+		int srcOffset = offset(src);
+		ByteBuffer dstBuf = chunk(dst);
+		int dstOffset = offset(dst);
+		dstBuf.putDouble(dstOffset + GScoreOffset, srcBuf.getDouble(srcOffset + GScoreOffset));
+		dstBuf.putFloat(dstOffset + HScoreOffset, srcBuf.getFloat(srcOffset + HScoreOffset));
+		for (int j=0; j<numLongs; j++) {
+			dstBuf.putLong(dstOffset + AssignmentsOffset + j*Long.BYTES, srcBuf.getLong(srcOffset + AssignmentsOffset + j*Long.BYTES));
+		}
+	}
+
+	private void readMoving(long i) {
+		ByteBuffer buf = chunk(i);
+		int offset = offset(i);
+		movingG = buf.getDouble(offset + GScoreOffset);
+		movingH = buf.getFloat(offset + HScoreOffset);
+		for (int j=0; j<numLongs; j++) {
+			movingAssignments[j] = buf.getLong(offset + AssignmentsOffset + j*Long.BYTES);
+		}
+	}
+
+	private void writeMoving(long i) {
+		ByteBuffer buf = chunk(i);
+		int offset = offset(i);
+		buf.putDouble(offset + GScoreOffset, movingG);
+		buf.putFloat(offset + HScoreOffset, movingH);
+		for (int j=0; j<numLongs; j++) {
+			buf.putLong(offset + AssignmentsOffset + j*Long.BYTES, movingAssignments[j]);
+		}
+	}
+
+	private EMConfAStarNode read(long i) {
+		readMoving(i);
+		EMConfAStarNode node = new EMConfAStarNode(numPos);
+		node.setLevel(unpack(movingAssignments, node.getConf()));
+		node.setGScore(movingG);
+		node.setHScore(movingH);
+		return node;
+	}
+}
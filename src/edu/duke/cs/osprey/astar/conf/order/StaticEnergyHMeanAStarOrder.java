@@ -119,7 +119,7 @@ public class StaticEnergyHMeanAStarOrder implements AStarOrder {
 			double minPairwise = Double.POSITIVE_INFINITY;
 			for (int rc1 : rcs.get(pos1)) {
 				for (int rc2 : rcs.get(pos2)) {
-					minPairwise = Math.min(minPairwise, emat.getPairwise(pos1, rc1, pos2, rc2));
+					minPairwise = Math.min(minPairwise, emat.getPairwiseValue(pos1, rc1, pos2, rc2));
 				}
 			}
 			
@@ -127,7 +127,7 @@ public class StaticEnergyHMeanAStarOrder implements AStarOrder {
 			double pos2Score = 0;
 			for (int rc1 : rcs.get(pos1)) {
 				for (int rc2 : rcs.get(pos2)) {
-					double normalizedPairwise = emat.getPairwise(pos1, rc1, pos2, rc2) - minPairwise;
+					double normalizedPairwise = emat.getPairwiseValue(pos1, rc1, pos2, rc2) - minPairwise;
 					if (normalizedPairwise != 0) {
 						pos2Score += 1.0/normalizedPairwise;
 					}
@@ -36,25 +36,119 @@ import edu.duke.cs.osprey.astar.conf.ConfIndex;
 import edu.duke.cs.osprey.astar.conf.RCs;
 import edu.duke.cs.osprey.astar.conf.scoring.mplp.MPLPUpdater;
 import edu.duke.cs.osprey.astar.conf.scoring.mplp.MessageVars;
+import edu.duke.cs.osprey.confspace.Conf;
 import edu.duke.cs.osprey.ematrix.EnergyMatrix;
 
+import java.util.Arrays;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+
 public class MPLPPairwiseHScorer implements AStarScorer {
-	
+
+	/**
+	 * Converged messages of recently-scored nodes, so their children can start from there.
+	 * Shared by all the scorers for one tree, and held to a memory budget.
+	 */
+	private static class MessageCache {
+
+		private static class Key {
+
+			final int[] conf;
+
+			Key(ConfIndex confIndex) {
+				this.conf = Conf.make(confIndex);
+			}
+
+			@Override
+			public int hashCode() {
+				return Arrays.hashCode(conf);
+			}
+
+			@Override
+			public boolean equals(Object other) {
+				return other instanceof Key && Arrays.equals(this.conf, ((Key)other).conf);
+			}
+		}
+
+		private static class Entry {
+
+			final int[] undefinedPos;
+			final double[] messages;
+			final int numIterations;
+
+			Entry(ConfIndex confIndex, MessageVars lambdas, int numIterations) {
+				this.undefinedPos = Arrays.copyOf(confIndex.undefinedPos, confIndex.numUndefined);
+				this.messages = lambdas.pack();
+				this.numIterations = numIterations;
+			}
+
+			long getNumBytes() {
+				// roughly, including object and array headers
+				return 64 + undefinedPos.length*4L + messages.length*8L;
+			}
+		}
+
+		final long maxBytes;
+
+		private final LinkedHashMap<Key,Entry> entries = new LinkedHashMap<>(16, 0.75f, true);
+		private long numBytes = 0;
+
+		MessageCache(int maxMiB) {
+			this.maxBytes = maxMiB*1024L*1024L;
+		}
+
+		synchronized Entry get(ConfIndex confIndex) {
+			return entries.get(new Key(confIndex));
+		}
+
+		synchronized void put(ConfIndex confIndex, Entry entry) {
+
+			Entry oldEntry = entries.put(new Key(confIndex), entry);
+			if (oldEntry != null) {
+				numBytes -= oldEntry.getNumBytes();
+			}
+			numBytes += entry.getNumBytes();
+
+			// evict the least recently used entries, but always keep the newest one
+			Iterator<Entry> iter = entries.values().iterator();
+			while (numBytes > maxBytes && entries.size() > 1) {
+				numBytes -= iter.next().getNumBytes();
+				iter.remove();
+			}
+		}
+	}
+
 	private MPLPUpdater updater;
 	private EnergyMatrix emat;
 	private int maxNumIterations;
 	private double epsilon;
+	private MessageCache cache;
 	
 	public MPLPPairwiseHScorer(MPLPUpdater updater, EnergyMatrix emat, int maxNumIterations, double epsilon) {
+		this(updater, emat, maxNumIterations, epsilon, (Integer)null);
+	}
+
+	/**
+	 * @param warmStartMiB If not null, start the messages of each child node from the messages of its parent,
+	 *                     and keep the messages of recently-scored nodes in memory, up to this budget in MiB.
+	 *                     When warm-starting, children iterate at most once more than their parents needed to converge.
+	 */
+	public MPLPPairwiseHScorer(MPLPUpdater updater, EnergyMatrix emat, int maxNumIterations, double epsilon, Integer warmStartMiB) {
+		this(updater, emat, maxNumIterations, epsilon, warmStartMiB != null ? new MessageCache(warmStartMiB) : null);
+	}
+
+	private MPLPPairwiseHScorer(MPLPUpdater updater, EnergyMatrix emat, int maxNumIterations, double epsilon, MessageCache cache) {
 		this.updater = updater;
 		this.emat = emat;
 		this.maxNumIterations = maxNumIterations;
 		this.epsilon = epsilon;
+		this.cache = cache;
 	}
 	
 	@Override
 	public MPLPPairwiseHScorer make() {
-		return new MPLPPairwiseHScorer(updater, emat, maxNumIterations, epsilon);
+		// share the message cache, so children can warm-start no matter which scorer scored the parent
+		return new MPLPPairwiseHScorer(updater, emat, maxNumIterations, epsilon, cache);
 	}
 
 	@Override
@@ -65,16 +159,62 @@ public class MPLPPairwiseHScorer implements AStarScorer {
 		MessageVars lambdas = new MessageVars(rcs, confIndex);
 		lambdas.initTraditionalAStar(emat);
 		
+		return run(confIndex, lambdas, maxNumIterations);
+	}
+
+	@Override
+	public double calcDifferential(ConfIndex confIndex, RCs rcs, int nextPos, int nextRc) {
+
+		if (cache == null) {
+			return calc(confIndex.assign(nextPos, nextRc), rcs);
+		}
+
+		// get the parent messages, or compute them if we don't have them anymore
+		MessageCache.Entry parent = cache.get(confIndex);
+		if (parent == null) {
+			MessageVars lambdas = new MessageVars(rcs, confIndex);
+			lambdas.initTraditionalAStar(emat);
+			run(confIndex, lambdas, maxNumIterations);
+			parent = cache.get(confIndex);
+		}
+
+		ConfIndex childIndex = confIndex.assign(nextPos, nextRc);
+		MessageVars lambdas = new MessageVars(rcs, childIndex);
+		if (parent != null) {
+
+			// init lambdas using the parent lambdas
+			// NOTE: these are sound for early stopping too, and usually much closer to convergence
+			lambdas.initWarmStart(emat, parent.undefinedPos, parent.messages, nextPos, nextRc);
+			return run(childIndex, lambdas, Math.min(maxNumIterations, parent.numIterations + 1));
+
+		} else {
+
+			// parent messages didn't fit in the cache, start over
+			lambdas.initTraditionalAStar(emat);
+			return run(childIndex, lambdas, maxNumIterations);
+		}
+	}
+
+	private double run(ConfIndex confIndex, MessageVars lambdas, int numIterations) {
+
 		// run MPLP
 		double energy = lambdas.getTotalEnergy();
-		for (int i=0; i<maxNumIterations; i++) {
+		int i;
+		for (i=0; i<numIterations; i++) {
 			updater.update(lambdas, emat);
 			double newEnergy = lambdas.getTotalEnergy();
 			if (Math.abs(newEnergy - energy) < epsilon) {
+				i++;
 				break;
 			}
 			energy = newEnergy;
 		}
+
+		// leaf nodes don't have any children to warm-start
+		if (cache != null && confIndex.numUndefined > 0) {
+			cache.put(confIndex, new MessageCache.Entry(confIndex, lambdas, i));
+		}
+
 		return energy;
 	}
 }
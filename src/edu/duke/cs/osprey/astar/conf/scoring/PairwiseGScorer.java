@@ -67,7 +67,7 @@ public class PairwiseGScorer implements AStarScorer {
 			int pos1 = confIndex.definedPos[i];
 			int rc1 = confIndex.definedRCs[i];
 			
-			gscore += emat.getOneBody(pos1, rc1);
+			gscore += emat.getOneBodyValue(pos1, rc1);
 		}
 		
 		// pairwise energies
@@ -79,7 +79,7 @@ public class PairwiseGScorer implements AStarScorer {
 				int pos2 = confIndex.definedPos[j];
 				int rc2 = confIndex.definedRCs[j];
 				
-				gscore += emat.getPairwise(pos1, rc1, pos2, rc2);
+				gscore += emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 			}
 		}
 		
@@ -93,13 +93,13 @@ public class PairwiseGScorer implements AStarScorer {
     	double gscore = confIndex.node.getGScore(optimizer);
     	
     	// add the new one-body energy
-    	gscore += emat.getOneBody(nextPos, nextRc);
+    	gscore += emat.getOneBodyValue(nextPos, nextRc);
     	
     	// add the new pairwise energies
     	for (int i=0; i<confIndex.numDefined; i++) {
     		int pos = confIndex.definedPos[i];
     		int rc = confIndex.definedRCs[i];
-    		gscore += emat.getPairwise(pos, rc, nextPos, nextRc);
+    		gscore += emat.getPairwiseValue(pos, rc, nextPos, nextRc);
     	}
     	
     	return gscore;
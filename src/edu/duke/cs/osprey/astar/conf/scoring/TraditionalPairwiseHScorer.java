@@ -74,12 +74,7 @@ public class TraditionalPairwiseHScorer implements AStarScorer {
 				for (int pos2=0; pos2<pos1; pos2++) {
 					
 					// optimize over rc2
-					double optEnergy = optimizer.initDouble();
-					for (int rc2 : rcs.get(pos2)) {
-						optEnergy = optimizer.opt(optEnergy, emat.getPairwise(pos1, rc1, pos2, rc2));
-					}
-					
-					undefinedEnergies[pos1][i][pos2] = optEnergy;
+					undefinedEnergies[pos1][i][pos2] = emat.optPairwise(pos1, rc1, pos2, rcs.get(pos2), optimizer);
 				}
 			}
 		}
@@ -162,7 +157,7 @@ public class TraditionalPairwiseHScorer implements AStarScorer {
 				}
 				
 				// add defined contribution
-				rcEnergy += emat.getPairwise(pos, rc, nextPos, nextRc);
+				rcEnergy += emat.getPairwiseValue(pos, rc, nextPos, nextRc);
 				
 				optRCEnergy = optimizer.opt(optRCEnergy, rcEnergy);
 			}
@@ -186,14 +181,14 @@ public class TraditionalPairwiseHScorer implements AStarScorer {
 				int rc1 = rcs1[j];
 				
 				// start with the one-body energy
-				double energy = emat.getOneBody(pos1, rc1);
+				double energy = emat.getOneBodyValue(pos1, rc1);
 				
 				// add defined energies
 				for (int k=0; k<confIndex.numDefined; k++) {
 					int pos2 = confIndex.definedPos[k];
 					int rc2 = confIndex.definedRCs[k];
 					
-					energy += emat.getPairwise(pos1, rc1, pos2, rc2);
+					energy += emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 				}
 				
 				// add undefined energies
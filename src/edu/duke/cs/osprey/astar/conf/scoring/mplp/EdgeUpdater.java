@@ -96,7 +96,7 @@ public class EdgeUpdater implements MPLPUpdater {
 			for (int rci2=0; rci2<rcs.getNum(pos2); rci2++) {
 				int rc2 = rcs.get(pos2, rci2);
 				double energy = lambdas.getEnergyWithout(posi2, rci2, posi1)
-					+ emat.getPairwise(pos1, rc1, pos2, rc2);
+					+ emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 				minEnergy = Math.min(minEnergy, energy);
 			}
 			
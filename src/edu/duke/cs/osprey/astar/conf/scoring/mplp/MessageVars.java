@@ -93,11 +93,11 @@ public class MessageVars {
 				int rc1 = rcs.get(pos1, rci1);
 				
 				// init i,i messages with single and defined-undefined energies
-				double sum = emat.getOneBody(pos1, rc1);
+				double sum = emat.getOneBodyValue(pos1, rc1);
 				for (int posi2=0; posi2<confIndex.numDefined; posi2++) {
 					int pos2 = confIndex.definedPos[posi2];
 					int rc2 = confIndex.definedRCs[posi2];
-					sum += emat.getPairwise(pos1, rc1, pos2, rc2);
+					sum += emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 				}
 				set(posi1, posi1, rci1, sum);
 				
@@ -108,11 +108,7 @@ public class MessageVars {
 					if (pos2 < pos1) {
 					
 						// min over the other RC
-						double minEnergy = Double.POSITIVE_INFINITY;
-						for (int rc2 : rcs.get(pos2)) {
-							minEnergy = Math.min(minEnergy, emat.getPairwise(pos1, rc1, pos2, rc2));
-						}
-						set(posi2, posi1, rci1, minEnergy);
+						set(posi2, posi1, rci1, emat.minPairwise(pos1, rc1, pos2, rcs.get(pos2)));
 					
 					} else if (pos2 > pos1) {
 						
@@ -132,6 +128,86 @@ public class MessageVars {
 		}
 	}
 	
+	/**
+	 * Initializes the messages from the packed messages of the parent node, where the parent
+	 * differs from this node only by the assignment of assignedRc to assignedPos.
+	 *
+	 * The parent's messages between positions that are still undefined here already satisfy
+	 * the MPLP constraints, so they're a sound place to start, just like the traditional A* heuristic.
+	 * Only the single-position messages change, by the pair energies with the newly-assigned RC.
+	 */
+	public void initWarmStart(EnergyMatrix emat, int[] parentUndefinedPos, double[] parentVars, int assignedPos, int assignedRc) {
+
+		// get the layout of the parent messages
+		int[] parentOffsets = new int[parentUndefinedPos.length];
+		int parentRowSize = 0;
+		for (int posi=0; posi<parentUndefinedPos.length; posi++) {
+			parentOffsets[posi] = parentRowSize;
+			parentRowSize += rcs.getNum(parentUndefinedPos[posi]);
+		}
+
+		// map our positions to the parent positions
+		int[] parentPosis = new int[confIndex.numUndefined];
+		for (int posi=0; posi<confIndex.numUndefined; posi++) {
+			int pos = confIndex.undefinedPos[posi];
+			parentPosis[posi] = -1;
+			for (int parentPosi=0; parentPosi<parentUndefinedPos.length; parentPosi++) {
+				if (parentUndefinedPos[parentPosi] == pos) {
+					parentPosis[posi] = parentPosi;
+					break;
+				}
+			}
+			if (parentPosis[posi] < 0) {
+				throw new IllegalArgumentException("position " + pos + " is not undefined in the parent");
+			}
+		}
+
+		for (int posi1=0; posi1<confIndex.numUndefined; posi1++) {
+			int pos1 = confIndex.undefinedPos[posi1];
+
+			for (int rci1=0; rci1<rcs.getNum(pos1); rci1++) {
+				int rc1 = rcs.get(pos1, rci1);
+
+				// copy the parent messages, and add the new energies to the i,i messages
+				for (int posi2=0; posi2<confIndex.numUndefined; posi2++) {
+					double val = parentVars[parentPosis[posi2]*parentRowSize + parentOffsets[parentPosis[posi1]] + rci1];
+					if (posi2 == posi1) {
+						val += emat.getPairwiseValue(pos1, rc1, assignedPos, assignedRc);
+					}
+					set(posi2, posi1, rci1, val);
+				}
+
+				if (canUsePrecomputedSums(posi1, rci1)) {
+
+					double sum = 0;
+					for (int posi2=0; posi2<confIndex.numUndefined; posi2++) {
+						sum += get(posi2, posi1, rci1);
+					}
+					sums[posi1][rci1] = sum;
+				}
+			}
+		}
+	}
+
+	/**
+	 * Copies all the messages into one array, eg to warm-start the messages of child nodes later.
+	 */
+	public double[] pack() {
+
+		int size = 0;
+		for (double[] msgs : vars) {
+			size += msgs.length;
+		}
+
+		double[] packed = new double[size];
+		int offset = 0;
+		for (double[] msgs : vars) {
+			System.arraycopy(msgs, 0, packed, offset, msgs.length);
+			offset += msgs.length;
+		}
+		return packed;
+	}
+
 	public RCs getRCs() {
 		return rcs;
 	}
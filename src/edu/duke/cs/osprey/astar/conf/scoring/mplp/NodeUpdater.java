@@ -116,7 +116,7 @@ public class NodeUpdater implements MPLPUpdater {
 					for (int rci2=0; rci2<rcs.getNum(pos2); rci2++) {
 						int rc2 = rcs.get(pos2, rci2);
 						
-						double theta = emat.getPairwise(pos1, rc1, pos2, rc2);
+						double theta = emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 						double delta = lambdas.getEnergyWithout(posi2, rci2, posi1);
 						
 						minVal = Math.min(minVal, theta + delta);
@@ -164,7 +164,7 @@ public class NodeUpdater implements MPLPUpdater {
 					double minVal = Double.POSITIVE_INFINITY;
 					for (int rci1=0; rci1<rcs.getNum(pos1); rci1++) {
 						int rc1 = rcs.get(pos1, rci1);
-						double theta = emat.getPairwise(pos1, rc1, pos2, rc2);
+						double theta = emat.getPairwiseValue(pos1, rc1, pos2, rc2);
 						double gamma1 = gammas.getEnergy(posi1, rci1);
 						double gamma2 = gammas.get(posi2, posi1, rci1);
 						if (Double.isFinite(theta) && Double.isFinite(gamma1) && Double.isFinite(gamma2)) {
@@ -0,0 +1,200 @@
+package edu.duke.cs.osprey.astar.seq.scoring;
+
+import edu.duke.cs.osprey.astar.seq.nodes.SeqAStarNode;
+import edu.duke.cs.osprey.confspace.FragmentEnergies;
+import edu.duke.cs.osprey.confspace.SeqSpace;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+
+import java.util.Arrays;
+
+
+/**
+ * Precomputed energy tables for the sequence A* heuristic for partially-defined sequences
+ * described in the COMETS paper, SI section B.2, for one conformation space.
+ *
+ * The heuristic minimizes over residue types and RCs at every position, so the inner
+ * minimizations over the RCs of each residue type only depend on the conformation space
+ * and its energies, not on the sequence being scored. This class computes them once, so
+ * scoring a sequence tree node is just table lookups. For each RC, the table stores the
+ * heuristic energy with every position unassigned, and a correction for each residue type
+ * assignment at each earlier position, so scoring a node only costs work
+ * for the positions that are actually assigned.
+ *
+ * The tables don't depend on state weights, so states that share a conformation space
+ * and energies can share one table too.
+ */
+public class SeqHTable {
+
+	public final SimpleConfSpace confSpace;
+	public final SeqSpace seqSpace;
+	public final FragmentEnergies fragmentEnergies;
+
+	/** conf space position for each sequence space position, or -1 if the conf space doesn't have it */
+	private final int[] confPosBySeqPos;
+
+	/** sequence space position for each conf space position, or -1 for immutable positions */
+	private final int[] seqPosByConfPos;
+
+	/** RCs for each residue type at each position, immutable positions have just one group with all the RCs */
+	private final int[][][] rcsByRT;
+
+	/** heuristic energy for each RC, with all positions unassigned, indexed [pos][rc] */
+	private final double[][] unassignedEnergies;
+
+	/** change in unassignedEnergies when an earlier position gets assigned, indexed [pos1][rc1][pos2][rt2] */
+	private final double[][][][] assignmentDeltas;
+
+	public SeqHTable(SimpleConfSpace confSpace, SeqSpace seqSpace, FragmentEnergies fragmentEnergies) {
+
+		this.confSpace = confSpace;
+		this.seqSpace = seqSpace;
+		this.fragmentEnergies = fragmentEnergies;
+
+		int numPos = confSpace.positions.size();
+
+		// map between the sequence and conf positions
+		confPosBySeqPos = new int[seqSpace.positions.size()];
+		Arrays.fill(confPosBySeqPos, -1);
+		seqPosByConfPos = new int[numPos];
+		for (SimpleConfSpace.Position confPos : confSpace.positions) {
+			SeqSpace.Position seqPos = seqSpace.getPosition(confPos.resNum);
+			if (seqPos != null) {
+				seqPosByConfPos[confPos.index] = seqPos.index;
+				confPosBySeqPos[seqPos.index] = confPos.index;
+			} else {
+
+				// immutable position, should just be one res type
+				assert (confPos.resTypes.size() == 1);
+
+				seqPosByConfPos[confPos.index] = -1;
+			}
+		}
+
+		// group the RCs by res type
+		rcsByRT = new int[numPos][][];
+		for (SimpleConfSpace.Position confPos : confSpace.positions) {
+			int seqPosi = seqPosByConfPos[confPos.index];
+			if (seqPosi >= 0) {
+				SeqSpace.Position seqPos = seqSpace.positions.get(seqPosi);
+				rcsByRT[confPos.index] = new int[seqPos.resTypes.size()][];
+				for (SeqSpace.ResType rt : seqPos.resTypes) {
+					rcsByRT[confPos.index][rt.index] = confPos.resConfs.stream()
+						.filter(rc -> rc.template.name.equals(rt.name))
+						.mapToInt(rc -> rc.index)
+						.toArray();
+				}
+			} else {
+				rcsByRT[confPos.index] = new int[][] {
+					confPos.resConfs.stream()
+						.mapToInt(rc -> rc.index)
+						.toArray()
+				};
+			}
+		}
+
+		// compute the tables
+		unassignedEnergies = new double[numPos][];
+		assignmentDeltas = new double[numPos][][][];
+		for (int pos1=0; pos1<numPos; pos1++) {
+
+			int numRCs1 = confSpace.positions.get(pos1).resConfs.size();
+			unassignedEnergies[pos1] = new double[numRCs1];
+			assignmentDeltas[pos1] = new double[numRCs1][][];
+
+			for (int rc1=0; rc1<numRCs1; rc1++) {
+
+				double energy = fragmentEnergies.getEnergy(pos1, rc1);
+				double[][] deltas = new double[pos1][];
+
+				for (int pos2=0; pos2<pos1; pos2++) {
+
+					// min over RCs at each RT at pos2
+					double[] minByRT = new double[rcsByRT[pos2].length];
+					double min = Double.POSITIVE_INFINITY;
+					for (int rt2=0; rt2<minByRT.length; rt2++) {
+						minByRT[rt2] = Double.POSITIVE_INFINITY;
+						for (int rc2 : rcsByRT[pos2][rt2]) {
+							minByRT[rt2] = Math.min(minByRT[rt2], fragmentEnergies.getEnergy(pos1, rc1, pos2, rc2));
+						}
+						min = Math.min(min, minByRT[rt2]);
+					}
+					energy += min;
+
+					// immutable positions never get assigned, so they don't need corrections
+					if (seqPosByConfPos[pos2] >= 0) {
+						for (int rt2=0; rt2<minByRT.length; rt2++) {
+							// NOTE: min over all RTs is never more than min over one RT, so this is never negative
+							minByRT[rt2] = Double.isFinite(min) ? minByRT[rt2] - min : Double.POSITIVE_INFINITY;
+						}
+						deltas[pos2] = minByRT;
+					}
+				}
+
+				unassignedEnergies[pos1][rc1] = energy;
+				assignmentDeltas[pos1][rc1] = deltas;
+			}
+		}
+	}
+
+	/**
+	 * Computes the (unweighted) heuristic energy of this conformation space,
+	 * optimized over all sequences that match the assignments.
+	 */
+	public double calc(SeqAStarNode.Assignments assignments) {
+
+		int numPos = confSpace.positions.size();
+
+		// get the assigned RT at each conf position, or -1 if unassigned
+		int[] rts = new int[numPos];
+		for (int pos=0; pos<numPos; pos++) {
+			rts[pos] = seqPosByConfPos[pos] >= 0 ? -1 : 0;
+		}
+		int[] assignedPos = new int[numPos];
+		int numAssigned = 0;
+		for (int i=0; i<assignments.numAssigned; i++) {
+			int pos = confPosBySeqPos[assignments.assignedPos[i]];
+			if (pos >= 0) {
+				rts[pos] = assignments.assignedRTs[i];
+				assignedPos[numAssigned++] = pos;
+			}
+		}
+		Arrays.sort(assignedPos, 0, numAssigned);
+
+		double score = 0.0;
+		for (int pos1=0; pos1<numPos; pos1++) {
+
+			// min over the allowed res types at pos1
+			int rtStart = rts[pos1];
+			int rtStop = rtStart + 1;
+			if (rtStart < 0) {
+				rtStart = 0;
+				rtStop = rcsByRT[pos1].length;
+			}
+
+			double bestPos1Energy = Double.POSITIVE_INFINITY;
+			for (int rt1=rtStart; rt1<rtStop; rt1++) {
+
+				// min over RCs at (pos1,rt1)
+				for (int rc1 : rcsByRT[pos1][rt1]) {
+
+					double rc1Energy = unassignedEnergies[pos1][rc1];
+
+					// restricting res types can only raise the energy, so infinite energies don't need any corrections
+					if (Double.isFinite(rc1Energy)) {
+						double[][] deltas = assignmentDeltas[pos1][rc1];
+						for (int i=0; i<numAssigned && assignedPos[i] < pos1; i++) {
+							int pos2 = assignedPos[i];
+							rc1Energy += deltas[pos2][rts[pos2]];
+						}
+					}
+
+					bestPos1Energy = Math.min(bestPos1Energy, rc1Energy);
+				}
+			}
+
+			score += bestPos1Energy;
+		}
+
+		return score;
+	}
+}
@@ -144,6 +144,14 @@ public abstract class AbstractTupleMatrix<T> implements TupleMatrix<T>, Serializ
     }
     
     protected abstract void allocate(int numOneBody, int numPairwise);
+
+    protected int getNumOneBodyTerms() {
+    	return getNumPos() > 0 ? oneBodyOffsets[numPos - 1] + numConfAtPos[numPos - 1] : 0;
+    }
+
+    protected int getNumPairwiseTerms() {
+    	return numPairwiseTerms;
+    }
     
     public double getPruningInterval() {
         return pruningInterval;
@@ -208,6 +216,25 @@ public abstract class AbstractTupleMatrix<T> implements TupleMatrix<T>, Serializ
     	return pairwiseOffsets[getPairwiseIndexNoCheck(res1, res2)] + numConfAtPos[res2]*conf1 + conf2;
     }
     
+    /**
+     * Index of a pairwise value within the block of values for its residue pair,
+     * where the block is identified by {@link #getPairwiseIndex(int, int)}.
+     * Useful for subclasses that don't keep all the pairwise values in one array.
+     */
+    protected int getPairwiseIndexInBlock(int res1, int conf1, int res2, int conf2) {
+    	if (res2 > res1) {
+    		return numConfAtPos[res1]*conf2 + conf1;
+    	} else if (res1 == res2) {
+    		throw new Error("Can't pair residue " + res1 + " with itself");
+    	}
+    	return numConfAtPos[res2]*conf1 + conf2;
+    }
+    
+    /** Number of pairwise values in the block for the residue pair */
+    protected int getPairwiseBlockSize(int res1, int res2) {
+    	return numConfAtPos[res1]*numConfAtPos[res2];
+    }
+    
     @Override
     public void fill(T val) {
 		for (int res1=0; res1<getNumPos(); res1++) {
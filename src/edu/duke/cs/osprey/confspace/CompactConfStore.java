@@ -0,0 +1,903 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.confspace;
+
+import java.io.*;
+import java.nio.charset.StandardCharsets;
+import java.util.*;
+import java.util.zip.CRC32;
+
+
+/**
+ * The compact storage engine for {@link ConfDB}, see {@link ConfDB.Engine#Compact}.
+ *
+ * The file is a header describing the conformation space, followed by a log of records.
+ * Records are written in batches, and each batch ends with a commit record holding a checksum
+ * of the batch. When the file is opened, the log is replayed up to the last complete batch,
+ * and any partially-written batch (eg, from a crash) is discarded.
+ *
+ * Conf assignments are bit-packed into a fixed number of bytes, using just enough bits at each
+ * position for the number of RCs there. Timestamps are varint-encoded relative to the time the
+ * file was created.
+ *
+ * Only the file offset of each conf is kept in memory. Energies are read from the file
+ * as needed, and the most recently used ones are cached. The offsets are held in a hash map
+ * per table, which costs roughly 100 bytes of heap per conf (the map entry, the boxed offset,
+ * and the packed key), so a table of 10 million confs needs about 1 GiB of heap.
+ *
+ * {@link #flush} always commits the current batch to disk. {@link #flushLater} groups writes
+ * instead: it commits when the last commit was at least commitIntervalMs ago, and otherwise
+ * schedules a commit for when the interval runs out, so writes are never held longer than that.
+ */
+class CompactConfStore implements ConfDB.Store {
+
+	private static final byte[] Magic = "OSPREYCDB".getBytes(StandardCharsets.US_ASCII);
+	private static final int Version = 1;
+
+	public static final int DefaultBatchBytes = 1024*1024;
+	public static final long DefaultCommitIntervalMs = 1000;
+	public static final int DefaultCacheSize = 100000;
+
+	// record types
+	private static final int RecTable = 1;
+	private static final int RecPut = 2;
+	private static final int RecRemove = 3;
+	private static final int RecSequence = 4;
+	private static final int RecCommit = 5;
+
+	// flags for conf info
+	private static final int FlagLower = 1;
+	private static final int FlagUpper = 2;
+	private static final int FlagSameTimestamp = 4;
+
+	public static boolean isCompactFile(File file) {
+		try (DataInputStream in = new DataInputStream(new FileInputStream(file))) {
+			byte[] magic = new byte[Magic.length];
+			in.readFully(magic);
+			return Arrays.equals(magic, Magic);
+		} catch (IOException ex) {
+			return false;
+		}
+	}
+
+	/** bit-packed conf assignments */
+	private static class Key implements Comparable<Key> {
+
+		final byte[] bytes;
+		final int hashCode;
+
+		Key(byte[] bytes) {
+			this.bytes = bytes;
+			this.hashCode = Arrays.hashCode(bytes);
+		}
+
+		@Override
+		public int hashCode() {
+			return hashCode;
+		}
+
+		@Override
+		public boolean equals(Object other) {
+			return other instanceof Key && Arrays.equals(bytes, ((Key)other).bytes);
+		}
+
+		@Override
+		public int compareTo(Key other) {
+			// unsigned lexicographic order matches the assignment order
+			for (int i=0; i<bytes.length; i++) {
+				int val = Integer.compare(bytes[i] & 0xff, other.bytes[i] & 0xff);
+				if (val != 0) {
+					return val;
+				}
+			}
+			return 0;
+		}
+	}
+
+	/** lets us write into the batch and read it back without copying */
+	private static class Buffer extends ByteArrayOutputStream {
+
+		byte[] array() {
+			return buf;
+		}
+	}
+
+	/** counts and checksums the bytes read from the log */
+	private static class LogInputStream extends FilterInputStream {
+
+		long pos = 0;
+		final CRC32 crc = new CRC32();
+
+		LogInputStream(InputStream in) {
+			super(in);
+		}
+
+		@Override
+		public int read()
+		throws IOException {
+			int b = super.read();
+			if (b >= 0) {
+				pos++;
+				crc.update(b);
+			}
+			return b;
+		}
+
+		@Override
+		public int read(byte[] b, int off, int len)
+		throws IOException {
+			int n = super.read(b, off, len);
+			if (n > 0) {
+				pos += n;
+				crc.update(b, off, n);
+			}
+			return n;
+		}
+
+		@Override
+		public long skip(long n) {
+			throw new UnsupportedOperationException();
+		}
+	}
+
+	private class Table implements ConfDB.TableStore {
+
+		final int id;
+		final String name;
+		final Map<Key,Long> offsets = new HashMap<>();
+
+		private long modCount = 0;
+		private SortedIndex lowerIndex = null;
+		private SortedIndex upperIndex = null;
+
+		Table(int id, String name) {
+			this.id = id;
+			this.name = name;
+		}
+
+		@Override
+		public ConfDB.ConfInfo get(int[] assignments) {
+			synchronized (CompactConfStore.this) {
+				Long offset = offsets.get(pack(assignments));
+				if (offset == null) {
+					return null;
+				}
+				return readInfo(offset, true);
+			}
+		}
+
+		@Override
+		public void put(int[] assignments, ConfDB.ConfInfo oldInfo, ConfDB.ConfInfo newInfo) {
+			synchronized (CompactConfStore.this) {
+				Key key = pack(assignments);
+				long offset = committedLength + batch.size();
+				try {
+					batchOut.writeByte(RecPut);
+					writeVarint(batchOut, id);
+					batchOut.write(key.bytes);
+					writeInfo(batchOut, newInfo);
+				} catch (IOException ex) {
+					throw new RuntimeException(ex);
+				}
+				offsets.put(key, offset);
+				cache.put(offset, newInfo);
+				modCount++;
+				commitIfFull();
+			}
+		}
+
+		@Override
+		public void putAll(Iterator<Map.Entry<int[],ConfDB.ConfInfo>> confs) {
+			// no need to read the old values, we're just going to overwrite them
+			while (confs.hasNext()) {
+				Map.Entry<int[],ConfDB.ConfInfo> entry = confs.next();
+				put(entry.getKey(), null, entry.getValue());
+			}
+		}
+
+		@Override
+		public void remove(int[] assignments, ConfDB.ConfInfo oldInfo) {
+			synchronized (CompactConfStore.this) {
+				Key key = pack(assignments);
+				try {
+					batchOut.writeByte(RecRemove);
+					writeVarint(batchOut, id);
+					batchOut.write(key.bytes);
+				} catch (IOException ex) {
+					throw new RuntimeException(ex);
+				}
+				offsets.remove(key);
+				modCount++;
+				commitIfFull();
+			}
+		}
+
+		/** a snapshot of the confs in the table, in assignment order */
+		private List<Map.Entry<Key,Long>> getSortedEntries() {
+			synchronized (CompactConfStore.this) {
+				List<Map.Entry<Key,Long>> entries = new ArrayList<>(offsets.entrySet().size());
+				for (Map.Entry<Key,Long> entry : offsets.entrySet()) {
+					entries.add(new AbstractMap.SimpleImmutableEntry<>(entry.getKey(), entry.getValue()));
+				}
+				entries.sort(Map.Entry.comparingByKey());
+				return entries;
+			}
+		}
+
+		@Override
+		public Iterator<Map.Entry<int[],ConfDB.ConfInfo>> iterator() {
+
+			// NOTE: the log is append-only, so the offsets in the snapshot stay valid
+			Iterator<Map.Entry<Key,Long>> iter = getSortedEntries().iterator();
+			return new Iterator<Map.Entry<int[],ConfDB.ConfInfo>>() {
+
+				@Override
+				public boolean hasNext() {
+					return iter.hasNext();
+				}
+
+				@Override
+				public Map.Entry<int[],ConfDB.ConfInfo> next() {
+					Map.Entry<Key,Long> entry = iter.next();
+					synchronized (CompactConfStore.this) {
+						return new AbstractMap.SimpleImmutableEntry<>(unpack(entry.getKey()), readInfo(entry.getValue(), false));
+					}
+				}
+			};
+		}
+
+		@Override
+		public ConfDB.EnergyIndex lowerIndex() {
+			synchronized (CompactConfStore.this) {
+				if (lowerIndex == null || lowerIndex.modCount != modCount) {
+					lowerIndex = new SortedIndex(this, true);
+				}
+				return lowerIndex;
+			}
+		}
+
+		@Override
+		public ConfDB.EnergyIndex upperIndex() {
+			synchronized (CompactConfStore.this) {
+				if (upperIndex == null || upperIndex.modCount != modCount) {
+					upperIndex = new SortedIndex(this, false);
+				}
+				return upperIndex;
+			}
+		}
+
+		@Override
+		public long size() {
+			synchronized (CompactConfStore.this) {
+				return offsets.size();
+			}
+		}
+
+		@Override
+		public void close() {
+			// nothing to do, the store owns the file
+		}
+	}
+
+	/** energy indices aren't stored, they're built by scanning the table when needed */
+	private class SortedIndex implements ConfDB.EnergyIndex {
+
+		final long modCount;
+		final double[] energies;
+		final Key[] keys;
+
+		SortedIndex(Table table, boolean isLower) {
+
+			modCount = table.modCount;
+
+			// read the energies in file order, so the reads are sequential
+			List<Map.Entry<Key,Long>> entries = new ArrayList<>(table.offsets.entrySet());
+			entries.sort(Map.Entry.comparingByValue());
+
+			List<Map.Entry<Double,Key>> energiedKeys = new ArrayList<>();
+			for (Map.Entry<Key,Long> entry : entries) {
+				ConfDB.ConfInfo info = readInfo(entry.getValue(), false);
+				if (isLower && info.lowerTimestampNs != 0L) {
+					energiedKeys.add(new AbstractMap.SimpleImmutableEntry<>(info.lowerEnergy, entry.getKey()));
+				} else if (!isLower && info.upperTimestampNs != 0L) {
+					energiedKeys.add(new AbstractMap.SimpleImmutableEntry<>(info.upperEnergy, entry.getKey()));
+				}
+			}
+			energiedKeys.sort(Map.Entry.<Double,Key>comparingByKey().thenComparing(Map.Entry.<Double,Key>comparingByValue()));
+
+			energies = new double[energiedKeys.size()];
+			keys = new Key[energiedKeys.size()];
+			for (int i=0; i<energies.length; i++) {
+				energies[i] = energiedKeys.get(i).getKey();
+				keys[i] = energiedKeys.get(i).getValue();
+			}
+		}
+
+		@Override
+		public Iterator<Double> energies() {
+			return Arrays.stream(energies)
+				.distinct()
+				.iterator();
+		}
+
+		@Override
+		public List<int[]> get(double energy) {
+
+			// find the first index with this energy
+			int i = Arrays.binarySearch(energies, energy);
+			if (i < 0) {
+				return null;
+			}
+			while (i > 0 && Double.compare(energies[i - 1], energy) == 0) {
+				i--;
+			}
+
+			List<int[]> multiAssignments = new ArrayList<>();
+			for (; i<energies.length && Double.compare(energies[i], energy) == 0; i++) {
+				multiAssignments.add(unpack(keys[i]));
+			}
+			return multiAssignments;
+		}
+
+		@Override
+		public Iterator<Map.Entry<Double,int[]>> iterator() {
+			return new Iterator<Map.Entry<Double,int[]>>() {
+
+				int i = 0;
+
+				@Override
+				public boolean hasNext() {
+					return i < energies.length;
+				}
+
+				@Override
+				public Map.Entry<Double,int[]> next() {
+					Map.Entry<Double,int[]> entry = new AbstractMap.SimpleImmutableEntry<>(energies[i], unpack(keys[i]));
+					i++;
+					return entry;
+				}
+			};
+		}
+	}
+
+	public final ConfDB confdb;
+	public final File file;
+	public final int batchBytes;
+	public final long commitIntervalMs;
+	public final int cacheSize;
+
+	private final int[] numRCs;
+	private final int[] numBits;
+	private final int keyBytes;
+	private final int maxRecordBytes;
+	private final RandomAccessFile raf;
+	private final Buffer batch = new Buffer();
+	private final DataOutputStream batchOut = new DataOutputStream(batch);
+	private final Map<String,Table> tablesByName = new LinkedHashMap<>();
+	private final List<Table> tablesById = new ArrayList<>();
+	private final Map<String,ConfDB.SequenceInfo> sequences = new LinkedHashMap<>();
+	private final LinkedHashMap<Long,ConfDB.ConfInfo> cache;
+	private final Thread shutdownHook;
+	private final Timer commitTimer = new Timer("CompactConfStore-commit", true);
+
+	private long baseTimestampNs;
+	private long committedLength;
+	private long lastCommitMs = System.currentTimeMillis();
+	private TimerTask commitTask = null;
+
+	public CompactConfStore(ConfDB confdb, File file) {
+		this(confdb, file, DefaultBatchBytes, DefaultCommitIntervalMs, DefaultCacheSize);
+	}
+
+	public CompactConfStore(ConfDB confdb, File file, int batchBytes, long commitIntervalMs, int cacheSize) {
+
+		this.confdb = confdb;
+		this.file = file;
+		this.batchBytes = batchBytes;
+		this.commitIntervalMs = commitIntervalMs;
+		this.cacheSize = cacheSize;
+
+		// use just enough bits at each position for the RCs, and for unassigned positions
+		List<SimpleConfSpace.Position> positions = confdb.confSpace.positions;
+		numRCs = new int[positions.size()];
+		numBits = new int[positions.size()];
+		int totalBits = 0;
+		for (SimpleConfSpace.Position pos : positions) {
+			numRCs[pos.index] = pos.resConfs.size();
+			numBits[pos.index] = 32 - Integer.numberOfLeadingZeros(numRCs[pos.index]);
+			totalBits += numBits[pos.index];
+		}
+		keyBytes = (totalBits + 7)/8;
+
+		// type, table id, key, flags, energies, timestamps
+		maxRecordBytes = 1 + 5 + keyBytes + 1 + 2*(Double.BYTES + 10);
+
+		cache = new LinkedHashMap<Long,ConfDB.ConfInfo>(16, 0.75f, true) {
+
+			private static final long serialVersionUID = 2960462932934416735L;
+
+			@Override
+			protected boolean removeEldestEntry(Map.Entry<Long,ConfDB.ConfInfo> eldest) {
+				return size() > CompactConfStore.this.cacheSize;
+			}
+		};
+
+		try {
+			raf = new RandomAccessFile(file, "rw");
+			if (raf.length() == 0) {
+				writeHeader();
+			} else {
+				replay();
+			}
+		} catch (IOException ex) {
+			throw new RuntimeException("can't open conf DB: " + file.getAbsolutePath(), ex);
+		}
+
+		// commit the last batch if the JVM exits before we're closed
+		shutdownHook = new Thread(() -> {
+			synchronized (CompactConfStore.this) {
+				commit();
+			}
+		});
+		Runtime.getRuntime().addShutdownHook(shutdownHook);
+	}
+
+	private void writeHeader()
+	throws IOException {
+
+		baseTimestampNs = System.currentTimeMillis()*1000000L;
+
+		ByteArrayOutputStream buf = new ByteArrayOutputStream();
+		DataOutputStream out = new DataOutputStream(buf);
+		out.write(Magic);
+		out.writeInt(Version);
+		out.writeLong(baseTimestampNs);
+		out.writeInt(numRCs.length);
+		for (int n : numRCs) {
+			out.writeInt(n);
+		}
+
+		raf.seek(0);
+		raf.write(buf.toByteArray());
+		raf.getChannel().force(false);
+		committedLength = buf.size();
+	}
+
+	private void replay()
+	throws IOException {
+
+		LogInputStream log = new LogInputStream(new BufferedInputStream(new FileInputStream(file)));
+		try (DataInputStream in = new DataInputStream(log)) {
+
+			// read the header
+			byte[] magic = new byte[Magic.length];
+			in.readFully(magic);
+			if (!Arrays.equals(magic, Magic)) {
+				throw new IOException("not a compact conf DB file");
+			}
+			int version = in.readInt();
+			if (version != Version) {
+				throw new IOException("unsupported compact conf DB version: " + version);
+			}
+			baseTimestampNs = in.readLong();
+			int numPos = in.readInt();
+			boolean matches = numPos == numRCs.length;
+			for (int i=0; i<numPos; i++) {
+				int n = in.readInt();
+				matches = matches && n == numRCs[i];
+			}
+			if (!matches) {
+				throw new IllegalArgumentException("conf DB " + file.getAbsolutePath() + " was written for a different conformation space");
+			}
+
+			long goodLength = log.pos;
+			log.crc.reset();
+
+			// replay the log, applying records only when their batch is committed
+			List<Runnable> effects = new ArrayList<>();
+			try {
+				while (true) {
+
+					long offset = log.pos;
+					int type = in.read();
+					if (type < 0) {
+						break;
+					}
+
+					switch (type) {
+
+						case RecTable: {
+							String name = in.readUTF();
+							effects.add(() -> addTable(name));
+						} break;
+
+						case RecPut: {
+							int tableId = readVarint(in);
+							Key key = readKey(in);
+							readInfo(in);
+							effects.add(() -> tablesById.get(tableId).offsets.put(key, offset));
+						} break;
+
+						case RecRemove: {
+							int tableId = readVarint(in);
+							Key key = readKey(in);
+							effects.add(() -> tablesById.get(tableId).offsets.remove(key));
+						} break;
+
+						case RecSequence: {
+							String id = in.readUTF();
+							double lowerEnergyOfUnsampledConfs = in.readDouble();
+							effects.add(() -> sequences.put(id, new ConfDB.SequenceInfo(lowerEnergyOfUnsampledConfs)));
+						} break;
+
+						case RecCommit: {
+							int checksum = (int)log.crc.getValue();
+							if (in.readInt() != checksum) {
+								throw new IOException("bad checksum");
+							}
+							for (Runnable effect : effects) {
+								effect.run();
+							}
+							effects.clear();
+							goodLength = log.pos;
+							log.crc.reset();
+						} break;
+
+						default:
+							throw new IOException("unknown record type: " + type);
+					}
+				}
+			} catch (IOException ex) {
+				// the last batch is incomplete or corrupted, so drop it
+			}
+
+			// drop anything after the last good batch
+			if (goodLength < raf.length()) {
+				raf.setLength(goodLength);
+			}
+			committedLength = goodLength;
+		}
+	}
+
+	private Table addTable(String name) {
+		Table table = new Table(tablesById.size(), name);
+		tablesById.add(table);
+		tablesByName.put(name, table);
+		return table;
+	}
+
+	private Key pack(int[] assignments) {
+
+		if (assignments.length != numRCs.length) {
+			throw new IllegalArgumentException("expected " + numRCs.length + " assignments, not " + assignments.length);
+		}
+
+		byte[] bytes = new byte[keyBytes];
+		int bit = 0;
+		for (int pos=0; pos<numRCs.length; pos++) {
+
+			// shift by one, so unassigned positions (-1) get 0
+			int val = assignments[pos] + 1;
+			if (val < 0 || val > numRCs[pos]) {
+				throw new IllegalArgumentException("assignment " + assignments[pos] + " at position " + pos + " is out of range");
+			}
+
+			for (int b=numBits[pos] - 1; b>=0; b--) {
+				if (((val >> b) & 1) != 0) {
+					bytes[bit >> 3] |= (byte)(0x80 >>> (bit & 7));
+				}
+				bit++;
+			}
+		}
+		return new Key(bytes);
+	}
+
+	private int[] unpack(Key key) {
+		int[] assignments = new int[numRCs.length];
+		int bit = 0;
+		for (int pos=0; pos<numRCs.length; pos++) {
+			int val = 0;
+			for (int b=0; b<numBits[pos]; b++) {
+				val = (val << 1) | ((key.bytes[bit >> 3] >>> (7 - (bit & 7))) & 1);
+				bit++;
+			}
+			assignments[pos] = val - 1;
+		}
+		return assignments;
+	}
+
+	private Key readKey(DataInput in)
+	throws IOException {
+		byte[] bytes = new byte[keyBytes];
+		in.readFully(bytes);
+		return new Key(bytes);
+	}
+
+	private static void writeVarint(DataOutput out, long val)
+	throws IOException {
+		while ((val & ~0x7fL) != 0) {
+			out.writeByte((int)((val & 0x7f) | 0x80));
+			val >>>= 7;
+		}
+		out.writeByte((int)val);
+	}
+
+	private static long readVarlong(DataInput in)
+	throws IOException {
+		long val = 0;
+		for (int shift=0; shift<64; shift+=7) {
+			int b = in.readUnsignedByte();
+			val |= (long)(b & 0x7f) << shift;
+			if ((b & 0x80) == 0) {
+				return val;
+			}
+		}
+		throw new IOException("malformed varint");
+	}
+
+	private static int readVarint(DataInput in)
+	throws IOException {
+		return (int)readVarlong(in);
+	}
+
+	private void writeTimestamp(DataOutput out, long timestampNs)
+	throws IOException {
+		// zig-zag encode the signed difference, so small values in either direction stay small
+		long delta = timestampNs - baseTimestampNs;
+		writeVarint(out, (delta << 1) ^ (delta >> 63));
+	}
+
+	private long readTimestamp(DataInput in)
+	throws IOException {
+		long zigzag = readVarlong(in);
+		return ((zigzag >>> 1) ^ -(zigzag & 1)) + baseTimestampNs;
+	}
+
+	private void writeInfo(DataOutput out, ConfDB.ConfInfo info)
+	throws IOException {
+
+		boolean hasLower = info.lowerTimestampNs != 0L;
+		boolean hasUpper = info.upperTimestampNs != 0L;
+		boolean sameTimestamp = hasLower && hasUpper && info.lowerTimestampNs == info.upperTimestampNs;
+
+		out.writeByte((hasLower ? FlagLower : 0) | (hasUpper ? FlagUpper : 0) | (sameTimestamp ? FlagSameTimestamp : 0));
+		if (hasLower) {
+			out.writeDouble(info.lowerEnergy);
+			writeTimestamp(out, info.lowerTimestampNs);
+		}
+		if (hasUpper) {
+			out.writeDouble(info.upperEnergy);
+			if (!sameTimestamp) {
+				writeTimestamp(out, info.upperTimestampNs);
+			}
+		}
+	}
+
+	private ConfDB.ConfInfo readInfo(DataInput in)
+	throws IOException {
+
+		ConfDB.ConfInfo info = new ConfDB.ConfInfo();
+		int flags = in.readUnsignedByte();
+		if ((flags & FlagLower) != 0) {
+			info.lowerEnergy = in.readDouble();
+			info.lowerTimestampNs = readTimestamp(in);
+		}
+		if ((flags & FlagUpper) != 0) {
+			info.upperEnergy = in.readDouble();
+			if ((flags & FlagSameTimestamp) != 0) {
+				info.upperTimestampNs = info.lowerTimestampNs;
+			} else {
+				info.upperTimestampNs = readTimestamp(in);
+			}
+		}
+		return info;
+	}
+
+	/** reads the conf info from the put record at this offset, either in the file or in the current batch */
+	private ConfDB.ConfInfo readInfo(long offset, boolean useCache) {
+
+		ConfDB.ConfInfo info = cache.get(offset);
+		if (info != null) {
+			return info;
+		}
+
+		try {
+
+			DataInputStream in;
+			if (offset >= committedLength) {
+				int start = (int)(offset - committedLength);
+				in = new DataInputStream(new ByteArrayInputStream(batch.array(), start, batch.size() - start));
+			} else {
+				byte[] buf = new byte[(int)Math.min(maxRecordBytes, committedLength - offset)];
+				raf.seek(offset);
+				raf.readFully(buf);
+				in = new DataInputStream(new ByteArrayInputStream(buf));
+			}
+
+			// skip the type, table id, and key
+			in.readUnsignedByte();
+			readVarint(in);
+			in.readFully(new byte[keyBytes]);
+
+			info = readInfo(in);
+
+		} catch (IOException ex) {
+			throw new RuntimeException("can't read conf DB: " + file.getAbsolutePath(), ex);
+		}
+
+		if (useCache) {
+			cache.put(offset, info);
+		}
+		return info;
+	}
+
+	private void commitIfFull() {
+		if (batch.size() >= batchBytes) {
+			commit();
+		}
+	}
+
+	/** writes the current batch to the file */
+	private void commit() {
+
+		// we're committing now, so any scheduled commit is moot
+		if (commitTask != null) {
+			commitTask.cancel();
+			commitTask = null;
+		}
+
+		if (batch.size() == 0) {
+			return;
+		}
+
+		try {
+
+			// end the batch with a checksum, so we can tell if it was written completely
+			batchOut.writeByte(RecCommit);
+			CRC32 crc = new CRC32();
+			crc.update(batch.array(), 0, batch.size());
+			batchOut.writeInt((int)crc.getValue());
+
+			raf.seek(committedLength);
+			raf.write(batch.array(), 0, batch.size());
+			raf.getChannel().force(false);
+
+		} catch (IOException ex) {
+			throw new RuntimeException("can't write conf DB: " + file.getAbsolutePath(), ex);
+		}
+
+		committedLength += batch.size();
+		batch.reset();
+		lastCommitMs = System.currentTimeMillis();
+	}
+
+	@Override
+	public synchronized ConfDB.TableStore openTable(String id) {
+		Table table = tablesByName.get(id);
+		if (table == null) {
+			table = addTable(id);
+			try {
+				batchOut.writeByte(RecTable);
+				batchOut.writeUTF(id);
+			} catch (IOException ex) {
+				throw new RuntimeException(ex);
+			}
+		}
+		return table;
+	}
+
+	@Override
+	public synchronized Set<String> getTableIds() {
+		return new LinkedHashSet<>(tablesByName.keySet());
+	}
+
+	@Override
+	public synchronized ConfDB.SequenceInfo getSequenceInfo(Sequence sequence) {
+		ConfDB.SequenceInfo info = sequences.get(confdb.getSequenceId(sequence));
+		if (info == null) {
+			return null;
+		}
+		// return a copy, since callers change it
+		return new ConfDB.SequenceInfo(info.lowerEnergyOfUnsampledConfs);
+	}
+
+	@Override
+	public synchronized void putSequenceInfo(Sequence sequence, ConfDB.SequenceInfo info) {
+		String id = confdb.getSequenceId(sequence);
+		try {
+			batchOut.writeByte(RecSequence);
+			batchOut.writeUTF(id);
+			batchOut.writeDouble(info.lowerEnergyOfUnsampledConfs);
+		} catch (IOException ex) {
+			throw new RuntimeException(ex);
+		}
+		sequences.put(id, new ConfDB.SequenceInfo(info.lowerEnergyOfUnsampledConfs));
+		commitIfFull();
+	}
+
+	@Override
+	public synchronized Iterable<Sequence> getSequences() {
+		List<Sequence> out = new ArrayList<>();
+		for (String id : sequences.keySet()) {
+			out.add(confdb.makeSequenceFromId(id));
+		}
+		return out;
+	}
+
+	@Override
+	public synchronized long getNumSequences() {
+		return sequences.size();
+	}
+
+	@Override
+	public synchronized void flush() {
+		commit();
+	}
+
+	@Override
+	public synchronized void flushLater() {
+
+		// group commit: let writes pile up for a little while, instead of syncing to disk after each one
+		if (System.currentTimeMillis() - lastCommitMs >= commitIntervalMs) {
+			commit();
+		} else if (commitTask == null) {
+
+			// but make sure they get committed even if no more writes come along
+			commitTask = new TimerTask() {
+				@Override
+				public void run() {
+					synchronized (CompactConfStore.this) {
+						commit();
+					}
+				}
+			};
+			commitTimer.schedule(commitTask, Math.max(0, lastCommitMs + commitIntervalMs - System.currentTimeMillis()));
+		}
+	}
+
+	@Override
+	public synchronized void close() {
+		commit();
+		commitTimer.cancel();
+		try {
+			raf.close();
+		} catch (IOException ex) {
+			throw new RuntimeException("can't close conf DB: " + file.getAbsolutePath(), ex);
+		}
+		try {
+			Runtime.getRuntime().removeShutdownHook(shutdownHook);
+		} catch (IllegalStateException ex) {
+			// JVM is already shutting down, that's fine
+		}
+	}
+}
@@ -149,7 +149,7 @@ public class ConfDB implements AutoCleanable {
 		}
 	}
 
-	private static class ConfInfo {
+	static class ConfInfo {
 
 		public double lowerEnergy;
 		public long lowerTimestampNs;
@@ -170,6 +170,10 @@ public class ConfDB implements AutoCleanable {
 			this.upperTimestampNs = upperTimestampNs;
 		}
 
+		public ConfInfo copy() {
+			return new ConfInfo(lowerEnergy, lowerTimestampNs, upperEnergy, upperTimestampNs);
+		}
+
 		public Conf.Bound makeLowerBound() {
 			return makeBound(lowerEnergy, lowerTimestampNs);
 		}
@@ -301,7 +305,7 @@ public class ConfDB implements AutoCleanable {
 		}
 	}
 
-	private static class SequenceInfo {
+	static class SequenceInfo {
 
 		public double lowerEnergyOfUnsampledConfs;
 		// TODO: other sequence-level properties?
@@ -315,46 +319,105 @@ public class ConfDB implements AutoCleanable {
 		}
 	}
 
-	public class ConfTable implements Iterable<Conf> {
+	/** the storage for the confs in one table, provided by the engine */
+	interface TableStore {
 
-		private final BTreeMap<int[],ConfInfo> btree;
-		private final EnergyIndex lowerIndex;
-		private final EnergyIndex upperIndex;
+		ConfInfo get(int[] assignments);
 
-		public ConfTable(String id) {
+		/**
+		 * @param oldInfo the info currently stored for these assignments, or null
+		 * @param newInfo the new info, which the store may keep, so don't change it afterwards
+		 */
+		void put(int[] assignments, ConfInfo oldInfo, ConfInfo newInfo);
 
-			// MapDB serializer for ConfInfo
-			final int ConfInfoBytes = Double.BYTES*2 + Long.BYTES*2;
-			SimpleSerializer<ConfInfo> confInfoSerializer = new SimpleSerializer<ConfInfo>(ConfInfoBytes) {
+		void remove(int[] assignments, ConfInfo oldInfo);
 
-				@Override
-				public void serialize(@NotNull DataOutput2 out, @NotNull ConfInfo info)
-				throws IOException {
-					out.writeDouble(info.lowerEnergy);
-					out.writeLong(info.lowerTimestampNs);
-					out.writeDouble(info.upperEnergy);
-					out.writeLong(info.upperTimestampNs);
-				}
+		/** iterates confs in assignment order */
+		Iterator<Map.Entry<int[],ConfInfo>> iterator();
 
-				@Override
-				public ConfInfo deserialize(@NotNull DataInput2 in, int available)
-				throws IOException {
-					return new ConfInfo(
-						in.readDouble(),
-						in.readLong(),
-						in.readDouble(),
-						in.readLong()
-					);
-				}
-			};
+		EnergyIndex lowerIndex();
+		EnergyIndex upperIndex();
 
-			this.btree = db.treeMap(id)
-				.keySerializer(new AssignmentsSerializer())
-				.valueSerializer(confInfoSerializer)
-				.createOrOpen();
+		long size();
 
-			this.lowerIndex = new EnergyIndex(id + "-lowerEnergy");
-			this.upperIndex = new EnergyIndex(id + "-upperEnergy");
+		/** bulk-adds confs to the table, overwriting any existing confs */
+		default void putAll(Iterator<Map.Entry<int[],ConfInfo>> confs) {
+			while (confs.hasNext()) {
+				Map.Entry<int[],ConfInfo> entry = confs.next();
+				put(entry.getKey(), get(entry.getKey()), entry.getValue());
+			}
+		}
+
+		void close();
+	}
+
+	/** conf assignments sorted by energy */
+	interface EnergyIndex extends Iterable<Map.Entry<Double,int[]>> {
+
+		/** the distinct energies, in order */
+		Iterator<Double> energies();
+
+		/** the assignments with exactly this energy, or null if none */
+		List<int[]> get(double energy);
+	}
+
+	/** the storage for a whole conf DB, provided by the engine */
+	interface Store {
+		TableStore openTable(String id);
+		Set<String> getTableIds();
+		SequenceInfo getSequenceInfo(Sequence sequence);
+		void putSequenceInfo(Sequence sequence, SequenceInfo info);
+		Iterable<Sequence> getSequences();
+		long getNumSequences();
+		void flush();
+		default void flushLater() {
+			flush();
+		}
+		void close();
+	}
+
+	/** storage engines for conf DBs */
+	public static enum Engine {
+
+		/** a MapDB database, with B-tree energy indices that are updated on every write */
+		MapDB,
+
+		/**
+		 * A compact append-only log, with bit-packed assignments and group-committed writes.
+		 * Writes are much cheaper than MapDB, but sorting confs by energy needs a scan of the whole table.
+		 * Recently-read confs are cached in memory, up to a fixed number of confs.
+		 * The file offset of every conf stays in memory though, at roughly 100 bytes of heap per conf.
+		 */
+		Compact;
+
+		/** new files with this extension use the compact engine */
+		public static final String CompactExtension = ".cdb";
+
+		/**
+		 * Existing files use whatever engine wrote them.
+		 * New files use the compact engine if the file name ends with {@link #CompactExtension},
+		 * or the MapDB engine otherwise.
+		 */
+		public static Engine forFile(File file) {
+			if (file == null) {
+				return MapDB;
+			}
+			if (file.exists() && file.length() > 0) {
+				return CompactConfStore.isCompactFile(file) ? Compact : MapDB;
+			}
+			return file.getName().endsWith(CompactExtension) ? Compact : MapDB;
+		}
+	}
+
+	public class ConfTable implements Iterable<Conf> {
+
+		public final String id;
+
+		private final TableStore store;
+
+		public ConfTable(String id) {
+			this.id = id;
+			this.store = ConfDB.this.store.openTable(id);
 		}
 
 		public void setBounds(ConfSearch.EnergiedConf econf, long timestampNs) {
@@ -362,62 +425,34 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		public void setBounds(int[] assignments, double lowerEnergy, double upperEnergy, long timestampNs) {
-			ConfInfo info = btree.get(assignments);
-			if (info == null) {
-				info = new ConfInfo();
-			} else {
-				// remove old energy index entries if needed
-				if (info.lowerTimestampNs != 0L) {
-					lowerIndex.remove(info.lowerEnergy, assignments);
-				}
-				if (info.upperTimestampNs != 0L) {
-					upperIndex.remove(info.upperEnergy, assignments);
-				}
-			}
+			ConfInfo oldInfo = store.get(assignments);
+			ConfInfo info = oldInfo == null ? new ConfInfo() : oldInfo.copy();
 			info.lowerEnergy = lowerEnergy;
 			info.lowerTimestampNs = timestampNs;
 			info.upperEnergy = upperEnergy;
 			info.upperTimestampNs = timestampNs;
-			btree.put(assignments, info);
-			lowerIndex.add(lowerEnergy, assignments);
-			upperIndex.add(upperEnergy, assignments);
+			store.put(assignments, oldInfo, info);
 		}
 
 		public void setLowerBound(int[] assignments, double energy, long timestampNs) {
-			ConfInfo info = btree.get(assignments);
-			if (info == null) {
-				info = new ConfInfo();
-			} else {
-				// remove old energy index entries if needed
-				if (info.lowerTimestampNs != 0L) {
-					lowerIndex.remove(info.lowerEnergy, assignments);
-				}
-			}
+			ConfInfo oldInfo = store.get(assignments);
+			ConfInfo info = oldInfo == null ? new ConfInfo() : oldInfo.copy();
 			info.lowerEnergy = energy;
 			info.lowerTimestampNs = timestampNs;
-			btree.put(assignments, info);
-			lowerIndex.add(energy, assignments);
+			store.put(assignments, oldInfo, info);
 		}
 
 		public void setUpperBound(int[] assignments, double energy, long timestampNs) {
-			ConfInfo info = btree.get(assignments);
-			if (info == null) {
-				info = new ConfInfo();
-			} else {
-				// remove old energy index entries if needed
-				if (info.upperTimestampNs != 0L) {
-					upperIndex.remove(info.upperEnergy, assignments);
-				}
-			}
+			ConfInfo oldInfo = store.get(assignments);
+			ConfInfo info = oldInfo == null ? new ConfInfo() : oldInfo.copy();
 			info.upperEnergy = energy;
 			info.upperTimestampNs = timestampNs;
-			btree.put(assignments, info);
-			upperIndex.add(energy, assignments);
+			store.put(assignments, oldInfo, info);
 		}
 
 		public Conf get(int[] assignments) {
 
-			ConfInfo info = btree.get(assignments);
+			ConfInfo info = store.get(assignments);
 			if (info == null) {
 				return null;
 			}
@@ -427,7 +462,7 @@ public class ConfDB implements AutoCleanable {
 
 		public ConfSearch.ScoredConf getScored(int[] assignments) {
 
-			ConfInfo info = btree.get(assignments);
+			ConfInfo info = store.get(assignments);
 			if (info == null) {
 				return null;
 			}
@@ -440,7 +475,7 @@ public class ConfDB implements AutoCleanable {
 
 		public ConfSearch.EnergiedConf getEnergied(ConfSearch.ScoredConf conf) {
 
-			ConfInfo info = btree.get(conf.getAssignments());
+			ConfInfo info = store.get(conf.getAssignments());
 			if (info == null || info.upperTimestampNs == 0L) {
 				return null;
 			}
@@ -450,7 +485,7 @@ public class ConfDB implements AutoCleanable {
 
 		public ConfSearch.EnergiedConf getEnergied(int[] assignments) {
 
-			ConfInfo info = btree.get(assignments);
+			ConfInfo info = store.get(assignments);
 			if (info == null) {
 				return null;
 			}
@@ -463,21 +498,15 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		public void remove(int[] assignments) {
-			ConfInfo info = btree.get(assignments);
+			ConfInfo info = store.get(assignments);
 			if (info != null) {
-				if (info.lowerTimestampNs != 0L) {
-					lowerIndex.remove(info.lowerEnergy, assignments);
-				}
-				if (info.upperTimestampNs != 0L) {
-					upperIndex.remove(info.upperEnergy, assignments);
-				}
-				btree.remove(assignments);
+				store.remove(assignments, info);
 			}
 		}
 
 		@Override
 		public Iterator<Conf> iterator() {
-			return Streams.of(btree.entryIterator())
+			return Streams.of(store.iterator())
 				.map((entry) -> new Conf(
 						entry.getKey(),
 						entry.getValue()
@@ -495,12 +524,12 @@ public class ConfDB implements AutoCleanable {
 						.iterator();
 
 				case Score:
-					return () -> Streams.of(lowerIndex.iterator())
+					return () -> Streams.of(store.lowerIndex().iterator())
 						.map((entry) -> new ConfSearch.ScoredConf(entry.getValue(), entry.getKey()))
 						.iterator();
 
 				case Energy:
-					return () -> Streams.of(upperIndex.iterator())
+					return () -> Streams.of(store.upperIndex().iterator())
 						.map((entry) -> getScored(entry.getValue()))
 						.filter((conf) -> conf != null)
 						.iterator();
@@ -519,13 +548,13 @@ public class ConfDB implements AutoCleanable {
 						.iterator();
 
 				case Score:
-					return () -> Streams.of(lowerIndex.iterator())
+					return () -> Streams.of(store.lowerIndex().iterator())
 						.map((entry) -> getEnergied(entry.getValue()))
 						.filter((conf) -> conf != null)
 						.iterator();
 
 				case Energy:
-					return () -> Streams.of(upperIndex.iterator())
+					return () -> Streams.of(store.upperIndex().iterator())
 						.map((entry) -> getEnergied(entry.getValue()))
 						.filter((conf) -> conf != null)
 						.iterator();
@@ -536,15 +565,15 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		public Iterable<Double> lowerBounds() {
-			return () -> lowerIndex.btree.keyIterator();
+			return () -> store.lowerIndex().energies();
 		}
 
 		public Iterable<Double> upperBounds() {
-			return () -> upperIndex.btree.keyIterator();
+			return () -> store.upperIndex().energies();
 		}
 
 		public List<Conf> getConfsByLowerBound(double energy) {
-			List<int[]> multiAssignments = lowerIndex.get(energy);
+			List<int[]> multiAssignments = store.lowerIndex().get(energy);
 			if (multiAssignments == null) {
 				return null;
 			}
@@ -554,7 +583,7 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		public List<Conf> getConfsByUpperBound(double energy) {
-			List<int[]> multiAssignments = upperIndex.get(energy);
+			List<int[]> multiAssignments = store.upperIndex().get(energy);
 			if (multiAssignments == null) {
 				return null;
 			}
@@ -564,12 +593,16 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		public long size() {
-			return btree.sizeLong();
+			return store.size();
 		}
 
 		public void flush() {
 			ConfDB.this.flush();
 		}
+
+		public void flushLater() {
+			ConfDB.this.flushLater();
+		}
 	}
 
 	public class SequenceDB extends ConfTable {
@@ -582,11 +615,11 @@ public class ConfDB implements AutoCleanable {
 		}
 
 		private SequenceInfo getInfo() {
-			return sequences.get(sequence);
+			return store.getSequenceInfo(sequence);
 		}
 
 		private void setInfo(SequenceInfo info) {
-			sequences.put(sequence, info);
+			store.putSequenceInfo(sequence, info);
 		}
 
 		public double getLowerEnergyOfUnsampledConfs() {
@@ -608,17 +641,18 @@ public class ConfDB implements AutoCleanable {
 		}
 	}
 
-	private class EnergyIndex implements Iterable<Map.Entry<Double,int[]>> {
+	private class MapDBEnergyIndex implements EnergyIndex {
 
 		public final BTreeMap<Double,List<int[]>> btree;
 
-		public EnergyIndex(String id) {
+		public MapDBEnergyIndex(String id) {
 			this.btree = db.treeMap(id)
 				.keySerializer(Serializer.DOUBLE)
 				.valueSerializer(new MultiAssignmentsSerializer())
 				.createOrOpen();
 		}
 
+		@Override
 		public List<int[]> get(double energy) {
 			return btree.get(energy);
 		}
@@ -650,30 +684,9 @@ public class ConfDB implements AutoCleanable {
 			}
 		}
 
-		private class EnergiedAssignments implements Map.Entry<Double,int[]> {
-
-			public final double energy;
-			public final int[] assignments;
-
-			public EnergiedAssignments(double energy, int[] assignments) {
-				this.energy = energy;
-				this.assignments = assignments;
-			}
-
-			@Override
-			public Double getKey() {
-				return energy;
-			}
-
-			@Override
-			public int[] getValue() {
-				return assignments;
-			}
-
-			@Override
-			public int[] setValue(int[] value) {
-				throw new UnsupportedOperationException();
-			}
+		@Override
+		public Iterator<Double> energies() {
+			return btree.keyIterator();
 		}
 
 		@Override
@@ -682,7 +695,7 @@ public class ConfDB implements AutoCleanable {
 				.flatMap((entry) ->
 					entry.getValue().stream()
 						.map((assignments) ->
-							(Map.Entry<Double,int[]>)new EnergiedAssignments(entry.getKey(), assignments)
+							(Map.Entry<Double,int[]>)new AbstractMap.SimpleImmutableEntry<>(entry.getKey(), assignments)
 						)
 				)
 				.iterator();
@@ -710,11 +723,264 @@ public class ConfDB implements AutoCleanable {
 		}
 	}
 
+	private class MapDBTableStore implements TableStore {
+
+		private final BTreeMap<int[],ConfInfo> btree;
+		private final MapDBEnergyIndex lowerIndex;
+		private final MapDBEnergyIndex upperIndex;
+
+		public MapDBTableStore(String id) {
+
+			// MapDB serializer for ConfInfo
+			final int ConfInfoBytes = Double.BYTES*2 + Long.BYTES*2;
+			SimpleSerializer<ConfInfo> confInfoSerializer = new SimpleSerializer<ConfInfo>(ConfInfoBytes) {
+
+				@Override
+				public void serialize(@NotNull DataOutput2 out, @NotNull ConfInfo info)
+				throws IOException {
+					out.writeDouble(info.lowerEnergy);
+					out.writeLong(info.lowerTimestampNs);
+					out.writeDouble(info.upperEnergy);
+					out.writeLong(info.upperTimestampNs);
+				}
+
+				@Override
+				public ConfInfo deserialize(@NotNull DataInput2 in, int available)
+				throws IOException {
+					return new ConfInfo(
+						in.readDouble(),
+						in.readLong(),
+						in.readDouble(),
+						in.readLong()
+					);
+				}
+			};
+
+			this.btree = db.treeMap(id)
+				.keySerializer(new AssignmentsSerializer())
+				.valueSerializer(confInfoSerializer)
+				.createOrOpen();
+
+			this.lowerIndex = new MapDBEnergyIndex(id + LowerIndexSuffix);
+			this.upperIndex = new MapDBEnergyIndex(id + UpperIndexSuffix);
+		}
+
+		@Override
+		public ConfInfo get(int[] assignments) {
+			return btree.get(assignments);
+		}
+
+		@Override
+		public void put(int[] assignments, ConfInfo oldInfo, ConfInfo newInfo) {
+
+			btree.put(assignments, newInfo);
+
+			// update the energy indices, but only if the energies changed
+			boolean hadLower = oldInfo != null && oldInfo.lowerTimestampNs != 0L;
+			if (!hadLower || Double.compare(oldInfo.lowerEnergy, newInfo.lowerEnergy) != 0 || newInfo.lowerTimestampNs == 0L) {
+				if (hadLower) {
+					lowerIndex.remove(oldInfo.lowerEnergy, assignments);
+				}
+				if (newInfo.lowerTimestampNs != 0L) {
+					lowerIndex.add(newInfo.lowerEnergy, assignments);
+				}
+			}
+			boolean hadUpper = oldInfo != null && oldInfo.upperTimestampNs != 0L;
+			if (!hadUpper || Double.compare(oldInfo.upperEnergy, newInfo.upperEnergy) != 0 || newInfo.upperTimestampNs == 0L) {
+				if (hadUpper) {
+					upperIndex.remove(oldInfo.upperEnergy, assignments);
+				}
+				if (newInfo.upperTimestampNs != 0L) {
+					upperIndex.add(newInfo.upperEnergy, assignments);
+				}
+			}
+		}
+
+		@Override
+		public void remove(int[] assignments, ConfInfo oldInfo) {
+			if (oldInfo.lowerTimestampNs != 0L) {
+				lowerIndex.remove(oldInfo.lowerEnergy, assignments);
+			}
+			if (oldInfo.upperTimestampNs != 0L) {
+				upperIndex.remove(oldInfo.upperEnergy, assignments);
+			}
+			btree.remove(assignments);
+		}
+
+		@Override
+		public Iterator<Map.Entry<int[],ConfInfo>> iterator() {
+			return btree.entryIterator();
+		}
+
+		@Override
+		public EnergyIndex lowerIndex() {
+			return lowerIndex;
+		}
+
+		@Override
+		public EnergyIndex upperIndex() {
+			return upperIndex;
+		}
+
+		@Override
+		public long size() {
+			return btree.sizeLong();
+		}
+
+		@Override
+		public void close() {
+			btree.close();
+		}
+	}
+
+	private static final String SequencesName = "sequences";
+	private static final String LowerIndexSuffix = "-lowerEnergy";
+	private static final String UpperIndexSuffix = "-upperEnergy";
+
+	private class MapDBStore implements Store {
+
+		private final HTreeMap<Sequence,SequenceInfo> sequences;
+		private final List<MapDBTableStore> tables = new ArrayList<>();
+
+		public MapDBStore() {
+
+			// MapDB serializer for Sequence
+			SimpleSerializer<Sequence> sequenceSerializer = new SimpleSerializer<Sequence>(SimpleSerializer.DynamicSize) {
+
+				@Override
+				public void serialize(@NotNull DataOutput2 out, @NotNull Sequence sequence)
+				throws IOException {
+					out.writeUTF(getSequenceId(sequence));
+				}
+
+				@Override
+				public Sequence deserialize(@NotNull DataInput2 in, int available)
+				throws IOException {
+					return makeSequenceFromId(in.readUTF());
+				}
+
+				@Override
+				public int compare(Sequence a, Sequence b) {
+
+					// short circuit
+					if (a == b) {
+						return 0;
+					}
+
+					// lexicographical comparison
+					for (SeqSpace.Position pos : confSpace.seqSpace.positions) {
+						SeqSpace.ResType aResType = a.get(pos);
+						SeqSpace.ResType bResType = b.get(pos);
+						if (aResType != null && bResType != null) {
+							// both not null, safe to compare
+							int val = aResType.compareTo(bResType);
+							if (val != 0) {
+								return val;
+							}
+						} else if (aResType == null && bResType != null) {
+							// a null, but not b, assume a < b
+							return -1;
+						} else if (aResType != null) {
+							// b null, but not a, assume a > b
+							return 1;
+						}
+						// both null, continue to next pos
+					}
+
+					return 0;
+				}
+			};
+
+			// MapDB serialzier for SequenceInfo
+			final int infoSize = Double.BYTES;
+			SimpleSerializer<SequenceInfo> infoSerializer = new SimpleSerializer<SequenceInfo>(infoSize) {
+
+				@Override
+				public void serialize(@NotNull DataOutput2 out, @NotNull SequenceInfo info)
+				throws IOException {
+					out.writeDouble(info.lowerEnergyOfUnsampledConfs);
+				}
+
+				@Override
+				public SequenceInfo deserialize(@NotNull DataInput2 in, int available)
+				throws IOException {
+					return new SequenceInfo(in.readDouble());
+				}
+			};
+
+			sequences = db.hashMap(SequencesName)
+				.keySerializer(sequenceSerializer)
+				.valueSerializer(infoSerializer)
+				.createOrOpen();
+		}
+
+		@Override
+		public TableStore openTable(String id) {
+			MapDBTableStore table = new MapDBTableStore(id);
+			tables.add(table);
+			return table;
+		}
+
+		@Override
+		public Set<String> getTableIds() {
+			Set<String> ids = new LinkedHashSet<>();
+			for (String name : db.getAllNames()) {
+				if (!name.equals(SequencesName) && !name.endsWith(LowerIndexSuffix) && !name.endsWith(UpperIndexSuffix)) {
+					ids.add(name);
+				}
+			}
+			return ids;
+		}
+
+		@Override
+		public SequenceInfo getSequenceInfo(Sequence sequence) {
+			return sequences.get(sequence);
+		}
+
+		@Override
+		public void putSequenceInfo(Sequence sequence, SequenceInfo info) {
+			sequences.put(sequence, info);
+		}
+
+		@Override
+		@SuppressWarnings("unchecked")
+		public Iterable<Sequence> getSequences() {
+			return (Set<Sequence>)sequences.keySet();
+		}
+
+		@Override
+		public long getNumSequences() {
+			// Java API means we're stuck with int-sized values here
+			//return sequences.getSize();
+			// but we could have lots of sequences, so we want a long
+			return sequences.sizeLong();
+		}
+
+		@Override
+		public void flush() {
+			// In write-ahead mode, we don't actually have any transactions,
+			// so there's nothing to commit in the traditional sense.
+			// So in this case, "commit" flushes write caches to disk
+			db.commit();
+		}
+
+		@Override
+		public void close() {
+			flush();
+			for (MapDBTableStore table : tables) {
+				table.close();
+			}
+			tables.clear();
+			db.close();
+		}
+	}
+
 	public final SimpleConfSpace confSpace;
 	public final File file;
+	public final Engine engine;
 
 	private final DB db;
-	private final HTreeMap<Sequence,SequenceInfo> sequences;
+	private final Store store;
 	private final Map<Sequence,SequenceDB> sequenceDBs;
 	private final IntEncoding assignmentEncoding;
 
@@ -722,10 +988,16 @@ public class ConfDB implements AutoCleanable {
 		this(confSpace, null);
 	}
 
+	/** uses the engine picked by {@link Engine#forFile} */
 	public ConfDB(SimpleConfSpace confSpace, File file) {
+		this(confSpace, file, Engine.forFile(file));
+	}
+
+	public ConfDB(SimpleConfSpace confSpace, File file, Engine engine) {
 
 		this.confSpace = confSpace;
 		this.file = file;
+		this.engine = engine;
 
 		// determine conf encoding
 		int maxAssignment = 0;
@@ -736,89 +1008,41 @@ public class ConfDB implements AutoCleanable {
 		}
 		assignmentEncoding = IntEncoding.get(maxAssignment);
 
-		// MapDB serializer for Sequence
-		SimpleSerializer<Sequence> sequenceSerializer = new SimpleSerializer<Sequence>(SimpleSerializer.DynamicSize) {
-
-			@Override
-			public void serialize(@NotNull DataOutput2 out, @NotNull Sequence sequence)
-			throws IOException {
-				out.writeUTF(getSequenceId(sequence));
-			}
-
-			@Override
-			public Sequence deserialize(@NotNull DataInput2 in, int available)
-			throws IOException {
-				return makeSequenceFromId(in.readUTF());
-			}
-
-			@Override
-			public int compare(Sequence a, Sequence b) {
+		switch (engine) {
 
-				// short circuit
-				if (a == b) {
-					return 0;
-				}
+			case MapDB:
 
-				// lexicographical comparison
-				for (SeqSpace.Position pos : confSpace.seqSpace.positions) {
-					SeqSpace.ResType aResType = a.get(pos);
-					SeqSpace.ResType bResType = b.get(pos);
-					if (aResType != null && bResType != null) {
-						// both not null, safe to compare
-						int val = aResType.compareTo(bResType);
-						if (val != 0) {
-							return val;
-						}
-					} else if (aResType == null && bResType != null) {
-						// a null, but not b, assume a < b
-						return -1;
-					} else if (aResType != null) {
-						// b null, but not a, assume a > b
-						return 1;
-					}
-					// both null, continue to next pos
+				// open the DB
+				if (file != null) {
+					db = DBMaker.fileDB(file)
+						.transactionEnable() // turn on wite-ahead log, so the db survives JVM crashes
+						.fileMmapEnableIfSupported() // use memory-mapped files if possible (can be much faster)
+						.closeOnJvmShutdown()
+						.make();
+				} else {
+					db = DBMaker.memoryDB()
+						.make();
 				}
+				store = new MapDBStore();
+			break;
 
-				return 0;
-			}
-		};
-
-		// MapDB serialzier for SequenceInfo
-		final int infoSize = Double.BYTES;
-		SimpleSerializer<SequenceInfo> infoSerializer = new SimpleSerializer<SequenceInfo>(infoSize) {
+			case Compact:
 
-			@Override
-			public void serialize(@NotNull DataOutput2 out, @NotNull SequenceInfo info)
-			throws IOException {
-				out.writeDouble(info.lowerEnergyOfUnsampledConfs);
-			}
-
-			@Override
-			public SequenceInfo deserialize(@NotNull DataInput2 in, int available)
-			throws IOException {
-				return new SequenceInfo(in.readDouble());
-			}
-		};
+				if (file == null) {
+					throw new IllegalArgumentException("the compact engine needs a file");
+				}
+				db = null;
+				store = new CompactConfStore(this, file);
+			break;
 
-		// open the DB
-		if (file != null) {
-			db = DBMaker.fileDB(file)
-				.transactionEnable() // turn on wite-ahead log, so the db survives JVM crashes
-				.fileMmapEnableIfSupported() // use memory-mapped files if possible (can be much faster)
-				.closeOnJvmShutdown()
-				.make();
-		} else {
-			db = DBMaker.memoryDB()
-				.make();
+			default:
+				throw new UnpossibleError();
 		}
-		sequences = db.hashMap("sequences")
-			.keySerializer(sequenceSerializer)
-			.valueSerializer(infoSerializer)
-			.createOrOpen();
+
 		sequenceDBs = new HashMap<>();
 	}
 
-	private String getSequenceId(Sequence sequence) {
+	String getSequenceId(Sequence sequence) {
 		return String.join(":", () ->
 			sequence.seqSpace.positions.stream()
 				.map((pos) -> (CharSequence)sequence.get(pos).name)
@@ -826,7 +1050,7 @@ public class ConfDB implements AutoCleanable {
 		);
 	}
 
-	private Sequence makeSequenceFromId(String id) {
+	Sequence makeSequenceFromId(String id) {
 		Sequence sequence = confSpace.makeUnassignedSequence();
 		String[] resTypes = id.split(":");
 		for (SeqSpace.Position pos : confSpace.seqSpace.positions) {
@@ -836,14 +1060,11 @@ public class ConfDB implements AutoCleanable {
 	}
 
 	public long getNumSequences() {
-		// Java API means we're stuck with int-sized values here
-		//return sequences.getSize();
-		// but we could have lots of sequences, so we want a long
-		return sequences.sizeLong();
+		return store.getNumSequences();
 	}
 
 	public Iterable<Sequence> getSequences() {
-		return (Set<Sequence>)sequences.keySet();
+		return store.getSequences();
 	}
 
 	public SequenceDB getSequence(Sequence sequence) {
@@ -857,27 +1078,68 @@ public class ConfDB implements AutoCleanable {
 		if (sdb == null) {
 			sdb = new SequenceDB(sequence);
 			sequenceDBs.put(sequence, sdb);
-			if (!sequences.containsKey(sequence)) {
-				sequences.put(sequence, new SequenceInfo());
+			if (store.getSequenceInfo(sequence) == null) {
+				store.putSequenceInfo(sequence, new SequenceInfo());
 			}
 		}
 		return sdb;
 	}
 
-	public void flush() {
-		// In write-ahead mode, we don't actually have any transactions,
-		// so there's nothing to commit in the traditional sense.
-		// So in this case, "commit" flushes write caches to disk
-		db.commit();
+	/** the ids of all the conf tables in this DB, including sequence tables */
+	public Set<String> getTableIds() {
+		return store.getTableIds();
 	}
 
-	public void close() {
+	/**
+	 * Copies all the conf tables and sequences from another DB into this one, overwriting any confs already here.
+	 * Use this to convert between engines, or to compact a DB.
+	 */
+	public void importFrom(ConfDB other) {
+
+		if (other.confSpace.positions.size() != confSpace.positions.size()) {
+			throw new IllegalArgumentException("the other DB has a different conformation space");
+		}
+
+		for (Sequence sequence : other.getSequences()) {
+			Sequence mySequence = makeSequenceFromId(other.getSequenceId(sequence));
+			store.putSequenceInfo(mySequence, other.store.getSequenceInfo(sequence));
+		}
+
+		for (String id : other.getTableIds()) {
+			new ConfTable(id).store.putAll(other.new ConfTable(id).store.iterator());
+		}
+
 		flush();
-		for (ConfTable sdb : sequenceDBs.values()) {
-			sdb.btree.close();
+	}
+
+	/** writes a copy of this DB to a new file, using the given engine */
+	public void exportTo(File file, Engine engine) {
+		try (ConfDB other = new ConfDB(confSpace, file, engine)) {
+			other.importFrom(this);
 		}
+	}
+
+	/**
+	 * Saves recent writes to disk, and waits for them to be written.
+	 */
+	public void flush() {
+		store.flush();
+	}
+
+	/**
+	 * Saves recent writes to disk soon, but lets the storage engine group them with other writes first.
+	 *
+	 * The compact engine commits the current batch at most a second or so later (or when it fills up),
+	 * which is much cheaper than committing after every write. The MapDB engine saves the writes right away.
+	 * Use this when writing confs at a high rate, and {@link #flush} when the writes must be on disk now.
+	 */
+	public void flushLater() {
+		store.flushLater();
+	}
+
+	public void close() {
+		store.close();
 		sequenceDBs.clear();
-		db.close();
 	}
 
 	@Override
@@ -394,21 +394,23 @@ public interface ConfSearch {
 		public final ConfSearch first;
 		public final ConfSearch second;
 
-		private Queue.FIFO<ScoredConf> buf;
+		private final Queue.FIFO<ScoredConf> buf;
 
 		public Splitter(ConfSearch confs) {
 			this(confs, false, null);
 		}
 
 		public Splitter(ConfSearch confs, boolean useExternalMemory, RCs rcs) {
+			this(confs, useExternalMemory
+				? Queue.ExternalFIFOFactory.of(new ScoredConfFIFOSerializer(rcs))
+				: Queue.FIFOFactory.<ScoredConf>of()
+			);
+		}
 
-			this.confs = confs;
+		public Splitter(ConfSearch confs, Queue.FIFO<ScoredConf> buf) {
 
-			if (useExternalMemory) {
-				buf = Queue.ExternalFIFOFactory.of(new ScoredConfFIFOSerializer(rcs));
-			} else {
-				buf = Queue.FIFOFactory.of();
-			}
+			this.confs = confs;
+			this.buf = buf;
 
 			AtomicBoolean exhausted = new AtomicBoolean(false);
 
@@ -39,11 +39,13 @@ import java.util.function.Consumer;
 
 public class TupleMatrixBoolean extends AbstractTupleMatrix<Boolean> {
 	
-	private static final long serialVersionUID = -1286639255089978027L;
+	private static final long serialVersionUID = -4718223467806470321L;
 	
     //note: tuples are sets not ordered pairs, i.e. E(i_r,j_s) = E(j_s,i_r), and pruning (i_r,j_s) means pruning (j_s,i_r)
 	private BitSet oneBody; // indices: res1, RC1
-	private BitSet pairwise; // indices: res1, res2, RC1, RC2 where res1>res2
+	private BitSet[] pairwise; // indices: res1, res2, then RC1, RC2 where res1>res2
+	// blocks are only allocated for residue pairs that have a true value,
+	// so eg, pairs of distant residues where nothing gets pruned don't use any memory
 	
 	protected TupleMatrixBoolean() {
 		// do nothing
@@ -54,7 +56,12 @@ public class TupleMatrixBoolean extends AbstractTupleMatrix<Boolean> {
 	public TupleMatrixBoolean(TupleMatrixBoolean other) {
 		super(other);
 		this.oneBody = (BitSet)other.oneBody.clone();
-		this.pairwise = (BitSet)other.pairwise.clone();
+		this.pairwise = new BitSet[other.pairwise.length];
+		for (int i=0; i<pairwise.length; i++) {
+			if (other.pairwise[i] != null) {
+				this.pairwise[i] = (BitSet)other.pairwise[i].clone();
+			}
+		}
 	}
     
     public TupleMatrixBoolean(ConfSpace cSpace, double pruningInterval, boolean defaultHigherInteraction) {
@@ -72,7 +79,7 @@ public class TupleMatrixBoolean extends AbstractTupleMatrix<Boolean> {
     @Override
     protected void allocate(int numOneBody, int numPairwise) {
         oneBody = new BitSet(numOneBody);
-        pairwise = new BitSet(numPairwise);
+        pairwise = new BitSet[getNumPos()*(getNumPos() - 1)/2];
     }
     
     @Override
@@ -95,12 +102,23 @@ public class TupleMatrixBoolean extends AbstractTupleMatrix<Boolean> {
     
     @Override
     public Boolean getPairwise(int res1, int conf1, int res2, int conf2) {
-    	return pairwise.get(getPairwiseIndex(res1, conf1, res2, conf2));
+    	BitSet block = pairwise[getPairwiseIndex(res1, res2)];
+    	return block != null && block.get(getPairwiseIndexInBlock(res1, conf1, res2, conf2));
     }
     
     @Override
     public void setPairwise(int res1, int conf1, int res2, int conf2, Boolean val) {
-    	pairwise.set(getPairwiseIndex(res1, conf1, res2, conf2), val);
+    	int blockIndex = getPairwiseIndex(res1, res2);
+    	BitSet block = pairwise[blockIndex];
+    	if (block == null) {
+    		if (!val) {
+    			// nothing to do, missing blocks are all false
+    			return;
+    		}
+    		block = new BitSet(getPairwiseBlockSize(res1, res2));
+    		pairwise[blockIndex] = block;
+    	}
+    	block.set(getPairwiseIndexInBlock(res1, conf1, res2, conf2), val);
     }
     
     @Override
@@ -109,7 +127,7 @@ public class TupleMatrixBoolean extends AbstractTupleMatrix<Boolean> {
     	int n2 = getNumConfAtPos(res2);
     	for (int i1=0; i1<n1; i1++) {
     		for (int i2=0; i2<n2; i2++) {
-    			pairwise.set(getPairwiseIndex(res1, i1, res2, i2), val.get(i1).get(i2));
+    			setPairwise(res1, i1, res2, i2, val.get(i1).get(i2));
     		}
     	}
     }
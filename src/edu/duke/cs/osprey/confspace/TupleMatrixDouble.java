@@ -36,6 +36,7 @@ import java.util.ArrayList;
 import java.util.function.BiConsumer;
 import java.util.function.Consumer;
 
+import edu.duke.cs.osprey.tools.MathTools;
 import org.apache.commons.collections4.iterators.ArrayIterator;
 
 public class TupleMatrixDouble extends AbstractTupleMatrix<Double> {
@@ -60,8 +61,26 @@ public class TupleMatrixDouble extends AbstractTupleMatrix<Double> {
     
     public TupleMatrixDouble(TupleMatrixDouble other) {
     	super(other);
-    	this.oneBody = other.oneBody.clone();
-    	this.pairwise = other.pairwise.clone();
+    	if (other.oneBody != null) {
+    		this.oneBody = other.oneBody.clone();
+    		this.pairwise = other.pairwise.clone();
+    	} else {
+    		// the other matrix keeps its values somewhere else (eg, a memory-mapped file)
+    		// so copy them through the accessors
+    		allocate(getNumOneBodyTerms(), getNumPairwiseTerms());
+    		for (int res1=0; res1<getNumPos(); res1++) {
+    			int n1 = getNumConfAtPos(res1);
+    			for (int i1=0; i1<n1; i1++) {
+    				oneBody[getOneBodyIndex(res1, i1)] = other.getOneBody(res1, i1);
+    				for (int res2=0; res2<res1; res2++) {
+    					int n2 = getNumConfAtPos(res2);
+    					for (int i2=0; i2<n2; i2++) {
+    						pairwise[getPairwiseIndex(res1, i1, res2, i2)] = other.getPairwise(res1, i1, res2, i2);
+    					}
+    				}
+    			}
+    		}
+    	}
     }
     
     @Override
@@ -109,6 +128,75 @@ public class TupleMatrixDouble extends AbstractTupleMatrix<Double> {
     	}
     }
     
+	/**
+	 * True if the values live in this class's arrays, so the primitive accessors can read them directly.
+	 * Subclasses that keep their values somewhere else should return false, and override
+	 * {@link #getOneBodyValue} and {@link #getPairwiseValue}.
+	 */
+	protected boolean hasDirectValues() {
+		return true;
+	}
+
+	/** Same as {@link #getOneBody}, but without boxing, for hot loops */
+	public double getOneBodyValue(int res, int conf) {
+		return oneBody[getOneBodyIndex(res, conf)];
+	}
+
+	/** Same as {@link #getPairwise}, but without boxing, for hot loops */
+	public double getPairwiseValue(int res1, int conf1, int res2, int conf2) {
+		return pairwise[getPairwiseIndex(res1, conf1, res2, conf2)];
+	}
+
+	/**
+	 * Copies the pairwise values between (res1,conf1) and every conf at res2 into out, indexed by conf2
+	 */
+	public double[] getPairwiseRow(int res1, int conf1, int res2, double[] out) {
+		int n2 = getNumConfAtPos(res2);
+		if (!hasDirectValues()) {
+			for (int conf2=0; conf2<n2; conf2++) {
+				out[conf2] = getPairwiseValue(res1, conf1, res2, conf2);
+			}
+		} else if (res1 > res2) {
+			// the row is contiguous in the array
+			System.arraycopy(pairwise, getPairwiseIndex(res1, conf1, res2, 0), out, 0, n2);
+		} else {
+			// the row is strided in the array
+			int i = getPairwiseIndex(res1, conf1, res2, 0);
+			int stride = getNumConfAtPos(res1);
+			for (int conf2=0; conf2<n2; conf2++) {
+				out[conf2] = pairwise[i];
+				i += stride;
+			}
+		}
+		return out;
+	}
+
+	/**
+	 * Returns the optimal pairwise value between (res1,conf1) and the given confs at res2
+	 */
+	public double optPairwise(int res1, int conf1, int res2, int[] confs2, MathTools.Optimizer optimizer) {
+		double opt = optimizer.initDouble();
+		if (!hasDirectValues()) {
+			for (int conf2 : confs2) {
+				opt = optimizer.opt(opt, getPairwiseValue(res1, conf1, res2, conf2));
+			}
+		} else {
+			int i = getPairwiseIndex(res1, conf1, res2, 0);
+			int stride = res1 > res2 ? 1 : getNumConfAtPos(res1);
+			for (int conf2 : confs2) {
+				opt = optimizer.opt(opt, pairwise[i + conf2*stride]);
+			}
+		}
+		return opt;
+	}
+
+	/**
+	 * Returns the min pairwise value between (res1,conf1) and the given confs at res2
+	 */
+	public double minPairwise(int res1, int conf1, int res2, int[] confs2) {
+		return optPairwise(res1, conf1, res2, confs2, MathTools.Optimizer.Minimize);
+	}
+
     public void fill(double[] vals) {
     	ArrayIterator<Double> iter = new ArrayIterator<>(vals);
     	fill(iter);
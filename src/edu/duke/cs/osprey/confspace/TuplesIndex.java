@@ -35,6 +35,7 @@ package edu.duke.cs.osprey.confspace;
 
 import java.util.*;
 import java.util.function.Consumer;
+import java.util.function.IntConsumer;
 
 
 public class TuplesIndex implements Iterable<RCTuple> {
@@ -51,6 +52,14 @@ public class TuplesIndex implements Iterable<RCTuple> {
 	private final List<RCTuple> tuples;
 	private final TupleMatrixGeneric<Integer> index;
 
+	// flat copies of the single and pair indices, so hot loops don't have to unbox anything
+	// missing tuples are -1
+	private final int[] numRCs;
+	private final int[] singleOffsets;
+	private final int[] singleIndices;
+	private final int[][] pairOffsets;
+	private final int[] pairIndices;
+
 	public TuplesIndex(SimpleConfSpace confSpace, RCTuple[] tuplesArray) {
 		this(confSpace, Arrays.asList(tuplesArray));
 	}
@@ -66,6 +75,43 @@ public class TuplesIndex implements Iterable<RCTuple> {
 		for (int i=0; i<tuples.size(); i++) {
 			index.setTuple(tuples.get(i), i);
 		}
+
+		// copy the singles and pairs into flat arrays
+		int numPos = confSpace.positions.size();
+		numRCs = new int[numPos];
+		for (int pos=0; pos<numPos; pos++) {
+			numRCs[pos] = confSpace.positions.get(pos).resConfs.size();
+		}
+		singleOffsets = new int[numPos];
+		pairOffsets = new int[numPos][];
+		int numSingles = 0;
+		int numPairs = 0;
+		for (int pos1=0; pos1<numPos; pos1++) {
+			int n1 = numRCs[pos1];
+			singleOffsets[pos1] = numSingles;
+			numSingles += n1;
+			pairOffsets[pos1] = new int[pos1];
+			for (int pos2=0; pos2<pos1; pos2++) {
+				pairOffsets[pos1][pos2] = numPairs;
+				numPairs += n1*numRCs[pos2];
+			}
+		}
+		singleIndices = new int[numSingles];
+		pairIndices = new int[numPairs];
+		for (int pos1=0; pos1<numPos; pos1++) {
+			int n1 = numRCs[pos1];
+			for (int rc1=0; rc1<n1; rc1++) {
+				Integer t = index.getOneBody(pos1, rc1);
+				singleIndices[singleOffsets[pos1] + rc1] = t != null ? t : -1;
+				for (int pos2=0; pos2<pos1; pos2++) {
+					int n2 = numRCs[pos2];
+					for (int rc2=0; rc2<n2; rc2++) {
+						t = index.getPairwise(pos1, rc1, pos2, rc2);
+						pairIndices[pairOffsets[pos1][pos2] + rc1*n2 + rc2] = t != null ? t : -1;
+					}
+				}
+			}
+		}
 	}
 
 	@Override
@@ -104,6 +150,19 @@ public class TuplesIndex implements Iterable<RCTuple> {
 		return index.getPairwise(pos1, rc1, pos2, rc2);
 	}
 
+	/** like {@link #getIndex(int, int)}, but returns -1 instead of null if there's no tuple */
+	public int findIndex(int pos1, int rc1) {
+		return singleIndices[singleOffsets[pos1] + rc1];
+	}
+
+	/** like {@link #getIndex(int, int, int, int)}, but returns -1 instead of null if there's no tuple */
+	public int findIndex(int pos1, int rc1, int pos2, int rc2) {
+		if (pos2 > pos1) {
+			return pairIndices[pairOffsets[pos2][pos1] + rc2*numRCs[pos1] + rc1];
+		}
+		return pairIndices[pairOffsets[pos1][pos2] + rc1*numRCs[pos2] + rc2];
+	}
+
 	public Integer getIndex(int pos1, int rc1, int pos2, int rc2, int pos3, int rc3) {
 		// TODO: is there a more efficient way to do this?
 		return getIndex(new RCTuple(pos1, rc1, pos2, rc2, pos3, rc3).sorted());
@@ -194,4 +253,92 @@ public class TuplesIndex implements Iterable<RCTuple> {
 		// look for higher order tuples next
 		index.forEachHigherOrderTupleIn(conf, (tuple, index) -> callback.accept(index));
 	}
+
+	/**
+	 * Sums values[t] over the indices t of all the tuples in the conformation,
+	 * the same tuples {@link #forEachIn} would visit, but without boxing any indices.
+	 */
+	public double sum(int[] conf, double[] values, boolean throwIfMissingSingle, boolean throwIfMissingPair) {
+
+		double sum = 0.0;
+
+		int numPos = confSpace.positions.size();
+		for (int pos1=0; pos1<numPos; pos1++) {
+
+			int rc1 = conf[pos1];
+			if (rc1 == Conf.Unassigned) {
+				continue;
+			}
+
+			int t = singleIndices[singleOffsets[pos1] + rc1];
+			if (t >= 0) {
+				sum += values[t];
+			} else if (throwIfMissingSingle) {
+				throw new TuplesIndex.NoSuchTupleException(new RCTuple(pos1, rc1));
+			}
+
+			int[] offsets = pairOffsets[pos1];
+			for (int pos2=0; pos2<pos1; pos2++) {
+
+				int rc2 = conf[pos2];
+				if (rc2 == Conf.Unassigned) {
+					continue;
+				}
+
+				t = pairIndices[offsets[pos2] + rc1*numRCs[pos2] + rc2];
+				if (t >= 0) {
+					sum += values[t];
+				} else if (throwIfMissingPair) {
+					throw new TuplesIndex.NoSuchTupleException(new RCTuple(pos1, rc1, pos2, rc2));
+				}
+			}
+		}
+
+		// higher order tuples are rare, so don't bother optimizing them
+		if (index.hasHigherOrderTuples()) {
+			double[] higherSum = { 0.0 };
+			index.forEachHigherOrderTupleIn(conf, (tuple, t) -> higherSum[0] += values[t]);
+			sum += higherSum[0];
+		}
+
+		return sum;
+	}
+
+	/** like {@link #forEachIn}, but without boxing the tuple indices */
+	public void forEachIndexIn(int[] conf, boolean throwIfMissingSingle, boolean throwIfMissingPair, IntConsumer callback) {
+
+		int numPos = confSpace.positions.size();
+		for (int pos1=0; pos1<numPos; pos1++) {
+
+			int rc1 = conf[pos1];
+			if (rc1 == Conf.Unassigned) {
+				continue;
+			}
+
+			int t = singleIndices[singleOffsets[pos1] + rc1];
+			if (t >= 0) {
+				callback.accept(t);
+			} else if (throwIfMissingSingle) {
+				throw new TuplesIndex.NoSuchTupleException(new RCTuple(pos1, rc1));
+			}
+
+			int[] offsets = pairOffsets[pos1];
+			for (int pos2=0; pos2<pos1; pos2++) {
+
+				int rc2 = conf[pos2];
+				if (rc2 == Conf.Unassigned) {
+					continue;
+				}
+
+				t = pairIndices[offsets[pos2] + rc1*numRCs[pos2] + rc2];
+				if (t >= 0) {
+					callback.accept(t);
+				} else if (throwIfMissingPair) {
+					throw new TuplesIndex.NoSuchTupleException(new RCTuple(pos1, rc1, pos2, rc2));
+				}
+			}
+		}
+
+		index.forEachHigherOrderTupleIn(conf, (tuple, t) -> callback.accept(t));
+	}
 }
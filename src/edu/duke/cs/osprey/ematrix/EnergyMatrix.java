@@ -33,6 +33,7 @@
 package edu.duke.cs.osprey.ematrix;
 
 import java.io.File;
+import java.io.IOException;
 import java.util.ArrayList;
 
 import edu.duke.cs.osprey.confspace.*;
@@ -49,14 +50,37 @@ public class EnergyMatrix extends TupleMatrixDouble implements FragmentEnergies
 	private static final long serialVersionUID = 6503270845014990929L;
 	
 	
+	/**
+	 * Reads an energy matrix in either the binary {@link EnergyMatrixIO} format,
+	 * or the older Java serialization format.
+	 */
 	public static EnergyMatrix read(File file)
 	throws BadFileException {
+		if (file.exists() && EnergyMatrixIO.isBinaryFile(file)) {
+			try {
+				return EnergyMatrixIO.read(file);
+			} catch (IOException ex) {
+				throw new BadFileException(file, "file is unreadable or corrupt", ex);
+			}
+		}
 		return ObjectIO.read(file, EnergyMatrix.class);
 	}
 	
+	/**
+	 * Writes an energy matrix in the binary {@link EnergyMatrixIO} format if possible,
+	 * otherwise falls back to Java serialization.
+	 */
 	public static void write(EnergyMatrix emat, File file)
 	throws CantWriteException {
-		ObjectIO.write(emat, file);
+		if (EnergyMatrixIO.canWrite(emat)) {
+			try {
+				EnergyMatrixIO.write(emat, EnergyMatrixIO.NoFingerprint, file);
+			} catch (IOException ex) {
+				throw new CantWriteException(file, ex);
+			}
+		} else {
+			ObjectIO.write(emat, file);
+		}
 	}
 
 	private double constTerm = 0;
@@ -87,6 +111,14 @@ public class EnergyMatrix extends TupleMatrixDouble implements FragmentEnergies
     	this.constTerm = other.constTerm;
     }
     
+    /**
+     * Returns false if this matrix doesn't store pair energies between the two positions,
+     * eg because they're too far apart to interact. Those pair energies are always zero.
+     */
+    public boolean storesPairwise(int pos1, int pos2) {
+    	return true;
+    }
+    
     public double rcContribAtPos(int pos, int[] conf, int numResInHot) {
     	// value of an rc
     	RCTuple tup = new RCTuple(conf);
@@ -179,12 +211,12 @@ public class EnergyMatrix extends TupleMatrixDouble implements FragmentEnergies
 
     @Override
 	public double getEnergy(int pos, int rc) {
-    	return getOneBody(pos, rc);
+    	return getOneBodyValue(pos, rc);
 	}
 
 	@Override
 	public double getEnergy(int pos1, int rc1, int pos2, int rc2) {
-    	return getPairwise(pos1, rc1, pos2, rc2);
+    	return getPairwiseValue(pos1, rc1, pos2, rc2);
 	}
     
     public double getHigherOrderEnergy(RCTuple tup, int i1, int i2) {
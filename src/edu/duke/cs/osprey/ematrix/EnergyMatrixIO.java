@@ -0,0 +1,593 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.tools.ObjectIO;
+
+import java.io.*;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.channels.FileChannel;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.StandardCopyOption;
+import java.nio.file.StandardOpenOption;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.*;
+import java.util.function.Supplier;
+
+
+/**
+ * Reads and writes energy matrices in a flat, little-endian binary format.
+ *
+ * Unlike Java serialization, the singles and pairs are stored as one contiguous block of doubles,
+ * so files can be memory-mapped on read (see {@link MappedEnergyMatrix}) without deserializing
+ * anything onto the heap.
+ *
+ * Layout of version 2:
+ *   magic "EMAT" (4 bytes), version (int),
+ *   conf space fingerprint (long), constant term (double),
+ *   number of positions (int), number of RCs at each position (int each),
+ *   zero padding to an 8-byte boundary,
+ *   {@link FragmentKeys}: pairs context (long), then an RC key and a single key (long each) for each RC,
+ *   singles (double each, in matrix index order), then pairs (double each, in matrix index order)
+ *
+ * Version 1 is the same, but without the fragment keys.
+ */
+public class EnergyMatrixIO {
+
+	public static final String Magic = "EMAT";
+	public static final int Version = 2;
+
+	/** fingerprint for files written without a conf space, which are checked with {@link EnergyMatrix#matches} instead */
+	public static final long NoFingerprint = 0L;
+
+	public static class FingerprintMismatchException extends IOException {
+
+		private static final long serialVersionUID = 2604919732125640151L;
+
+		public FingerprintMismatchException(File file) {
+			super("energy matrix in " + file.getAbsolutePath() + " was computed for a different conformation space");
+		}
+	}
+
+	/**
+	 * Computes a stable fingerprint for a conformation space, based on the design positions,
+	 * residue conformations (templates, rotamers, and DOF bounds), and the shell.
+	 * Equal conf spaces have equal fingerprints, across processes and Osprey runs.
+	 */
+	public static long fingerprint(SimpleConfSpace confSpace) {
+		return digest((out) -> {
+
+			out.writeInt(confSpace.positions.size());
+			for (SimpleConfSpace.Position pos : confSpace.positions) {
+				out.writeUTF(pos.resNum);
+				out.writeInt(pos.resConfs.size());
+				for (SimpleConfSpace.ResidueConf rc : pos.resConfs) {
+					writeResConf(out, rc);
+				}
+			}
+
+			out.writeDouble(confSpace.shellDist);
+			for (String resNum : new TreeSet<>(confSpace.shellResNumbers)) {
+				out.writeUTF(resNum);
+			}
+		});
+	}
+
+	/**
+	 * Like {@link #fingerprint(SimpleConfSpace)}, but also identifies how the energies were stored.
+	 *
+	 * @param storage describes any lossy storage, eg skipped pairs or reduced precision,
+	 *                or null for full storage, which has the same fingerprint as the conf space alone
+	 */
+	public static long fingerprint(SimpleConfSpace confSpace, String storage) {
+		long fingerprint = fingerprint(confSpace);
+		if (storage == null) {
+			return fingerprint;
+		}
+		return digest((out) -> {
+			out.writeLong(fingerprint);
+			out.writeUTF(storage);
+		});
+	}
+
+	static void writeResConf(DataOutputStream out, SimpleConfSpace.ResidueConf rc)
+	throws IOException {
+		out.writeUTF(rc.template.name);
+		out.writeUTF(rc.getRotamerCode());
+		for (Map.Entry<String,double[]> entry : new TreeMap<>(rc.dofBounds).entrySet()) {
+			out.writeUTF(entry.getKey());
+			for (double bound : entry.getValue()) {
+				out.writeDouble(bound);
+			}
+		}
+	}
+
+	interface DigestWriter {
+		void write(DataOutputStream out) throws IOException;
+	}
+
+	/** hashes everything written by the writer into a long, using SHA-256 */
+	static long digest(DigestWriter writer) {
+		return ByteBuffer.wrap(digestBytes(writer)).getLong();
+	}
+
+	/** hashes everything written by the writer, using SHA-256 */
+	static byte[] digestBytes(DigestWriter writer) {
+
+		MessageDigest digest;
+		try {
+			digest = MessageDigest.getInstance("SHA-256");
+		} catch (NoSuchAlgorithmException ex) {
+			throw new Error("JVM doesn't support SHA-256", ex);
+		}
+
+		try (DataOutputStream out = new DataOutputStream(new DigestOutputStream(digest))) {
+			writer.write(out);
+		} catch (IOException ex) {
+			throw new Error("can't compute digest", ex);
+		}
+
+		return digest.digest();
+	}
+
+	private static class DigestOutputStream extends OutputStream {
+
+		final MessageDigest digest;
+
+		DigestOutputStream(MessageDigest digest) {
+			this.digest = digest;
+		}
+
+		@Override
+		public void write(int b) {
+			digest.update((byte)b);
+		}
+
+		@Override
+		public void write(byte[] b, int off, int len) {
+			digest.update(b, off, len);
+		}
+	}
+
+	/** returns true if the file looks like an energy matrix in this format */
+	public static boolean isBinaryFile(File file) {
+		try (FileInputStream in = new FileInputStream(file)) {
+			byte[] magic = new byte[Magic.length()];
+			return in.read(magic) == magic.length
+				&& new String(magic, StandardCharsets.US_ASCII).equals(Magic);
+		} catch (IOException ex) {
+			return false;
+		}
+	}
+
+	/** returns false if the energy matrix has values that the binary format can't store, like higher-order tuples */
+	public static boolean canWrite(EnergyMatrix emat) {
+		return !emat.hasHigherOrderTerms() && !emat.hasHigherOrderTuples();
+	}
+
+	public static void write(EnergyMatrix emat, SimpleConfSpace confSpace, File file)
+	throws IOException {
+		write(emat, fingerprint(confSpace), null, file);
+	}
+
+	public static void write(EnergyMatrix emat, long fingerprint, File file)
+	throws IOException {
+		write(emat, fingerprint, null, file);
+	}
+
+	/**
+	 * Writes an energy matrix to a file.
+	 *
+	 * The matrix is written to a temporary file first, which then replaces the destination file,
+	 * so readers (including memory maps of the old file) never see a partially-written matrix.
+	 *
+	 * @param keys if not null, saved so later conf spaces can reuse the energies, see {@link #readKeys}
+	 */
+	public static void write(EnergyMatrix emat, long fingerprint, FragmentKeys keys, File file)
+	throws IOException {
+
+		if (!canWrite(emat)) {
+			throw new IllegalArgumentException("energy matrix has higher-order terms, which aren't supported by the binary format");
+		}
+
+		int numPos = emat.getNumPos();
+
+		if (keys != null) {
+			if (keys.getNumPos() != numPos) {
+				throw new IllegalArgumentException("fragment keys don't match energy matrix");
+			}
+			for (int pos=0; pos<numPos; pos++) {
+				if (keys.getNumConfAtPos(pos) != emat.getNumConfAtPos(pos)) {
+					throw new IllegalArgumentException("fragment keys don't match energy matrix");
+				}
+			}
+		}
+
+		File tempFile = new File(file.getAbsoluteFile().getParentFile(), file.getName() + ".tmp");
+		try (FileChannel channel = FileChannel.open(tempFile.toPath(), StandardOpenOption.CREATE, StandardOpenOption.TRUNCATE_EXISTING, StandardOpenOption.WRITE)) {
+
+			ByteBuffer buf = ByteBuffer.allocateDirect(1024*1024).order(ByteOrder.LITTLE_ENDIAN);
+
+			// write the header
+			buf.put(Magic.getBytes(StandardCharsets.US_ASCII));
+			buf.putInt(Version);
+			buf.putLong(fingerprint);
+			buf.putDouble(emat.getConstTerm());
+			buf.putInt(numPos);
+			for (int pos=0; pos<numPos; pos++) {
+				buf.putInt(emat.getNumConfAtPos(pos));
+			}
+			while (buf.position() % Double.BYTES != 0) {
+				buf.put((byte)0);
+			}
+
+			// write the fragment keys, if any
+			buf = putLong(channel, buf, keys != null ? keys.pairsContext : FragmentKeys.NoKeys);
+			for (int pos1=0; pos1<numPos; pos1++) {
+				for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+					buf = putLong(channel, buf, keys != null ? keys.rcKeys[pos1][rc1] : FragmentKeys.NoKeys);
+					buf = putLong(channel, buf, keys != null ? keys.singleKeys[pos1][rc1] : FragmentKeys.NoKeys);
+				}
+			}
+
+			// write the singles, in index order
+			for (int pos1=0; pos1<numPos; pos1++) {
+				for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+					buf = putDouble(channel, buf, emat.getOneBody(pos1, rc1));
+				}
+			}
+
+			// write the pairs, in index order
+			for (int pos1=0; pos1<numPos; pos1++) {
+				for (int pos2=0; pos2<pos1; pos2++) {
+					for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+						for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+							buf = putDouble(channel, buf, emat.getPairwise(pos1, rc1, pos2, rc2));
+						}
+					}
+				}
+			}
+
+			flush(channel, buf);
+		}
+
+		Files.move(tempFile.toPath(), file.toPath(), StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE);
+	}
+
+	private static ByteBuffer putDouble(FileChannel channel, ByteBuffer buf, double val)
+	throws IOException {
+		if (buf.remaining() < Double.BYTES) {
+			flush(channel, buf);
+		}
+		buf.putDouble(val);
+		return buf;
+	}
+
+	private static ByteBuffer putLong(FileChannel channel, ByteBuffer buf, long val)
+	throws IOException {
+		if (buf.remaining() < Long.BYTES) {
+			flush(channel, buf);
+		}
+		buf.putLong(val);
+		return buf;
+	}
+
+	private static void flush(FileChannel channel, ByteBuffer buf)
+	throws IOException {
+		buf.flip();
+		while (buf.hasRemaining()) {
+			channel.write(buf);
+		}
+		buf.clear();
+	}
+
+	private static class Header {
+
+		final long fingerprint;
+		final double constTerm;
+		final int[] numConfAtPos;
+		final long keysOffset;
+		final long dataOffset;
+
+		Header(FileChannel channel)
+		throws IOException {
+
+			// read the fixed-size part of the header
+			ByteBuffer header = ByteBuffer.allocate(4 + 4 + 8 + 8 + 4).order(ByteOrder.LITTLE_ENDIAN);
+			readFully(channel, header, 0);
+
+			byte[] magic = new byte[Magic.length()];
+			header.get(magic);
+			if (!new String(magic, StandardCharsets.US_ASCII).equals(Magic)) {
+				throw new IOException("not an energy matrix file");
+			}
+			int version = header.getInt();
+			if (version != 1 && version != Version) {
+				throw new IOException("unrecognized energy matrix version: " + version);
+			}
+			fingerprint = header.getLong();
+			constTerm = header.getDouble();
+			int numPos = header.getInt();
+
+			// read the RC counts
+			ByteBuffer counts = ByteBuffer.allocate(numPos*Integer.BYTES).order(ByteOrder.LITTLE_ENDIAN);
+			readFully(channel, counts, header.capacity());
+			numConfAtPos = new int[numPos];
+			long numRCs = 0;
+			for (int pos=0; pos<numPos; pos++) {
+				numConfAtPos[pos] = counts.getInt();
+				numRCs += numConfAtPos[pos];
+			}
+
+			long offset = header.capacity() + counts.capacity();
+			offset = (offset + Double.BYTES - 1)/Double.BYTES*Double.BYTES;
+
+			if (version == 1) {
+				keysOffset = -1;
+				dataOffset = offset;
+			} else {
+				keysOffset = offset;
+				dataOffset = offset + (1 + 2*numRCs)*Long.BYTES;
+			}
+
+			// check the file size before mapping anything
+			long numValues = 0;
+			for (int pos1=0; pos1<numPos; pos1++) {
+				numValues += numConfAtPos[pos1];
+				for (int pos2=0; pos2<pos1; pos2++) {
+					numValues += (long)numConfAtPos[pos1]*numConfAtPos[pos2];
+				}
+			}
+			long expectedSize = dataOffset + numValues*Double.BYTES;
+			if (channel.size() != expectedSize) {
+				throw new IOException(String.format("energy matrix file is truncated or corrupt: expected %d bytes, found %d", expectedSize, channel.size()));
+			}
+		}
+	}
+
+	/**
+	 * Reads an energy matrix without checking the conformation space fingerprint.
+	 */
+	public static EnergyMatrix read(File file)
+	throws IOException {
+		return read(file, null);
+	}
+
+	/**
+	 * Memory-maps an energy matrix from a file.
+	 *
+	 * @param confSpace if not null, the file's fingerprint must match this conformation space,
+	 *                  or a {@link FingerprintMismatchException} is thrown
+	 */
+	public static EnergyMatrix read(File file, SimpleConfSpace confSpace)
+	throws IOException {
+		return read(file, confSpace, null);
+	}
+
+	/**
+	 * Like {@link #read(File, SimpleConfSpace)}, but the file's energies must have been stored
+	 * the same way too, see {@link #fingerprint(SimpleConfSpace, String)}.
+	 */
+	public static EnergyMatrix read(File file, SimpleConfSpace confSpace, String storage)
+	throws IOException {
+
+		try (FileChannel channel = FileChannel.open(file.toPath(), StandardOpenOption.READ)) {
+
+			Header header = new Header(channel);
+			if (confSpace != null && header.fingerprint != NoFingerprint && header.fingerprint != fingerprint(confSpace, storage)) {
+				throw new FingerprintMismatchException(file);
+			}
+
+			// map the values
+			MappedEnergyMatrix emat = new MappedEnergyMatrix(header.numConfAtPos.length, header.numConfAtPos, channel, header.dataOffset);
+			emat.setConstTerm(header.constTerm);
+
+			// no fingerprint? fall back to the weaker check
+			if (confSpace != null && header.fingerprint == NoFingerprint && !emat.matches(confSpace)) {
+				throw new FingerprintMismatchException(file);
+			}
+
+			return emat;
+		}
+	}
+
+	/**
+	 * Reads the fragment keys from an energy matrix file.
+	 *
+	 * @return the keys, or null if the file doesn't have any
+	 */
+	public static FragmentKeys readKeys(File file)
+	throws IOException {
+
+		try (FileChannel channel = FileChannel.open(file.toPath(), StandardOpenOption.READ)) {
+
+			Header header = new Header(channel);
+			if (header.keysOffset < 0) {
+				return null;
+			}
+
+			ByteBuffer buf = ByteBuffer.allocate((int)(header.dataOffset - header.keysOffset)).order(ByteOrder.LITTLE_ENDIAN);
+			readFully(channel, buf, header.keysOffset);
+
+			long pairsContext = buf.getLong();
+			if (pairsContext == FragmentKeys.NoKeys) {
+				return null;
+			}
+
+			int numPos = header.numConfAtPos.length;
+			long[][] rcKeys = new long[numPos][];
+			long[][] singleKeys = new long[numPos][];
+			for (int pos=0; pos<numPos; pos++) {
+				rcKeys[pos] = new long[header.numConfAtPos[pos]];
+				singleKeys[pos] = new long[header.numConfAtPos[pos]];
+				for (int rc=0; rc<header.numConfAtPos[pos]; rc++) {
+					rcKeys[pos][rc] = buf.getLong();
+					singleKeys[pos][rc] = buf.getLong();
+				}
+			}
+
+			return new FragmentKeys(pairsContext, rcKeys, singleKeys);
+		}
+	}
+
+	private static void readFully(FileChannel channel, ByteBuffer buf, long position)
+	throws IOException {
+		while (buf.hasRemaining()) {
+			int numBytes = channel.read(buf, position + buf.position());
+			if (numBytes < 0) {
+				throw new EOFException();
+			}
+		}
+		buf.flip();
+	}
+
+	/** makes a new energy matrix, optionally reusing energies from an older one */
+	public interface IncrementalFactory {
+
+		/**
+		 * @param oldEmat an energy matrix computed for a different conformation space, or null
+		 * @param oldKeys the fragment keys for oldEmat, or null
+		 */
+		EnergyMatrix make(EnergyMatrix oldEmat, FragmentKeys oldKeys);
+	}
+
+	/**
+	 * Reads an energy matrix cache file in either the binary format or the older
+	 * Java serialization format. If the cache is missing, invalid, or was computed
+	 * for a different conformation space, the energy matrix is computed and saved
+	 * in the binary format.
+	 */
+	public static EnergyMatrix readOrMake(File file, SimpleConfSpace confSpace, Supplier<EnergyMatrix> factory) {
+		return readOrMake(file, confSpace, null, (oldEmat, oldKeys) -> factory.get());
+	}
+
+	/**
+	 * Like {@link #readOrMake(File, SimpleConfSpace, Supplier)}, but if the cache was computed
+	 * for a different conformation space and has fragment keys, the old energy matrix and its keys
+	 * are passed to the factory, so unchanged energies can be reused.
+	 *
+	 * @param keys the fragment keys for confSpace, saved with the new energy matrix
+	 */
+	public static EnergyMatrix readOrMake(File file, SimpleConfSpace confSpace, FragmentKeys keys, IncrementalFactory factory) {
+		return readOrMake(file, confSpace, null, keys, factory);
+	}
+
+	/**
+	 * Like {@link #readOrMake(File, SimpleConfSpace, FragmentKeys, IncrementalFactory)}, but the cache
+	 * is only used as-is if its energies were stored the same way, see {@link #fingerprint(SimpleConfSpace, String)}.
+	 * Otherwise, only the energies allowed by the fragment keys are reused.
+	 */
+	public static EnergyMatrix readOrMake(File file, SimpleConfSpace confSpace, String storage, FragmentKeys keys, IncrementalFactory factory) {
+
+		final String name = "energy matrix";
+
+		EnergyMatrix oldEmat = null;
+		FragmentKeys oldKeys = null;
+
+		if (file.exists()) {
+			if (isBinaryFile(file)) {
+
+				try {
+					EnergyMatrix emat = read(file, confSpace, storage);
+					System.out.println("read " + name + " from file: " + file.getAbsolutePath());
+					return emat;
+				} catch (FingerprintMismatchException ex) {
+
+					// see if we can reuse some of the old energies
+					if (keys != null) {
+						try {
+							oldKeys = readKeys(file);
+							if (oldKeys != null) {
+								oldEmat = read(file);
+							}
+						} catch (IOException ex2) {
+							oldKeys = null;
+							oldEmat = null;
+						}
+					}
+
+					if (oldEmat != null) {
+						System.out.println("WARNING: " + name + " from file is for a different conformation space or storage, will reuse what energies we can");
+					} else {
+						System.out.println("WARNING: " + name + " from file is invalid, will create new one");
+					}
+				} catch (IOException ex) {
+					ex.printStackTrace(System.out);
+					System.out.println("WARNING: can't read " + name + ", will create new one");
+				}
+
+			} else {
+
+				// try the old Java serialization format
+				try {
+					EnergyMatrix emat = ObjectIO.read(file, EnergyMatrix.class);
+					if (emat != null && emat.matches(confSpace)) {
+						System.out.println("read " + name + " from file: " + file.getAbsolutePath());
+
+						// upgrade the cache file to the binary format, so next time is faster
+						// (labeled with the requested storage, so the next read with the same settings matches)
+						if (canWrite(emat)) {
+							tryWrite(emat, confSpace, storage, keys, file, name);
+						}
+						return emat;
+					}
+					System.out.println("WARNING: " + name + " from file is invalid, will create new one");
+				} catch (ObjectIO.BadFileException ex) {
+					ex.printStackTrace(System.out);
+					System.out.println("WARNING: can't read " + name + ", will create new one");
+				}
+			}
+		}
+
+		// make the energy matrix
+		EnergyMatrix emat = factory.make(oldEmat, oldKeys);
+
+		tryWrite(emat, confSpace, storage, keys, file, name);
+
+		return emat;
+	}
+
+	private static void tryWrite(EnergyMatrix emat, SimpleConfSpace confSpace, String storage, FragmentKeys keys, File file, String name) {
+		try {
+			write(emat, fingerprint(confSpace, storage), keys, file);
+			System.out.println("wrote " + name + " to file: " + file.getAbsolutePath());
+		} catch (IOException ex) {
+			ex.printStackTrace(System.out);
+			System.out.println("WARNING: can't write " + name + ", will have to be created again next time");
+		}
+	}
+}
@@ -0,0 +1,165 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+
+import java.util.ArrayList;
+
+
+/**
+ * An energy matrix that stores pair energies in single precision, using half the memory of {@link EnergyMatrix}.
+ *
+ * Pair energies are rounded down to the nearest float, so sums of pair energies (e.g., A* scores)
+ * are still lower bounds on the sums of the full-precision energies.
+ * Single energies are few enough that they're kept in double precision.
+ */
+public class FloatEnergyMatrix extends EnergyMatrix {
+
+	private static final long serialVersionUID = 3930618209731948524L;
+
+	private double[] oneBody;
+	private float[] pairwise;
+
+	public FloatEnergyMatrix(SimpleConfSpace confSpace) {
+		super(confSpace);
+	}
+
+	public FloatEnergyMatrix(int numPos, int[] numConfAtPos) {
+		super(numPos, numConfAtPos, Double.POSITIVE_INFINITY);
+	}
+
+	@Override
+	protected void allocate(int numOneBody, int numPairwise) {
+		oneBody = new double[numOneBody];
+		pairwise = new float[numPairwise];
+	}
+
+	/** rounds towards negative infinity, so lower bounds stay lower bounds */
+	public static float roundDown(double val) {
+		float f = (float)val;
+		if (f > val) {
+			f = Math.nextDown(f);
+		}
+		return f;
+	}
+
+	@Override
+	protected boolean hasDirectValues() {
+		return false;
+	}
+
+	@Override
+	public Double getOneBody(int res, int conf) {
+		return oneBody[getOneBodyIndex(res, conf)];
+	}
+
+	@Override
+	public double getOneBodyValue(int res, int conf) {
+		return oneBody[getOneBodyIndex(res, conf)];
+	}
+
+	@Override
+	public void setOneBody(int res, int conf, Double val) {
+		oneBody[getOneBodyIndex(res, conf)] = val;
+	}
+
+	@Override
+	public void setOneBody(int res, ArrayList<Double> val) {
+		int n = getNumConfAtPos(res);
+		for (int i=0; i<n; i++) {
+			oneBody[getOneBodyIndex(res, i)] = val.get(i);
+		}
+	}
+
+	@Override
+	public Double getPairwise(int res1, int conf1, int res2, int conf2) {
+		return (double)pairwise[getPairwiseIndex(res1, conf1, res2, conf2)];
+	}
+
+	@Override
+	public double getPairwiseValue(int res1, int conf1, int res2, int conf2) {
+		return pairwise[getPairwiseIndex(res1, conf1, res2, conf2)];
+	}
+
+	@Override
+	public void setPairwise(int res1, int conf1, int res2, int conf2, Double val) {
+		pairwise[getPairwiseIndex(res1, conf1, res2, conf2)] = roundDown(val);
+	}
+
+	@Override
+	public void setPairwise(int res1, int res2, ArrayList<ArrayList<Double>> val) {
+		int n1 = getNumConfAtPos(res1);
+		int n2 = getNumConfAtPos(res2);
+		for (int i1=0; i1<n1; i1++) {
+			for (int i2=0; i2<n2; i2++) {
+				pairwise[getPairwiseIndex(res1, i1, res2, i2)] = roundDown(val.get(i1).get(i2));
+			}
+		}
+	}
+
+	@Override
+	public double[] getPairwiseRow(int res1, int conf1, int res2, double[] out) {
+		int n2 = getNumConfAtPos(res2);
+		int i = getPairwiseIndex(res1, conf1, res2, 0);
+		int stride = res1 > res2 ? 1 : getNumConfAtPos(res1);
+		for (int conf2=0; conf2<n2; conf2++) {
+			out[conf2] = pairwise[i];
+			i += stride;
+		}
+		return out;
+	}
+
+	@Override
+	public void negate() {
+		// NOTE: negating flips the rounding direction, so negated pair energies are upper bounds
+		for (int i=0; i<oneBody.length; i++) {
+			oneBody[i] = -oneBody[i];
+		}
+		for (int i=0; i<pairwise.length; i++) {
+			pairwise[i] = -pairwise[i];
+		}
+	}
+
+	@Override
+	public double sum() {
+		double sum = 0.0;
+		for (int i=0; i<oneBody.length; i++) {
+			sum += oneBody[i];
+		}
+		for (int i=0; i<pairwise.length; i++) {
+			sum += pairwise[i];
+		}
+		return sum;
+	}
+}
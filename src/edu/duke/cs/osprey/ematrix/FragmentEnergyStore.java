@@ -0,0 +1,390 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import edu.duke.cs.osprey.confspace.RCTuple;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.ResidueInteractions;
+import edu.duke.cs.osprey.structure.Residue;
+import edu.duke.cs.osprey.tools.HashCalculator;
+
+import java.io.File;
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.channels.FileChannel;
+import java.nio.channels.FileLock;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.StandardOpenOption;
+import java.util.*;
+
+
+/**
+ * A persistent store of fragment energies, shared between designs, Osprey runs, and processes.
+ *
+ * Energies are addressed by a hash of everything that determines them: the residue conformations
+ * in the fragment, the residue interactions (including weights and offsets, so reference energies
+ * and the energy partition are accounted for), the templates and coordinates of every interacting
+ * residue, the forcefield parameters, and the minimization settings. So any energy matrix or
+ * reference energy calculation that needs a fragment energy that was computed before
+ * (by any design, on any node sharing the file) can just look it up.
+ *
+ * The store is an append-only file of fixed-size records. Appends are guarded by an exclusive
+ * file lock and reads by a shared lock, so many processes can read and append to the same store
+ * at the same time. Energies appended by other processes are picked up by {@link #refresh}.
+ *
+ * Layout:
+ *   magic "FRAG" (4 bytes), version (int),
+ *   then records of: key (two longs), energy (double)
+ */
+public class FragmentEnergyStore {
+
+	public static final String Magic = "FRAG";
+	public static final int Version = 1;
+
+	private static final int HeaderSize = 4 + Integer.BYTES;
+	private static final int RecordSize = 2*Long.BYTES + Double.BYTES;
+
+	// file locks are per-JVM, so threads in the same process need to take turns too
+	private static final Map<String,Object> fileMonitors = new HashMap<>();
+
+	private static Object getMonitor(File file) {
+		String path = file.getAbsolutePath();
+		synchronized (fileMonitors) {
+			return fileMonitors.computeIfAbsent(path, (key) -> new Object());
+		}
+	}
+
+	public static class Key {
+
+		public final long hi;
+		public final long lo;
+
+		public Key(long hi, long lo) {
+			this.hi = hi;
+			this.lo = lo;
+		}
+
+		@Override
+		public int hashCode() {
+			return HashCalculator.combineHashes(hi, lo);
+		}
+
+		@Override
+		public boolean equals(Object other) {
+			return other instanceof Key && equals((Key)other);
+		}
+
+		public boolean equals(Key other) {
+			return this.hi == other.hi && this.lo == other.lo;
+		}
+	}
+
+	/**
+	 * Computes store keys for the fragments of one conformation space.
+	 */
+	public static class Hasher {
+
+		public final ConfEnergyCalculator confEcalc;
+
+		private final long context;
+		private final Map<String,Long> residueHashes = new HashMap<>();
+
+		public Hasher(ConfEnergyCalculator confEcalc) {
+			this.confEcalc = confEcalc;
+			this.context = EnergyMatrixIO.digest((out) -> FragmentKeys.writeEnergyContext(out, confEcalc));
+		}
+
+		public synchronized Key make(RCTuple frag, ResidueInteractions inters) {
+
+			// use a stable order for everything, so keys don't depend on position or interaction order
+			List<Integer> fragIndices = new ArrayList<>();
+			for (int i=0; i<frag.size(); i++) {
+				fragIndices.add(i);
+			}
+			fragIndices.sort(Comparator.comparing((i) -> confEcalc.confSpace.positions.get(frag.pos.get(i)).resNum));
+
+			List<ResidueInteractions.Pair> pairs = new ArrayList<>();
+			for (ResidueInteractions.Pair pair : inters) {
+				pairs.add(pair);
+			}
+			pairs.sort(Comparator
+				.comparing((ResidueInteractions.Pair pair) -> pair.resNum1)
+				.thenComparing((pair) -> pair.resNum2)
+			);
+
+			List<String> resNums = new ArrayList<>(inters.getResidueNumbers());
+			Collections.sort(resNums);
+
+			byte[] digest = EnergyMatrixIO.digestBytes((out) -> {
+
+				out.writeLong(context);
+
+				out.writeInt(fragIndices.size());
+				for (int i : fragIndices) {
+					SimpleConfSpace.Position pos = confEcalc.confSpace.positions.get(frag.pos.get(i));
+					out.writeUTF(pos.resNum);
+					EnergyMatrixIO.writeResConf(out, pos.resConfs.get(frag.RCs.get(i)));
+				}
+
+				out.writeInt(pairs.size());
+				for (ResidueInteractions.Pair pair : pairs) {
+					out.writeUTF(pair.resNum1);
+					out.writeUTF(pair.resNum2);
+					out.writeDouble(pair.weight);
+					out.writeDouble(pair.offset);
+				}
+
+				out.writeInt(resNums.size());
+				for (String resNum : resNums) {
+					out.writeLong(getResidueHash(resNum));
+				}
+			});
+
+			ByteBuffer buf = ByteBuffer.wrap(digest);
+			return new Key(buf.getLong(), buf.getLong());
+		}
+
+		private long getResidueHash(String resNum) {
+			return residueHashes.computeIfAbsent(resNum, (key) -> {
+
+				Residue res = null;
+				for (Strand strand : confEcalc.confSpace.strands) {
+					res = strand.mol.getResByPDBResNumberOrNull(resNum);
+					if (res != null) {
+						break;
+					}
+				}
+				if (res == null) {
+					throw new NoSuchElementException("no residue " + resNum + " in conformation space");
+				}
+
+				final Residue fres = res;
+				return EnergyMatrixIO.digest((out) -> {
+					out.writeUTF(fres.getPDBResNumber());
+					out.writeUTF(fres.template != null ? fres.template.name : fres.fullName);
+					for (double coord : fres.coords) {
+						out.writeDouble(coord);
+					}
+				});
+			});
+		}
+	}
+
+	public final File file;
+
+	private final Object monitor;
+	private final Map<Key,Double> energies = new HashMap<>();
+	private final Map<Key,Double> pending = new LinkedHashMap<>();
+	private long readOffset = HeaderSize;
+
+	public FragmentEnergyStore(File file) {
+
+		this.file = file;
+		this.monitor = getMonitor(file);
+
+		try {
+			synchronized (monitor) {
+				try (FileChannel channel = FileChannel.open(file.toPath(), StandardOpenOption.CREATE, StandardOpenOption.READ, StandardOpenOption.WRITE)) {
+					try (FileLock lock = channel.lock()) {
+
+						if (channel.size() < HeaderSize) {
+
+							// new store, write the header
+							ByteBuffer buf = ByteBuffer.allocate(HeaderSize).order(ByteOrder.LITTLE_ENDIAN);
+							buf.put(Magic.getBytes(StandardCharsets.US_ASCII));
+							buf.putInt(Version);
+							buf.flip();
+							channel.truncate(0);
+							while (buf.hasRemaining()) {
+								channel.write(buf, buf.position());
+							}
+
+						} else {
+
+							// existing store, check the header
+							ByteBuffer buf = ByteBuffer.allocate(HeaderSize).order(ByteOrder.LITTLE_ENDIAN);
+							while (buf.hasRemaining()) {
+								if (channel.read(buf, buf.position()) < 0) {
+									break;
+								}
+							}
+							buf.flip();
+							byte[] magic = new byte[Magic.length()];
+							buf.get(magic);
+							if (!new String(magic, StandardCharsets.US_ASCII).equals(Magic)) {
+								throw new IOException("not a fragment energy store: " + file.getAbsolutePath());
+							}
+							int version = buf.getInt();
+							if (version != Version) {
+								throw new IOException("unrecognized fragment energy store version: " + version);
+							}
+						}
+					}
+				}
+			}
+		} catch (IOException ex) {
+			throw new RuntimeException("can't open fragment energy store: " + file.getAbsolutePath(), ex);
+		}
+
+		refresh();
+	}
+
+	public Hasher hasher(ConfEnergyCalculator confEcalc) {
+		return new Hasher(confEcalc);
+	}
+
+	/** reads any energies appended to the store since the last read, eg by other processes */
+	public void refresh() {
+		try {
+			synchronized (monitor) {
+				try (FileChannel channel = FileChannel.open(file.toPath(), StandardOpenOption.READ)) {
+					try (FileLock lock = channel.lock(0, Long.MAX_VALUE, true)) {
+						readRecords(channel);
+					}
+				}
+			}
+		} catch (IOException ex) {
+			throw new RuntimeException("can't read fragment energy store: " + file.getAbsolutePath(), ex);
+		}
+	}
+
+	private void readRecords(FileChannel channel)
+	throws IOException {
+
+		// only read whole records, in case a crashed writer left part of one
+		long numRecords = (channel.size() - readOffset)/RecordSize;
+		if (numRecords <= 0) {
+			return;
+		}
+
+		ByteBuffer buf = ByteBuffer.allocate(RecordSize*4096).order(ByteOrder.LITTLE_ENDIAN);
+		long end = readOffset + numRecords*RecordSize;
+		long pos = readOffset;
+		while (pos < end) {
+
+			buf.clear();
+			buf.limit((int)Math.min(buf.capacity(), end - pos));
+			while (buf.hasRemaining()) {
+				if (channel.read(buf, pos + buf.position()) < 0) {
+					throw new IOException("fragment energy store was truncated");
+				}
+			}
+			buf.flip();
+			pos += buf.limit();
+
+			synchronized (this) {
+				while (buf.hasRemaining()) {
+					Key key = new Key(buf.getLong(), buf.getLong());
+					energies.put(key, buf.getDouble());
+				}
+			}
+		}
+
+		readOffset = end;
+	}
+
+	/** returns the energy for the key, or null if the store doesn't have it yet */
+	public synchronized Double get(Key key) {
+		return energies.get(key);
+	}
+
+	/** adds an energy to the store, which is saved to the file on the next {@link #flush} */
+	public synchronized void put(Key key, double energy) {
+		if (energies.put(key, energy) == null) {
+			pending.put(key, energy);
+		}
+	}
+
+	public synchronized int size() {
+		return energies.size();
+	}
+
+	/** appends all new energies to the store file */
+	public void flush() {
+
+		// grab the pending energies
+		List<Map.Entry<Key,Double>> records;
+		synchronized (this) {
+			if (pending.isEmpty()) {
+				return;
+			}
+			records = new ArrayList<>(pending.entrySet());
+			pending.clear();
+		}
+
+		try {
+			synchronized (monitor) {
+				try (FileChannel channel = FileChannel.open(file.toPath(), StandardOpenOption.READ, StandardOpenOption.WRITE)) {
+					try (FileLock lock = channel.lock()) {
+
+						// pick up anything other processes wrote first
+						readRecords(channel);
+
+						// drop any partial record left by a crashed writer
+						channel.truncate(readOffset);
+
+						ByteBuffer buf = ByteBuffer.allocate(RecordSize*4096).order(ByteOrder.LITTLE_ENDIAN);
+						long pos = readOffset;
+						for (Map.Entry<Key,Double> record : records) {
+							if (buf.remaining() < RecordSize) {
+								pos = write(channel, buf, pos);
+							}
+							buf.putLong(record.getKey().hi);
+							buf.putLong(record.getKey().lo);
+							buf.putDouble(record.getValue());
+						}
+						pos = write(channel, buf, pos);
+						channel.force(false);
+
+						readOffset = pos;
+					}
+				}
+			}
+		} catch (IOException ex) {
+			throw new RuntimeException("can't write fragment energy store: " + file.getAbsolutePath(), ex);
+		}
+	}
+
+	private static long write(FileChannel channel, ByteBuffer buf, long pos)
+	throws IOException {
+		buf.flip();
+		while (buf.hasRemaining()) {
+			pos += channel.write(buf, pos);
+		}
+		buf.clear();
+		return pos;
+	}
+}
@@ -0,0 +1,267 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.confspace.StrandFlex;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.EnergyPartition;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.minimization.ObjectiveFunction.DofBounds;
+
+import java.io.DataOutputStream;
+import java.io.IOException;
+import java.util.HashMap;
+import java.util.Map;
+import java.util.TreeSet;
+
+
+/**
+ * Stable identities for the single and pair energies of an energy matrix.
+ *
+ * Each residue conformation is identified by its residue number, template, rotamer, and
+ * DOF bounds (ie, its voxel), rather than by its index in the conformation space.
+ * Singles are additionally keyed by everything else that contributes to their energies
+ * (forcefield, shell, reference energy, etc), and pairs share one context key.
+ *
+ * So when a conformation space changes slightly, eg by adding a mutation, the energies
+ * of unchanged fragments can be found in the old energy matrix and reused,
+ * and only the energies of new fragments need to be computed.
+ */
+public class FragmentKeys {
+
+	/** pairs context for energy matrices without keys */
+	public static final long NoKeys = 0L;
+
+	public final long pairsContext;
+	public final long[][] rcKeys;
+	public final long[][] singleKeys;
+
+	public FragmentKeys(long pairsContext, long[][] rcKeys, long[][] singleKeys) {
+		this.pairsContext = pairsContext;
+		this.rcKeys = rcKeys;
+		this.singleKeys = singleKeys;
+	}
+
+	public static FragmentKeys of(ConfEnergyCalculator confEcalc) {
+		return of(confEcalc, null);
+	}
+
+	/**
+	 * @param storage describes any lossy storage of the pair energies (see {@link EnergyMatrixIO#fingerprint(SimpleConfSpace, String)}),
+	 *                so pairs are only reused from energy matrices that stored them the same way
+	 */
+	public static FragmentKeys of(ConfEnergyCalculator confEcalc, String storage) {
+
+		SimpleConfSpace confSpace = confEcalc.confSpace;
+
+		// everything that affects all the fragment energies
+		long commonContext = EnergyMatrixIO.digest((out) -> {
+			writeEnergyContext(out, confEcalc);
+			out.writeUTF(confEcalc.epart.name());
+
+			// traditional singles and pairs only depend on the residues in the fragment (and the shell),
+			// but other energy partitions can spread energies around the whole conf space,
+			// so for those, only reuse energies if the whole conf space is the same
+			if (confEcalc.epart != EnergyPartition.Traditional) {
+				out.writeLong(EnergyMatrixIO.fingerprint(confSpace));
+				writeReferenceEnergies(out, confEcalc);
+			}
+		});
+
+		long singlesContext = EnergyMatrixIO.digest((out) -> {
+			out.writeLong(commonContext);
+			out.writeDouble(confSpace.shellDist);
+			for (String resNum : new TreeSet<>(confSpace.shellResNumbers)) {
+				out.writeUTF(resNum);
+			}
+		});
+
+		long pairsContext = EnergyMatrixIO.digest((out) -> {
+			out.writeLong(commonContext);
+
+			// eg, pairs beyond a distance cutoff are stored as zero, and float pairs are rounded
+			if (storage != null) {
+				out.writeUTF(storage);
+			}
+		});
+
+		long[][] rcKeys = new long[confSpace.positions.size()][];
+		long[][] singleKeys = new long[confSpace.positions.size()][];
+		for (SimpleConfSpace.Position pos : confSpace.positions) {
+			rcKeys[pos.index] = new long[pos.resConfs.size()];
+			singleKeys[pos.index] = new long[pos.resConfs.size()];
+			for (SimpleConfSpace.ResidueConf rc : pos.resConfs) {
+
+				long rcKey = EnergyMatrixIO.digest((out) -> {
+					out.writeUTF(pos.resNum);
+					EnergyMatrixIO.writeResConf(out, rc);
+				});
+				rcKeys[pos.index][rc.index] = rcKey;
+
+				singleKeys[pos.index][rc.index] = EnergyMatrixIO.digest((out) -> {
+					out.writeLong(singlesContext);
+					out.writeLong(rcKey);
+					writeOffsets(out, confEcalc, pos.index, rc.index);
+				});
+			}
+		}
+
+		return new FragmentKeys(pairsContext, rcKeys, singleKeys);
+	}
+
+	/** writes everything about the energy calculator that affects all fragment energies */
+	static void writeEnergyContext(DataOutputStream out, ConfEnergyCalculator confEcalc)
+	throws IOException {
+		writeForcefield(out, confEcalc.ecalc.resPairCache.ffparams);
+		writeEnergyCalculator(out, confEcalc.ecalc);
+		for (Strand strand : confEcalc.confSpace.strands) {
+			for (StrandFlex flex : confEcalc.confSpace.strandFlex.get(strand)) {
+				out.writeUTF(flex.getClass().getName());
+				DofBounds bounds = flex.makeBounds(strand);
+				for (int d=0; d<bounds.size(); d++) {
+					out.writeDouble(bounds.getMin(d));
+					out.writeDouble(bounds.getMax(d));
+				}
+			}
+		}
+	}
+
+	private static void writeForcefield(DataOutputStream out, ForcefieldParams ffparams)
+	throws IOException {
+		out.writeUTF(ffparams.forcefld.name());
+		out.writeUTF(ffparams.solvationForcefield.name());
+		out.writeDouble(ffparams.vdwMultiplier);
+		out.writeDouble(ffparams.solvScale);
+		out.writeDouble(ffparams.dielectric);
+		out.writeBoolean(ffparams.distDepDielect);
+		out.writeBoolean(ffparams.hElect);
+		out.writeBoolean(ffparams.hVDW);
+		out.writeDouble(ffparams.shellDistCutoff);
+	}
+
+	private static void writeEnergyCalculator(DataOutputStream out, EnergyCalculator ecalc)
+	throws IOException {
+		out.writeBoolean(ecalc.isMinimizing);
+		out.writeDouble(ecalc.infiniteWellEnergy != null ? ecalc.infiniteWellEnergy : Double.NaN);
+		out.writeDouble(ecalc.alwaysResolveClashesEnergy != null ? ecalc.alwaysResolveClashesEnergy : Double.NaN);
+	}
+
+	private static void writeReferenceEnergies(DataOutputStream out, ConfEnergyCalculator confEcalc)
+	throws IOException {
+		for (SimpleConfSpace.Position pos : confEcalc.confSpace.positions) {
+			for (SimpleConfSpace.ResidueConf rc : pos.resConfs) {
+				writeOffsets(out, confEcalc, pos.index, rc.index);
+			}
+		}
+	}
+
+	private static void writeOffsets(DataOutputStream out, ConfEnergyCalculator confEcalc, int pos, int rc)
+	throws IOException {
+		out.writeDouble(confEcalc.eref != null ? confEcalc.eref.getOffset(confEcalc.confSpace, pos, rc) : 0.0);
+		out.writeDouble(confEcalc.addResEntropy ? EnergyPartition.getResEntropy(confEcalc.confSpace, pos, rc) : 0.0);
+	}
+
+	public int getNumPos() {
+		return rcKeys.length;
+	}
+
+	public int getNumConfAtPos(int pos) {
+		return rcKeys[pos].length;
+	}
+
+	/**
+	 * Matches the residue conformations of this conf space to the ones in an older conf space,
+	 * so fragment energies can be reused from the older energy matrix.
+	 */
+	public Matching match(FragmentKeys old) {
+		return new Matching(old);
+	}
+
+	public class Matching {
+
+		public final FragmentKeys old;
+
+		private final int[][] oldPos;
+		private final int[][] oldRCs;
+
+		private Matching(FragmentKeys old) {
+
+			this.old = old;
+
+			// index the old RCs by key
+			Map<Long,int[]> oldIndex = new HashMap<>();
+			for (int pos=0; pos<old.getNumPos(); pos++) {
+				for (int rc=0; rc<old.getNumConfAtPos(pos); rc++) {
+					oldIndex.put(old.rcKeys[pos][rc], new int[] { pos, rc });
+				}
+			}
+
+			// look up our RCs
+			oldPos = new int[getNumPos()][];
+			oldRCs = new int[getNumPos()][];
+			for (int pos=0; pos<getNumPos(); pos++) {
+				oldPos[pos] = new int[getNumConfAtPos(pos)];
+				oldRCs[pos] = new int[getNumConfAtPos(pos)];
+				for (int rc=0; rc<getNumConfAtPos(pos); rc++) {
+					int[] index = oldIndex.get(rcKeys[pos][rc]);
+					oldPos[pos][rc] = index != null ? index[0] : -1;
+					oldRCs[pos][rc] = index != null ? index[1] : -1;
+				}
+			}
+		}
+
+		public boolean hasSingle(int pos, int rc) {
+			return oldPos[pos][rc] >= 0
+				&& old.singleKeys[oldPos[pos][rc]][oldRCs[pos][rc]] == singleKeys[pos][rc];
+		}
+
+		public double getSingle(EnergyMatrix oldEmat, int pos, int rc) {
+			return oldEmat.getOneBody(oldPos[pos][rc], oldRCs[pos][rc]);
+		}
+
+		public boolean hasPair(int pos1, int rc1, int pos2, int rc2) {
+			return old.pairsContext != NoKeys
+				&& old.pairsContext == pairsContext
+				&& oldPos[pos1][rc1] >= 0
+				&& oldPos[pos2][rc2] >= 0
+				&& oldPos[pos1][rc1] != oldPos[pos2][rc2];
+		}
+
+		public double getPair(EnergyMatrix oldEmat, int pos1, int rc1, int pos2, int rc2) {
+			return oldEmat.getPairwise(oldPos[pos1][rc1], oldRCs[pos1][rc1], oldPos[pos2][rc2], oldRCs[pos2][rc2]);
+		}
+	}
+}
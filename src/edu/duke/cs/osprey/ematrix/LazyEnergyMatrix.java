@@ -94,6 +94,22 @@ public class LazyEnergyMatrix extends EnergyMatrix {
     	return val;
     }
 	
+	@Override
+	protected boolean hasDirectValues() {
+		// values might not be computed yet
+		return false;
+	}
+
+	@Override
+	public double getOneBodyValue(int res, int conf) {
+		return getOneBody(res, conf);
+	}
+
+	@Override
+	public double getPairwiseValue(int res1, int conf1, int res2, int conf2) {
+		return getPairwise(res1, conf1, res2, conf2);
+	}
+	
 	public boolean hasOneBody(int res, int conf) {
 		return hasVal(super.getOneBody(res, conf));
 	}
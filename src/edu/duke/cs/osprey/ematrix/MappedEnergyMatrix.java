@@ -0,0 +1,174 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import java.io.IOException;
+import java.io.ObjectStreamException;
+import java.nio.ByteOrder;
+import java.nio.DoubleBuffer;
+import java.nio.channels.FileChannel;
+import java.util.ArrayList;
+
+
+/**
+ * An energy matrix whose singles and pairs are read directly from a memory-mapped
+ * {@link EnergyMatrixIO} file, rather than copied onto the heap.
+ *
+ * The file is mapped copy-on-write, so modifications (e.g., applying reference energies)
+ * only change this process' view of the matrix, never the file itself.
+ */
+public class MappedEnergyMatrix extends EnergyMatrix {
+
+	private static final long serialVersionUID = -2750329475218312478L;
+
+	// a single mapping can't be bigger than 2 GiB, so split the values into chunks
+	private static final int ChunkBits = 27; // 1 GiB of doubles
+	private static final int ChunkSize = 1 << ChunkBits;
+	private static final int ChunkMask = ChunkSize - 1;
+
+	private transient DoubleBuffer[] chunks;
+	private final int numOneBody;
+
+	MappedEnergyMatrix(int numPos, int[] numConfAtPos, FileChannel channel, long dataOffset)
+	throws IOException {
+		super(numPos, numConfAtPos, Double.POSITIVE_INFINITY);
+
+		this.numOneBody = getNumOneBodyTerms();
+		long numValues = (long)numOneBody + getNumPairwiseTerms();
+
+		int numChunks = (int)((numValues + ChunkSize - 1) >>> ChunkBits);
+		chunks = new DoubleBuffer[numChunks];
+		for (int i=0; i<numChunks; i++) {
+			long start = (long)i << ChunkBits;
+			long size = Math.min(ChunkSize, numValues - start);
+			chunks[i] = channel.map(FileChannel.MapMode.PRIVATE, dataOffset + start*Double.BYTES, size*Double.BYTES)
+				.order(ByteOrder.LITTLE_ENDIAN)
+				.asDoubleBuffer();
+		}
+	}
+
+	@Override
+	protected void allocate(int numOneBody, int numPairwise) {
+		// don't allocate anything on the heap, the values live in the mapped file
+	}
+
+	private double get(long i) {
+		return chunks[(int)(i >>> ChunkBits)].get((int)(i & ChunkMask));
+	}
+
+	private void set(long i, double val) {
+		chunks[(int)(i >>> ChunkBits)].put((int)(i & ChunkMask), val);
+	}
+
+	@Override
+	public Double getOneBody(int res, int conf) {
+		return get(getOneBodyIndex(res, conf));
+	}
+
+	@Override
+	public void setOneBody(int res, int conf, Double val) {
+		set(getOneBodyIndex(res, conf), val);
+	}
+
+	@Override
+	public void setOneBody(int res, ArrayList<Double> val) {
+		int n = getNumConfAtPos(res);
+		for (int i=0; i<n; i++) {
+			set(getOneBodyIndex(res, i), val.get(i));
+		}
+	}
+
+	@Override
+	public Double getPairwise(int res1, int conf1, int res2, int conf2) {
+		return get((long)numOneBody + getPairwiseIndex(res1, conf1, res2, conf2));
+	}
+
+	@Override
+	public void setPairwise(int res1, int conf1, int res2, int conf2, Double val) {
+		set((long)numOneBody + getPairwiseIndex(res1, conf1, res2, conf2), val);
+	}
+
+	@Override
+	public void setPairwise(int res1, int res2, ArrayList<ArrayList<Double>> val) {
+		int n1 = getNumConfAtPos(res1);
+		int n2 = getNumConfAtPos(res2);
+		for (int i1=0; i1<n1; i1++) {
+			for (int i2=0; i2<n2; i2++) {
+				setPairwise(res1, i1, res2, i2, val.get(i1).get(i2));
+			}
+		}
+	}
+
+	@Override
+	protected boolean hasDirectValues() {
+		return false;
+	}
+
+	@Override
+	public double getOneBodyValue(int res, int conf) {
+		return get(getOneBodyIndex(res, conf));
+	}
+
+	@Override
+	public double getPairwiseValue(int res1, int conf1, int res2, int conf2) {
+		return get((long)numOneBody + getPairwiseIndex(res1, conf1, res2, conf2));
+	}
+
+	private long getNumValues() {
+		return (long)numOneBody + getNumPairwiseTerms();
+	}
+
+	@Override
+	public void negate() {
+		long n = getNumValues();
+		for (long i=0; i<n; i++) {
+			set(i, -get(i));
+		}
+	}
+
+	@Override
+	public double sum() {
+		double sum = 0.0;
+		long n = getNumValues();
+		for (long i=0; i<n; i++) {
+			sum += get(i);
+		}
+		return sum;
+	}
+
+	/** the mapping can't be serialized, so serialize a copy of the values on the heap instead */
+	private Object writeReplace()
+	throws ObjectStreamException {
+		return new EnergyMatrix(this);
+	}
+}
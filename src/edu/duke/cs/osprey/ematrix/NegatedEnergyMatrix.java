@@ -69,4 +69,14 @@ public class NegatedEnergyMatrix extends ProxyEnergyMatrix {
 	public void setPairwise(int pos1, int rc1, int pos2, int rc2, Double val) {
 		super.setPairwise(pos1, rc1, pos2, rc2, -val);
 	}
+
+	@Override
+	public double getOneBodyValue(int pos, int rc) {
+		return -super.getOneBodyValue(pos, rc);
+	}
+
+	@Override
+	public double getPairwiseValue(int pos1, int rc1, int pos2, int rc2) {
+		return -super.getPairwiseValue(pos1, rc1, pos2, rc2);
+	}
 }
@@ -69,5 +69,20 @@ public class ProxyEnergyMatrix extends EnergyMatrix {
 		target.setPairwise(pos1, rc1, pos2, rc2, val);
 	}
 
+	@Override
+	protected boolean hasDirectValues() {
+		return false;
+	}
+
+	@Override
+	public double getOneBodyValue(int pos, int rc) {
+		return target.getOneBodyValue(pos, rc);
+	}
+
+	@Override
+	public double getPairwiseValue(int pos1, int rc1, int pos2, int rc2) {
+		return target.getPairwiseValue(pos1, rc1, pos2, rc2);
+	}
+
 	// TODO: need to proxy anything else?
 }
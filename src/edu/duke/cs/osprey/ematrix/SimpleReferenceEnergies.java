@@ -32,6 +32,7 @@
 
 package edu.duke.cs.osprey.ematrix;
 
+import java.io.File;
 import java.util.HashMap;
 import java.util.Map;
 
@@ -56,6 +57,9 @@ public class SimpleReferenceEnergies implements Serializable {
 		private EnergyCalculator ecalc;
 		private boolean addResEntropy = false;
 		
+		/** see {@link SimplerEnergyMatrixCalculator.Builder#fragmentStoreFile} */
+		private File fragmentStoreFile = null;
+		
 		public Builder(SimpleConfSpace confSpace, EnergyCalculator ecalc) {
 			this.confSpace = confSpace;
 			this.ecalc = ecalc;
@@ -66,11 +70,17 @@ public class SimpleReferenceEnergies implements Serializable {
 			return this;
 		}
 		
+		public Builder setFragmentStoreFile(File val) {
+			fragmentStoreFile = val;
+			return this;
+		}
+		
 		public SimpleReferenceEnergies build() {
 			ConfEnergyCalculator confEcalc = new ConfEnergyCalculator.Builder(confSpace, ecalc)
 				.addResEntropy(addResEntropy)
 				.build();
 			return new SimplerEnergyMatrixCalculator.Builder(confEcalc)
+				.setFragmentStoreFile(fragmentStoreFile)
 				.build()
 				.calcReferenceEnergies();
 		}
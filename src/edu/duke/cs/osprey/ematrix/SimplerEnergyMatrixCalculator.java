@@ -35,13 +35,15 @@ package edu.duke.cs.osprey.ematrix;
 import java.io.File;
 import java.util.ArrayList;
 import java.util.List;
+import java.util.function.BiConsumer;
+import java.util.function.Consumer;
 
 import edu.duke.cs.osprey.confspace.RCTuple;
 import edu.duke.cs.osprey.confspace.SimpleConfSpace;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.energy.EnergyCalculator;
 import edu.duke.cs.osprey.energy.ResInterGen;
-import edu.duke.cs.osprey.tools.ObjectIO;
+import edu.duke.cs.osprey.energy.ResidueInteractions;
 import edu.duke.cs.osprey.tools.Progress;
 
 public class SimplerEnergyMatrixCalculator {
@@ -69,9 +71,49 @@ public class SimplerEnergyMatrixCalculator {
 		 * new energy matrix instead of usng the cached, incorrect one. Osprey might not detect
 		 * all design changes though, and incorrectly reuse a cached energy matrix, so it
 		 * is best to manually delete the entry matrix cache file after changing design settings.
+		 *
+		 * @note Cache files are written in a compact binary format that is memory-mapped when read,
+		 * so even very large energy matrices load quickly. Cache files written by older versions
+		 * of Osprey are still read, and upgraded to the binary format automatically.
+		 *
+		 * @note If the conformation space changes between runs (eg, a mutation or a design position
+		 * is added), the cached energies of unchanged singles and pairs are reused, and only the
+		 * energies of new fragments are computed. See {@link FragmentKeys}.
+		 *
+		 * @note Cache files also remember the pair distance cutoff and float precision settings.
+		 * If those change, pair energies in the cache aren't reused, since they could be missing or rounded.
 		 */
 		private File cacheFile = null;
 		
+		/**
+		 * Path to a fragment energy store shared between designs, Osprey runs, and processes.
+		 * 
+		 * @note Before computing any single or pair energy, Osprey looks it up in the store,
+		 * and every newly-computed energy is added to the store. Energies are addressed by a hash
+		 * of the molecule coordinates, templates, residue conformations, residue interactions,
+		 * and forcefield parameters, so one store can safely be shared by many different designs,
+		 * even by Osprey processes running at the same time. See {@link FragmentEnergyStore}.
+		 */
+		private File fragmentStoreFile = null;
+		
+		/**
+		 * Store pair energies in single precision, to fit larger energy matrices in memory.
+		 * 
+		 * @note Pair energies are rounded down, so A* scores are still lower bounds. See {@link FloatEnergyMatrix}.
+		 * Energy matrices read from a cache file are always double precision.
+		 */
+		private boolean floatPrecision = false;
+		
+		/**
+		 * If set, pairs of design positions whose alpha carbons are farther apart than this distance (in Angstroms)
+		 * are assumed not to interact. Their pair energies are not calculated or stored, and are treated as zero.
+		 * See {@link SparseEnergyMatrix}.
+		 * 
+		 * @note Side chains can reach quite far from the alpha carbon, so use a generous cutoff, e.g. 20 Angstroms or more.
+		 * Can't be combined with {@link #floatPrecision}.
+		 */
+		private Double pairDistanceCutoff = null;
+		
 		public Builder(SimpleConfSpace confSpace, EnergyCalculator ecalc) {
 			this(new ConfEnergyCalculator.Builder(confSpace, ecalc).build());
 		}
@@ -85,17 +127,92 @@ public class SimplerEnergyMatrixCalculator {
 			return this;
 		}
 		
+		public Builder setFragmentStoreFile(File val) {
+			fragmentStoreFile = val;
+			return this;
+		}
+		
+		public Builder setFloatPrecision(boolean val) {
+			floatPrecision = val;
+			return this;
+		}
+		
+		public Builder setPairDistanceCutoff(Double val) {
+			pairDistanceCutoff = val;
+			return this;
+		}
+		
 		public SimplerEnergyMatrixCalculator build() {
-			return new SimplerEnergyMatrixCalculator(confEcalc, cacheFile);
+			if (floatPrecision && pairDistanceCutoff != null) {
+				throw new IllegalArgumentException("float precision and a pair distance cutoff can't be used together");
+			}
+			return new SimplerEnergyMatrixCalculator(confEcalc, cacheFile, fragmentStoreFile, floatPrecision, pairDistanceCutoff);
 		}
 	}
 	
 	public final ConfEnergyCalculator confEcalc;
 	public final File cacheFile;
+	public final File fragmentStoreFile;
+	public final boolean floatPrecision;
+	public final Double pairDistanceCutoff;
 
-	private SimplerEnergyMatrixCalculator(ConfEnergyCalculator confEcalc, File cacheFile) {
+	private SimplerEnergyMatrixCalculator(ConfEnergyCalculator confEcalc, File cacheFile, File fragmentStoreFile, boolean floatPrecision, Double pairDistanceCutoff) {
 		this.confEcalc = confEcalc;
 		this.cacheFile = cacheFile;
+		this.fragmentStoreFile = fragmentStoreFile;
+		this.floatPrecision = floatPrecision;
+		this.pairDistanceCutoff = pairDistanceCutoff;
+	}
+	
+	private EnergyMatrix allocateEnergyMatrix() {
+		if (floatPrecision) {
+			return new FloatEnergyMatrix(confEcalc.confSpace);
+		} else if (pairDistanceCutoff != null) {
+			return new SparseEnergyMatrix(confEcalc.confSpace, pairDistanceCutoff);
+		} else {
+			return new EnergyMatrix(confEcalc.confSpace);
+		}
+	}
+	
+	private EnergyMatrix copyToStorage(EnergyMatrix src) {
+		EnergyMatrix emat = allocateEnergyMatrix();
+		emat.setConstTerm(src.getConstTerm());
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				emat.setOneBody(pos1, rc1, src.getOneBodyValue(pos1, rc1));
+			}
+			for (int pos2=0; pos2<pos1; pos2++) {
+				if (!emat.storesPairwise(pos1, pos2)) {
+					continue;
+				}
+				for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						emat.setPairwise(pos1, rc1, pos2, rc2, src.getPairwiseValue(pos1, rc1, pos2, rc2));
+					}
+				}
+			}
+		}
+		return emat;
+	}
+	
+	/** describes any lossy storage of the energies, so cache files are only reused if they were stored the same way */
+	private String getStorage() {
+		if (floatPrecision) {
+			return "float32";
+		} else if (pairDistanceCutoff != null) {
+			return "sparse cutoff=" + pairDistanceCutoff;
+		} else {
+			return null;
+		}
+	}
+	
+	private FragmentEnergyStore openFragmentStore() {
+		if (fragmentStoreFile == null) {
+			return null;
+		}
+		FragmentEnergyStore store = new FragmentEnergyStore(fragmentStoreFile);
+		System.out.println("read " + store.size() + " fragment energies from store: " + fragmentStoreFile.getAbsolutePath());
+		return store;
 	}
 	
 	/**
@@ -104,27 +221,81 @@ public class SimplerEnergyMatrixCalculator {
 	public EnergyMatrix calcEnergyMatrix() {
 		
 		if (cacheFile != null) {
-			return ObjectIO.readOrMake(
+			String storage = getStorage();
+			FragmentKeys keys = FragmentKeys.of(confEcalc, storage);
+			EnergyMatrix emat = EnergyMatrixIO.readOrMake(
 				cacheFile,
-				EnergyMatrix.class,
-				"energy matrix",
-				(emat) -> emat.matches(confEcalc.confSpace),
-				(context) -> reallyCalcEnergyMatrix()
+				confEcalc.confSpace,
+				storage,
+				keys,
+				(oldEmat, oldKeys) -> reallyCalcEnergyMatrix(keys, oldEmat, oldKeys)
 			);
+
+			// cache files are always read as dense matrices, so put lossy storage back the way it was
+			if (storage != null && emat instanceof MappedEnergyMatrix) {
+				emat = copyToStorage(emat);
+			}
+			return emat;
 		} else {
-			return reallyCalcEnergyMatrix();
+			return reallyCalcEnergyMatrix(null, null, null);
 		}
 	}
 	
-	private EnergyMatrix reallyCalcEnergyMatrix() {
+	private EnergyMatrix reallyCalcEnergyMatrix(FragmentKeys keys, EnergyMatrix oldEmat, FragmentKeys oldKeys) {
 		
 		// allocate the new matrix
-		EnergyMatrix emat = new EnergyMatrix(confEcalc.confSpace);
+		EnergyMatrix emat = allocateEnergyMatrix();
+		
+		// copy over any energies we can reuse
+		final FragmentKeys.Matching matching;
+		if (keys != null && oldEmat != null && oldKeys != null) {
+			matching = keys.match(oldKeys);
+		} else {
+			matching = null;
+		}
+		int numSinglesToCalc = 0;
+		int numPairsToCalc = 0;
+		long numPairsSkipped = 0;
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				
+				if (matching != null && matching.hasSingle(pos1, rc1)) {
+					emat.setOneBody(pos1, rc1, matching.getSingle(oldEmat, pos1, rc1));
+				} else {
+					numSinglesToCalc++;
+				}
+				
+				for (int pos2=0; pos2<pos1; pos2++) {
+					if (!emat.storesPairwise(pos1, pos2)) {
+						numPairsSkipped += emat.getNumConfAtPos(pos2);
+						continue;
+					}
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						if (matching != null && matching.hasPair(pos1, rc1, pos2, rc2)) {
+							emat.setPairwise(pos1, rc1, pos2, rc2, matching.getPair(oldEmat, pos1, rc1, pos2, rc2));
+						} else {
+							numPairsToCalc++;
+						}
+					}
+				}
+			}
+		}
+		if (numPairsSkipped > 0) {
+			System.out.println("Skipping " + numPairsSkipped + " pair energies between positions beyond the distance cutoff");
+		}
+		if (matching != null) {
+			long numEntries = confEcalc.confSpace.getNumResConfs() + confEcalc.confSpace.getNumResConfPairs() - numPairsSkipped;
+			System.out.println("Reused " + (numEntries - numSinglesToCalc - numPairsToCalc) + " of " + numEntries + " energy matrix entries from cache");
+		}
 		
 		// count how much work there is to do (roughly based on number of residue pairs)
 		final int singleCost = confEcalc.makeSingleInters(0, 0).size();
 		final int pairCost = confEcalc.makePairInters(0, 0, 0, 0).size();
-		Progress progress = new Progress(confEcalc.confSpace.getNumResConfs()*singleCost + confEcalc.confSpace.getNumResConfPairs()*pairCost);
+		Progress progress = new Progress((long)numSinglesToCalc*singleCost + (long)numPairsToCalc*pairCost);
+		
+		// look for the other energies in the fragment store, if any
+		FragmentEnergyStore store = openFragmentStore();
+		FragmentEnergyStore.Hasher hasher = store != null ? store.hasher(confEcalc) : null;
 		
 		// some fragments can be big and some can be small
 		// try minimize thread sync overhead by not sending a bunch of small fragments in all separate tasks
@@ -132,57 +303,84 @@ public class SimplerEnergyMatrixCalculator {
 		class Batch {
 			
 			List<RCTuple> fragments = new ArrayList<>();
+			List<FragmentEnergyStore.Key> keys = new ArrayList<>();
 			int cost = 0;
+			long elapsedNs = 0;
 			
-			void addSingle(int pos, int rc) {
-				fragments.add(new RCTuple(pos, rc));
+			void addSingle(RCTuple frag, FragmentEnergyStore.Key key) {
+				fragments.add(frag);
+				keys.add(key);
 				cost += singleCost;
 			}
 			
-			void addPair(int pos1, int rc1, int pos2, int rc2) {
-				fragments.add(new RCTuple(pos1, rc1, pos2, rc2));
+			void addPair(RCTuple frag, FragmentEnergyStore.Key key) {
+				fragments.add(frag);
+				keys.add(key);
 				cost += pairCost;
 			}
 			
-			void submitTask() {
+			void submitTask(Consumer<Batch> onFinished) {
 				confEcalc.tasks.submit(
 					() -> {
 						
+						long startNs = System.nanoTime();
+						
 						// calculate all the fragment energies
-						List<Double> energies = new ArrayList<>();
+						List<ResidueInteractions> inters = new ArrayList<>(fragments.size());
 						for (RCTuple frag : fragments) {
 							if (frag.size() == 1) {
-								energies.add(confEcalc.calcSingleEnergy(frag).energy);
+								inters.add(confEcalc.makeSingleInters(frag.pos.get(0), frag.RCs.get(0)));
 							} else {
-								energies.add(confEcalc.calcPairEnergy(frag).energy);
+								inters.add(confEcalc.makePairInters(frag.pos.get(0), frag.RCs.get(0), frag.pos.get(1), frag.RCs.get(1)));
 							}
 						}
+						double[] energies = confEcalc.calcEnergies(fragments, inters);
 						
+						elapsedNs = System.nanoTime() - startNs;
 						return energies;
 					},
-					(List<Double> energies) -> {
+					(double[] energies) -> {
 						
 						// update the energy matrix
 						for (int i=0; i<fragments.size(); i++) {
 							RCTuple frag = fragments.get(i);
 							if (frag.size() == 1) {
-								emat.setOneBody(frag.pos.get(0), frag.RCs.get(0), energies.get(i));
+								emat.setOneBody(frag.pos.get(0), frag.RCs.get(0), energies[i]);
 							} else {
-								emat.setPairwise(frag.pos.get(0), frag.RCs.get(0), frag.pos.get(1), frag.RCs.get(1), energies.get(i));
+								emat.setPairwise(frag.pos.get(0), frag.RCs.get(0), frag.pos.get(1), frag.RCs.get(1), energies[i]);
+							}
+							if (store != null) {
+								store.put(keys.get(i), energies[i]);
 							}
 						}
 						
-						progress.incrementProgress(cost);
+						onFinished.accept(this);
+						synchronized (progress) {
+							progress.incrementProgress(cost);
+						}
 					}
 				);
 			}
 		}
 		
-		final int CostThreshold = 100;
+		// fragment costs are only a rough guess, and fragments can be very fast (rigid)
+		// or very slow (minimized), so adapt the batch size to the observed speed:
+		// aim for batches that take about TargetBatchMs each,
+		// but keep enough batches around so all the threads stay busy until the end
+		final int InitialCostThreshold = 100;
+		final long TargetBatchMs = 50;
+		final int MinBatchesPerThread = 4;
 		
 		class Batcher {
 			
 			Batch batch = null;
+			long remainingCost = progress.getTotalWork();
+			int costThreshold = InitialCostThreshold;
+			
+			// only touched by the listener thread
+			long finishedCost = 0;
+			long finishedNs = 0;
+			volatile double nsPerCost = Double.NaN;
 			
 			Batch getBatch() {
 				if (batch == null) {
@@ -192,34 +390,100 @@ public class SimplerEnergyMatrixCalculator {
 			}
 			
 			void submitIfFull() {
-				if (batch != null && batch.cost >= CostThreshold) {
+				if (batch != null && batch.cost >= costThreshold) {
 					submit();
 				}
 			}
 			
 			void submit() {
 				if (batch != null) {
-					batch.submitTask();
+					remainingCost -= batch.cost;
+					batch.submitTask((finishedBatch) -> onFinished(finishedBatch));
 					batch = null;
+					updateCostThreshold();
+				}
+			}
+			
+			void onFinished(Batch finishedBatch) {
+				finishedCost += finishedBatch.cost;
+				finishedNs += finishedBatch.elapsedNs;
+				if (finishedCost > 0) {
+					nsPerCost = (double)finishedNs/finishedCost;
+				}
+			}
+			
+			void updateCostThreshold() {
+				
+				double nsPerCost = this.nsPerCost;
+				if (Double.isNaN(nsPerCost)) {
+					return;
 				}
+				
+				long targetCost = (long)(TargetBatchMs*1000000/Math.max(nsPerCost, 1e-3));
+				long maxCost = remainingCost/(MinBatchesPerThread*confEcalc.tasks.getParallelism());
+				costThreshold = (int)Math.max(1, Math.min(Integer.MAX_VALUE, Math.min(targetCost, maxCost)));
 			}
 		}
 		Batcher batcher = new Batcher();
 		
 		// batch all the singles and pairs
-		System.out.println("Calculating energy matrix with " + (confEcalc.confSpace.getNumResConfs() + confEcalc.confSpace.getNumResConfPairs()) + " entries...");
+		// NOTE: group pairs by positions, so the energy calculator can reuse molecules between fragments
+		System.out.println("Calculating energy matrix with " + (numSinglesToCalc + numPairsToCalc) + " entries...");
+		long numStoreHits = 0;
 		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
 			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
 				
-				// singles
-				batcher.getBatch().addSingle(pos1, rc1);
-				batcher.submitIfFull();
+				if (matching == null || !matching.hasSingle(pos1, rc1)) {
+					RCTuple frag = new RCTuple(pos1, rc1);
+					FragmentEnergyStore.Key key = null;
+					Double energy = null;
+					if (store != null) {
+						key = hasher.make(frag, confEcalc.makeSingleInters(pos1, rc1));
+						energy = store.get(key);
+					}
+					if (energy != null) {
+						emat.setOneBody(pos1, rc1, energy);
+						synchronized (progress) {
+							progress.incrementProgress(singleCost);
+						}
+						numStoreHits++;
+					} else {
+						batcher.getBatch().addSingle(frag, key);
+						batcher.submitIfFull();
+					}
+				}
+			}
+		}
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int pos2=0; pos2<pos1; pos2++) {
 				
-				// pairs
-				for (int pos2=0; pos2<pos1; pos2++) {
+				// skip pairs the matrix won't store
+				if (!emat.storesPairwise(pos1, pos2)) {
+					continue;
+				}
+				
+				for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
 					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
-						batcher.getBatch().addPair(pos1, rc1, pos2, rc2);
-						batcher.submitIfFull();
+						
+						if (matching == null || !matching.hasPair(pos1, rc1, pos2, rc2)) {
+							RCTuple frag = new RCTuple(pos1, rc1, pos2, rc2);
+							FragmentEnergyStore.Key key = null;
+							Double energy = null;
+							if (store != null) {
+								key = hasher.make(frag, confEcalc.makePairInters(pos1, rc1, pos2, rc2));
+								energy = store.get(key);
+							}
+							if (energy != null) {
+								emat.setPairwise(pos1, rc1, pos2, rc2, energy);
+								synchronized (progress) {
+									progress.incrementProgress(pairCost);
+								}
+								numStoreHits++;
+							} else {
+								batcher.getBatch().addPair(frag, key);
+								batcher.submitIfFull();
+							}
+						}
 					}
 				}
 			}
@@ -228,6 +492,11 @@ public class SimplerEnergyMatrixCalculator {
 		batcher.submit();
 		confEcalc.tasks.waitForFinish();
 		
+		if (store != null) {
+			store.flush();
+			System.out.println("Found " + numStoreHits + " energy matrix entries in fragment store");
+		}
+		
 		return emat;
 	}
 	
@@ -241,26 +510,57 @@ public class SimplerEnergyMatrixCalculator {
 		
 		SimpleReferenceEnergies eref = new SimpleReferenceEnergies();
 		
+		// keep the min energy for each pos,resType
+		// NOTE: energies can come from the fragment store (on this thread) or the task listener thread
+		BiConsumer<RCTuple,Double> updateEref = (frag, energy) -> {
+			synchronized (eref) {
+				String resType = confEcalc.confSpace.positions.get(frag.pos.get(0)).resConfs.get(frag.RCs.get(0)).template.name;
+				Double e = eref.get(frag.pos.get(0), resType);
+				if (e == null || energy < e) {
+					e = energy;
+				}
+				eref.set(frag.pos.get(0), resType, e);
+			}
+		};
+		
+		FragmentEnergyStore store = openFragmentStore();
+		FragmentEnergyStore.Hasher hasher = store != null ? store.hasher(confEcalc) : null;
+		
 		// send all the tasks
 		Progress progress = new Progress(confEcalc.confSpace.getNumResConfs());
 		System.out.println("Calculating reference energies for " + progress.getTotalWork() + " residue confs...");
 		for (SimpleConfSpace.Position pos : confEcalc.confSpace.positions) {
 			for (SimpleConfSpace.ResidueConf rc : pos.resConfs) {
 			
-				String resType = rc.template.name;
 				RCTuple frag = new RCTuple(pos.index, rc.index);
+				ResidueInteractions inters = ResInterGen.of(confEcalc.confSpace).addIntra(pos.index).make();
+				
+				// check the fragment store first
+				FragmentEnergyStore.Key key = null;
+				if (store != null) {
+					key = hasher.make(frag, inters);
+					Double energy = store.get(key);
+					if (energy != null) {
+						updateEref.accept(frag, energy);
+						synchronized (progress) {
+							progress.incrementProgress();
+						}
+						continue;
+					}
+				}
+				
+				final FragmentEnergyStore.Key fkey = key;
 				confEcalc.calcEnergyAsync(
 					frag,
-					ResInterGen.of(confEcalc.confSpace).addIntra(pos.index).make(),
+					inters,
 					(EnergyCalculator.EnergiedParametricMolecule epmol) -> {
-						
-						// keep the min energy for each pos,resType
-						Double e = eref.get(frag.pos.get(0), resType);
-						if (e == null || epmol.energy < e) {
-							e = epmol.energy;
+						updateEref.accept(frag, epmol.energy);
+						if (store != null) {
+							store.put(fkey, epmol.energy);
+						}
+						synchronized (progress) {
+							progress.incrementProgress();
 						}
-						eref.set(frag.pos.get(0), resType, e);
-						progress.incrementProgress();
 					}
 				);
 			}
@@ -268,6 +568,10 @@ public class SimplerEnergyMatrixCalculator {
 		
 		confEcalc.tasks.waitForFinish();
 		
+		if (store != null) {
+			store.flush();
+		}
+		
 		return eref;
 	}
 }
@@ -0,0 +1,231 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.structure.Residue;
+import edu.duke.cs.osprey.tools.VectorAlgebra;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.function.BiPredicate;
+
+
+/**
+ * An energy matrix that only stores pair energies for pairs of positions that interact.
+ *
+ * Pair energies between positions that don't interact are assumed to be zero: they read as zero,
+ * writes to them are ignored, and {@link SimplerEnergyMatrixCalculator} doesn't calculate them.
+ */
+public class SparseEnergyMatrix extends EnergyMatrix {
+
+	private static final long serialVersionUID = 8212507768809372066L;
+
+	/**
+	 * Returns true if the positions should be treated as interacting,
+	 * ie if their alpha carbons are within the cutoff distance.
+	 * Positions without alpha carbons are always treated as interacting.
+	 */
+	public static boolean isWithinDistance(SimpleConfSpace confSpace, int pos1, int pos2, double distanceCutoff) {
+		double[] ca1 = getAlphaCarbon(confSpace.positions.get(pos1));
+		double[] ca2 = getAlphaCarbon(confSpace.positions.get(pos2));
+		if (ca1 == null || ca2 == null) {
+			return true;
+		}
+		return VectorAlgebra.distance(ca1, ca2) <= distanceCutoff;
+	}
+
+	private static double[] getAlphaCarbon(SimpleConfSpace.Position pos) {
+		Residue res = pos.strand.mol.getResByPDBResNumberOrNull(pos.resNum);
+		if (res == null) {
+			return null;
+		}
+		return res.getCoordsByAtomName("CA");
+	}
+
+	private double[] oneBody;
+	private double[][] pairwise; // indices: res1, res2, then RC1, RC2 where res1>res2, null if res1 and res2 don't interact
+
+	/**
+	 * Makes an energy matrix that only stores pair energies for positions whose alpha carbons
+	 * are within the cutoff distance.
+	 */
+	public SparseEnergyMatrix(SimpleConfSpace confSpace, double distanceCutoff) {
+		this(confSpace.positions.size(), confSpace.getNumResConfsByPos(), (pos1, pos2) -> isWithinDistance(confSpace, pos1, pos2, distanceCutoff));
+	}
+
+	public SparseEnergyMatrix(int numPos, int[] numConfAtPos, BiPredicate<Integer,Integer> interacts) {
+		super(numPos, numConfAtPos, Double.POSITIVE_INFINITY);
+
+		// allocate blocks just for the interacting positions
+		for (int res1=0; res1<numPos; res1++) {
+			for (int res2=0; res2<res1; res2++) {
+				if (interacts.test(res1, res2)) {
+					pairwise[getPairwiseIndex(res1, res2)] = new double[getPairwiseBlockSize(res1, res2)];
+				}
+			}
+		}
+	}
+
+	@Override
+	protected void allocate(int numOneBody, int numPairwise) {
+		oneBody = new double[numOneBody];
+		pairwise = new double[getNumPos()*(getNumPos() - 1)/2][];
+	}
+
+	@Override
+	public boolean storesPairwise(int res1, int res2) {
+		return pairwise[getPairwiseIndex(res1, res2)] != null;
+	}
+
+	/** Number of pair energies actually stored by this matrix */
+	public long getNumStoredPairwise() {
+		long num = 0;
+		for (double[] block : pairwise) {
+			if (block != null) {
+				num += block.length;
+			}
+		}
+		return num;
+	}
+
+	@Override
+	protected boolean hasDirectValues() {
+		return false;
+	}
+
+	@Override
+	public Double getOneBody(int res, int conf) {
+		return oneBody[getOneBodyIndex(res, conf)];
+	}
+
+	@Override
+	public double getOneBodyValue(int res, int conf) {
+		return oneBody[getOneBodyIndex(res, conf)];
+	}
+
+	@Override
+	public void setOneBody(int res, int conf, Double val) {
+		oneBody[getOneBodyIndex(res, conf)] = val;
+	}
+
+	@Override
+	public void setOneBody(int res, ArrayList<Double> val) {
+		int n = getNumConfAtPos(res);
+		for (int i=0; i<n; i++) {
+			oneBody[getOneBodyIndex(res, i)] = val.get(i);
+		}
+	}
+
+	@Override
+	public Double getPairwise(int res1, int conf1, int res2, int conf2) {
+		return getPairwiseValue(res1, conf1, res2, conf2);
+	}
+
+	@Override
+	public double getPairwiseValue(int res1, int conf1, int res2, int conf2) {
+		double[] block = pairwise[getPairwiseIndex(res1, res2)];
+		if (block == null) {
+			return 0.0;
+		}
+		return block[getPairwiseIndexInBlock(res1, conf1, res2, conf2)];
+	}
+
+	@Override
+	public void setPairwise(int res1, int conf1, int res2, int conf2, Double val) {
+		double[] block = pairwise[getPairwiseIndex(res1, res2)];
+		if (block != null) {
+			block[getPairwiseIndexInBlock(res1, conf1, res2, conf2)] = val;
+		}
+	}
+
+	@Override
+	public void setPairwise(int res1, int res2, ArrayList<ArrayList<Double>> val) {
+		int n1 = getNumConfAtPos(res1);
+		int n2 = getNumConfAtPos(res2);
+		for (int i1=0; i1<n1; i1++) {
+			for (int i2=0; i2<n2; i2++) {
+				setPairwise(res1, i1, res2, i2, val.get(i1).get(i2));
+			}
+		}
+	}
+
+	@Override
+	public double[] getPairwiseRow(int res1, int conf1, int res2, double[] out) {
+		int n2 = getNumConfAtPos(res2);
+		double[] block = pairwise[getPairwiseIndex(res1, res2)];
+		if (block == null) {
+			Arrays.fill(out, 0, n2, 0.0);
+		} else if (res1 > res2) {
+			System.arraycopy(block, getPairwiseIndexInBlock(res1, conf1, res2, 0), out, 0, n2);
+		} else {
+			int i = getPairwiseIndexInBlock(res1, conf1, res2, 0);
+			int stride = getNumConfAtPos(res1);
+			for (int conf2=0; conf2<n2; conf2++) {
+				out[conf2] = block[i];
+				i += stride;
+			}
+		}
+		return out;
+	}
+
+	@Override
+	public void negate() {
+		for (int i=0; i<oneBody.length; i++) {
+			oneBody[i] = -oneBody[i];
+		}
+		for (double[] block : pairwise) {
+			if (block != null) {
+				for (int i=0; i<block.length; i++) {
+					block[i] = -block[i];
+				}
+			}
+		}
+	}
+
+	@Override
+	public double sum() {
+		double sum = 0.0;
+		for (int i=0; i<oneBody.length; i++) {
+			sum += oneBody[i];
+		}
+		for (double[] block : pairwise) {
+			if (block != null) {
+				for (int i=0; i<block.length; i++) {
+					sum += block[i];
+				}
+			}
+		}
+		return sum;
+	}
+}
@@ -44,6 +44,8 @@ import edu.duke.cs.osprey.ematrix.SimpleReferenceEnergies;
 import edu.duke.cs.osprey.minimization.MoleculeObjectiveFunction;
 import edu.duke.cs.osprey.parallelism.TaskExecutor;
 import edu.duke.cs.osprey.parallelism.TaskExecutor.TaskListener;
+import edu.duke.cs.osprey.restypes.ResidueTemplate;
+import edu.duke.cs.osprey.structure.Residue;
 import edu.duke.cs.osprey.tools.Progress;
 import edu.duke.cs.osprey.tools.TimeTools;
 
@@ -231,6 +233,153 @@ public class ConfEnergyCalculator {
 		tasks.submit(() -> calcEnergy(frag), listener);
 	}
 
+	/**
+	 * Calculate the energies of many molecule fragments at once.
+	 *
+	 * Rigid fragments (ie, without any continuous degrees of freedom) are posed by copying
+	 * cached residue coordinates into one shared molecule, rather than making a new molecule
+	 * for each fragment. Since nothing is minimized, no roundoff error can accumulate between fragments.
+	 * The shared molecule is reused as long as consecutive fragments have the same positions
+	 * and residue templates, so order fragments by position and template to get the most benefit.
+	 *
+	 * All other fragments are calculated exactly like {@link #calcEnergy(RCTuple,ResidueInteractions)}.
+	 * So are all fragments in subclasses, unless they opt in with {@link #canReposeRigidFragments}.
+	 *
+	 * @param frags The assignments of the conformation space
+	 * @param inters The residue interactions for each fragment
+	 * @return The energy of each fragment
+	 */
+	public double[] calcEnergies(List<RCTuple> frags, List<ResidueInteractions> inters) {
+
+		if (frags.size() != inters.size()) {
+			throw new IllegalArgumentException("need residue interactions for each fragment");
+		}
+
+		double[] energies = new double[frags.size()];
+
+		// the shared molecule for rigid fragments, and the fragment it was made for
+		boolean canRepose = canReposeRigidFragments();
+		ParametricMolecule rigidPmol = null;
+		RCTuple rigidFrag = null;
+
+		for (int i=0; i<frags.size(); i++) {
+			RCTuple frag = frags.get(i);
+
+			if (!canRepose || !isRigid(frag)) {
+				energies[i] = calcEnergy(frag, inters.get(i)).energy;
+				continue;
+			}
+
+			if (rigidPmol != null && canRepose(rigidFrag, frag)) {
+
+				// just copy the residue coords into the shared molecule
+				for (int j=0; j<frag.size(); j++) {
+					RigidPose pose = getRigidPose(frag.pos.get(j), frag.RCs.get(j));
+					Residue res = rigidPmol.mol.getResByPDBResNumber(confSpace.positions.get(frag.pos.get(j)).resNum);
+					System.arraycopy(pose.coords, 0, res.coords, 0, pose.coords.length);
+				}
+				rigidFrag = frag;
+
+			} else {
+
+				// make a new shared molecule
+				rigidPmol = confSpace.makeMolecule(frag);
+				rigidFrag = frag;
+			}
+
+			numCalculations.incrementAndGet();
+			energies[i] = ecalc.calcEnergy(rigidPmol, inters.get(i)).energy;
+		}
+
+		return energies;
+	}
+
+	/**
+	 * Whether {@link #calcEnergies} can calculate rigid fragments itself by reposing a shared molecule,
+	 * rather than calling {@link #calcEnergy(RCTuple,ResidueInteractions)} for each fragment.
+	 *
+	 * Subclasses usually change how energies are calculated (eg, on remote workers),
+	 * so they don't get the shared molecule unless they override this.
+	 */
+	protected boolean canReposeRigidFragments() {
+		return ecalc != null && getClass() == ConfEnergyCalculator.class;
+	}
+
+	private static class RigidPose {
+
+		final ResidueTemplate template;
+		final double[] coords;
+
+		RigidPose(ResidueTemplate template, double[] coords) {
+			this.template = template;
+			this.coords = coords;
+		}
+	}
+
+	private volatile RigidPose[][] rigidPoses = null;
+
+	/** returns the pose of a rigid RC, or null if the RC has continuous DOFs */
+	private RigidPose getRigidPose(int pos, int rc) {
+
+		RigidPose[][] poses = rigidPoses;
+		if (poses == null) {
+			synchronized (this) {
+				if (rigidPoses == null) {
+					RigidPose[][] newPoses = new RigidPose[confSpace.positions.size()][];
+					for (SimpleConfSpace.Position p : confSpace.positions) {
+						newPoses[p.index] = new RigidPose[p.resConfs.size()];
+					}
+					rigidPoses = newPoses;
+				}
+				poses = rigidPoses;
+			}
+		}
+
+		// NOTE: poses are immutable, so it's ok if two threads race to make the same one
+		RigidPose pose = poses[pos][rc];
+		if (pose == null) {
+			ParametricMolecule pmol = confSpace.makeMolecule(new RCTuple(pos, rc));
+			if (pmol.dofs.isEmpty()) {
+				Residue res = pmol.mol.getResByPDBResNumber(confSpace.positions.get(pos).resNum);
+				pose = new RigidPose(res.template, res.coords.clone());
+			} else {
+				pose = new RigidPose(null, null);
+			}
+			poses[pos][rc] = pose;
+		}
+		return pose.template != null ? pose : null;
+	}
+
+	private boolean isRigid(RCTuple frag) {
+		for (int i=0; i<frag.size(); i++) {
+			if (getRigidPose(frag.pos.get(i), frag.RCs.get(i)) == null) {
+				return false;
+			}
+		}
+		return true;
+	}
+
+	private boolean canRepose(RCTuple oldFrag, RCTuple newFrag) {
+
+		// positions must match exactly, so no other residues are out of their wild-type poses
+		if (!oldFrag.pos.equals(newFrag.pos)) {
+			return false;
+		}
+
+		for (int i=0; i<newFrag.size(); i++) {
+			ResidueTemplate oldTemplate = getRigidPose(oldFrag.pos.get(i), oldFrag.RCs.get(i)).template;
+			ResidueTemplate newTemplate = getRigidPose(newFrag.pos.get(i), newFrag.RCs.get(i)).template;
+
+			// templates must match, so the residue atoms match
+			// and skip prolines, since their puckers have state outside of the coords
+			if (oldTemplate != newTemplate || newTemplate.name.equalsIgnoreCase("PRO")) {
+				return false;
+			}
+		}
+
+		return true;
+	}
+
 	/**
 	 * Version of {@link #calcEnergy(RCTuple)}
 	 * using the specified ConfDB table as a cache.
@@ -272,7 +421,7 @@ public class ConfEnergyCalculator {
 
 		// update the ConfDB
 		table.setUpperBound(conf, energy, TimeTools.getTimestampNs());
-		table.flush();
+		table.flushLater();
 
 		return energy;
 	}
@@ -413,10 +562,10 @@ public class ConfEnergyCalculator {
 		econf = supplier.get();
 
 		// update the ConfDB
-		// NOTE: flushing the db every write might be noticeably slow at a high write rate
-		// in testing so far, at about 20 writes/s, the performance hit is undetectable
+		// NOTE: flushing the db every write might be noticeably slow at a high write rate,
+		// so let the db group the writes
 		table.setBounds(econf, TimeTools.getTimestampNs());
-		table.flush();
+		table.flushLater();
 
 		return econf;
 	}
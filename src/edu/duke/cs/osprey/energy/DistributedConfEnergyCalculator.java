@@ -0,0 +1,198 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.energy;
+
+import cern.colt.matrix.DoubleFactory1D;
+import cern.colt.matrix.DoubleMatrix1D;
+import edu.duke.cs.osprey.confspace.ParametricMolecule;
+import edu.duke.cs.osprey.confspace.RCTuple;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.ematrix.SimpleReferenceEnergies;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.parallelism.DistributedTaskExecutor;
+import edu.duke.cs.osprey.parallelism.DistributedWorker;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+
+import java.io.Serializable;
+
+
+/**
+ * A conformation energy calculator that minimizes fragments on the workers of a {@link DistributedTaskExecutor}.
+ *
+ * Each worker builds its own copy of the energy calculator from the conformation space and forcefield,
+ * so only the fragment and residue interactions are sent for each minimization, and only the energy
+ * and the minimized DOF values come back. The pose is rebuilt here from the DOF values.
+ *
+ * Since this calculator uses the distributed executor for its tasks, anything that calculates energies
+ * through it (eg, energy matrices, partition functions, GMEC finders) will run its minimizations on the workers.
+ */
+public class DistributedConfEnergyCalculator extends ConfEnergyCalculator {
+
+	/** everything a worker needs to make its own conformation energy calculator */
+	private static class Recipe implements Serializable {
+
+		private static final long serialVersionUID = -1622594812094387260L;
+
+		final SimpleConfSpace confSpace;
+		final ForcefieldParams ffparams;
+		final EnergyPartition epart;
+		final SimpleReferenceEnergies eref;
+		final boolean addResEntropy;
+		final boolean isMinimizing;
+		final Double infiniteWellEnergy;
+		final Double alwaysResolveClashesEnergy;
+
+		private transient ConfEnergyCalculator confEcalc = null;
+
+		Recipe(ConfEnergyCalculator confEcalc) {
+			this.confSpace = confEcalc.confSpace;
+			this.ffparams = confEcalc.ecalc.resPairCache.ffparams;
+			this.epart = confEcalc.epart;
+			this.eref = confEcalc.eref;
+			this.addResEntropy = confEcalc.addResEntropy;
+			this.isMinimizing = confEcalc.ecalc.isMinimizing;
+			this.infiniteWellEnergy = confEcalc.ecalc.infiniteWellEnergy;
+			this.alwaysResolveClashesEnergy = confEcalc.ecalc.alwaysResolveClashesEnergy;
+		}
+
+		synchronized ConfEnergyCalculator getConfEcalc() {
+			if (confEcalc == null) {
+				EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, ffparams)
+					.setParallelism(Parallelism.makeCpu(DistributedWorker.getNumThreads()))
+					.setIsMinimizing(isMinimizing)
+					.setInfiniteWellEnergy(infiniteWellEnergy)
+					.setAlwaysResolveClashesEnergy(alwaysResolveClashesEnergy)
+					.build();
+				confEcalc = new ConfEnergyCalculator.Builder(confSpace, ecalc)
+					.setEnergyPartition(epart)
+					.setReferenceEnergies(eref)
+					.addResEntropy(addResEntropy)
+					.build();
+			}
+			return confEcalc;
+		}
+	}
+
+	private static class EnergyResult implements Serializable {
+
+		private static final long serialVersionUID = 7512240129455384712L;
+
+		final double energy;
+		final double[] params;
+
+		EnergyResult(double energy, double[] params) {
+			this.energy = energy;
+			this.params = params;
+		}
+	}
+
+	private static class EnergyTask implements DistributedTaskExecutor.RemoteTask<EnergyResult> {
+
+		private static final long serialVersionUID = -3279302645263744125L;
+
+		final DistributedTaskExecutor.ContextRef<Recipe> recipe;
+		final RCTuple frag;
+		final String[] resNums1;
+		final String[] resNums2;
+		final double[] weights;
+		final double[] offsets;
+
+		EnergyTask(DistributedTaskExecutor.ContextRef<Recipe> recipe, RCTuple frag, ResidueInteractions inters) {
+			this.recipe = recipe;
+			this.frag = frag;
+
+			// residue interactions aren't serializable, so send the pairs instead
+			int n = inters.size();
+			resNums1 = new String[n];
+			resNums2 = new String[n];
+			weights = new double[n];
+			offsets = new double[n];
+			int i = 0;
+			for (ResidueInteractions.Pair pair : inters) {
+				resNums1[i] = pair.resNum1;
+				resNums2[i] = pair.resNum2;
+				weights[i] = pair.weight;
+				offsets[i] = pair.offset;
+				i++;
+			}
+		}
+
+		@Override
+		public EnergyResult run() {
+
+			ResidueInteractions inters = new ResidueInteractions();
+			for (int i=0; i<resNums1.length; i++) {
+				inters.addPair(resNums1[i], resNums2[i], weights[i], offsets[i]);
+			}
+
+			EnergyCalculator.EnergiedParametricMolecule epmol = recipe.get().getConfEcalc().calcEnergy(frag, inters);
+			return new EnergyResult(
+				epmol.energy,
+				epmol.params != null ? epmol.params.toArray() : null
+			);
+		}
+	}
+
+	public final DistributedTaskExecutor distributedTasks;
+
+	private final DistributedTaskExecutor.ContextRef<Recipe> recipe;
+
+	/**
+	 * @param confEcalc The local energy calculator to copy on the workers.
+	 * @param tasks The executor whose workers will compute the energies
+	 */
+	public DistributedConfEnergyCalculator(ConfEnergyCalculator confEcalc, DistributedTaskExecutor tasks) {
+		super(confEcalc.confSpace, confEcalc.ecalc, tasks, confEcalc.epart, confEcalc.eref, confEcalc.addResEntropy);
+		this.distributedTasks = tasks;
+		this.recipe = tasks.putContext(new Recipe(confEcalc));
+	}
+
+	@Override
+	public EnergyCalculator.EnergiedParametricMolecule calcEnergy(RCTuple frag, ResidueInteractions inters) {
+
+		numCalculations.incrementAndGet();
+		EnergyResult result = distributedTasks.call(new EnergyTask(recipe, frag, inters));
+
+		// rebuild the minimized pose
+		ParametricMolecule pmol = confSpace.makeMolecule(frag);
+		DoubleMatrix1D params = null;
+		if (result.params != null) {
+			params = DoubleFactory1D.dense.make(result.params);
+			for (int i=0; i<result.params.length; i++) {
+				pmol.dofs.get(i).apply(result.params[i]);
+			}
+		}
+
+		return new EnergyCalculator.EnergiedParametricMolecule(pmol, inters, params, result.energy);
+	}
+}
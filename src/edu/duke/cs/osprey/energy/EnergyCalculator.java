@@ -32,6 +32,7 @@
 
 package edu.duke.cs.osprey.energy;
 
+import java.io.File;
 import java.util.List;
 import java.util.function.Consumer;
 import java.util.stream.Collectors;
@@ -41,6 +42,7 @@ import cern.colt.matrix.DoubleMatrix1D;
 import edu.duke.cs.osprey.confspace.ParametricMolecule;
 import edu.duke.cs.osprey.confspace.SimpleConfSpace;
 import edu.duke.cs.osprey.confspace.SimpleConfSpace.DofTypes;
+import edu.duke.cs.osprey.energy.forcefield.AtomPairInfoCache;
 import edu.duke.cs.osprey.energy.forcefield.BigForcefieldEnergy;
 import edu.duke.cs.osprey.energy.forcefield.ForcefieldInteractions;
 import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
@@ -108,6 +110,22 @@ public class EnergyCalculator implements AutoCleanable {
 		private AtomConnectivity.Builder atomConnectivityBuilder = new AtomConnectivity.Builder();
 		private ResPairCache resPairCache;
 
+		/**
+		 * Residue pairs with identical atoms and forcefield parameters share precomputed forcefield
+		 * parameter tables through this cache, even across energy calculators and conformation spaces.
+		 * By default, all energy calculators in the process share one cache, sized to an eighth of the heap,
+		 * which drops its tables when the last energy calculator using it is cleaned up.
+		 * Set to null to give this energy calculator its own tables.
+		 */
+		private AtomPairInfoCache atomPairInfoCache = AtomPairInfoCache.Shared;
+
+		/**
+		 * If set, tables in this file are added to the atom pair info cache when the energy calculator is built,
+		 * and the cache is saved back to the file when the energy calculator is cleaned up,
+		 * so later runs can skip precomputing the tables.
+		 */
+		private File atomPairInfoCacheFile = null;
+
 		/** True to minimize continuous degrees of freedom in conformations. False to use only rigid structures. */
 		private boolean isMinimizing = true;
 
@@ -188,6 +206,16 @@ public class EnergyCalculator implements AutoCleanable {
 			return this;
 		}
 
+		public Builder setAtomPairInfoCache(AtomPairInfoCache val) {
+			atomPairInfoCache = val;
+			return this;
+		}
+
+		public Builder setAtomPairInfoCacheFile(File val) {
+			atomPairInfoCacheFile = val;
+			return this;
+		}
+
 		public Builder setIsMinimizing(boolean val) {
 			this.isMinimizing = val;
 			return this;
@@ -219,10 +247,18 @@ public class EnergyCalculator implements AutoCleanable {
 				AtomConnectivity connectivity = atomConnectivityBuilder
 					.setParallelism(Parallelism.makeCpu(parallelism.numThreads))
 					.build();
-				resPairCache = new ResPairCache(ffparams, connectivity);
+				resPairCache = new ResPairCache(ffparams, connectivity, atomPairInfoCache);
+			}
+
+			// read the atom pair info cache file if needed
+			if (atomPairInfoCacheFile != null && resPairCache.sharedInfos == null) {
+				throw new IllegalArgumentException("atom pair info cache file needs an atom pair info cache");
+			}
+			if (atomPairInfoCacheFile != null && atomPairInfoCacheFile.exists()) {
+				resPairCache.sharedInfos.load(atomPairInfoCacheFile);
 			}
 			
-			return new EnergyCalculator(parallelism, type, resPairCache, isMinimizing, infiniteWellEnergy, alwaysResolveClashesEnergy);
+			return new EnergyCalculator(parallelism, type, resPairCache, isMinimizing, infiniteWellEnergy, alwaysResolveClashesEnergy, atomPairInfoCacheFile);
 		}
 	}
 
@@ -535,8 +571,10 @@ public class EnergyCalculator implements AutoCleanable {
 	public final Double alwaysResolveClashesEnergy;
 
 	private final Type.Context cpuContext; // for vdW forcefields
+	private final File atomPairInfoCacheFile;
+	private boolean isCleaned = false;
 	
-	private EnergyCalculator(Parallelism parallelism, Type type, ResPairCache resPairCache, boolean isMinimizing, Double infiniteWellEnergy, Double alwaysResolveClashesEnergy) {
+	private EnergyCalculator(Parallelism parallelism, Type type, ResPairCache resPairCache, boolean isMinimizing, Double infiniteWellEnergy, Double alwaysResolveClashesEnergy, File atomPairInfoCacheFile) {
 
 		this.parallelism = parallelism;
 		this.tasks = parallelism.makeTaskExecutor();
@@ -546,6 +584,11 @@ public class EnergyCalculator implements AutoCleanable {
 		this.isMinimizing = isMinimizing;
 		this.infiniteWellEnergy = infiniteWellEnergy;
 		this.alwaysResolveClashesEnergy = alwaysResolveClashesEnergy;
+		this.atomPairInfoCacheFile = atomPairInfoCacheFile;
+
+		if (resPairCache.sharedInfos != null) {
+			resPairCache.sharedInfos.addUser();
+		}
 
 		// make a CPU context if we need to do vdW forcefields
 		// TODO: implement vdW forcefield on the GPU too?
@@ -568,12 +611,20 @@ public class EnergyCalculator implements AutoCleanable {
 		this.alwaysResolveClashesEnergy = parent.alwaysResolveClashesEnergy;
 
 		this.cpuContext = parent.cpuContext;
+		this.atomPairInfoCacheFile = null;
 	}
 	
 	@Override
 	public void clean() {
 		context.cleanup();
 		tasks.clean();
+		if (atomPairInfoCacheFile != null) {
+			resPairCache.sharedInfos.save(atomPairInfoCacheFile);
+		}
+		if (resPairCache.sharedInfos != null && !isCleaned) {
+			resPairCache.sharedInfos.removeUser();
+		}
+		isCleaned = true;
 	}
 	
 	/**
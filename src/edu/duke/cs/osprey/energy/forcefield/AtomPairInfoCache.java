@@ -0,0 +1,444 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.energy.forcefield;
+
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams.SolvationForcefield;
+import edu.duke.cs.osprey.energy.forcefield.ResPairCache.AtomPairInfo;
+import edu.duke.cs.osprey.structure.Atom;
+import edu.duke.cs.osprey.structure.AtomConnectivity.AtomPairs;
+import edu.duke.cs.osprey.structure.AtomNeighbors;
+import edu.duke.cs.osprey.structure.Residue;
+
+import java.io.*;
+import java.nio.file.Files;
+import java.nio.file.StandardCopyOption;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.function.Supplier;
+
+
+/**
+ * A thread-safe cache of precomputed forcefield parameters for residue pairs,
+ * keyed by the contents of the residues instead of by object identity.
+ *
+ * Every {@link ResPairCache} keeps its own cache of {@link AtomPairInfo} instances, but designs
+ * that use several energy calculators (eg, one for each K* state) would otherwise compute and
+ * store the same parameter tables once for each calculator. Residue pairs whose atoms,
+ * atom pairs, and forcefield parameters all match share one {@link AtomPairInfo} instead.
+ *
+ * The cache holds the least recently used tables to a memory budget. The cache can also be
+ * saved to a file and loaded again later, so later runs can skip the precomputation entirely.
+ */
+public class AtomPairInfoCache {
+
+	/** a 128-bit hash of everything an {@link AtomPairInfo} depends on */
+	public static class Key {
+
+		public final long hi;
+		public final long lo;
+
+		public Key(long hi, long lo) {
+			this.hi = hi;
+			this.lo = lo;
+		}
+
+		@Override
+		public int hashCode() {
+			return Long.hashCode(hi ^ lo);
+		}
+
+		@Override
+		public boolean equals(Object other) {
+			return other instanceof Key && equals((Key)other);
+		}
+
+		public boolean equals(Key other) {
+			return this.hi == other.hi && this.lo == other.lo;
+		}
+
+		@Override
+		public String toString() {
+			return String.format("%016x%016x", hi, lo);
+		}
+	}
+
+	private static class Hasher {
+
+		private long a = 0x6a09e667f3bcc908L;
+		private long b = 0xbb67ae8584caa73bL;
+
+		void add(long val) {
+			a = mix(a ^ val);
+			b = mix(Long.rotateLeft(b, 23) + val + 0x9e3779b97f4a7c15L);
+		}
+
+		void add(int val) {
+			add((long)val);
+		}
+
+		void add(boolean val) {
+			add(val ? 1L : 0L);
+		}
+
+		void add(double val) {
+			add(Double.doubleToLongBits(val));
+		}
+
+		void add(String val) {
+			if (val == null) {
+				add(-1L);
+				return;
+			}
+			add(val.length());
+			for (int i=0; i<val.length(); i++) {
+				add((long)val.charAt(i));
+			}
+		}
+
+		void add(byte[] val) {
+			add(val.length);
+			for (byte v : val) {
+				add((long)v);
+			}
+		}
+
+		Key makeKey() {
+			return new Key(mix(a ^ b), mix(b + 0x3c6ef372fe94f82bL));
+		}
+
+		private static long mix(long z) {
+			z = (z ^ (z >>> 30))*0xbf58476d1ce4e5b9L;
+			z = (z ^ (z >>> 27))*0x94d049bb133111ebL;
+			return z ^ (z >>> 31);
+		}
+	}
+
+	/**
+	 * Hashes the forcefield parameters, so keys made with different parameters never match.
+	 */
+	public static Key hashForcefieldParams(ForcefieldParams ffparams) {
+		try (ByteArrayOutputStream buf = new ByteArrayOutputStream()) {
+			try (ObjectOutputStream out = new ObjectOutputStream(buf)) {
+				out.writeObject(ffparams);
+			}
+			Hasher hasher = new Hasher();
+			hasher.add(buf.toByteArray());
+			return hasher.makeKey();
+		} catch (IOException ex) {
+			throw new RuntimeException("can't hash forcefield params", ex);
+		}
+	}
+
+	/**
+	 * Makes the key for the atom pair info of a residue pair.
+	 *
+	 * The key covers every property of the atoms the forcefield parameters depend on, including
+	 * the nearby bond structure used to assign solvation groups, so residues that were built from
+	 * the same template and protonation state get the same key, even in different conf spaces.
+	 */
+	public static Key makeKey(Key ffparamsKey, Residue res1, Residue res2, AtomPairs atomPairs, SolvationForcefield.ResiduesInfo solvInfo) {
+
+		Hasher hasher = new Hasher();
+		hasher.add(ffparamsKey.hi);
+		hasher.add(ffparamsKey.lo);
+
+		// solvation changes the layout of the precomputed values
+		hasher.add(solvInfo != null);
+		if (solvInfo != null) {
+			hasher.add(solvInfo.getClass().getName());
+			hasher.add(solvInfo.getNumPrecomputedPerAtomPair());
+		}
+
+		hashResidue(hasher, res1);
+		hasher.add(res1 == res2);
+		if (res1 != res2) {
+			hashResidue(hasher, res2);
+		}
+
+		for (AtomNeighbors.Type type : ResPairCache.AtomPairTypes) {
+			int[][] pairs = atomPairs.getPairs(type);
+			hasher.add(pairs.length);
+			for (int[] pair : pairs) {
+				hasher.add(pair[0]);
+				hasher.add(pair[1]);
+			}
+		}
+
+		return hasher.makeKey();
+	}
+
+	private static void hashResidue(Hasher hasher, Residue res) {
+		hasher.add(res.template != null ? res.template.name : null);
+		hasher.add(res.atoms.size());
+		for (Atom atom : res.atoms) {
+			hasher.add(atom.name);
+			hasher.add(atom.elementType);
+			hasher.add(atom.forceFieldType);
+			hasher.add(atom.type);
+			hasher.add(atom.charge);
+
+			// solvation groups depend on bonded atoms, and the atoms bonded to them
+			hasher.add(atom.bonds.size());
+			for (Atom bonded : atom.bonds) {
+				hasher.add(bonded.elementType);
+				hasher.add(bonded.bonds.size());
+				for (Atom bonded2 : bonded.bonds) {
+					hasher.add(bonded2.elementType);
+				}
+			}
+		}
+	}
+
+	public static long estimateNumBytes(AtomPairInfo info) {
+		return 64 + 8L*info.flags.length + 8L*info.precomputed.length;
+	}
+
+	/** an eighth of the max heap size, or 512 MiB if the heap has no limit */
+	public static final long DefaultMaxBytes = Runtime.getRuntime().maxMemory() == Long.MAX_VALUE
+		? 512L*1024L*1024L
+		: Runtime.getRuntime().maxMemory()/8;
+
+	/**
+	 * The cache used by all energy calculators in this process, unless they're configured otherwise.
+	 * It drops its tables when the last energy calculator using it is cleaned up.
+	 */
+	public static final AtomPairInfoCache Shared = new AtomPairInfoCache(DefaultMaxBytes, true);
+
+	private static final byte[] Magic = { 'A', 'P', 'I', 'C' };
+	private static final int Version = 1;
+
+	public final long maxBytes;
+	public final boolean clearWhenUnused;
+
+	private final LinkedHashMap<Key,AtomPairInfo> infos = new LinkedHashMap<>(16, 0.75f, true);
+	private long numBytes = 0;
+	private long numHits = 0;
+	private long numMisses = 0;
+	private int numUsers = 0;
+
+	public AtomPairInfoCache(long maxBytes) {
+		this(maxBytes, false);
+	}
+
+	/**
+	 * @param maxBytes The budget for the estimated size of cached tables, in bytes.
+	 *                 The most recently used table is always kept, even if it alone exceeds the budget.
+	 * @param clearWhenUnused True to drop all the tables when the last user of the cache
+	 *                        (see {@link #addUser}) is removed.
+	 */
+	public AtomPairInfoCache(long maxBytes, boolean clearWhenUnused) {
+		this.maxBytes = maxBytes;
+		this.clearWhenUnused = clearWhenUnused;
+	}
+
+	/** called by energy calculators that use this cache, so the cache knows when it's not needed anymore */
+	public synchronized void addUser() {
+		numUsers++;
+	}
+
+	public synchronized void removeUser() {
+		if (numUsers > 0) {
+			numUsers--;
+		}
+		if (numUsers == 0 && clearWhenUnused) {
+			clear();
+		}
+	}
+
+	public synchronized int getNumUsers() {
+		return numUsers;
+	}
+
+	public synchronized AtomPairInfo get(Key key) {
+		return infos.get(key);
+	}
+
+	/**
+	 * Gets the cached info for the key, or makes it if it's not cached yet.
+	 *
+	 * The info is made outside of the cache lock, so threads don't wait on each other's
+	 * precomputations. If two threads make the same info at once, they both get the first one cached.
+	 */
+	public AtomPairInfo getOrMake(Key key, Supplier<AtomPairInfo> factory) {
+
+		synchronized (this) {
+			AtomPairInfo info = infos.get(key);
+			if (info != null) {
+				numHits++;
+				return info;
+			}
+			numMisses++;
+		}
+
+		AtomPairInfo info = factory.get();
+
+		synchronized (this) {
+			AtomPairInfo existing = infos.get(key);
+			if (existing != null) {
+				return existing;
+			}
+			put(key, info);
+			return info;
+		}
+	}
+
+	public synchronized void put(Key key, AtomPairInfo info) {
+		AtomPairInfo oldInfo = infos.put(key, info);
+		if (oldInfo != null) {
+			numBytes -= estimateNumBytes(oldInfo);
+		}
+		numBytes += estimateNumBytes(info);
+		evict();
+	}
+
+	private void evict() {
+		Iterator<AtomPairInfo> iter = infos.values().iterator();
+		while (numBytes > maxBytes && infos.size() > 1) {
+			numBytes -= estimateNumBytes(iter.next());
+			iter.remove();
+		}
+	}
+
+	public synchronized int size() {
+		return infos.size();
+	}
+
+	/** the estimated size of the cached tables, in bytes */
+	public synchronized long getNumBytes() {
+		return numBytes;
+	}
+
+	public synchronized long getNumHits() {
+		return numHits;
+	}
+
+	public synchronized long getNumMisses() {
+		return numMisses;
+	}
+
+	public synchronized void clear() {
+		infos.clear();
+		numBytes = 0;
+	}
+
+	/**
+	 * Writes the cached tables to a file, replacing the file if it exists.
+	 */
+	public void save(File file) {
+
+		// copy the entries so we don't hold the lock while writing
+		List<Map.Entry<Key,AtomPairInfo>> entries;
+		synchronized (this) {
+			entries = new ArrayList<>(infos.entrySet());
+		}
+
+		File tmpFile = new File(file.getPath() + ".tmp");
+		try (DataOutputStream out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(tmpFile)))) {
+
+			out.write(Magic);
+			out.writeInt(Version);
+			out.writeInt(entries.size());
+
+			for (Map.Entry<Key,AtomPairInfo> entry : entries) {
+				Key key = entry.getKey();
+				AtomPairInfo info = entry.getValue();
+				out.writeLong(key.hi);
+				out.writeLong(key.lo);
+				out.writeInt(info.numAtomPairs);
+				out.writeInt(info.numPrecomputedPerAtomPair);
+				for (long flags : info.flags) {
+					out.writeLong(flags);
+				}
+				for (double val : info.precomputed) {
+					out.writeDouble(val);
+				}
+			}
+
+		} catch (IOException ex) {
+			throw new RuntimeException("can't write atom pair info cache to " + file.getAbsolutePath(), ex);
+		}
+
+		try {
+			Files.move(tmpFile.toPath(), file.toPath(), StandardCopyOption.REPLACE_EXISTING);
+		} catch (IOException ex) {
+			throw new RuntimeException("can't write atom pair info cache to " + file.getAbsolutePath(), ex);
+		}
+	}
+
+	/**
+	 * Adds the tables in the file to the cache, subject to the memory budget.
+	 *
+	 * @return the number of tables read from the file
+	 */
+	public int load(File file) {
+
+		try (DataInputStream in = new DataInputStream(new BufferedInputStream(new FileInputStream(file)))) {
+
+			byte[] magic = new byte[Magic.length];
+			in.readFully(magic);
+			if (!Arrays.equals(magic, Magic)) {
+				throw new IOException("not an atom pair info cache file");
+			}
+			int version = in.readInt();
+			if (version != Version) {
+				throw new IOException("unsupported atom pair info cache version: " + version);
+			}
+
+			int numEntries = in.readInt();
+			for (int i=0; i<numEntries; i++) {
+				Key key = new Key(in.readLong(), in.readLong());
+				int numAtomPairs = in.readInt();
+				int numPrecomputedPerAtomPair = in.readInt();
+				long[] flags = new long[numAtomPairs];
+				for (int j=0; j<flags.length; j++) {
+					flags[j] = in.readLong();
+				}
+				double[] precomputed = new double[numAtomPairs*numPrecomputedPerAtomPair];
+				for (int j=0; j<precomputed.length; j++) {
+					precomputed[j] = in.readDouble();
+				}
+				put(key, new AtomPairInfo(flags, precomputed, numPrecomputedPerAtomPair));
+			}
+
+			return numEntries;
+
+		} catch (IOException ex) {
+			throw new RuntimeException("can't read atom pair info cache from " + file.getAbsolutePath(), ex);
+		}
+	}
+}
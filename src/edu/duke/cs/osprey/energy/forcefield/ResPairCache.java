@@ -33,7 +33,9 @@
 package edu.duke.cs.osprey.energy.forcefield;
 
 import java.util.Arrays;
+import java.util.Collections;
 import java.util.IdentityHashMap;
+import java.util.List;
 import java.util.Map;
 
 import edu.duke.cs.osprey.energy.ResidueInteractions;
@@ -47,6 +49,12 @@ import edu.duke.cs.osprey.structure.Residue;
 import edu.duke.cs.osprey.structure.Residues;
 
 public class ResPairCache {
+
+	/** the kinds of atom pairs that get forcefield parameters, in order */
+	public static final List<AtomNeighbors.Type> AtomPairTypes = Collections.unmodifiableList(Arrays.asList(
+		AtomNeighbors.Type.BONDED14,
+		AtomNeighbors.Type.NONBONDED
+	));
 	
 	public static class ResPair {
 		
@@ -91,6 +99,13 @@ public class ResPairCache {
 		public final double[] precomputed;
 		public final int numPrecomputedPerAtomPair;
 		
+		public AtomPairInfo(long[] flags, double[] precomputed, int numPrecomputedPerAtomPair) {
+			this.numAtomPairs = flags.length;
+			this.flags = flags;
+			this.precomputed = precomputed;
+			this.numPrecomputedPerAtomPair = numPrecomputedPerAtomPair;
+		}
+		
 		public AtomPairInfo(Residue res1, Residue res2, ForcefieldParams ffparams, AtomPairs atomPairs, SolvationForcefield.ResiduesInfo solvInfo) {
 			
 			VdwParams vdwparams = new VdwParams();
@@ -112,7 +127,7 @@ public class ResPairCache {
 			int flagsIndex = 0;
 			int precomputedIndex = 0;
 			
-			for (AtomNeighbors.Type type : Arrays.asList(AtomNeighbors.Type.BONDED14, AtomNeighbors.Type.NONBONDED)) {
+			for (AtomNeighbors.Type type : AtomPairTypes) {
 				for (int[] atomPair : atomPairs.getPairs(type)) {
 			
 					Atom atom1 = res1.atoms.get(atomPair[0]);
@@ -152,13 +167,23 @@ public class ResPairCache {
 	
 	public final ForcefieldParams ffparams;
 	public final AtomConnectivity connectivity;
+
+	/** the content-keyed cache shared with other res pair caches, or null to not share */
+	public final AtomPairInfoCache sharedInfos;
 	
-	private Map<AtomPairs,AtomPairInfo> infos;
+	private final Map<AtomPairs,AtomPairInfo> infos;
+	private final AtomPairInfoCache.Key ffparamsKey;
 	
 	public ResPairCache(ForcefieldParams ffparams, AtomConnectivity connectivity) {
+		this(ffparams, connectivity, AtomPairInfoCache.Shared);
+	}
+	
+	public ResPairCache(ForcefieldParams ffparams, AtomConnectivity connectivity, AtomPairInfoCache sharedInfos) {
 		this.ffparams = ffparams;
 		this.connectivity = connectivity;
+		this.sharedInfos = sharedInfos;
 		this.infos = new IdentityHashMap<>();
+		this.ffparamsKey = sharedInfos != null ? AtomPairInfoCache.hashForcefieldParams(ffparams) : null;
 	}
 	
 	public ResPair get(Residues residues, ResidueInteractions.Pair pair, SolvationForcefield.ResiduesInfo solvInfo) {
@@ -176,18 +201,21 @@ public class ResPairCache {
 		}
 		
 		// look in the cache
-		AtomPairInfo info = infos.get(atomPairs);
+		AtomPairInfo info;
+		synchronized (infos) {
+			info = infos.get(atomPairs);
+		}
 		if (info == null) {
 			
-			// cache miss!
-			info = new AtomPairInfo(
-				res1, res2,
-				ffparams,
-				atomPairs,
-				solvInfo
-			);
+			// cache miss! try the shared cache before precomputing
+			info = makeInfo(res1, res2, atomPairs, solvInfo);
 			
-			infos.put(atomPairs, info);
+			synchronized (infos) {
+				AtomPairInfo existing = infos.putIfAbsent(atomPairs, info);
+				if (existing != null) {
+					info = existing;
+				}
+			}
 		}
 	
 		return new ResPair(
@@ -199,4 +227,14 @@ public class ResPairCache {
 			ffparams.solvScale
 		);
 	}
+	
+	private AtomPairInfo makeInfo(Residue res1, Residue res2, AtomPairs atomPairs, SolvationForcefield.ResiduesInfo solvInfo) {
+		
+		if (sharedInfos == null) {
+			return new AtomPairInfo(res1, res2, ffparams, atomPairs, solvInfo);
+		}
+		
+		AtomPairInfoCache.Key key = AtomPairInfoCache.makeKey(ffparamsKey, res1, res2, atomPairs, solvInfo);
+		return sharedInfos.getOrMake(key, () -> new AtomPairInfo(res1, res2, ffparams, atomPairs, solvInfo));
+	}
 }
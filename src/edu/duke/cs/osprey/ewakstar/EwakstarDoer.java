@@ -8,6 +8,7 @@ import edu.duke.cs.osprey.astar.seq.SeqAStarTree;
 import edu.duke.cs.osprey.astar.seq.order.SequentialSeqAStarOrder;
 import edu.duke.cs.osprey.astar.seq.scoring.NOPSeqAStarScorer;
 import edu.duke.cs.osprey.astar.seq.scoring.SeqAStarScorer;
+import edu.duke.cs.osprey.astar.seq.scoring.SeqHTable;
 import edu.duke.cs.osprey.confspace.*;
 import edu.duke.cs.osprey.ematrix.EnergyMatrix;
 import edu.duke.cs.osprey.ematrix.SimpleReferenceEnergies;
@@ -31,7 +32,6 @@ import java.math.BigInteger;
 import java.util.*;
 import java.util.concurrent.TimeUnit;
 import java.util.function.Function;
-import java.util.stream.Collectors;
 
 import static edu.duke.cs.osprey.tools.Log.formatBig;
 
@@ -118,117 +118,12 @@ public class EwakstarDoer {
      */
     private class SeqHScorer implements SeqAStarScorer {
 
-        MathTools.Optimizer opt = MathTools.Optimizer.Minimize;
-
-        // collect conf space positions from all states
-        List<SimpleConfSpace.Position> allPositions = new ArrayList<>();
-
-        // the states associated with each position
-        State statesByAllPosition;
-
-        SeqHScorer() {
-                for (SimpleConfSpace.Position pos : state.confSpace.positions) {
-                    allPositions.add(pos);
-                    statesByAllPosition = state;
-                }
-        }
+        // the inner minimizations don't depend on the sequence, so look them up from precomputed tables
+        SeqHTable table = getSeqHTable();
 
         @Override
         public double calc(SeqAStarNode.Assignments assignments) {
-
-            // TODO: if inner loops are independent of assignments, pre-compute them somehow?
-
-            double score = 0;
-            // sum over all positions
-            for (int i1=0; i1<allPositions.size(); i1++) {
-                SimpleConfSpace.Position pos1 = allPositions.get(i1);
-
-                // optimize over res types at pos1
-                double bestPos1Energy = opt.initDouble();
-                for (SeqSpace.ResType rt1 : getRTs(pos1, assignments)) {
-
-                    // min over RCs at (pos1,rt1,state)
-                    double bestRC1Energy = opt.initDouble();
-                    for (SimpleConfSpace.ResidueConf rc1 : getRCs(pos1, rt1, state)) {
-
-                        double rc1Energy = 0.0;
-
-                        // singles
-                        rc1Energy += state.getSingleEnergy(pos1.index, rc1.index);
-
-                        // pairs
-                        for (int i2=0; i2<pos1.index; i2++) {
-                            SimpleConfSpace.Position pos2 = state.confSpace.positions.get(i2);
-
-                            // min over RTs at pos2
-                            double bestRT2Energy = opt.initDouble();
-                            for (SeqSpace.ResType rt2 : getRTs(pos2, assignments)) {
-
-                                // min over RCs at (pos2,rt2,state)
-                                double bestRC2Energy = opt.initDouble();
-                                for (SimpleConfSpace.ResidueConf rc2 : getRCs(pos2, rt2, state)) {
-
-                                    double rc2Energy = state.getPairEnergy(pos1.index, rc1.index, pos2.index, rc2.index);
-
-                                    bestRC2Energy = opt.opt(bestRC2Energy, rc2Energy);
-                                }
-
-                                bestRT2Energy = opt.opt(bestRT2Energy, bestRC2Energy);
-                            }
-
-                            rc1Energy += bestRT2Energy;
-                        }
-
-                        bestRC1Energy = opt.opt(bestRC1Energy, rc1Energy);
-                    }
-
-                    bestPos1Energy = opt.opt(bestPos1Energy, bestRC1Energy);
-                }
-
-                score += bestPos1Energy;
-            }
-
-            return score;
-        }
-
-        List<SeqSpace.ResType> getRTs(SimpleConfSpace.Position confPos, SeqAStarNode.Assignments assignments) {
-
-            // TODO: pre-compute this somehow?
-
-            // map the conf pos to a sequence pos
-            SeqSpace.Position seqPos = seqSpace.getPosition(confPos.resNum);
-            if (seqPos != null) {
-
-                Integer assignedRT = assignments.getAssignment(seqPos.index);
-                if (assignedRT != null) {
-                    // use just the assigned res type
-                    return Collections.singletonList(seqPos.resTypes.get(assignedRT));
-                } else {
-                    // use all the res types at the pos
-                    return seqPos.resTypes;
-                }
-
-            } else {
-
-                // immutable position, use all the res types (should just be one)
-                assert (confPos.resTypes.size() == 1);
-
-                // use the null value to signal there's no res type here
-                return Collections.singletonList(null);
-            }
-        }
-
-        List<SimpleConfSpace.ResidueConf> getRCs(SimpleConfSpace.Position pos, SeqSpace.ResType rt, State state) {
-            // TODO: pre-compute this somehow?
-            if (rt != null) {
-                // mutable pos, grab the RCs that match the RT
-                return pos.resConfs.stream()
-                        .filter(rc -> rc.template.name.equals(rt.name))
-                        .collect(Collectors.toList());
-            } else {
-                // immutable pos, use all the RCs
-                return pos.resConfs;
-            }
+            return table.calc(assignments);
         }
     }
 
@@ -559,6 +454,7 @@ public class EwakstarDoer {
     public EwakstarDoer ewakstarDoerPL;
 
     private final Map<StateConfs.Key,StateConfs> stateConfsCache = new HashMap<>();
+    private SeqHTable seqHTable = null;
 
     private EwakstarDoer(State state, double eW, String mutableType, int numMutable, int numCPUs, boolean printToConsole, boolean seqFilterOnly, File logFile, int numEWAKStarSeqs, boolean useWtBenchmark, int orderOfMag, double pfEw, int numPfConfs, double epsilon, int numTopOverallSeqs) {
 
@@ -594,6 +490,15 @@ public class EwakstarDoer {
         log("sequence space has %s sequences\n%s", formatBig(new RTs(seqSpace).getNumSequences()), seqSpace);
     }
 
+    private SeqHTable getSeqHTable() {
+
+        // only recompute the tables if the energies changed
+        if (seqHTable == null || seqHTable.fragmentEnergies != state.fragmentEnergies) {
+            seqHTable = new SeqHTable(state.confSpace, seqSpace, state.fragmentEnergies);
+        }
+        return seqHTable;
+    }
+
     /**
      * find the best sequences as ranked by the objective function
      *
@@ -0,0 +1,264 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.externalMemory;
+
+import java.io.File;
+import java.io.IOException;
+import java.io.RandomAccessFile;
+import java.io.UncheckedIOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.channels.FileChannel;
+import java.util.ArrayDeque;
+import java.util.NoSuchElementException;
+
+import edu.duke.cs.osprey.confspace.ConfSearch.ScoredConf;
+
+/**
+ * A FIFO queue of scored conformations that keeps at most a fixed number of bytes
+ * worth of conformations in memory, and spills the rest to a temporary run file on disk.
+ *
+ * Records on disk are packed as int assignments followed by the double score,
+ * so the run file costs 4*numPos + 8 bytes per conformation.
+ * The run file is created when the queue first spills, and deleted whenever the queue drains it,
+ * so an idle queue holds no file handles. {@link #close()} deletes any run file that's left.
+ *
+ * Not thread-safe.
+ */
+public class SpillingScoredConfFIFO implements Queue.FIFO<ScoredConf>, AutoCloseable {
+
+	/** rough heap cost of a ScoredConf, not counting the assignments */
+	private static final long ConfOverheadBytes = 56;
+
+	private static final int IOBufferBytes = 64*1024;
+
+	public final long maxBytes;
+
+	private final ArrayDeque<ScoredConf> mem = new ArrayDeque<>();
+	private long size = 0;
+
+	private int numPos = -1;
+	private long confBytes;
+	private int recordBytes;
+
+	private File file = null;
+	private FileChannel channel = null;
+	private ByteBuffer writeBuf = null;
+	private ByteBuffer readBuf = null;
+	private long writePos = 0;
+	private long readPos = 0;
+	private long numSpilled = 0;
+	private long maxNumSpilled = 0;
+
+	public SpillingScoredConfFIFO(long maxBytes) {
+		if (maxBytes <= 0) {
+			throw new IllegalArgumentException("max bytes must be positive");
+		}
+		this.maxBytes = maxBytes;
+	}
+
+	public static SpillingScoredConfFIFO ofMiB(int maxMiB) {
+		return new SpillingScoredConfFIFO(maxMiB*1024L*1024L);
+	}
+
+	/** the number of conformations currently on disk */
+	public long getNumSpilled() {
+		return numSpilled;
+	}
+
+	/** the most conformations that were ever on disk at once */
+	public long getMaxNumSpilled() {
+		return maxNumSpilled;
+	}
+
+	/** the current run file, or null if nothing is on disk */
+	File getSpillFile() {
+		return file;
+	}
+
+	private long memCapacity() {
+		// always keep at least one conf in memory, so peek() has something to return
+		return Math.max(1, maxBytes/confBytes);
+	}
+
+	@Override
+	public void push(ScoredConf conf) {
+
+		if (numPos < 0) {
+			numPos = conf.getAssignments().length;
+			confBytes = ConfOverheadBytes + numPos*Integer.BYTES;
+			recordBytes = numPos*Integer.BYTES + Double.BYTES;
+		}
+
+		// once anything is on disk, everything newer has to go there too to keep the order
+		if (numSpilled == 0 && mem.size() < memCapacity()) {
+			mem.add(conf);
+		} else {
+			spill(conf);
+		}
+
+		size++;
+	}
+
+	@Override
+	public ScoredConf peek() {
+		if (mem.isEmpty() && numSpilled > 0) {
+			unspill();
+		}
+		return mem.peek();
+	}
+
+	@Override
+	public void pop() {
+		if (peek() == null) {
+			throw new NoSuchElementException();
+		}
+		mem.poll();
+		size--;
+	}
+
+	@Override
+	public long size() {
+		return size;
+	}
+
+	@Override
+	public boolean isEmpty() {
+		return size == 0;
+	}
+
+	private void spill(ScoredConf conf) {
+		try {
+
+			if (channel == null) {
+				file = File.createTempFile("osprey.confs.", ".spill");
+				channel = new RandomAccessFile(file, "rw").getChannel();
+				writePos = 0;
+				readPos = 0;
+				if (writeBuf == null) {
+					writeBuf = ByteBuffer.allocate(Math.max(IOBufferBytes, recordBytes)).order(ByteOrder.LITTLE_ENDIAN);
+					readBuf = ByteBuffer.allocate(Math.max(IOBufferBytes, recordBytes)).order(ByteOrder.LITTLE_ENDIAN);
+				}
+				writeBuf.clear();
+				readBuf.clear();
+				readBuf.flip();
+			}
+
+			if (writeBuf.remaining() < recordBytes) {
+				flushWrites();
+			}
+			for (int rc : conf.getAssignments()) {
+				writeBuf.putInt(rc);
+			}
+			writeBuf.putDouble(conf.getScore());
+
+			numSpilled++;
+			maxNumSpilled = Math.max(maxNumSpilled, numSpilled);
+
+		} catch (IOException ex) {
+			throw new UncheckedIOException("can't spill conformations to disk", ex);
+		}
+	}
+
+	private void flushWrites()
+	throws IOException {
+		writeBuf.flip();
+		while (writeBuf.hasRemaining()) {
+			writePos += channel.write(writeBuf, writePos);
+		}
+		writeBuf.clear();
+	}
+
+	private void unspill() {
+		try {
+
+			// make sure everything spilled so far is actually in the file
+			flushWrites();
+
+			// read back as many confs as fit in memory
+			long numToRead = Math.min(numSpilled, memCapacity());
+			for (long i=0; i<numToRead; i++) {
+
+				if (readBuf.remaining() < recordBytes) {
+					readBuf.compact();
+					while (readBuf.position() < recordBytes) {
+						int numBytes = channel.read(readBuf, readPos);
+						if (numBytes < 0) {
+							throw new IOException("conformation spill file ended early");
+						}
+						readPos += numBytes;
+					}
+					readBuf.flip();
+				}
+
+				int[] assignments = new int[numPos];
+				for (int j=0; j<numPos; j++) {
+					assignments[j] = readBuf.getInt();
+				}
+				mem.add(new ScoredConf(assignments, readBuf.getDouble()));
+			}
+			numSpilled -= numToRead;
+
+			// if the file is drained, get rid of it, and make a new one if we spill again
+			if (numSpilled == 0) {
+				deleteFile();
+			}
+
+		} catch (IOException ex) {
+			throw new UncheckedIOException("can't read spilled conformations from disk", ex);
+		}
+	}
+
+	private void deleteFile() {
+		if (channel != null) {
+			try {
+				channel.close();
+			} catch (IOException ex) {
+				// don't care, we're deleting the file anyway
+			}
+			channel = null;
+		}
+		if (file != null) {
+			file.delete();
+			file = null;
+		}
+	}
+
+	@Override
+	public void close() {
+		deleteFile();
+		mem.clear();
+		size = 0;
+		numSpilled = 0;
+	}
+}
@@ -9,10 +9,10 @@ import edu.duke.cs.osprey.astar.seq.SeqAStarTree;
 import edu.duke.cs.osprey.astar.seq.order.SequentialSeqAStarOrder;
 import edu.duke.cs.osprey.astar.seq.scoring.NOPSeqAStarScorer;
 import edu.duke.cs.osprey.astar.seq.scoring.SeqAStarScorer;
+import edu.duke.cs.osprey.astar.seq.scoring.SeqHTable;
 import edu.duke.cs.osprey.confspace.*;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.tools.HashCalculator;
-import edu.duke.cs.osprey.tools.MathTools;
 
 import java.io.File;
 import java.io.FileWriter;
@@ -183,123 +183,25 @@ public class Comets {
 	 */
 	private class SeqHScorer implements SeqAStarScorer {
 
-		MathTools.Optimizer opt = MathTools.Optimizer.Minimize;
-
-		// collect conf space positions from all states
-		List<SimpleConfSpace.Position> allPositions = new ArrayList<>();
-
-		// the states associated with each position
-		List<WeightedState> statesByAllPosition = new ArrayList<>();
+		// the inner minimizations don't depend on the sequence, so look them up from precomputed tables
+		List<SeqHTable> tables = new ArrayList<>();
 
 		SeqHScorer() {
 			for (WeightedState wstate : objective.states) {
-				for (SimpleConfSpace.Position pos : wstate.state.confSpace.positions) {
-					allPositions.add(pos);
-					statesByAllPosition.add(wstate);
-				}
+				tables.add(getSeqHTable(wstate.state));
 			}
 		}
 
 		@Override
 		public double calc(SeqAStarNode.Assignments assignments) {
 
-			// TODO: if inner loops are independent of assignments, pre-compute them somehow?
-
-			// sum over all positions
+			// sum over states
 			double score = objective.offset;
-			for (int i1=0; i1<allPositions.size(); i1++) {
-				SimpleConfSpace.Position pos1 = allPositions.get(i1);
-
-				// optimize over res types at pos1
-				double bestPos1Energy = opt.initDouble();
-				for (SeqSpace.ResType rt1 : getRTs(pos1, assignments)) {
-
-					// sum over states (always just 1, due to how we build allPositions)
-					WeightedState wstate = statesByAllPosition.get(i1);
-
-					// min over RCs at (pos1,rt1,state)
-					double bestRC1Energy = opt.initDouble();
-					for (SimpleConfSpace.ResidueConf rc1 : getRCs(pos1, rt1, wstate.state)) {
-
-						double rc1Energy = 0.0;
-
-						// singles
-						rc1Energy += wstate.getSingleEnergy(pos1.index, rc1.index);
-
-						// pairs
-						for (int i2=0; i2<pos1.index; i2++) {
-							SimpleConfSpace.Position pos2 = wstate.state.confSpace.positions.get(i2);
-
-							// min over RTs at pos2
-							double bestRT2Energy = opt.initDouble();
-							for (SeqSpace.ResType rt2 : getRTs(pos2, assignments)) {
-
-								// min over RCs at (pos2,rt2,state)
-								double bestRC2Energy = opt.initDouble();
-								for (SimpleConfSpace.ResidueConf rc2 : getRCs(pos2, rt2, wstate.state)) {
-
-									double rc2Energy = wstate.getPairEnergy(pos1.index, rc1.index, pos2.index, rc2.index);
-
-									bestRC2Energy = opt.opt(bestRC2Energy, rc2Energy);
-								}
-
-								bestRT2Energy = opt.opt(bestRT2Energy, bestRC2Energy);
-							}
-
-							rc1Energy += bestRT2Energy;
-						}
-
-						bestRC1Energy = opt.opt(bestRC1Energy, rc1Energy);
-					}
-
-					bestPos1Energy = opt.opt(bestPos1Energy, bestRC1Energy);
-				}
-
-				score += bestPos1Energy;
+			for (int i=0; i<objective.states.size(); i++) {
+				score += Math.abs(objective.states.get(i).weight)*tables.get(i).calc(assignments);
 			}
-
 			return score;
 		}
-
-		List<SeqSpace.ResType> getRTs(SimpleConfSpace.Position confPos, SeqAStarNode.Assignments assignments) {
-
-			// TODO: pre-compute this somehow?
-
-			// map the conf pos to a sequence pos
-			SeqSpace.Position seqPos = seqSpace.getPosition(confPos.resNum);
-			if (seqPos != null) {
-
-				Integer assignedRT = assignments.getAssignment(seqPos.index);
-				if (assignedRT != null) {
-					// use just the assigned res type
-					return Collections.singletonList(seqPos.resTypes.get(assignedRT));
-				} else {
-					// use all the res types at the pos
-					return seqPos.resTypes;
-				}
-
-			} else {
-
-				// immutable position, use all the res types (should just be one)
-				assert (confPos.resTypes.size() == 1);
-
-				// use the null value to signal there's no res type here
-				return Collections.singletonList(null);
-			}
-		}
-
-		List<SimpleConfSpace.ResidueConf> getRCs(SimpleConfSpace.Position pos, SeqSpace.ResType rt, State state) {
-			// TODO: pre-compute this somehow?
-			if (rt != null) {
-				// mutable pos, grab the RCs that match the RT
-				return pos.resConfs.stream()
-					.filter(rc -> rc.template.name.equals(rt.name))
-					.collect(Collectors.toList());
-			} else {
-				// immutable pos, use all the RCs
-				return pos.resConfs;
-			}
-		}
 	}
 
 	private class ConfDBs extends ConfDB.DBs {
@@ -644,6 +546,7 @@ public class Comets {
 
 	private final Map<StateConfs.Key,StateConfs> stateConfsCache = new HashMap<>();
 	private final ConfSearchCache confTrees;
+	private final Map<SimpleConfSpace,SeqHTable> seqHTables = new HashMap<>();
 
 	private Comets(LME objective, List<LME> constraints, double objectiveWindowSize, double objectiveWindowMax, int maxSimultaneousMutations, Integer minNumConfTrees, boolean printToConsole, File logFile) {
 
@@ -791,6 +694,17 @@ public class Comets {
 		return infos;
 	}
 
+	private SeqHTable getSeqHTable(State state) {
+
+		// states with the same conf space and energies can share tables
+		SeqHTable table = seqHTables.get(state.confSpace);
+		if (table == null || table.fragmentEnergies != state.fragmentEnergies) {
+			table = new SeqHTable(state.confSpace, seqSpace, state.fragmentEnergies);
+			seqHTables.put(state.confSpace, table);
+		}
+		return table;
+	}
+
 	private void log(String msg, Object ... args) {
 		if (printToConsole) {
 			edu.duke.cs.osprey.tools.Log.log(msg, args);
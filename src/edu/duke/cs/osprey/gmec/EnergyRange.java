@@ -34,7 +34,8 @@ package edu.duke.cs.osprey.gmec;
 
 public class EnergyRange {
 	
-	private double min;
+	// written by listener threads, read by A* threads
+	private volatile double min;
 	private double size;
 	
 	public EnergyRange(double energy, double size) {
@@ -50,6 +50,10 @@ import edu.duke.cs.osprey.tools.*;
 
 import java.io.*;
 import java.util.*;
+import java.util.concurrent.ArrayBlockingQueue;
+import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
 
 import static edu.duke.cs.osprey.tools.Log.formatBig;
 
@@ -100,6 +104,17 @@ public class SimpleGMECFinder {
 		 * design state and resume the calculation close to where it was aborted. Set a file to turn on the conf DB.
 		 */
 		protected File confDB = null;
+
+		/**
+		 * True to enumerate conformations with A* on a separate thread while the energy calculator
+		 * minimizes them, instead of enumerating the whole energy window before minimizing.
+		 * Enumerated conformations wait in a bounded queue until a minimizer is free.
+		 * A* and minimizer throughputs are reported separately, to help choose the parallelism.
+		 */
+		protected boolean pipelined = false;
+
+		/** The most enumerated conformations that can wait for minimization in pipelined mode */
+		protected int pipelineQueueSize = 1024;
 		
 		public Builder(ConfSearch search, ConfEnergyCalculator confEcalc) {
 			this.search = search;
@@ -147,6 +162,19 @@ public class SimpleGMECFinder {
 			return this;
 		}
 
+		public Builder setPipelined(boolean val) {
+			pipelined = val;
+			return this;
+		}
+
+		public Builder setPipelineQueueSize(int val) {
+			if (val <= 0) {
+				throw new IllegalArgumentException("pipeline queue size must be positive");
+			}
+			pipelineQueueSize = val;
+			return this;
+		}
+
 		public SimpleGMECFinder build() {
 			return new SimpleGMECFinder(
 				search,
@@ -157,7 +185,9 @@ public class SimpleGMECFinder {
 				printIntermediateConfsToConsole,
 				printToConsole,
 				useExternalMemory,
-				confDB
+				confDB,
+				pipelined,
+				pipelineQueueSize
 			);
 		}
 	}
@@ -169,6 +199,8 @@ public class SimpleGMECFinder {
 	public final ConfPrinter consolePrinter;
 	public final boolean printIntermediateConfsToConsole;
 	public final boolean printToConsole;
+	public final boolean pipelined;
+	public final int pipelineQueueSize;
 	
 	private final Queue.Factory.FIFO<ScoredConf> scoredFifoFactory;
 	private final Queue.Factory.FIFO<EnergiedConf> energiedFifoFactory;
@@ -176,6 +208,10 @@ public class SimpleGMECFinder {
 	private final File confDBFile;
 
 	protected SimpleGMECFinder(ConfSearch search, ConfEnergyCalculator confEcalc, ConfPruner pruner, ConfPrinter logPrinter, ConfPrinter consolePrinter, boolean printIntermediateConfsToConsole, boolean printToConsole, boolean useExternalMemory, File confDBFile) {
+		this(search, confEcalc, pruner, logPrinter, consolePrinter, printIntermediateConfsToConsole, printToConsole, useExternalMemory, confDBFile, false, 1024);
+	}
+
+	protected SimpleGMECFinder(ConfSearch search, ConfEnergyCalculator confEcalc, ConfPruner pruner, ConfPrinter logPrinter, ConfPrinter consolePrinter, boolean printIntermediateConfsToConsole, boolean printToConsole, boolean useExternalMemory, File confDBFile, boolean pipelined, int pipelineQueueSize) {
 		this.search = search;
 		this.confEcalc = confEcalc;
 		this.pruner = pruner;
@@ -184,6 +220,8 @@ public class SimpleGMECFinder {
 		this.printIntermediateConfsToConsole = printIntermediateConfsToConsole;
 		this.printToConsole = printToConsole;
 		this.confDBFile = confDBFile;
+		this.pipelined = pipelined;
+		this.pipelineQueueSize = pipelineQueueSize;
 		
 		if (useExternalMemory) {
 			RCs rcs = new RCs(confEcalc.confSpace);
@@ -284,7 +322,11 @@ public class SimpleGMECFinder {
 				Queue<EnergiedConf> econfs = energiedPriorityFactory.make();
 				econfs.push(eMinScoreConf);
 
-				checkMoreConfs(unpeekedConfs, erange, econfs, confTable);
+				if (pipelined) {
+					checkMoreConfsPipelined(unpeekedConfs, erange, econfs, confTable);
+				} else {
+					checkMoreConfs(unpeekedConfs, erange, econfs, confTable);
+				}
 				log("checked %d conformations", econfs.size());
 
 				// econfs are in a priority queue, so the first one is the GMEC
@@ -440,6 +482,196 @@ public class SimpleGMECFinder {
 		confEcalc.tasks.waitForFinish();
 	}
 
+	private static final ScoredConf EndOfConfs = new ScoredConf(new int[0], Double.NaN);
+
+	private void checkMoreConfsPipelined(ConfSearch search, EnergyRange erange, Queue<EnergiedConf> econfs, ConfDB.ConfTable confTable) {
+
+		setErangeProgress(search, erange);
+
+		log("Enumerating and minimizing other low-scoring conformations...");
+		log("\t(A* on its own thread, %d minimizer(s), queue size %d)", confEcalc.tasks.getParallelism(), pipelineQueueSize);
+
+		BlockingQueue<ScoredConf> pipeline = new ArrayBlockingQueue<>(pipelineQueueSize);
+		AtomicBoolean isStopped = new AtomicBoolean(false);
+		Stopwatch totalStopwatch = new Stopwatch().start();
+
+		// the producer: stream confs from A* into the queue, until we leave the energy window
+		Stopwatch astarStopwatch = new Stopwatch();
+		Stopwatch producerBlockedStopwatch = new Stopwatch();
+		long[] numEnumerated = { 0 };
+		Throwable[] producerError = { null };
+		Thread producer = new Thread(() -> {
+			try {
+				while (!isStopped.get()) {
+
+					// get the next conf, or stop searching if none left
+					astarStopwatch.resume();
+					ScoredConf conf = search.nextConf();
+					astarStopwatch.stop();
+					if (conf == null) {
+						break;
+					}
+
+					// A* is sorted by score, so stop at the first conf out of range
+					// (the window only shrinks as minimizations finish)
+					if (conf.getScore() > erange.getMax()) {
+						break;
+					}
+					numEnumerated[0]++;
+
+					// wait for room in the queue
+					producerBlockedStopwatch.resume();
+					try {
+						while (!pipeline.offer(conf, 100, TimeUnit.MILLISECONDS)) {
+							if (isStopped.get()) {
+								return;
+							}
+						}
+					} finally {
+						producerBlockedStopwatch.stop();
+					}
+
+					// if we're exactly at the limit, stop after saving the conf
+					if (conf.getScore() == erange.getMax()) {
+						break;
+					}
+				}
+			} catch (Throwable t) {
+				producerError[0] = t;
+			} finally {
+				if (astarStopwatch.isRunning()) {
+					astarStopwatch.stop();
+				}
+				// tell the consumer we're done, unless it already quit
+				try {
+					while (!pipeline.offer(EndOfConfs, 100, TimeUnit.MILLISECONDS)) {
+						if (isStopped.get()) {
+							break;
+						}
+					}
+				} catch (InterruptedException ex) {
+					Thread.currentThread().interrupt();
+				}
+			}
+		});
+		producer.setName("GMEC A*");
+		producer.setDaemon(true);
+		producer.start();
+
+		// track minimization progress, although we don't know the total until A* is done,
+		// so keep the total one ahead of the confs sent so far, to not finish early
+		Progress progress;
+		if (printToConsole) {
+			progress = new Progress(1);
+		} else {
+			progress = null;
+		}
+
+		// what to do when we get a conf energy?
+		long[] numMinimized = { 0 };
+		TaskListener<EnergiedConf> ecalcListener = (econf) -> {
+
+			// NOTE: this is called on a listener thread, which is separate from the main thread
+
+			handleEnergiedConf(econf, econfs, erange);
+			numMinimized[0]++;
+
+			// refine the estimate of the top of the energy window
+			boolean changed = erange.updateMin(econf.getEnergy());
+			if (changed) {
+				log("\nNew lowest energy: %.6f", erange.getMin());
+				setErangeProgress(search, erange);
+			}
+
+			if (progress != null) {
+				synchronized (progress) {
+					progress.incrementProgress();
+				}
+			}
+		};
+
+		// the consumer: send confs from the queue to the minimizers
+		Stopwatch consumerWaitingStopwatch = new Stopwatch();
+		long numSkipped = 0;
+		long numSubmitted = 0;
+		try {
+			while (true) {
+
+				consumerWaitingStopwatch.resume();
+				ScoredConf conf = pipeline.poll(100, TimeUnit.MILLISECONDS);
+				consumerWaitingStopwatch.stop();
+				if (conf == EndOfConfs) {
+					break;
+				}
+				if (conf == null) {
+					// the producer should always send the end marker, but don't wait forever if it couldn't
+					if (!producer.isAlive() && pipeline.isEmpty()) {
+						break;
+					}
+					continue;
+				}
+
+				// check the stopping criterion incrementally:
+				// once a conf is out of the latest window, all the later confs are too
+				if (isStopped.get() || !erange.containsOrBelow(conf.getScore())) {
+					isStopped.set(true);
+					numSkipped += 1 + pipeline.size();
+					pipeline.clear();
+					continue;
+				}
+
+				numSubmitted++;
+				if (progress != null) {
+					synchronized (progress) {
+						progress.setTotalWork(numSubmitted + 1);
+					}
+				}
+
+				// send the conf to the energy calculator
+				// (this blocks when all the minimizers are busy, which backs up the queue)
+				confEcalc.calcEnergyAsync(conf, confTable, ecalcListener);
+			}
+			producer.join();
+		} catch (InterruptedException ex) {
+			Thread.currentThread().interrupt();
+			throw new RuntimeException("interrupted while minimizing conformations", ex);
+		} finally {
+			isStopped.set(true);
+			confEcalc.tasks.waitForFinish();
+		}
+
+		// now we know the total, so finish the progress
+		if (progress != null && numSubmitted > 0) {
+			synchronized (progress) {
+				progress.setTotalWork(numSubmitted);
+				progress.setProgress(progress.getNumWorkDone());
+			}
+		}
+
+		if (producerError[0] != null) {
+			throw new RuntimeException("A* failed while enumerating conformations", producerError[0]);
+		}
+
+		// report throughputs, so users can see which side of the pipeline to give more resources
+		double totalS = totalStopwatch.stop().getTimeS();
+		double astarS = astarStopwatch.getTimeS();
+		log("\tA* enumerated %d conformations in %s (%.1f confs/s), waited %s for minimizers",
+			numEnumerated[0],
+			astarStopwatch.getTime(1),
+			astarS > 0 ? numEnumerated[0]/astarS : 0.0,
+			producerBlockedStopwatch.getTime(1)
+		);
+		log("\tminimized %d conformations in %s (%.1f confs/s), waited %s for A*",
+			numMinimized[0],
+			totalStopwatch.getTime(1),
+			totalS > 0 ? numMinimized[0]/totalS : 0.0,
+			consumerWaitingStopwatch.getTime(1)
+		);
+		if (numSkipped > 0) {
+			log("\tskipped %d enumerated conformations above the refined energy window", numSkipped);
+		}
+	}
+
 	private void setErangeProgress(ConfSearch confSearch, EnergyRange erange) {
 		
 		// HACKHACK: set progress goal
@@ -32,6 +32,8 @@
 
 package edu.duke.cs.osprey.handlempi;
 
+import edu.duke.cs.osprey.parallelism.DistributedTaskExecutor;
+
 import java.util.ArrayList;
 
 /**
@@ -47,9 +49,16 @@ public class MPIMaster {
     
     static int processRank = 0;
     
+    //if set, tasks are farmed out to the workers of this executor instead of running locally
+    private static DistributedTaskExecutor executor = null;
+    
     private MPIMaster() {
     }
     
+    public static void setExecutor(DistributedTaskExecutor val){
+        executor = val;
+    }
+    
     public static void printIfMaster(String output){
         //print the string if called at the master node.  Otherwise do nothing.  
         if(processRank==0)
@@ -66,13 +75,31 @@ public class MPIMaster {
     public ArrayList<Object> handleTasks(ArrayList<MPISlaveTask> tasks) {
         //Given the list of tasks, return their results in the same order
         
-        //DEBUG!!!!
-        //BEFORE WE IMPLEMENT MPI JUST DO THESE LOCALLY
-        ArrayList<Object> ans = new ArrayList<>();
-        for(MPISlaveTask task : tasks){
-            ans.add( task.doCalculation() );
+        if(executor==null){
+            //no workers, just do these locally
+            ArrayList<Object> ans = new ArrayList<>();
+            for(MPISlaveTask task : tasks){
+                ans.add( task.doCalculation() );
+            }
+            return ans;
         }
-        return ans;
+        
+        //send the tasks to the workers, and put the results back in order as they come in
+        Object[] ans = new Object[tasks.size()];
+        for(int i=0; i<tasks.size(); i++){
+            final int index = i;
+            MPISlaveTask task = tasks.get(i);
+            executor.submit(
+                (DistributedTaskExecutor.RemoteTask<Object>)task::doCalculation,
+                (result) -> ans[index] = result
+            );
+        }
+        executor.waitForFinish();
+        
+        ArrayList<Object> ansList = new ArrayList<>();
+        for(Object result : ans)
+            ansList.add(result);
+        return ansList;
     }
     
     private static class MPIMasterHolder {
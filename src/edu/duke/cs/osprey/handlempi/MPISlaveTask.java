@@ -32,16 +32,19 @@
 
 package edu.duke.cs.osprey.handlempi;
 
+import java.io.Serializable;
+
 /**
  *
  * @author mhall44
  */
 //Jobs for MPI are handled by creating a bunch of MPISlaveTask objects
 //these are farmed out to various slave nodes
+//(so they, and their results, must be serializable)
 //they doCalculation and return whatever they're supposed to
 //which can then be cast by the master to the form used by the task calling the master
 
-public interface MPISlaveTask {
+public interface MPISlaveTask extends Serializable {
     
     Object doCalculation();
     
@@ -32,6 +32,7 @@
 
 package edu.duke.cs.osprey.kstar;
 
+import edu.duke.cs.osprey.astar.conf.ConfSearchCache;
 import edu.duke.cs.osprey.astar.conf.RCs;
 import edu.duke.cs.osprey.confspace.*;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
@@ -43,6 +44,8 @@ import edu.duke.cs.osprey.tools.MathTools;
 import java.io.File;
 import java.math.BigDecimal;
 import java.util.*;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Future;
 
 
 /**
@@ -74,6 +77,18 @@ public class BBKStar {
 			 */
 			private int numConfsPerBatch = 8;
 
+			/**
+			 * Memory budget (in MiB) for the conformation trees of partition functions
+			 * that are still being refined, or null for no budget.
+			 *
+			 * BBK* keeps a partition function for every sequence it has visited, and each one
+			 * holds an A* tree that can grow very large. When the estimated size of the trees
+			 * exceeds this budget, the trees for the least recently refined sequences are dropped.
+			 * The partition function bounds are kept, and a dropped tree is re-instantiated and
+			 * enumerated back to its last position if BBK* ever returns to that sequence.
+			 */
+			private Integer confTreesMiB = null;
+
 			public Builder setNumBestSequences(int val) {
 				numBestSequences = val;
 				return this;
@@ -84,17 +99,24 @@ public class BBKStar {
 				return this;
 			}
 
+			public Builder setConfTreesMiB(Integer val) {
+				confTreesMiB = val;
+				return this;
+			}
+
 			public Settings build() {
-				return new Settings(numBestSequences, numConfsPerBatch);
+				return new Settings(numBestSequences, numConfsPerBatch, confTreesMiB);
 			}
 		}
 
 		public final int numBestSequences;
 		public final int numConfsPerBatch;
+		public final Integer confTreesMiB;
 
-		public Settings(int numBestSequences, int numConfsPerBatch) {
+		public Settings(int numBestSequences, int numConfsPerBatch, Integer confTreesMiB) {
 			this.numBestSequences = numBestSequences;
 			this.numConfsPerBatch = numConfsPerBatch;
+			this.confTreesMiB = confTreesMiB;
 		}
 	}
 
@@ -115,6 +137,9 @@ public class BBKStar {
 
 		public File confDBFile = null;
 
+		/** overrides {@link KStar.Settings#confBufferMiB} for this conf space, if not null */
+		public Integer confBufferMiB = null;
+
 		private BigDecimal stabilityThreshold = null;
 
 		public ConfSpaceInfo(SimpleConfSpace confSpace, KStar.ConfSpaceType type) {
@@ -138,6 +163,18 @@ public class BBKStar {
 		public void setConfDBFile(String path) {
 			confDBFile = new File(path);
 		}
+
+		private ConfSearch makeConfSearchMinimized(RCs rcs) {
+			synchronized (confSearchFactoryMinimized) { // factories can be implemented in Python, don't call them concurrently
+				return confSearchFactoryMinimized.make(rcs);
+			}
+		}
+
+		private ConfSearch makeConfSearchRigid(RCs rcs) {
+			synchronized (confSearchFactoryRigid) { // factories can be implemented in Python, don't call them concurrently
+				return confSearchFactoryRigid.make(rcs);
+			}
+		}
 	}
 
 	private class ConfDBs {
@@ -243,6 +280,25 @@ public class BBKStar {
 		@Override
 		public void estimateScore() {
 
+			// did we already estimate this node before the last checkpoint?
+			if (checkpoint != null) {
+				KStarCheckpoint.SequenceBound bound = checkpoint.getBound(sequence);
+				if (bound != null) {
+					score = bound.score;
+					isUnboundUnstable = bound.isUnboundUnstable;
+					return;
+				}
+			}
+
+			calcScore();
+
+			if (checkpoint != null) {
+				checkpoint.putBound(sequence, new KStarCheckpoint.SequenceBound(score, isUnboundUnstable));
+			}
+		}
+
+		private void calcScore() {
+
 			// TODO: expose setting?
 			// NOTE: for the correctness of the bounds, the number of confs must be the same for every node
 			// meaning, it might not be sound to do epsilon-based iterative approximations here
@@ -308,7 +364,7 @@ public class BBKStar {
 			// but use rigid energies instead of minimized energies
 
 			RCs rcs = sequence.makeRCs(info.confSpace);
-			ConfSearch astar = info.confSearchFactoryRigid.make(rcs);
+			ConfSearch astar = info.makeConfSearchRigid(rcs);
 			BoltzmannCalculator bcalc = new BoltzmannCalculator(PartitionFunction.decimalPrecision);
 
 			BigMath m = new BigMath(PartitionFunction.decimalPrecision)
@@ -331,7 +387,7 @@ public class BBKStar {
 
 			RCs rcs = sequence.makeRCs(info.confSpace);
 			UpperBoundCalculator calc = new UpperBoundCalculator(
-				info.confSearchFactoryMinimized.make(rcs),
+				info.makeConfSearchMinimized(rcs),
 				rcs.getNumConformations()
 			);
 			calc.run(numConfs);
@@ -367,12 +423,30 @@ public class BBKStar {
 			// filter the global sequence to this conf space
 			Sequence sequence = this.sequence.filter(info.confSpace.seqSpace);
 
+			// nodes can be made on many threads at once, but each pfunc should only be made once
+			synchronized (pfuncCache) {
+				return makePfunc(pfuncCache, info, confdb, sequence);
+			}
+		}
+
+		private PartitionFunction makePfunc(Map<Sequence,PartitionFunction> pfuncCache, ConfSpaceInfo info, ConfDB confdb, Sequence sequence) {
+
 			// first check the cache
 			PartitionFunction pfunc = pfuncCache.get(sequence);
 			if (pfunc != null) {
 				return pfunc;
 			}
 
+			// was the partition function finished before the last checkpoint?
+			if (checkpoint != null) {
+				PartitionFunction.Result result = checkpoint.getPfunc(info.id, sequence);
+				if (result != null) {
+					pfunc = new KStarCheckpoint.FinishedPfunc(result);
+					pfuncCache.put(sequence, pfunc);
+					return pfunc;
+				}
+			}
+
 			// cache miss, need to compute the partition function
 
 			// make the partition function
@@ -385,7 +459,11 @@ public class BBKStar {
 			if (kstarSettings.useExternalMemory) {
 				PartitionFunction.WithExternalMemory.setOrThrow(pfunc, true, rcs);
 			}
-			ConfSearch astar = info.confSearchFactoryMinimized.make(rcs);
+			Integer confBufferMiB = info.confBufferMiB != null ? info.confBufferMiB : kstarSettings.confBufferMiB;
+			if (confBufferMiB != null) {
+				PartitionFunction.WithConfBufferLimit.setOrThrow(pfunc, confBufferMiB);
+			}
+			ConfSearch astar = confTrees.make(() -> info.makeConfSearchMinimized(rcs));
 			pfunc.init(astar, rcs.getNumConformations(), kstarSettings.epsilon);
 			pfunc.setStabilityThreshold(info.stabilityThreshold);
 
@@ -400,38 +478,38 @@ public class BBKStar {
 			// tank the sequence if either unbound strand is unstable
 			// yeah, we haven't refined any pfuncs yet this estimation,
 			// but since pfuncs get cached, check before we do any more estimation
-			if (protein.getStatus() == PartitionFunction.Status.Unstable
-				|| ligand.getStatus() == PartitionFunction.Status.Unstable) {
+			if (getStatus(protein) == PartitionFunction.Status.Unstable
+				|| getStatus(ligand) == PartitionFunction.Status.Unstable) {
 				score = Double.NEGATIVE_INFINITY;
 				isUnboundUnstable = true;
 				return;
 			}
 
 			// refine the pfuncs if needed
-			if (protein.getStatus().canContinue()) {
-				protein.compute(bbkstarSettings.numConfsPerBatch);
+			if (getStatus(protein).canContinue()) {
+				refine(protein, BBKStar.this.protein);
 
 				// tank the sequence if the unbound protein is unstable
-				if (protein.getStatus() == PartitionFunction.Status.Unstable) {
+				if (getStatus(protein) == PartitionFunction.Status.Unstable) {
 					score = Double.NEGATIVE_INFINITY;
 					isUnboundUnstable = true;
 					return;
 				}
 			}
 
-			if (ligand.getStatus().canContinue()) {
-				ligand.compute(bbkstarSettings.numConfsPerBatch);
+			if (getStatus(ligand).canContinue()) {
+				refine(ligand, BBKStar.this.ligand);
 
 				// tank the sequence if the unbound ligand is unstable
-				if (ligand.getStatus() == PartitionFunction.Status.Unstable) {
+				if (getStatus(ligand) == PartitionFunction.Status.Unstable) {
 					score = Double.NEGATIVE_INFINITY;
 					isUnboundUnstable = true;
 					return;
 				}
 			}
 
-			if (complex.getStatus().canContinue()) {
-				complex.compute(bbkstarSettings.numConfsPerBatch);
+			if (getStatus(complex).canContinue()) {
+				refine(complex, BBKStar.this.complex);
 			}
 
 			// update the score
@@ -445,16 +523,24 @@ public class BBKStar {
 		}
 
 		public KStarScore computeScore() {
+			return computeScore(null);
+		}
+
+		private KStarScore computeScore(ExecutorService nodeThreads) {
 
 			// refine the pfuncs until done
-			while (protein.getStatus().canContinue()) {
-				protein.compute(bbkstarSettings.numConfsPerBatch);
-			}
-			while (ligand.getStatus().canContinue()) {
-				ligand.compute(bbkstarSettings.numConfsPerBatch);
-			}
-			while (complex.getStatus().canContinue()) {
-				complex.compute(bbkstarSettings.numConfsPerBatch);
+			if (nodeThreads == null) {
+				refineUntilDone(protein, BBKStar.this.protein);
+				refineUntilDone(ligand, BBKStar.this.ligand);
+				refineUntilDone(complex, BBKStar.this.complex);
+			} else {
+				// no short circuits here, so all three pfuncs are independent
+				Future<?> proteinDone = nodeThreads.submit(() -> refineUntilDone(protein, BBKStar.this.protein));
+				Future<?> ligandDone = nodeThreads.submit(() -> refineUntilDone(ligand, BBKStar.this.ligand));
+				Future<?> complexDone = nodeThreads.submit(() -> refineUntilDone(complex, BBKStar.this.complex));
+				KStar.waitFor(proteinDone);
+				KStar.waitFor(ligandDone);
+				KStar.waitFor(complexDone);
 			}
 
 			// update the score
@@ -463,20 +549,52 @@ public class BBKStar {
 			return kstarScore;
 		}
 
+		private void refine(PartitionFunction pfunc, ConfSpaceInfo info) {
+
+			// pfuncs can be shared by nodes on different threads, so only refine one batch at a time
+			synchronized (lockFor(pfunc)) {
+				pfunc.compute(bbkstarSettings.numConfsPerBatch);
+				if (checkpoint != null) {
+					checkpoint.putPfunc(info.id, sequence.filter(info.confSpace.seqSpace), pfunc.makeResult());
+				}
+			}
+		}
+
+		private void refineUntilDone(PartitionFunction pfunc, ConfSpaceInfo info) {
+			while (getStatus(pfunc).canContinue()) {
+				refine(pfunc, info);
+			}
+		}
+
+		private PartitionFunction.Status getStatus(PartitionFunction pfunc) {
+			synchronized (lockFor(pfunc)) {
+				return pfunc.getStatus();
+			}
+		}
+
+		private PartitionFunction.Result makeResult(PartitionFunction pfunc) {
+			synchronized (lockFor(pfunc)) {
+				return pfunc.makeResult();
+			}
+		}
+
 		public KStarScore makeKStarScore() {
-			return new KStarScore(protein.makeResult(), ligand.makeResult(), complex.makeResult());
+			return new KStarScore(makeResult(protein), makeResult(ligand), makeResult(complex));
 		}
 
 		public PfuncsStatus getStatus() {
 
 			// aggregate pfunc statuses
-			if (protein.getStatus() == PartitionFunction.Status.Estimated
-				&& ligand.getStatus() == PartitionFunction.Status.Estimated
-				&& complex.getStatus() == PartitionFunction.Status.Estimated) {
+			PartitionFunction.Status proteinStatus = getStatus(protein);
+			PartitionFunction.Status ligandStatus = getStatus(ligand);
+			PartitionFunction.Status complexStatus = getStatus(complex);
+			if (proteinStatus == PartitionFunction.Status.Estimated
+				&& ligandStatus == PartitionFunction.Status.Estimated
+				&& complexStatus == PartitionFunction.Status.Estimated) {
 				return PfuncsStatus.Estimated;
-			} else if (protein.getStatus() == PartitionFunction.Status.Estimating
-				|| ligand.getStatus() == PartitionFunction.Status.Estimating
-				|| complex.getStatus() == PartitionFunction.Status.Estimating) {
+			} else if (proteinStatus == PartitionFunction.Status.Estimating
+				|| ligandStatus == PartitionFunction.Status.Estimating
+				|| complexStatus == PartitionFunction.Status.Estimating) {
 				return PfuncsStatus.Estimating;
 			} else {
 				return PfuncsStatus.Blocked;
@@ -508,10 +626,16 @@ public class BBKStar {
 	/** Optional and overridable settings for BBK* */
 	public final Settings bbkstarSettings;
 
-	// TODO: caching these will keep lots of A* trees in memory. is that a problem? (oh yes, it definitely is)
+	// NOTE: the pfuncs only hold their A* trees through the tree cache, so the trees can be dropped to save memory
 	private final Map<Sequence,PartitionFunction> proteinPfuncs;
 	private final Map<Sequence,PartitionFunction> ligandPfuncs;
 	private final Map<Sequence,PartitionFunction> complexPfuncs;
+	private ConfSearchCache confTrees = null;
+
+	// pfunc refinement needs a lock that's not the pfunc itself, since pfuncs synchronize with their own listener threads
+	private final Map<PartitionFunction,Object> pfuncLocks = Collections.synchronizedMap(new IdentityHashMap<>());
+
+	private KStarCheckpoint checkpoint = null;
 
 	public BBKStar(SimpleConfSpace protein, SimpleConfSpace ligand, SimpleConfSpace complex, KStar.Settings kstarSettings, Settings bbkstarSettings) {
 
@@ -558,101 +682,189 @@ public class BBKStar {
 		proteinPfuncs.clear();
 		ligandPfuncs.clear();
 		complexPfuncs.clear();
+		confTrees = new ConfSearchCache(null, bbkstarSettings.confTreesMiB);
+		pfuncLocks.clear();
 
 		List<KStar.ScoredSequence> scoredSequences = new ArrayList<>();
 
-		// open the conf databases if needed
+		// open the conf databases and the checkpoint if needed
 		try (ConfDB.DBs confDBs = new ConfDB.DBs()
 			 .add(protein.confSpace, protein.confDBFile)
 			.add(ligand.confSpace, ligand.confDBFile)
-			.add(complex.confSpace, complex.confDBFile)
+			.add(complex.confSpace, complex.confDBFile);
+			KStarCheckpoint checkpoint = kstarSettings.checkpointFile != null
+				? new KStarCheckpoint(kstarSettings.checkpointFile, kstarSettings, protein.confSpace, ligand.confSpace, complex.confSpace)
+				: null
 		) {
+			this.checkpoint = checkpoint;
+
+			// score tree nodes in parallel if needed
+			ExecutorService nodeThreads = kstarSettings.sequenceParallelism > 1
+				? KStar.makeThreads(kstarSettings.sequenceParallelism, "bbkstar-node")
+				: null;
+			try {
+				search(confDBs, nodeThreads, scoredSequences);
+			} finally {
+				if (nodeThreads != null) {
+					nodeThreads.shutdownNow();
+				}
 
-			// calculate wild-type first
-			if (complex.confSpace.seqSpace.containsWildTypeSequence()) {
-				System.out.println("computing K* score for the wild-type sequence...");
-				SingleSequenceNode wildTypeNode = new SingleSequenceNode(complex.confSpace.makeWildTypeSequence(), confDBs);
-				KStarScore wildTypeScore = wildTypeNode.computeScore();
-				kstarSettings.scoreWriters.writeScore(new KStarScoreWriter.ScoreInfo(
-					-1,
-					0,
-					wildTypeNode.sequence,
-					wildTypeScore
-				));
-				if (kstarSettings.stabilityThreshold != null) {
-					BigDecimal stabilityThresholdFactor = new BoltzmannCalculator(PartitionFunction.decimalPrecision).calc(kstarSettings.stabilityThreshold);
-					protein.stabilityThreshold = wildTypeScore.protein.values.calcLowerBound().multiply(stabilityThresholdFactor);
-					ligand.stabilityThreshold = wildTypeScore.ligand.values.calcLowerBound().multiply(stabilityThresholdFactor);
+				// most pfuncs never finish, so clean up their conf buffers explicitly
+				for (Map<Sequence,PartitionFunction> pfuncs : Arrays.asList(proteinPfuncs, ligandPfuncs, complexPfuncs)) {
+					synchronized (pfuncs) {
+						for (PartitionFunction pfunc : pfuncs.values()) {
+							PartitionFunction.WithConfBufferLimit.closeIfNeeded(pfunc);
+						}
+					}
 				}
-			} else if (kstarSettings.stabilityThreshold != null) {
-				System.out.println("Sequence space does not contain the wild type sequence, stability threshold is disabled");
 			}
 
-			// start the BBK* tree with the root node
-			PriorityQueue<Node> tree = new PriorityQueue<>();
-			tree.add(new MultiSequenceNode(complex.confSpace.makeUnassignedSequence(), confDBs));
+		} finally {
+			this.checkpoint = null;
+		}
 
-			// start searching the tree
-			System.out.println("computing K* scores for the " + bbkstarSettings.numBestSequences + " best sequences to epsilon = " + kstarSettings.epsilon + " ...");
-			kstarSettings.scoreWriters.writeHeader();
-			while (!tree.isEmpty() && scoredSequences.size() < bbkstarSettings.numBestSequences) {
+		return scoredSequences;
+	}
 
-				// get the next node
-				Node node = tree.poll();
+	private void search(ConfDB.DBs confDBs, ExecutorService nodeThreads, List<KStar.ScoredSequence> scoredSequences) {
+
+		// calculate wild-type first
+		if (complex.confSpace.seqSpace.containsWildTypeSequence()) {
+			System.out.println("computing K* score for the wild-type sequence...");
+			SingleSequenceNode wildTypeNode = new SingleSequenceNode(complex.confSpace.makeWildTypeSequence(), confDBs);
+			KStarScore wildTypeScore = wildTypeNode.computeScore(nodeThreads);
+			kstarSettings.scoreWriters.writeScore(new KStarScoreWriter.ScoreInfo(
+				-1,
+				0,
+				wildTypeNode.sequence,
+				wildTypeScore
+			));
+			if (kstarSettings.stabilityThreshold != null) {
+				BigDecimal stabilityThresholdFactor = new BoltzmannCalculator(PartitionFunction.decimalPrecision).calc(kstarSettings.stabilityThreshold);
+				protein.stabilityThreshold = wildTypeScore.protein.values.calcLowerBound().multiply(stabilityThresholdFactor);
+				ligand.stabilityThreshold = wildTypeScore.ligand.values.calcLowerBound().multiply(stabilityThresholdFactor);
+			}
+		} else if (kstarSettings.stabilityThreshold != null) {
+			System.out.println("Sequence space does not contain the wild type sequence, stability threshold is disabled");
+		}
 
-				if (node instanceof SingleSequenceNode) {
-					SingleSequenceNode ssnode = (SingleSequenceNode)node;
+		// start the BBK* tree with the root node
+		PriorityQueue<Node> tree = new PriorityQueue<>();
+		tree.add(new MultiSequenceNode(complex.confSpace.makeUnassignedSequence(), confDBs));
 
-					// single-sequence node
-					switch (ssnode.getStatus()) {
-						case Estimated:
+		// start searching the tree
+		System.out.println("computing K* scores for the " + bbkstarSettings.numBestSequences + " best sequences to epsilon = " + kstarSettings.epsilon + " ...");
+		kstarSettings.scoreWriters.writeHeader();
+		while (!tree.isEmpty() && scoredSequences.size() < bbkstarSettings.numBestSequences) {
 
-							// sequence is finished, return it!
-							reportSequence(ssnode, scoredSequences);
+			if (nodeThreads != null) {
+				stepParallel(tree, nodeThreads, scoredSequences);
+				continue;
+			}
 
-						break;
-						case Estimating:
+			// get the next node
+			Node node = tree.poll();
 
-							// needs more estimation, catch-and-release
-							ssnode.estimateScore();
-							if (!ssnode.isUnboundUnstable) {
-								tree.add(ssnode);
-							}
+			if (node instanceof SingleSequenceNode) {
+				SingleSequenceNode ssnode = (SingleSequenceNode)node;
 
-						break;
-						case Blocked:
+				// single-sequence node
+				switch (ssnode.getStatus()) {
+					case Estimated:
 
-							// from here on out, it's all blocked sequences
-							// so it's ok to put them in the sorted order now
-							reportSequence(ssnode, scoredSequences);
-					}
+						// sequence is finished, return it!
+						reportSequence(ssnode, scoredSequences);
 
-				} else if (node instanceof MultiSequenceNode) {
-					MultiSequenceNode msnode = (MultiSequenceNode)node;
+					break;
+					case Estimating:
 
-					// partial sequence, expand children
-					// TODO: parallelize the multi-sequence node scoring here?
-					for (Node child : msnode.makeChildren()) {
-						child.estimateScore();
-						if (!child.isUnboundUnstable) {
-							tree.add(child);
+						// needs more estimation, catch-and-release
+						ssnode.estimateScore();
+						if (!ssnode.isUnboundUnstable) {
+							tree.add(ssnode);
 						}
+
+					break;
+					case Blocked:
+
+						// from here on out, it's all blocked sequences
+						// so it's ok to put them in the sorted order now
+						reportSequence(ssnode, scoredSequences);
+				}
+
+			} else if (node instanceof MultiSequenceNode) {
+				MultiSequenceNode msnode = (MultiSequenceNode)node;
+
+				// partial sequence, expand children
+				// (see stepParallel() for the parallel version)
+				for (Node child : msnode.makeChildren()) {
+					child.estimateScore();
+					if (!child.isUnboundUnstable) {
+						tree.add(child);
 					}
 				}
 			}
+		}
 
-			if (scoredSequences.size() < bbkstarSettings.numBestSequences) {
-				if (tree.isEmpty()) {
-					// all is well, we just don't have that many sequences in the design
-					System.out.println("Tried to find " + bbkstarSettings.numBestSequences + " sequences,"
-						+ " but design flexibility and sequence filters only allowed " + scoredSequences.size() + " sequences.");
-				} else {
-					throw new Error("BBK* ended, but the tree isn't empty and we didn't return enough sequences. This is a bug.");
-				}
+		if (scoredSequences.size() < bbkstarSettings.numBestSequences) {
+			if (tree.isEmpty()) {
+				// all is well, we just don't have that many sequences in the design
+				System.out.println("Tried to find " + bbkstarSettings.numBestSequences + " sequences,"
+					+ " but design flexibility and sequence filters only allowed " + scoredSequences.size() + " sequences.");
+			} else {
+				throw new Error("BBK* ended, but the tree isn't empty and we didn't return enough sequences. This is a bug.");
 			}
 		}
+	}
 
-		return scoredSequences;
+	private void stepParallel(PriorityQueue<Node> tree, ExecutorService nodeThreads, List<KStar.ScoredSequence> scoredSequences) {
+
+		// nothing is in flight between steps, so a finished sequence at the head of the tree
+		// is really the best one left, and we can report it just like the serial search
+		Node head = tree.peek();
+		if (head instanceof SingleSequenceNode && ((SingleSequenceNode)head).getStatus() != PfuncsStatus.Estimating) {
+			reportSequence((SingleSequenceNode)tree.poll(), scoredSequences);
+			return;
+		}
+
+		// pop a batch of nodes that need more work, up to the next finished sequence
+		List<Node> batch = new ArrayList<>();
+		while (batch.size() < kstarSettings.sequenceParallelism && !tree.isEmpty()) {
+			Node node = tree.peek();
+			if (node instanceof SingleSequenceNode && ((SingleSequenceNode)node).getStatus() != PfuncsStatus.Estimating) {
+				break;
+			}
+			batch.add(tree.poll());
+		}
+
+		// expand the multi-sequence nodes, so all the children can be scored in parallel too
+		List<Node> nodesToScore = new ArrayList<>();
+		for (Node node : batch) {
+			if (node instanceof MultiSequenceNode) {
+				nodesToScore.addAll(((MultiSequenceNode)node).makeChildren());
+			} else {
+				nodesToScore.add(node);
+			}
+		}
+
+		List<Future<?>> scored = new ArrayList<>();
+		for (Node node : nodesToScore) {
+			scored.add(nodeThreads.submit(node::estimateScore));
+		}
+		for (Future<?> future : scored) {
+			KStar.waitFor(future);
+		}
+
+		// put the nodes back in the tree in a fixed order, so ties don't depend on thread timing
+		for (Node node : nodesToScore) {
+			if (!node.isUnboundUnstable) {
+				tree.add(node);
+			}
+		}
+	}
+
+	private Object lockFor(PartitionFunction pfunc) {
+		return pfuncLocks.computeIfAbsent(pfunc, (key) -> new Object());
 	}
 
 	private void reportSequence(SingleSequenceNode ssnode, List<KStar.ScoredSequence> scoredSequences) {
@@ -41,6 +41,8 @@ import edu.duke.cs.osprey.kstar.pfunc.PartitionFunction;
 import java.io.File;
 import java.math.BigDecimal;
 import java.util.*;
+import java.util.concurrent.*;
+import java.util.concurrent.atomic.AtomicInteger;
 
 
 /**
@@ -103,6 +105,33 @@ public class KStar {
 			 */
 			private boolean useExternalMemory = false;
 
+			/**
+			 * If not null, the most memory (in MiB) each partition function can use to buffer
+			 * conformations between its lower and upper bound calculators.
+			 * Conformations that don't fit are spilled to a compact temporary file on disk.
+			 *
+			 * Can be overridden for individual partition functions with {@link ConfSpaceInfo#confBufferMiB}.
+			 */
+			private Integer confBufferMiB = null;
+
+			/**
+			 * If not null, record progress in this file, and resume from it when it already exists.
+			 * See {@link KStarCheckpoint}.
+			 */
+			private File checkpointFile = null;
+
+			/**
+			 * The number of sequences whose partition functions can be computed at the same time.
+			 *
+			 * All partition functions share the thread pool of the energy calculator, so extra
+			 * sequence parallelism mostly helps keep cores busy during conformation enumeration
+			 * and partition function bookkeeping, which run on the sequence threads.
+			 * The wild-type sequence is always computed before any mutants.
+			 *
+			 * BBK* uses this setting to score up to this many tree nodes at once.
+			 */
+			private int sequenceParallelism = 1;
+
 			public Builder setEpsilon(double val) {
 				epsilon = val;
 				return this;
@@ -152,8 +181,29 @@ public class KStar {
 				return this;
 			}
 
+			public Builder setConfBufferMiB(Integer val) {
+				if (val != null && val <= 0) {
+					throw new IllegalArgumentException("conf buffer size should be positive. To turn off the limit, pass null");
+				}
+				confBufferMiB = val;
+				return this;
+			}
+
+			public Builder setCheckpointFile(File val) {
+				checkpointFile = val;
+				return this;
+			}
+
+			public Builder setSequenceParallelism(int val) {
+				if (val <= 0) {
+					throw new IllegalArgumentException("sequence parallelism should be at least 1");
+				}
+				sequenceParallelism = val;
+				return this;
+			}
+
 			public Settings build() {
-				return new Settings(epsilon, stabilityThreshold, maxSimultaneousMutations, scoreWriters, showPfuncProgress, useExternalMemory);
+				return new Settings(epsilon, stabilityThreshold, maxSimultaneousMutations, scoreWriters, showPfuncProgress, useExternalMemory, confBufferMiB, checkpointFile, sequenceParallelism);
 			}
 		}
 
@@ -163,15 +213,21 @@ public class KStar {
 		public final KStarScoreWriter.Writers scoreWriters;
 		public final boolean showPfuncProgress;
 		public final boolean useExternalMemory;
+		public final Integer confBufferMiB;
+		public final File checkpointFile;
+		public final int sequenceParallelism;
 
 
-		public Settings(double epsilon, Double stabilityThreshold, int maxSimultaneousMutations, KStarScoreWriter.Writers scoreWriters, boolean dumpPfuncConfs, boolean useExternalMemory) {
+		public Settings(double epsilon, Double stabilityThreshold, int maxSimultaneousMutations, KStarScoreWriter.Writers scoreWriters, boolean dumpPfuncConfs, boolean useExternalMemory, Integer confBufferMiB, File checkpointFile, int sequenceParallelism) {
 			this.epsilon = epsilon;
 			this.stabilityThreshold = stabilityThreshold;
 			this.maxSimultaneousMutations = maxSimultaneousMutations;
 			this.scoreWriters = scoreWriters;
 			this.showPfuncProgress = dumpPfuncConfs;
 			this.useExternalMemory = useExternalMemory;
+			this.confBufferMiB = confBufferMiB;
+			this.checkpointFile = checkpointFile;
+			this.sequenceParallelism = sequenceParallelism;
 		}
 	}
 
@@ -220,10 +276,16 @@ public class KStar {
 
 		public final Map<Sequence,PartitionFunction.Result> pfuncResults = new HashMap<>();
 
+		// pfuncs currently being computed by sequence threads, so we don't compute any twice
+		private final Map<Sequence,CompletableFuture<PartitionFunction.Result>> pendingPfuncs = new HashMap<>();
+
 		public ConfEnergyCalculator confEcalc = null;
 		public ConfSearchFactory confSearchFactory = null;
 		public File confDBFile = null;
 
+		/** overrides {@link Settings#confBufferMiB} for this conf space, if not null */
+		public Integer confBufferMiB = null;
+
 		public ConfSpaceInfo(SimpleConfSpace confSpace, ConfSpaceType type) {
 			this.confSpace = confSpace;
 			this.type = type;
@@ -240,7 +302,10 @@ public class KStar {
 		}
 
 		public void clear() {
-			pfuncResults.clear();
+			synchronized (pfuncResults) {
+				pfuncResults.clear();
+				pendingPfuncs.clear();
+			}
 		}
 
 		public PartitionFunction.Result calcPfunc(int sequenceIndex, BigDecimal stabilityThreshold, ConfDB confDB) {
@@ -248,33 +313,85 @@ public class KStar {
 			Sequence sequence = sequences.get(sequenceIndex).filter(confSpace.seqSpace);
 
 			// check the cache first
-			PartitionFunction.Result result = pfuncResults.get(sequence);
-			if (result != null) {
-				return result;
+			CompletableFuture<PartitionFunction.Result> pending;
+			synchronized (pfuncResults) {
+
+				PartitionFunction.Result result = pfuncResults.get(sequence);
+				if (result != null) {
+					return result;
+				}
+
+				// is another sequence thread already computing this pfunc?
+				pending = pendingPfuncs.get(sequence);
+				if (pending == null) {
+					pendingPfuncs.put(sequence, new CompletableFuture<>());
+				}
+			}
+			if (pending != null) {
+				return pending.join();
 			}
 
 			// cache miss, need to compute the partition function
+			try {
+
+				// unless it was finished before the last checkpoint
+				PartitionFunction.Result result = checkpoint != null ? checkpoint.getPfunc(id, sequence) : null;
+				if (result == null) {
+					result = calcPfunc(sequence, stabilityThreshold, confDB);
+					if (checkpoint != null) {
+						checkpoint.putPfunc(id, sequence, result);
+					}
+				}
+
+				synchronized (pfuncResults) {
+					pfuncResults.put(sequence, result);
+					pendingPfuncs.remove(sequence).complete(result);
+				}
+				return result;
+
+			} catch (Throwable t) {
+				synchronized (pfuncResults) {
+					pendingPfuncs.remove(sequence).completeExceptionally(t);
+				}
+				throw t;
+			}
+		}
+
+		private PartitionFunction.Result calcPfunc(Sequence sequence, BigDecimal stabilityThreshold, ConfDB confDB) {
 
 			// make the partition function
 			PartitionFunction pfunc = PartitionFunction.makeBestFor(confEcalc);
 			pfunc.setReportProgress(settings.showPfuncProgress);
 			if (confDB != null) {
-				PartitionFunction.WithConfTable.setOrThrow(pfunc, confDB.getSequence(sequence));
+				ConfDB.SequenceDB sdb;
+				synchronized (confDB) { // sequence threads share the conf DB
+					sdb = confDB.getSequence(sequence);
+				}
+				PartitionFunction.WithConfTable.setOrThrow(pfunc, sdb);
 			}
 			RCs rcs = sequence.makeRCs(confSpace);
 			if (settings.useExternalMemory) {
 				PartitionFunction.WithExternalMemory.setOrThrow(pfunc, true, rcs);
 			}
-			ConfSearch astar = confSearchFactory.make(rcs);
+			Integer confBufferMiB = this.confBufferMiB != null ? this.confBufferMiB : settings.confBufferMiB;
+			if (confBufferMiB != null) {
+				PartitionFunction.WithConfBufferLimit.setOrThrow(pfunc, confBufferMiB);
+			}
+			ConfSearch astar;
+			synchronized (confSearchFactory) { // factories can be implemented in Python, don't call them concurrently
+				astar = confSearchFactory.make(rcs);
+			}
 			pfunc.init(astar, rcs.getNumConformations(), settings.epsilon);
 			pfunc.setStabilityThreshold(stabilityThreshold);
 
-			// compute it
-			pfunc.compute();
-
-			// save the result
-			result = pfunc.makeResult();
-			pfuncResults.put(sequence, result);
+			// compute it, and save the result
+			PartitionFunction.Result result;
+			try {
+				pfunc.compute();
+				result = pfunc.makeResult();
+			} finally {
+				PartitionFunction.WithConfBufferLimit.closeIfNeeded(pfunc);
+			}
 
 			/* HACKHACK: we're done using the A* tree, pfunc, etc
 				and normally the garbage collector will clean them up,
@@ -283,8 +400,12 @@ public class KStar {
 				If we try to allocate more off-heap resources before these get cleaned up,
 				we might run out. So poke the garbage collector now and try to get
 				it to clean up the off-heap resources right away.
+				Only external memory uses off-heap resources though, and a full GC after every pfunc
+				(on every sequence thread) is expensive, so don't bother otherwise.
 			*/
-			Runtime.getRuntime().gc();
+			if (settings.useExternalMemory) {
+				Runtime.getRuntime().gc();
+			}
 
 			return result;
 		}
@@ -298,6 +419,19 @@ public class KStar {
 		KStarScore score(int sequenceNumber, PartitionFunction.Result proteinResult, PartitionFunction.Result ligandResult, PartitionFunction.Result complexResult);
 	}
 
+	private static class SequenceResults {
+
+		final PartitionFunction.Result protein;
+		final PartitionFunction.Result ligand;
+		final PartitionFunction.Result complex;
+
+		SequenceResults(PartitionFunction.Result protein, PartitionFunction.Result ligand, PartitionFunction.Result complex) {
+			this.protein = protein;
+			this.ligand = ligand;
+			this.complex = complex;
+		}
+	}
+
 	/** A configuration space containing just the protein strand */
 	public final ConfSpaceInfo protein;
 
@@ -311,6 +445,7 @@ public class KStar {
 	public final Settings settings;
 
 	private List<Sequence> sequences;
+	private KStarCheckpoint checkpoint = null;
 
 	public KStar(SimpleConfSpace protein, SimpleConfSpace ligand, SimpleConfSpace complex, Settings settings) {
 		this.settings = settings;
@@ -385,22 +520,27 @@ public class KStar {
 		settings.scoreWriters.writeHeader();
 		// TODO: progress bar?
 
-		// open the conf databases if needed
+		// open the conf databases and the checkpoint if needed
 		try (ConfDB.DBs confDBs = new ConfDB.DBs()
 			.add(protein.confSpace, protein.confDBFile)
 			.add(ligand.confSpace, ligand.confDBFile)
-			.add(complex.confSpace, complex.confDBFile)
+			.add(complex.confSpace, complex.confDBFile);
+			KStarCheckpoint checkpoint = settings.checkpointFile != null
+				? new KStarCheckpoint(settings.checkpointFile, settings, protein.confSpace, ligand.confSpace, complex.confSpace)
+				: null
 		) {
+			this.checkpoint = checkpoint;
 			ConfDB proteinConfDB = confDBs.get(protein.confSpace);
 			ConfDB ligandConfDB = confDBs.get(ligand.confSpace);
 			ConfDB complexConfDB = confDBs.get(complex.confSpace);
 
 			// compute wild type partition functions first (always at pos 0)
+			SequenceResults wildTypeResults = calcWildType(proteinConfDB, ligandConfDB, complexConfDB);
 			KStarScore wildTypeScore = scorer.score(
 				0,
-				protein.calcPfunc(0, BigDecimal.ZERO, proteinConfDB),
-				ligand.calcPfunc(0, BigDecimal.ZERO, ligandConfDB),
-				complex.calcPfunc(0, BigDecimal.ZERO, complexConfDB)
+				wildTypeResults.protein,
+				wildTypeResults.ligand,
+				wildTypeResults.complex
 			);
 			BigDecimal proteinStabilityThreshold = null;
 			BigDecimal ligandStabilityThreshold = null;
@@ -409,30 +549,122 @@ public class KStar {
 				proteinStabilityThreshold = wildTypeScore.protein.values.calcLowerBound().multiply(stabilityThresholdFactor);
 				ligandStabilityThreshold = wildTypeScore.ligand.values.calcLowerBound().multiply(stabilityThresholdFactor);
 			}
+			final BigDecimal fProteinStabilityThreshold = proteinStabilityThreshold;
+			final BigDecimal fLigandStabilityThreshold = ligandStabilityThreshold;
 
 			// compute all the partition functions and K* scores for the rest of the sequences
-			for (int i=1; i<n; i++) {
-
-				// get the pfuncs, with short circuits as needed
-				final PartitionFunction.Result proteinResult = protein.calcPfunc(i, proteinStabilityThreshold, proteinConfDB);
-				final PartitionFunction.Result ligandResult;
-				final PartitionFunction.Result complexResult;
-				if (!KStarScore.isLigandComplexUseful(proteinResult)) {
-					ligandResult = PartitionFunction.Result.makeAborted();
-					complexResult = PartitionFunction.Result.makeAborted();
-				} else {
-					ligandResult = ligand.calcPfunc(i, ligandStabilityThreshold, ligandConfDB);
-					if (!KStarScore.isComplexUseful(proteinResult, ligandResult)) {
-						complexResult = PartitionFunction.Result.makeAborted();
-					} else {
-						complexResult = complex.calcPfunc(i, BigDecimal.ZERO, complexConfDB);
-					}
+			if (settings.sequenceParallelism <= 1) {
+
+				for (int i=1; i<n; i++) {
+					SequenceResults results = calcSequence(i, proteinStabilityThreshold, ligandStabilityThreshold, proteinConfDB, ligandConfDB, complexConfDB);
+					scorer.score(i, results.protein, results.ligand, results.complex);
 				}
 
-				scorer.score(i, proteinResult, ligandResult, complexResult);
+			} else {
+
+				ExecutorService sequenceThreads = makeSequenceThreads();
+				try {
+
+					List<Future<SequenceResults>> futures = new ArrayList<>();
+					for (int i=1; i<n; i++) {
+						final int fi = i;
+						futures.add(sequenceThreads.submit(() ->
+							calcSequence(fi, fProteinStabilityThreshold, fLigandStabilityThreshold, proteinConfDB, ligandConfDB, complexConfDB)
+						));
+					}
+
+					// report scores in sequence order, so the output doesn't depend on thread timing
+					for (int i=1; i<n; i++) {
+						SequenceResults results = waitFor(futures.get(i - 1));
+						scorer.score(i, results.protein, results.ligand, results.complex);
+					}
+
+				} finally {
+					sequenceThreads.shutdownNow();
+				}
 			}
+
+		} finally {
+			this.checkpoint = null;
 		}
 
 		return scores;
 	}
+
+	private SequenceResults calcWildType(ConfDB proteinConfDB, ConfDB ligandConfDB, ConfDB complexConfDB) {
+
+		// no short circuits for the wild type, so all three pfuncs are independent
+		if (settings.sequenceParallelism <= 1) {
+			return new SequenceResults(
+				protein.calcPfunc(0, BigDecimal.ZERO, proteinConfDB),
+				ligand.calcPfunc(0, BigDecimal.ZERO, ligandConfDB),
+				complex.calcPfunc(0, BigDecimal.ZERO, complexConfDB)
+			);
+		}
+
+		ExecutorService sequenceThreads = makeSequenceThreads();
+		try {
+			Future<PartitionFunction.Result> proteinResult = sequenceThreads.submit(() -> protein.calcPfunc(0, BigDecimal.ZERO, proteinConfDB));
+			Future<PartitionFunction.Result> ligandResult = sequenceThreads.submit(() -> ligand.calcPfunc(0, BigDecimal.ZERO, ligandConfDB));
+			Future<PartitionFunction.Result> complexResult = sequenceThreads.submit(() -> complex.calcPfunc(0, BigDecimal.ZERO, complexConfDB));
+			return new SequenceResults(
+				waitFor(proteinResult),
+				waitFor(ligandResult),
+				waitFor(complexResult)
+			);
+		} finally {
+			sequenceThreads.shutdownNow();
+		}
+	}
+
+	private SequenceResults calcSequence(int sequenceIndex, BigDecimal proteinStabilityThreshold, BigDecimal ligandStabilityThreshold, ConfDB proteinConfDB, ConfDB ligandConfDB, ConfDB complexConfDB) {
+
+		// get the pfuncs, with short circuits as needed
+		final PartitionFunction.Result proteinResult = protein.calcPfunc(sequenceIndex, proteinStabilityThreshold, proteinConfDB);
+		final PartitionFunction.Result ligandResult;
+		final PartitionFunction.Result complexResult;
+		if (!KStarScore.isLigandComplexUseful(proteinResult)) {
+			ligandResult = PartitionFunction.Result.makeAborted();
+			complexResult = PartitionFunction.Result.makeAborted();
+		} else {
+			ligandResult = ligand.calcPfunc(sequenceIndex, ligandStabilityThreshold, ligandConfDB);
+			if (!KStarScore.isComplexUseful(proteinResult, ligandResult)) {
+				complexResult = PartitionFunction.Result.makeAborted();
+			} else {
+				complexResult = complex.calcPfunc(sequenceIndex, BigDecimal.ZERO, complexConfDB);
+			}
+		}
+
+		return new SequenceResults(proteinResult, ligandResult, complexResult);
+	}
+
+	private ExecutorService makeSequenceThreads() {
+		return makeThreads(settings.sequenceParallelism, "kstar-sequence");
+	}
+
+	static ExecutorService makeThreads(int numThreads, String name) {
+		AtomicInteger threadId = new AtomicInteger(0);
+		return Executors.newFixedThreadPool(numThreads, (runnable) -> {
+			Thread thread = Executors.defaultThreadFactory().newThread(runnable);
+			thread.setDaemon(true);
+			thread.setName(String.format("%s-%d", name, threadId.getAndIncrement()));
+			return thread;
+		});
+	}
+
+	static <T> T waitFor(Future<T> future) {
+		try {
+			return future.get();
+		} catch (InterruptedException ex) {
+			throw new Error(ex);
+		} catch (ExecutionException ex) {
+			Throwable cause = ex.getCause();
+			if (cause instanceof RuntimeException) {
+				throw (RuntimeException)cause;
+			} else if (cause instanceof Error) {
+				throw (Error)cause;
+			}
+			throw new RuntimeException(cause);
+		}
+	}
 }
@@ -0,0 +1,381 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.kstar;
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileReader;
+import java.io.FileWriter;
+import java.io.IOException;
+import java.io.RandomAccessFile;
+import java.io.UncheckedIOException;
+import java.io.Writer;
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.Map;
+
+import edu.duke.cs.osprey.confspace.ConfSearch;
+import edu.duke.cs.osprey.confspace.SeqSpace;
+import edu.duke.cs.osprey.confspace.Sequence;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.ematrix.EnergyMatrixIO;
+import edu.duke.cs.osprey.kstar.pfunc.PartitionFunction;
+import edu.duke.cs.osprey.tools.MathTools;
+
+/**
+ * Records the progress of a K* or BBK* design in a file, so a design that gets
+ * interrupted can pick up where it left off when it's run again with the same arguments.
+ *
+ * The checkpoint stores finished partition functions, and for BBK*, the bounds
+ * on partial sequences in the sequence tree. Partition functions that were still
+ * being refined when the design stopped are recomputed from scratch, which is fast
+ * when the conf spaces have conf DBs, since all the minimized conformation energies
+ * will be read from the DBs instead of minimized again.
+ *
+ * The file is an append-only text log that is flushed after every record,
+ * so an interrupted design loses at most the record it was writing.
+ * Designs with matching settings and conf spaces (including K* and BBK* designs) can share a checkpoint.
+ */
+public class KStarCheckpoint implements AutoCloseable {
+
+	public static class DifferentDesignException extends RuntimeException {
+		public DifferentDesignException(File file) {
+			super("checkpoint file " + file + " was written by a design with different settings or conformation spaces."
+				+ " Delete it or pick a different checkpoint file to start over.");
+		}
+	}
+
+	public static class SequenceBound {
+
+		public final double score;
+		public final boolean isUnboundUnstable;
+
+		public SequenceBound(double score, boolean isUnboundUnstable) {
+			this.score = score;
+			this.isUnboundUnstable = isUnboundUnstable;
+		}
+	}
+
+	/**
+	 * A stand-in for a partition function that was already finished before the checkpoint.
+	 */
+	public static class FinishedPfunc implements PartitionFunction {
+
+		public final Result result;
+
+		public FinishedPfunc(Result result) {
+			this.result = result;
+		}
+
+		@Override
+		public void setReportProgress(boolean val) {
+			// nothing to report
+		}
+
+		@Override
+		public void setConfListener(ConfListener val) {
+			// no confs to listen to
+		}
+
+		@Override
+		public void init(ConfSearch confSearch, BigInteger numConfsBeforePruning, double targetEpsilon) {
+			// nothing to init
+		}
+
+		@Override
+		public void setStabilityThreshold(BigDecimal stabilityThreshold) {
+			// already applied
+		}
+
+		@Override
+		public Status getStatus() {
+			return result.status;
+		}
+
+		@Override
+		public Values getValues() {
+			return result.values;
+		}
+
+		@Override
+		public int getParallelism() {
+			return 1;
+		}
+
+		@Override
+		public int getNumConfsEvaluated() {
+			return result.numConfs;
+		}
+
+		@Override
+		public void compute(int maxNumConfs) {
+			// already done
+		}
+
+		@Override
+		public Result makeResult() {
+			return result;
+		}
+	}
+
+	private static final String Magic = "OSPREY-KSTAR-CHECKPOINT";
+	private static final int Version = 2;
+	private static final String RecordEnd = "end";
+
+	public final File file;
+
+	private final Map<String,PartitionFunction.Result> pfuncs = new HashMap<>();
+	private final Map<String,SequenceBound> bounds = new HashMap<>();
+	private final Writer out;
+
+	public KStarCheckpoint(File file, KStar.Settings settings, SimpleConfSpace protein, SimpleConfSpace ligand, SimpleConfSpace complex) {
+
+		this.file = file;
+
+		String header = String.join("\t",
+			Magic,
+			Integer.toString(Version),
+			makeDesignKey(settings, protein, ligand, complex)
+		);
+
+		try {
+
+			// read the existing checkpoint, if any
+			boolean isNew = !file.exists() || file.length() == 0;
+			if (!isNew) {
+				try (BufferedReader in = new BufferedReader(new FileReader(file))) {
+
+					if (!header.equals(in.readLine())) {
+						throw new DifferentDesignException(file);
+					}
+
+					String line;
+					while ((line = in.readLine()) != null) {
+						if (!line.isEmpty()) {
+							readRecord(line);
+						}
+					}
+				}
+			}
+
+			out = new FileWriter(file, !isNew);
+			if (isNew) {
+				writeLine(header);
+			} else if (!endsWithNewline(file)) {
+				// finish off any record that was cut short, so new records start on their own lines
+				writeLine("");
+			}
+
+		} catch (IOException ex) {
+			throw new UncheckedIOException("can't open checkpoint file: " + file, ex);
+		}
+
+		if (!pfuncs.isEmpty() || !bounds.isEmpty()) {
+			System.out.println(String.format("resuming from checkpoint %s with %d partition functions and %d sequence bounds",
+				file, pfuncs.size(), bounds.size()
+			));
+		}
+	}
+
+	private static String makeDesignKey(KStar.Settings settings, SimpleConfSpace protein, SimpleConfSpace ligand, SimpleConfSpace complex) {
+		StringBuilder buf = new StringBuilder();
+		buf.append("epsilon=").append(settings.epsilon);
+		buf.append(",stabilityThreshold=").append(settings.stabilityThreshold);
+		buf.append(",maxSimultaneousMutations=").append(settings.maxSimultaneousMutations);
+
+		// identify the conf spaces by their contents, not just their sizes
+		for (SimpleConfSpace confSpace : Arrays.asList(protein, ligand, complex)) {
+			buf.append(",confSpace=").append(Long.toHexString(EnergyMatrixIO.fingerprint(confSpace)));
+		}
+
+		// the complex sequence space covers the other states too
+		buf.append(",seqSpace=");
+		for (SeqSpace.Position pos : complex.seqSpace.positions) {
+			buf.append(pos.resNum)
+				.append(":")
+				.append(pos.wildType != null ? pos.wildType.name : "");
+			for (SeqSpace.ResType resType : pos.resTypes) {
+				buf.append("/").append(resType.name);
+			}
+			buf.append(";");
+		}
+
+		return buf.toString();
+	}
+
+	private static String makeKey(String confSpaceId, Sequence sequence) {
+		return confSpaceId + " " + sequence.toString(Sequence.Renderer.Assignment);
+	}
+
+	private void readRecord(String line) {
+
+		String[] parts = line.split("\t");
+		try {
+
+			// make sure the record wasn't cut short
+			if (!parts[parts.length - 1].equals(RecordEnd)) {
+				throw new IllegalArgumentException("incomplete record");
+			}
+
+			switch (parts[0]) {
+
+				case "pfunc": {
+					PartitionFunction.Values values = new PartitionFunction.Values();
+					values.qstar = parseBig(parts[4]);
+					values.qprime = parseBig(parts[5]);
+					values.pstar = parseBig(parts[6]);
+					pfuncs.put(parts[1], new PartitionFunction.Result(
+						PartitionFunction.Status.valueOf(parts[2]),
+						values,
+						Integer.parseInt(parts[3])
+					));
+				} break;
+
+				case "bound": {
+					bounds.put(parts[1], new SequenceBound(
+						Double.parseDouble(parts[2]),
+						Boolean.parseBoolean(parts[3])
+					));
+				} break;
+
+				default:
+					throw new IllegalArgumentException("unknown record type: " + parts[0]);
+			}
+
+		} catch (RuntimeException ex) {
+
+			// the last record might have been cut short when the design was interrupted, just skip it
+			System.err.println("skipping unreadable checkpoint record: " + line);
+		}
+	}
+
+	private static boolean endsWithNewline(File file)
+	throws IOException {
+		try (RandomAccessFile in = new RandomAccessFile(file, "r")) {
+			in.seek(in.length() - 1);
+			return in.read() == '\n';
+		}
+	}
+
+	private static BigDecimal parseBig(String s) {
+		switch (s) {
+			case "Infinity": return MathTools.BigPositiveInfinity;
+			case "-Infinity": return MathTools.BigNegativeInfinity;
+			case "NaN": return MathTools.BigNaN;
+			default: return new BigDecimal(s);
+		}
+	}
+
+	private void writeLine(String line)
+	throws IOException {
+		out.write(line);
+		out.write("\n");
+		out.flush();
+	}
+
+	private void write(String ... parts) {
+		try {
+			writeLine(String.join("\t", parts) + "\t" + RecordEnd);
+		} catch (IOException ex) {
+			throw new UncheckedIOException("can't write to checkpoint file: " + file, ex);
+		}
+	}
+
+	/**
+	 * Returns the finished partition function for this sequence, or null if there isn't one.
+	 */
+	public synchronized PartitionFunction.Result getPfunc(String confSpaceId, Sequence sequence) {
+		return pfuncs.get(makeKey(confSpaceId, sequence));
+	}
+
+	/**
+	 * Saves a partition function, if it's finished.
+	 */
+	public synchronized void putPfunc(String confSpaceId, Sequence sequence, PartitionFunction.Result result) {
+
+		// only save finished pfuncs
+		if (result.status.canContinue()) {
+			return;
+		}
+
+		String key = makeKey(confSpaceId, sequence);
+		if (pfuncs.containsKey(key)) {
+			return;
+		}
+		pfuncs.put(key, result);
+
+		write(
+			"pfunc",
+			key,
+			result.status.name(),
+			Integer.toString(result.numConfs),
+			result.values.qstar.toString(),
+			result.values.qprime.toString(),
+			result.values.pstar.toString()
+		);
+	}
+
+	/**
+	 * Returns the bound for this partial sequence, or null if there isn't one.
+	 */
+	public synchronized SequenceBound getBound(Sequence sequence) {
+		return bounds.get(makeKey("tree", sequence));
+	}
+
+	public synchronized void putBound(Sequence sequence, SequenceBound bound) {
+
+		String key = makeKey("tree", sequence);
+		if (bounds.containsKey(key)) {
+			return;
+		}
+		bounds.put(key, bound);
+
+		write(
+			"bound",
+			key,
+			Double.toString(bound.score),
+			Boolean.toString(bound.isUnboundUnstable)
+		);
+	}
+
+	@Override
+	public synchronized void close() {
+		try {
+			out.close();
+		} catch (IOException ex) {
+			// don't care
+		}
+	}
+}
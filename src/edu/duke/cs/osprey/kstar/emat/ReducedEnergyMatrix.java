@@ -67,6 +67,25 @@ public class ReducedEnergyMatrix extends EnergyMatrix {
     }
     
     
+    @Override
+	protected boolean hasDirectValues() {
+		// positions are remapped
+		return false;
+	}
+
+
+	@Override
+	public double getOneBodyValue(int res, int index) {
+		return getOneBody(res, index);
+	}
+
+
+	@Override
+	public double getPairwiseValue(int res1, int index1, int res2, int index2) {
+		return getPairwise(res1, index1, res2, index2);
+	}
+    
+    
     @Override
 	public HigherTupleFinder<Double> getHigherOrderTerms(int res1, int index1, int res2, int index2) {
 
@@ -37,6 +37,9 @@ import edu.duke.cs.osprey.confspace.ConfDB;
 import edu.duke.cs.osprey.confspace.ConfSearch;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.externalMemory.ExternalMemory;
+import edu.duke.cs.osprey.externalMemory.SpillingScoredConfFIFO;
+import edu.duke.cs.osprey.parallelism.ScopedTaskExecutor;
+import edu.duke.cs.osprey.parallelism.TaskExecutor;
 import edu.duke.cs.osprey.tools.*;
 
 import java.math.BigDecimal;
@@ -64,22 +67,24 @@ import java.util.function.Supplier;
  * not orders of magnitude slower than operation 1 (when e.g. we're reading
  * energies out of a cache).
  */
-public class GradientDescentPfunc implements PartitionFunction.WithConfTable, PartitionFunction.WithExternalMemory {
+public class GradientDescentPfunc implements PartitionFunction.WithConfTable, PartitionFunction.WithExternalMemory, PartitionFunction.WithConfBufferLimit {
 
-	private static class State {
+	private static class State<T> {
 
-		BigDecimal numConfs;
+		final PfuncArithmetic<T> arith;
+
+		T numConfs;
 
 		// upper bound (score axis) vars
 		long numScoredConfs = 0;
-		BigDecimal upperScoreWeightSum = BigDecimal.ZERO;
-		BigDecimal minUpperScoreWeight = MathTools.BigPositiveInfinity;
+		T upperScoreWeightSum;
+		T minUpperScoreWeight;
 
 		// lower bound (energy axis) vars
 		long numEnergiedConfs = 0;
-		BigDecimal lowerScoreWeightSum = BigDecimal.ZERO;
-		BigDecimal energyWeightSum = BigDecimal.ZERO;
-		BigDecimal minLowerScoreWeight = MathTools.BigPositiveInfinity;
+		T lowerScoreWeightSum;
+		T energyWeightSum;
+		T minLowerScoreWeight;
 
 		// estimate of inital rates
 		// (values here aren't super imporant since they get tuned during execution,
@@ -91,43 +96,41 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		double dEnergy = -1.0;
 		double dScore = -1.0;
 
-		State(BigInteger numConfs) {
-			this.numConfs = new BigDecimal(numConfs);
+		State(PfuncArithmetic<T> arith, BigInteger numConfs) {
+			this.arith = arith;
+			this.numConfs = arith.of(numConfs);
+			upperScoreWeightSum = arith.zero();
+			minUpperScoreWeight = arith.of(MathTools.BigPositiveInfinity);
+			lowerScoreWeightSum = arith.zero();
+			energyWeightSum = arith.zero();
+			minLowerScoreWeight = arith.of(MathTools.BigPositiveInfinity);
 		}
 
 		double calcDelta() {
-			BigDecimal upperBound = getUpperBound();
-			if (MathTools.isZero(upperBound) || MathTools.isInf(upperBound)) {
+			T upperBound = getUpperBound();
+			if (arith.isZero(upperBound) || arith.isInfinite(upperBound)) {
 				return 1.0;
 			}
-			return new BigMath(PartitionFunction.decimalPrecision)
-				.set(upperBound)
-				.sub(getLowerBound())
-				.div(upperBound)
-				.get()
-				.doubleValue();
+			return arith.ratio(arith.sub(upperBound, getLowerBound()), upperBound);
 		}
 
-		public BigDecimal getLowerBound() {
+		public T getLowerBound() {
 			return energyWeightSum;
 		}
 
-		public BigDecimal getUpperBound() {
-			return new BigMath(PartitionFunction.decimalPrecision)
+		public T getUpperBound() {
 
-				// unscored bound
-				.set(numConfs)
-				.sub(numScoredConfs)
-				.mult(minUpperScoreWeight)
+			// unscored bound
+			T bound = arith.mult(arith.sub(numConfs, arith.of(numScoredConfs)), minUpperScoreWeight);
 
-				// with scored bound
-				.add(upperScoreWeightSum)
+			// with scored bound
+			bound = arith.add(bound, upperScoreWeightSum);
 
-				// but replace weights that have energies
-				.sub(lowerScoreWeightSum)
-				.add(energyWeightSum)
+			// but replace weights that have energies
+			bound = arith.sub(bound, lowerScoreWeightSum);
+			bound = arith.add(bound, energyWeightSum);
 
-				.get();
+			return bound;
 		}
 
 		boolean epsilonReached(double targetEpsilon) {
@@ -135,18 +138,18 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		}
 
 		boolean isStable(BigDecimal stabilityThreshold) {
-			return numEnergiedConfs <= 0 || stabilityThreshold == null || MathTools.isGreaterThanOrEqual(getUpperBound(), stabilityThreshold);
+			return numEnergiedConfs <= 0 || stabilityThreshold == null || arith.compare(getUpperBound(), arith.of(stabilityThreshold)) >= 0;
 		}
 
 		boolean hasLowEnergies() {
-			return MathTools.isGreaterThan(minLowerScoreWeight,  BigDecimal.ZERO);
+			return arith.compare(minLowerScoreWeight, arith.zero()) > 0;
 		}
 
 		@Override
 		public String toString() {
 			return String.format("upper: count %d  sum %e  min %e     lower: count %d  score sum %e  energy sum %e",
-				numScoredConfs, upperScoreWeightSum, minUpperScoreWeight,
-				numEnergiedConfs, lowerScoreWeightSum, energyWeightSum
+				numScoredConfs, arith.doubleValue(upperScoreWeightSum), arith.doubleValue(minUpperScoreWeight),
+				numEnergiedConfs, arith.doubleValue(lowerScoreWeightSum), arith.doubleValue(energyWeightSum)
 			);
 		}
 	}
@@ -160,6 +163,9 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 
     public final ConfEnergyCalculator ecalc;
 
+	// only wait on our own tasks, so many pfuncs can share the ecalc thread pool
+	private final TaskExecutor tasks;
+
 	private double targetEpsilon = Double.NaN;
 	private BigDecimal stabilityThreshold = BigDecimal.ZERO;
 	private ConfListener confListener = null;
@@ -167,11 +173,11 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 	private Stopwatch stopwatch = new Stopwatch().start();
 	private ConfSearch scoreConfs = null;
 	private ConfSearch energyConfs = null;
-	private BoltzmannCalculator bcalc = new BoltzmannCalculator(PartitionFunction.decimalPrecision);
+	private Arithmetic arithmetic = Arithmetic.Big;
 
 	private Status status = null;
 	private Values values = null;
-	private State state = null;
+	private State<?> state = null;
 
 	private boolean hasEnergyConfs = true;
 	private boolean hasScoreConfs = true;
@@ -183,11 +189,15 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 	private boolean useExternalMemory = false;
 	private RCs rcs = null;
 
+	private Integer confBufferMiB = null;
+	private SpillingScoredConfFIFO confBuffer = null;
+
 	private PfuncSurface surf = null;
 	private PfuncSurface.Trace trace = null;
 
 	public GradientDescentPfunc(ConfEnergyCalculator ecalc) {
 		this.ecalc = ecalc;
+		this.tasks = new ScopedTaskExecutor(ecalc.tasks);
 	}
 	
 	@Override
@@ -232,6 +242,16 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		this.rcs = rcs;
 	}
 
+	@Override
+	public void setConfBufferMiB(Integer val) {
+		this.confBufferMiB = val;
+	}
+
+	@Override
+	public void setArithmetic(Arithmetic val) {
+		arithmetic = val;
+	}
+
 	public void traceTo(PfuncSurface val) {
 		surf = val;
 	}
@@ -242,7 +262,15 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		init(numConfsBeforePruning, targetEpsilon);
 
 		// split the confs between the upper and lower bounds
-		ConfSearch.Splitter confsSplitter = new ConfSearch.Splitter(confSearch, useExternalMemory, rcs);
+		ConfSearch.Splitter confsSplitter;
+		if (confBufferMiB != null) {
+			// the bounded buffer spills to its own compact file, so it takes precedence over external memory
+			closeConfBuffer();
+			confBuffer = SpillingScoredConfFIFO.ofMiB(confBufferMiB);
+			confsSplitter = new ConfSearch.Splitter(confSearch, confBuffer);
+		} else {
+			confsSplitter = new ConfSearch.Splitter(confSearch, useExternalMemory, rcs);
+		}
 		scoreConfs = confsSplitter.first;
 		energyConfs = confsSplitter.second;
 	}
@@ -266,7 +294,7 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 
 		// init state
 		status = Status.Estimating;
-		state = new State(numConfsBeforePruning);
+		state = new State<>(arithmetic.make(), numConfsBeforePruning);
 		values = Values.makeFullRange();
 		// don't explicitly check the pruned confs, just lump them together with the un-enumerated confs
 		values.pstar = BigDecimal.ZERO;
@@ -354,29 +382,7 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 					}
 
 					numConfsEnergied++;
-
-					class EnergyResult {
-						ConfSearch.EnergiedConf econf;
-						BigDecimal scoreWeight;
-						BigDecimal energyWeight;
-						Stopwatch stopwatch = new Stopwatch();
-					}
-
-					ecalc.tasks.submit(
-						() -> {
-							// compute one energy and weights (and time it)
-							EnergyResult result = new EnergyResult();
-							result.stopwatch.start();
-							result.econf = ecalc.calcEnergy(conf, confTable);
-							result.scoreWeight = bcalc.calc(result.econf.getScore());
-							result.energyWeight = bcalc.calc(result.econf.getEnergy());
-							result.stopwatch.stop();
-							return result;
-						},
-						(result) -> {
-							onEnergy(result.econf, result.scoreWeight, result.energyWeight, result.stopwatch.getTimeS());
-						}
-					);
+					submitEnergy(state, conf);
 
 					break;
 				}
@@ -400,26 +406,7 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 						confs.add(conf);
 					}
 
-					class ScoreResult {
-						List<BigDecimal> scoreWeights = new ArrayList<>();
-						Stopwatch stopwatch = new Stopwatch();
-					}
-
-					ecalc.tasks.submit(
-						() -> {
-							// compute the weights (and time it)
-							ScoreResult result = new ScoreResult();
-							result.stopwatch.start();
-							for (ConfSearch.ScoredConf conf : confs) {
-								result.scoreWeights.add(bcalc.calc(conf.getScore()));
-							}
-							result.stopwatch.stop();
-							return result;
-						},
-						(result) -> {
-							onScores(result.scoreWeights, result.stopwatch.getTimeS());
-						}
-					);
+					submitScores(state, confs);
 
 					break;
 				}
@@ -432,14 +419,10 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		}
 
 		// wait for all the scores and energies to come in
-		ecalc.tasks.waitForFinish();
+		tasks.waitForFinish();
 
 		// update the pfunc values from the state
-		values.qstar = state.getLowerBound();
-		values.qprime = new BigMath(PartitionFunction.decimalPrecision)
-			.set(state.getUpperBound())
-			.sub(state.getLowerBound())
-			.get();
+		updateValues(state);
 
 		// we stopped stepping, all the score and energies are accounted for,
 		// so update the pfunc status now
@@ -464,18 +447,90 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		if (!state.isStable(stabilityThreshold)) {
 			status = Status.Unstable;
 		}
+
+		// we won't read any more confs, so clean up any spilled ones
+		if (!status.canContinue()) {
+			closeConfBuffer();
+		}
+	}
+
+	private <T> void submitEnergy(State<T> state, ConfSearch.ScoredConf conf) {
+
+		class EnergyResult {
+			ConfSearch.EnergiedConf econf;
+			T scoreWeight;
+			T energyWeight;
+			Stopwatch stopwatch = new Stopwatch();
+		}
+
+		tasks.submit(
+			() -> {
+				// compute one energy and weights (and time it)
+				EnergyResult result = new EnergyResult();
+				result.stopwatch.start();
+				result.econf = ecalc.calcEnergy(conf, confTable);
+				result.scoreWeight = state.arith.weight(result.econf.getScore());
+				result.energyWeight = state.arith.weight(result.econf.getEnergy());
+				result.stopwatch.stop();
+				return result;
+			},
+			(result) -> {
+				onEnergy(state, result.econf, result.scoreWeight, result.energyWeight, result.stopwatch.getTimeS());
+			}
+		);
+	}
+
+	private <T> void submitScores(State<T> state, List<ConfSearch.ScoredConf> confs) {
+
+		class ScoreResult {
+			List<T> scoreWeights = new ArrayList<>();
+			Stopwatch stopwatch = new Stopwatch();
+		}
+
+		tasks.submit(
+			() -> {
+				// compute the weights (and time it)
+				ScoreResult result = new ScoreResult();
+				result.stopwatch.start();
+				for (ConfSearch.ScoredConf conf : confs) {
+					result.scoreWeights.add(state.arith.weight(conf.getScore()));
+				}
+				result.stopwatch.stop();
+				return result;
+			},
+			(result) -> {
+				onScores(state, result.scoreWeights, result.stopwatch.getTimeS());
+			}
+		);
+	}
+
+	private <T> void updateValues(State<T> state) {
+		values.qstar = state.arith.toBigDecimal(state.getLowerBound());
+		values.qprime = state.arith.toBigDecimal(state.arith.sub(state.getUpperBound(), state.getLowerBound()));
+	}
+
+	private void closeConfBuffer() {
+		if (confBuffer != null) {
+			confBuffer.close();
+			confBuffer = null;
+		}
+	}
+
+	@Override
+	public void close() {
+		closeConfBuffer();
 	}
 
-	private void onEnergy(ConfSearch.EnergiedConf econf, BigDecimal scoreWeight, BigDecimal energyWeight, double seconds) {
+	private <T> void onEnergy(State<T> state, ConfSearch.EnergiedConf econf, T scoreWeight, T energyWeight, double seconds) {
 
 		synchronized (this) { // don't race the main thread
 
 			// update the state
-			state.energyWeightSum = state.energyWeightSum.add(energyWeight);
-			state.lowerScoreWeightSum = state.lowerScoreWeightSum.add(scoreWeight);
+			state.energyWeightSum = state.arith.add(state.energyWeightSum, energyWeight);
+			state.lowerScoreWeightSum = state.arith.add(state.lowerScoreWeightSum, scoreWeight);
 			state.numEnergiedConfs++;
 			state.energyOps = 1.0/seconds;
-			if (MathTools.isLessThan(scoreWeight, state.minLowerScoreWeight)) {
+			if (state.arith.compare(scoreWeight, state.minLowerScoreWeight) < 0) {
 				state.minLowerScoreWeight = scoreWeight;
 			}
 
@@ -492,7 +547,7 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 				System.out.println(String.format("conf:%4d, score:%12.6f, energy:%12.6f, bounds:[%12e,%12e], delta:%.6f, time:%10s, heapMem:%s, extMem:%s",
 					state.numEnergiedConfs,
 					econf.getScore(), econf.getEnergy(),
-					state.getLowerBound().doubleValue(), state.getUpperBound().doubleValue(),
+					state.arith.doubleValue(state.getLowerBound()), state.arith.doubleValue(state.getUpperBound()),
 					state.calcDelta(),
 					stopwatch.getTime(2),
 					JvmMem.getOldPool(),
@@ -512,14 +567,14 @@ public class GradientDescentPfunc implements PartitionFunction.WithConfTable, Pa
 		}
 	}
 
-	private void onScores(List<BigDecimal> scoreWeights, double seconds) {
+	private <T> void onScores(State<T> state, List<T> scoreWeights, double seconds) {
 
 		synchronized (this) { // don't race the main thread
 
 			// update the state
-			for (BigDecimal weight : scoreWeights) {
-				state.upperScoreWeightSum = state.upperScoreWeightSum.add(weight);
-				if (MathTools.isLessThan(weight, state.minUpperScoreWeight)) {
+			for (T weight : scoreWeights) {
+				state.upperScoreWeightSum = state.arith.add(state.upperScoreWeightSum, weight);
+				if (state.arith.compare(weight, state.minUpperScoreWeight) < 0) {
 					state.minUpperScoreWeight = weight;
 				}
 			}
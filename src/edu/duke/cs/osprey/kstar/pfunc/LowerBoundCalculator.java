@@ -154,7 +154,7 @@ public class LowerBoundCalculator {
 					econf.getEnergy(),
 					TimeTools.getTimestampNs()
 				);
-				confTable.flush();
+				confTable.flushLater();
 			}
 
 			onEconf.onFinished(econf);
@@ -73,6 +73,31 @@ public interface PartitionFunction {
 	}
 
 	public final MathContext decimalPrecision = new MathContext(64, RoundingMode.HALF_UP);
+
+	/**
+	 * The arithmetic partition function calculators use to compute and sum Boltzmann weights.
+	 * The results are always reported as BigDecimal values, so the implementations can be cross-checked.
+	 */
+	public static enum Arithmetic {
+
+		/** 64-digit BigDecimal arithmetic, the original implementation */
+		Big {
+			@Override
+			public PfuncArithmetic<?> make() {
+				return new PfuncArithmetic.Big(decimalPrecision);
+			}
+		},
+
+		/** double-double arithmetic with a separate exponent, much faster, with about 32 significant digits */
+		DoubleDouble {
+			@Override
+			public PfuncArithmetic<?> make() {
+				return new PfuncArithmetic.DoubleDouble(decimalPrecision);
+			}
+		};
+
+		public abstract PfuncArithmetic<?> make();
+	}
 	
 	public static class Values {
 		
@@ -250,6 +275,13 @@ public interface PartitionFunction {
 		throw new UnsupportedOperationException(getClass().getName() + " does not yet support stability thresholds");
 	}
 
+	/**
+	 * Chooses the arithmetic for Boltzmann weights, if supported. Call before init().
+	 */
+	default void setArithmetic(Arithmetic val) {
+		throw new UnsupportedOperationException(getClass().getName() + " does not yet support choosing the arithmetic");
+	}
+
 	Status getStatus();
 	Values getValues();
 	int getParallelism();
@@ -317,4 +349,41 @@ public interface PartitionFunction {
 			}
 		}
 	}
+
+	public static interface WithConfBufferLimit extends PartitionFunction, AutoCloseable {
+
+		/**
+		 * Caps the memory used to buffer conformations between the upper and lower bound calculations.
+		 * Conformations beyond the cap are spilled to a temporary file on disk.
+		 * null means the buffer is unbounded.
+		 */
+		void setConfBufferMiB(Integer val);
+
+		/**
+		 * Deletes any conformations spilled to disk. Call this when the partition function
+		 * won't be refined any more, even if it didn't finish.
+		 */
+		@Override
+		void close();
+
+		public static void setOrThrow(PartitionFunction pfunc, Integer val) {
+			if (pfunc instanceof PartitionFunction.WithConfBufferLimit) {
+				((PartitionFunction.WithConfBufferLimit)pfunc).setConfBufferMiB(val);
+			} else {
+				throw new PartitionFunction.WithConfBufferLimit.UnsupportedException(pfunc);
+			}
+		}
+
+		public static void closeIfNeeded(PartitionFunction pfunc) {
+			if (pfunc instanceof PartitionFunction.WithConfBufferLimit) {
+				((PartitionFunction.WithConfBufferLimit)pfunc).close();
+			}
+		}
+
+		public static class UnsupportedException extends RuntimeException {
+			public UnsupportedException(PartitionFunction pfunc) {
+				super("This partition function implementation (" + pfunc.getClass().getSimpleName() + ") doesn't support conformation buffer limits");
+			}
+		}
+	}
 }
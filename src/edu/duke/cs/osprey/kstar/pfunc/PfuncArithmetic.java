@@ -0,0 +1,263 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.kstar.pfunc;
+
+import edu.duke.cs.osprey.tools.BigExp;
+import edu.duke.cs.osprey.tools.BigMath;
+import edu.duke.cs.osprey.tools.MathTools;
+
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.math.MathContext;
+
+
+/**
+ * The number type and arithmetic that partition function calculators use
+ * to compute and sum Boltzmann weights.
+ *
+ * Choose an implementation with {@link PartitionFunction#setArithmetic}.
+ */
+public interface PfuncArithmetic<T> {
+
+	T zero();
+	T of(long val);
+	T of(BigInteger val);
+	T of(BigDecimal val);
+
+	/** the Boltzmann weight of the energy */
+	T weight(double energy);
+
+	T add(T a, T b);
+	T sub(T a, T b);
+	T mult(T a, T b);
+
+	/** a/b, as a double */
+	double ratio(T a, T b);
+
+	int compare(T a, T b);
+	boolean isZero(T a);
+	boolean isInfinite(T a);
+
+	double doubleValue(T a);
+	BigDecimal toBigDecimal(T a);
+
+
+	/**
+	 * BigDecimal arithmetic, at the precision of the math context.
+	 * This is the original partition function arithmetic.
+	 */
+	class Big implements PfuncArithmetic<BigDecimal> {
+
+		public final MathContext context;
+
+		private final BoltzmannCalculator bcalc;
+
+		public Big(MathContext context) {
+			this.context = context;
+			this.bcalc = new BoltzmannCalculator(context);
+		}
+
+		@Override
+		public BigDecimal zero() {
+			return BigDecimal.ZERO;
+		}
+
+		@Override
+		public BigDecimal of(long val) {
+			return MathTools.biggen(val);
+		}
+
+		@Override
+		public BigDecimal of(BigInteger val) {
+			return new BigDecimal(val);
+		}
+
+		@Override
+		public BigDecimal of(BigDecimal val) {
+			return val;
+		}
+
+		@Override
+		public BigDecimal weight(double energy) {
+			return bcalc.calc(energy);
+		}
+
+		@Override
+		public BigDecimal add(BigDecimal a, BigDecimal b) {
+			return new BigMath(context).set(a).add(b).get();
+		}
+
+		@Override
+		public BigDecimal sub(BigDecimal a, BigDecimal b) {
+			return new BigMath(context).set(a).sub(b).get();
+		}
+
+		@Override
+		public BigDecimal mult(BigDecimal a, BigDecimal b) {
+			return new BigMath(context).set(a).mult(b).get();
+		}
+
+		@Override
+		public double ratio(BigDecimal a, BigDecimal b) {
+			return new BigMath(context).set(a).div(b).get().doubleValue();
+		}
+
+		@Override
+		public int compare(BigDecimal a, BigDecimal b) {
+			if (MathTools.isLessThan(a, b)) {
+				return -1;
+			} else if (MathTools.isGreaterThan(a, b)) {
+				return 1;
+			}
+			return 0;
+		}
+
+		@Override
+		public boolean isZero(BigDecimal a) {
+			return MathTools.isZero(a);
+		}
+
+		@Override
+		public boolean isInfinite(BigDecimal a) {
+			return MathTools.isInf(a);
+		}
+
+		@Override
+		public double doubleValue(BigDecimal a) {
+			return a.doubleValue();
+		}
+
+		@Override
+		public BigDecimal toBigDecimal(BigDecimal a) {
+			return a;
+		}
+	}
+
+
+	/**
+	 * Double-double arithmetic with a separate exponent, see {@link BigExp}.
+	 *
+	 * Much faster than {@link Big}, with about 32 significant digits instead of 64.
+	 * The Boltzmann weights are more accurate than the {@link Big} weights though,
+	 * which are only computed to double precision before being widened.
+	 * To match {@link Big}, weights too small to show up at the precision of the math context are zero.
+	 */
+	class DoubleDouble implements PfuncArithmetic<BigExp> {
+
+		public final MathContext context;
+
+		private final double minExponent;
+
+		public DoubleDouble(MathContext context) {
+			this.context = context;
+
+			// BoltzmannCalculator rounds weights to this many decimal places
+			this.minExponent = Math.log(0.5) - context.getPrecision()*Math.log(10.0);
+		}
+
+		@Override
+		public BigExp zero() {
+			return BigExp.Zero;
+		}
+
+		@Override
+		public BigExp of(long val) {
+			return BigExp.valueOf(val);
+		}
+
+		@Override
+		public BigExp of(BigInteger val) {
+			return BigExp.valueOf(val);
+		}
+
+		@Override
+		public BigExp of(BigDecimal val) {
+			return BigExp.valueOf(val);
+		}
+
+		@Override
+		public BigExp weight(double energy) {
+			double x = -energy/BoltzmannCalculator.constRT;
+			if (x < minExponent) {
+				return BigExp.Zero;
+			}
+			return BigExp.exp(x);
+		}
+
+		@Override
+		public BigExp add(BigExp a, BigExp b) {
+			return a.add(b);
+		}
+
+		@Override
+		public BigExp sub(BigExp a, BigExp b) {
+			return a.sub(b);
+		}
+
+		@Override
+		public BigExp mult(BigExp a, BigExp b) {
+			return a.mult(b);
+		}
+
+		@Override
+		public double ratio(BigExp a, BigExp b) {
+			return a.div(b).doubleValue();
+		}
+
+		@Override
+		public int compare(BigExp a, BigExp b) {
+			return a.compareTo(b);
+		}
+
+		@Override
+		public boolean isZero(BigExp a) {
+			return a.isZero();
+		}
+
+		@Override
+		public boolean isInfinite(BigExp a) {
+			return a.isInfinite();
+		}
+
+		@Override
+		public double doubleValue(BigExp a) {
+			return a.doubleValue();
+		}
+
+		@Override
+		public BigDecimal toBigDecimal(BigExp a) {
+			return a.toBigDecimal(context);
+		}
+	}
+}
@@ -37,6 +37,7 @@ import edu.duke.cs.osprey.confspace.ConfSearch;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.externalMemory.ExternalMemory;
 import edu.duke.cs.osprey.parallelism.ThreadPoolTaskExecutor;
+import edu.duke.cs.osprey.parallelism.WorkStealingTaskExecutor;
 import edu.duke.cs.osprey.tools.JvmMem;
 import edu.duke.cs.osprey.tools.MathTools;
 import edu.duke.cs.osprey.tools.Stopwatch;
@@ -190,7 +191,7 @@ public class SimplePartitionFunction implements PartitionFunction {
 
 			// nope, need to do some more work
 
-			if (ecalc.tasks instanceof ThreadPoolTaskExecutor) {
+			if (ecalc.tasks instanceof ThreadPoolTaskExecutor || ecalc.tasks instanceof WorkStealingTaskExecutor) {
 
 				// while we're waiting on energy threads, refine q' a bit on the main thread
 				while (upperBound.delta > upperBoundEpsilon && ecalc.tasks.isBusy()) {
@@ -264,7 +265,7 @@ public class SimplePartitionFunction implements PartitionFunction {
 		}
 
 		// if we're still waiting on energy threads, refine q' a bit more on the main thread
-		if (ecalc.tasks instanceof ThreadPoolTaskExecutor) {
+		if (ecalc.tasks instanceof ThreadPoolTaskExecutor || ecalc.tasks instanceof WorkStealingTaskExecutor) {
 			while (upperBound.delta > upperBoundEpsilon && ecalc.tasks.isWorking()) {
 				upperBound.run(scoreConfsBatchSize, upperBoundEpsilon);
 			}
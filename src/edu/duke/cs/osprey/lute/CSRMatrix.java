@@ -0,0 +1,176 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.lute;
+
+import edu.duke.cs.osprey.confspace.TuplesIndex;
+import edu.duke.cs.osprey.parallelism.TaskExecutor;
+
+import java.util.Arrays;
+import java.util.List;
+
+
+/**
+ * The LUTE design matrix, where rows are conformations and columns are tuples,
+ * stored in compressed sparse row (CSR) form.
+ *
+ * Every non-zero entry is 1, so only the column indices are stored.
+ * The transpose is stored too, in compressed sparse column form,
+ * so multiplications by the matrix and its transpose can both be split
+ * among threads without any thread writing to another thread's outputs.
+ */
+public class CSRMatrix {
+
+	static interface Range {
+		void run(int start, int stop);
+	}
+
+	/** don't bother splitting up loops smaller than this */
+	private static final int MinChunkSize = 1024;
+
+	public final int numRows;
+	public final int numCols;
+
+	/** column indices for row r are cols[rowStarts[r]] to cols[rowStarts[r + 1] - 1] */
+	public final int[] rowStarts;
+	public final int[] cols;
+
+	/** row indices for column c are rows[colStarts[c]] to rows[colStarts[c + 1] - 1] */
+	public final int[] colStarts;
+	public final int[] rows;
+
+	/**
+	 * Builds the design matrix in one pass over the conformations.
+	 */
+	public CSRMatrix(TuplesIndex tuples, List<int[]> confs, boolean throwIfMissingSingle, boolean throwIfMissingPair) {
+
+		numRows = confs.size();
+		numCols = tuples.size();
+
+		// collect the column indices, row by row
+		rowStarts = new int[numRows + 1];
+		// start with a guess at the size, and grow as needed
+		int numPos = tuples.confSpace.positions.size();
+		int[][] buf = { new int[(int)Math.min(Integer.MAX_VALUE - 8, Math.max(16L, (long)numRows*numPos))] };
+		int[] size = { 0 };
+		for (int r=0; r<numRows; r++) {
+			rowStarts[r] = size[0];
+			tuples.forEachIndexIn(confs.get(r), throwIfMissingSingle, throwIfMissingPair, (t) -> {
+				if (size[0] == buf[0].length) {
+					buf[0] = Arrays.copyOf(buf[0], buf[0].length*2);
+				}
+				buf[0][size[0]++] = t;
+			});
+		}
+		rowStarts[numRows] = size[0];
+		cols = Arrays.copyOf(buf[0], size[0]);
+
+		// transpose with a counting sort
+		colStarts = new int[numCols + 1];
+		for (int c : cols) {
+			colStarts[c + 1]++;
+		}
+		for (int c=0; c<numCols; c++) {
+			colStarts[c + 1] += colStarts[c];
+		}
+		rows = new int[cols.length];
+		int[] next = Arrays.copyOf(colStarts, numCols);
+		for (int r=0; r<numRows; r++) {
+			for (int i=rowStarts[r]; i<rowStarts[r + 1]; i++) {
+				rows[next[cols[i]]++] = r;
+			}
+		}
+	}
+
+	public int getNumNonZeros() {
+		return cols.length;
+	}
+
+	/** the number of non-zero entries in the column, ie, the number of conformations that have the tuple */
+	public int getColCount(int c) {
+		return colStarts[c + 1] - colStarts[c];
+	}
+
+	/** out = Ax */
+	public void multA(double[] x, double[] out, TaskExecutor tasks) {
+		forEachChunk(numRows, tasks, (start, stop) -> {
+			for (int r=start; r<stop; r++) {
+				double sum = 0.0;
+				for (int i=rowStarts[r]; i<rowStarts[r + 1]; i++) {
+					sum += x[cols[i]];
+				}
+				out[r] = sum;
+			}
+		});
+	}
+
+	/** out = A^t y */
+	public void multAt(double[] y, double[] out, TaskExecutor tasks) {
+		forEachChunk(numCols, tasks, (start, stop) -> {
+			for (int c=start; c<stop; c++) {
+				double sum = 0.0;
+				for (int i=colStarts[c]; i<colStarts[c + 1]; i++) {
+					sum += y[rows[i]];
+				}
+				out[c] = sum;
+			}
+		});
+	}
+
+	/**
+	 * Splits [0,n) into a few chunks per thread, and runs them in parallel.
+	 * Chunks must write to disjoint outputs.
+	 */
+	static void forEachChunk(int n, TaskExecutor tasks, Range range) {
+
+		int numThreads = tasks.getParallelism();
+		if (numThreads <= 1 || n < MinChunkSize*2) {
+			range.run(0, n);
+			return;
+		}
+
+		int numChunks = Math.min(numThreads*4, n/MinChunkSize);
+		for (int i=0; i<numChunks; i++) {
+			int start = (int)((long)n*i/numChunks);
+			int stop = (int)((long)n*(i + 1)/numChunks);
+			tasks.submit(
+				() -> {
+					range.run(start, stop);
+					return null;
+				},
+				(ignored) -> {}
+			);
+		}
+		tasks.waitForFinish();
+	}
+}
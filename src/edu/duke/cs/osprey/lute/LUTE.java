@@ -50,6 +50,7 @@ import smile.regression.LASSO;
 import java.io.File;
 import java.math.BigInteger;
 import java.util.*;
+import java.util.concurrent.atomic.DoubleAccumulator;
 import java.util.function.Consumer;
 import java.util.function.Function;
 
@@ -143,8 +144,215 @@ public class LUTE {
 				binfo.offset += lasso.intercept();
 				return lasso.coefficients();
 			}
+		},
+
+		/**
+		 * ordinary least squares via preconditioned conjugate gradient
+		 *
+		 * solves the same problem as OLSCG, but on the sparse design matrix directly,
+		 * with Jacobi preconditioning and multi-threaded matrix multiplication.
+		 * Starts from the previous fit, if any, so refits after sampling more confs
+		 * or adding more tuples usually only take a few iterations
+		 */
+		OLSPCG(true) {
+
+			@Override
+			public double[] fit(LinearSystem system, LinearSystem.BInfo binfo, TaskExecutor tasks) {
+
+				CSRMatrix A = system.getMatrix();
+				int m = A.numRows;
+				int n = A.numCols;
+
+				// precondition by scaling the columns of A to unit norm
+				double[] d = new double[n];
+				for (int c=0; c<n; c++) {
+					int count = A.getColCount(c);
+					d[c] = count > 0 ? 1.0/Math.sqrt(count) : 0.0;
+				}
+
+				// start at the previous fit, if any
+				double[] x = new double[n];
+				if (binfo.x0 != null) {
+					for (int c=0; c<n; c++) {
+						x[c] = d[c] > 0.0 ? binfo.x0[c] : 0.0;
+					}
+				}
+
+				// use CG on the normal equations (ie CGLS), without ever building A^tA
+				double[] r = new double[m];
+				A.multA(x, r, tasks);
+				for (int i=0; i<m; i++) {
+					r[i] = binfo.b[i] - r[i];
+				}
+				double[] s = new double[n];
+				A.multAt(binfo.b, s, tasks);
+				double stopNorm = OLSPCGTolerance*Math.sqrt(scaledDot(s, s, d));
+				A.multAt(r, s, tasks);
+				for (int c=0; c<n; c++) {
+					s[c] *= d[c];
+				}
+				double[] p = s.clone();
+				double gamma = dot(s, s);
+
+				double[] dp = new double[n];
+				double[] q = new double[m];
+				for (int iter=0; iter<OLSPCGMaxIterations && Math.sqrt(gamma) > stopNorm; iter++) {
+
+					for (int c=0; c<n; c++) {
+						dp[c] = d[c]*p[c];
+					}
+					A.multA(dp, q, tasks);
+					double qq = dot(q, q);
+					if (qq == 0.0) {
+						break;
+					}
+
+					double alpha = gamma/qq;
+					for (int c=0; c<n; c++) {
+						x[c] += alpha*dp[c];
+					}
+					for (int i=0; i<m; i++) {
+						r[i] -= alpha*q[i];
+					}
+
+					A.multAt(r, s, tasks);
+					for (int c=0; c<n; c++) {
+						s[c] *= d[c];
+					}
+					double nextGamma = dot(s, s);
+					double beta = nextGamma/gamma;
+					gamma = nextGamma;
+					for (int c=0; c<n; c++) {
+						p[c] = s[c] + beta*p[c];
+					}
+				}
+
+				return x;
+			}
+		},
+
+		/**
+		 * least absolute shrinkage and selection operator via coordinate descent
+		 *
+		 * solves a LASSO problem on the sparse design matrix directly, and starts from the previous fit, if any.
+		 * Tuples at the same positions can never be in the same conformation, so their columns
+		 * of the design matrix never overlap, and coordinate descent can update them all in parallel
+		 * while getting exactly the same answer as updating them one at a time.
+		 *
+		 * NOTE: the regularization is not the same as the LASSO fitter, so results will differ a bit
+		 */
+		LASSOCD(true) {
+
+			@Override
+			public double[] fit(LinearSystem system, LinearSystem.BInfo binfo, TaskExecutor tasks) {
+
+				CSRMatrix A = system.getMatrix();
+				int m = A.numRows;
+				int n = A.numCols;
+
+				// group the tuples by positions
+				Map<List<Integer>,List<Integer>> tuplesByPos = new LinkedHashMap<>();
+				for (int t=0; t<n; t++) {
+					tuplesByPos.computeIfAbsent(system.tuples.get(t).pos, (key) -> new ArrayList<>()).add(t);
+				}
+				List<int[]> groups = new ArrayList<>();
+				for (List<Integer> group : tuplesByPos.values()) {
+					groups.add(group.stream().mapToInt(i -> i).toArray());
+				}
+
+				// start at the previous fit, if any
+				double[] x = binfo.x0 != null ? binfo.x0.clone() : new double[n];
+				double[] r = new double[m];
+				A.multA(x, r, tasks);
+				for (int i=0; i<m; i++) {
+					r[i] = binfo.b[i] - r[i];
+				}
+				double intercept = updateIntercept(r, 0.0);
+
+				// minimize |r|^2/(2m) + lambda*|x|_1
+				double threshold = LASSOCDLambda*m;
+				for (int sweep=0; sweep<LASSOCDMaxSweeps; sweep++) {
+
+					DoubleAccumulator maxChange = new DoubleAccumulator(Math::max, 0.0);
+					for (int[] group : groups) {
+						CSRMatrix.forEachChunk(group.length, tasks, (start, stop) -> {
+							double chunkMaxChange = 0.0;
+							for (int i=start; i<stop; i++) {
+								int c = group[i];
+
+								int count = A.getColCount(c);
+								if (count == 0) {
+									x[c] = 0.0;
+									continue;
+								}
+
+								double rho = count*x[c];
+								for (int k=A.colStarts[c]; k<A.colStarts[c + 1]; k++) {
+									rho += r[A.rows[k]];
+								}
+								double xc = Math.signum(rho)*Math.max(Math.abs(rho) - threshold, 0.0)/count;
+
+								double delta = xc - x[c];
+								if (delta != 0.0) {
+									x[c] = xc;
+									for (int k=A.colStarts[c]; k<A.colStarts[c + 1]; k++) {
+										r[A.rows[k]] -= delta;
+									}
+									chunkMaxChange = Math.max(chunkMaxChange, Math.abs(delta));
+								}
+							}
+							maxChange.accumulate(chunkMaxChange);
+						});
+					}
+
+					intercept = updateIntercept(r, intercept);
+
+					if (maxChange.get() < LASSOCDTolerance) {
+						break;
+					}
+				}
+
+				binfo.offset += intercept*binfo.scale;
+				return x;
+			}
 		};
 
+		// tried a few things, these seem to work well
+		private static final double OLSPCGTolerance = 1e-8;
+		private static final int OLSPCGMaxIterations = 100000;
+		private static final double LASSOCDLambda = 1e-5;
+		private static final double LASSOCDTolerance = 1e-6;
+		private static final int LASSOCDMaxSweeps = 1000;
+
+		private static double dot(double[] a, double[] b) {
+			double sum = 0.0;
+			for (int i=0; i<a.length; i++) {
+				sum += a[i]*b[i];
+			}
+			return sum;
+		}
+
+		private static double scaledDot(double[] a, double[] b, double[] scale) {
+			double sum = 0.0;
+			for (int i=0; i<a.length; i++) {
+				sum += a[i]*b[i]*scale[i]*scale[i];
+			}
+			return sum;
+		}
+
+		/** moves the mean of the residual into the intercept */
+		private static double updateIntercept(double[] r, double intercept) {
+			double mean = 0.0;
+			for (double ri : r) {
+				mean += ri;
+			}
+			mean /= r.length;
+			for (int i=0; i<r.length; i++) {
+				r[i] -= mean;
+			}
+			return intercept + mean;
+		}
+
 		public final boolean normalize;
 
 		private Fitter(boolean normalize) {
@@ -160,6 +368,9 @@ public class LUTE {
 			double[] b = confEnergies.clone();
 			double offset = 0.0;
 			double scale = 1.0;
+
+			/** the initial guess for the fitters that can use one, in normalized space */
+			double[] x0 = null;
 		}
 
 
@@ -172,6 +383,8 @@ public class LUTE {
 
 		public Errors errors = null;
 
+		private CSRMatrix matrix = null;
+
 		public LinearSystem(TuplesIndex tuples, ConfSampler.Samples samples, Map<int[],Double> confEnergies) {
 
 			this.tuples = tuples;
@@ -192,7 +405,25 @@ public class LUTE {
 			tuples.forEachIn(confs.get(c), throwIfMissingSingle, throwIfMissingPair, callback);
 		}
 
+		/** the design matrix, in sparse form */
+		public CSRMatrix getMatrix() {
+			if (matrix == null) {
+				final boolean throwIfMissingSingle = false; // we're not fitting singles
+				final boolean throwIfMissingPair = true; // we always fit to dense pairs, confs shouldn't be using pruned pairs
+				matrix = new CSRMatrix(tuples, confs, throwIfMissingSingle, throwIfMissingPair);
+			}
+			return matrix;
+		}
+
 		public void fit(Fitter fitter, TaskExecutor tasks) {
+			fit(fitter, tasks, null);
+		}
+
+		/**
+		 * @param initialTupleEnergies a guess for the tuple energies (eg, from a previous fit), or null.
+		 *                             Fitters that can start from a guess will use it.
+		 */
+		public void fit(Fitter fitter, TaskExecutor tasks, double[] initialTupleEnergies) {
 
 			// calculate b, and normalize if needed
 			BInfo binfo = new BInfo();
@@ -215,6 +446,13 @@ public class LUTE {
 				}
 			}
 
+			if (initialTupleEnergies != null) {
+				binfo.x0 = new double[tuples.size()];
+				for (int t=0; t<tuples.size(); t++) {
+					binfo.x0[t] = initialTupleEnergies[t]/binfo.scale;
+				}
+			}
+
 			double[] x = fitter.fit(this, binfo, tasks);
 
 			calcTupleEnergies(x, binfo);
@@ -584,7 +822,7 @@ public class LUTE {
 				for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
 					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
 
-						double interaction = Math.abs(emat.getPairwise(pos1, rc1, pos2, rc2));
+						double interaction = Math.abs(emat.getPairwiseValue(pos1, rc1, pos2, rc2));
 
 						if (interaction > strongestInteractions.get(pos1, pos2)) {
 							strongestInteractions.set(pos1, pos2, interaction);
@@ -762,8 +1000,9 @@ public class LUTE {
 				// fit the linear system to the training set
 				logf("fitting %d confs to %d tuples ...", numSamples, this.tuples.size());
 				Stopwatch trainingSw = new Stopwatch().start();
+				double[] initialTupleEnergies = makeInitialTupleEnergies(tuplesIndex);
 				trainingSystem = new LinearSystem(tuplesIndex, trainingSet, energies);
-				trainingSystem.fit(fitter, tasks);
+				trainingSystem.fit(fitter, tasks, initialTupleEnergies);
 				logf(" done in %s", trainingSw.stop().getTime(2));
 			}
 
@@ -815,6 +1054,24 @@ public class LUTE {
 		log("");
 	}
 
+	/** get the tuple energies from the previous fit, if any, so fitters can start there */
+	private double[] makeInitialTupleEnergies(TuplesIndex tuplesIndex) {
+
+		if (trainingSystem == null || trainingSystem.tupleEnergies == null) {
+			return null;
+		}
+
+		// new tuples start at zero
+		double[] energies = new double[tuplesIndex.size()];
+		for (int t=0; t<tuplesIndex.size(); t++) {
+			Integer prevt = trainingSystem.tuples.getIndex(tuplesIndex.get(t));
+			if (prevt != null) {
+				energies[t] = trainingSystem.tupleEnergies[prevt];
+			}
+		}
+		return energies;
+	}
+
 	public double calcOverfittingScore() {
 
 		double num = testSystem.errors.rms;
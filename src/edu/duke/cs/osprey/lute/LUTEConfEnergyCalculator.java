@@ -32,24 +32,43 @@
 
 package edu.duke.cs.osprey.lute;
 
+import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
 import edu.duke.cs.osprey.confspace.*;
 import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.energy.EnergyCalculator;
 import edu.duke.cs.osprey.energy.ResidueInteractions;
 import edu.duke.cs.osprey.minimization.MoleculeObjectiveFunction;
-import edu.duke.cs.osprey.parallelism.TaskExecutor;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.tools.AutoCleanable;
 
+import java.util.List;
 
-public class LUTEConfEnergyCalculator extends ConfEnergyCalculator implements FragmentEnergies {
+
+public class LUTEConfEnergyCalculator extends ConfEnergyCalculator implements FragmentEnergies, AutoCleanable {
 
 	public final LUTEState state;
 	public final TuplesIndex tuples;
+	public final Parallelism parallelism;
 
 	public LUTEConfEnergyCalculator(SimpleConfSpace confSpace, LUTEState state) {
-		super(confSpace, new TaskExecutor()); // TODO: parallelism?
+		this(confSpace, state, Parallelism.makeCpu(1));
+	}
+
+	/**
+	 * LUTE energies are cheap, so only the A* searches and batches of conformations
+	 * are worth doing in parallel, see {@link #calcEnergies} and {@link ConfAStarTree#setParallelism}.
+	 */
+	public LUTEConfEnergyCalculator(SimpleConfSpace confSpace, LUTEState state, Parallelism parallelism) {
+		super(confSpace, parallelism.makeTaskExecutor());
 
 		this.state = state;
 		this.tuples = new TuplesIndex(confSpace, state.tuples);
+		this.parallelism = parallelism;
+	}
+
+	@Override
+	public void clean() {
+		tasks.clean();
 	}
 
 	private static class NotSupportedByLUTEException extends RuntimeException {
@@ -100,21 +119,49 @@ public class LUTEConfEnergyCalculator extends ConfEnergyCalculator implements Fr
 		final boolean throwIfMissingSingle = false; // we're not fitting singles
 		final boolean throwIfMissingPair = true; // we always fit to dense pairs, confs shouldn't be using pruned pairs
 
-		// silly Java... If this were Kotlin, we wouldn't have to use an array to make the energy modifiable
-		// hopefully JVM escape analysis will stack-allocate this?
-		final double[] energy = new double[] { 0.0 };
-		tuples.forEachIn(conf, throwIfMissingSingle, throwIfMissingPair, (t) -> {
-			energy[0] += state.tupleEnergies[t];
-		});
-		return energy[0] + state.tupleEnergyOffset;
+		return tuples.sum(conf, state.tupleEnergies, throwIfMissingSingle, throwIfMissingPair) + state.tupleEnergyOffset;
+	}
+
+	/**
+	 * Calculates the energies of many conformations at once, in parallel if possible.
+	 * Unlike {@link #calcEnergy(int[])}, conformations that have pruned pairs get infinite energies,
+	 * rather than throwing an exception.
+	 */
+	public double[] calcEnergies(List<int[]> confs) {
+
+		double[] energies = new double[confs.size()];
+
+		// split the confs into a few chunks per thread, so the threads stay busy but don't sync too often
+		int numChunks = Math.min(confs.size(), tasks.getParallelism()*4);
+		for (int chunk=0; chunk<numChunks; chunk++) {
+			int start = (int)((long)confs.size()*chunk/numChunks);
+			int stop = (int)((long)confs.size()*(chunk + 1)/numChunks);
+			tasks.submit(
+				() -> {
+					// each chunk writes to its own part of the energies array, so no need to synchronize
+					for (int i=start; i<stop; i++) {
+						try {
+							energies[i] = tuples.sum(confs.get(i), state.tupleEnergies, false, true) + state.tupleEnergyOffset;
+						} catch (TuplesIndex.NoSuchTupleException ex) {
+							energies[i] = Double.POSITIVE_INFINITY;
+						}
+					}
+					return stop - start;
+				},
+				(numConfs) -> numCalculations.addAndGet(numConfs)
+			);
+		}
+		tasks.waitForFinish();
+
+		return energies;
 	}
 
 	public boolean hasTuple(int pos, int rc) {
-		return tuples.getIndex(pos, rc) != null;
+		return tuples.findIndex(pos, rc) >= 0;
 	}
 
 	public boolean hasTuple(int pos1, int rc1, int pos2, int rc2) {
-		return tuples.getIndex(pos1, rc1, pos2, rc2) != null;
+		return tuples.findIndex(pos1, rc1, pos2, rc2) >= 0;
 	}
 
 	public boolean hasTuple(int pos1, int rc1, int pos2, int rc2, int pos3, int rc3) {
@@ -123,12 +170,12 @@ public class LUTEConfEnergyCalculator extends ConfEnergyCalculator implements Fr
 
 	@Override
 	public double getEnergy(int pos, int rc) {
-		return getEnergy(tuples.getIndex(pos, rc));
+		return getEnergy(tuples.findIndex(pos, rc));
 	}
 
 	@Override
 	public double getEnergy(int pos1, int rc1, int pos2, int rc2) {
-		return getEnergy(tuples.getIndex(pos1, rc1, pos2, rc2));
+		return getEnergy(tuples.findIndex(pos1, rc1, pos2, rc2));
 	}
 
 	public double getEnergy(int pos1, int rc1, int pos2, int rc2, int pos3, int rc3) {
@@ -139,6 +186,13 @@ public class LUTEConfEnergyCalculator extends ConfEnergyCalculator implements Fr
 		if (index == null) {
 			return 0.0;
 		}
+		return getEnergy((int)index);
+	}
+
+	private double getEnergy(int index) {
+		if (index < 0) {
+			return 0.0;
+		}
 		return state.tupleEnergyOffset + state.tupleEnergies[index];
 	}
 }
@@ -118,9 +118,7 @@ public class LUTEGMECFinder {
 
 		Queue.FIFO<ConfSearch.ScoredConf> confs = Queue.FIFOFactory.of();
 
-		ConfAStarTree search = new ConfAStarTree.Builder(null, pmat)
-			.setLUTE(confEcalc)
-			.build();
+		ConfAStarTree search = makeAStar(pmat, confEcalc);
 
 		// start searching for the min score conf
 		System.out.println("Searching for GMEC...");
@@ -175,4 +173,24 @@ public class LUTEGMECFinder {
 
 		return confs;
 	}
+
+	/**
+	 * Makes an A* search over LUTE energies that uses the parallelism of the LUTE energy calculator.
+	 * With more than one thread, many nodes are expanded at once, since LUTE scores are too cheap
+	 * to be worth scoring just the children of one node in parallel.
+	 */
+	public static ConfAStarTree makeAStar(PruningMatrix pmat, LUTEConfEnergyCalculator confEcalc) {
+
+		ConfAStarTree.Builder builder = new ConfAStarTree.Builder(null, pmat)
+			.setLUTE(confEcalc);
+
+		int numThreads = confEcalc.parallelism.getParallelism();
+		if (numThreads > 1) {
+			builder.setNumParallelNodes(numThreads*4);
+		}
+
+		ConfAStarTree astar = builder.build();
+		astar.setParallelism(confEcalc.parallelism);
+		return astar;
+	}
 }
@@ -36,9 +36,8 @@ package edu.duke.cs.osprey.lute;
 import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
 import edu.duke.cs.osprey.confspace.ConfSearch;
 import edu.duke.cs.osprey.externalMemory.ExternalMemory;
-import edu.duke.cs.osprey.kstar.pfunc.BoltzmannCalculator;
 import edu.duke.cs.osprey.kstar.pfunc.PartitionFunction;
-import edu.duke.cs.osprey.tools.BigMath;
+import edu.duke.cs.osprey.kstar.pfunc.PfuncArithmetic;
 import edu.duke.cs.osprey.tools.JvmMem;
 import edu.duke.cs.osprey.tools.MathTools;
 import edu.duke.cs.osprey.tools.Stopwatch;
@@ -53,9 +52,23 @@ import java.math.BigInteger;
  */
 public class LUTEPfunc implements PartitionFunction {
 
+	private static class Bounds<T> {
+
+		final PfuncArithmetic<T> arith;
+
+		T qstar;
+		T qprime;
+
+		Bounds(PfuncArithmetic<T> arith) {
+			this.arith = arith;
+			this.qstar = arith.zero();
+			this.qprime = arith.of(MathTools.BigPositiveInfinity);
+		}
+	}
+
 	public final LUTEConfEnergyCalculator ecalc;
 
-	private final BoltzmannCalculator bcalc = new BoltzmannCalculator(PartitionFunction.decimalPrecision);
+	private Arithmetic arithmetic = Arithmetic.Big;
 
 	private boolean reportProgress = false;
 	private ConfListener confListener = null;
@@ -66,6 +79,7 @@ public class LUTEPfunc implements PartitionFunction {
 
 	private PartitionFunction.Status status;
 	private PartitionFunction.Values values;
+	private Bounds<?> bounds;
 	private int numConfsEvaluated;
 	private Stopwatch stopwatch = new Stopwatch();
 
@@ -83,6 +97,11 @@ public class LUTEPfunc implements PartitionFunction {
 		confListener = val;
 	}
 
+	@Override
+	public void setArithmetic(Arithmetic val) {
+		arithmetic = val;
+	}
+
 	@Override
 	public void init(ConfSearch confSearch, BigInteger numConfsBeforePruning, double epsilon) {
 
@@ -100,6 +119,7 @@ public class LUTEPfunc implements PartitionFunction {
 
 		status = Status.Estimating;
 		values = Values.makeFullRange();
+		bounds = new Bounds<>(arithmetic.make());
 		numConfsEvaluated = 0;
 		stopwatch.start();
 	}
@@ -138,61 +158,87 @@ public class LUTEPfunc implements PartitionFunction {
 			throw new IllegalStateException("pfunc was not initialized. Call init() before compute()");
 		}
 
-		for (int i=0; i<maxNumConfs; i++) {
-
-			ConfSearch.ScoredConf conf = astar.nextConf();
-			if (conf == null) {
-				status = Status.OutOfConformations;
-				break;
-			}
-
-			// confs are ordered by increasing score, so if we hit infinity, the rest of the confs are infinity too
-			if (conf.getScore() == Double.POSITIVE_INFINITY) {
-				status = Status.OutOfLowEnergies;
-				break;
-			}
-
-			// we did a conf! =D
-			numConfsEvaluated++;
-			BigInteger numConfsLeft = numConfsBeforePruning.subtract(BigInteger.valueOf(numConfsEvaluated));
-
-			if (confListener != null) {
-				confListener.onConf(conf);
-			}
+		compute(bounds, maxNumConfs);
+	}
 
-			if (reportProgress) {
-				System.out.println(String.format("conf:%4d, score:%12.6f, bounds:[%12e,%12e], delta:%.6f, time:%10s, heapMem:%s, extMem:%s",
-					numConfsEvaluated,
-					conf.getScore(),
-					values.calcLowerBound().doubleValue(), values.calcUpperBound().doubleValue(),
-					values.getEffectiveEpsilon(),
-					stopwatch.getTime(2),
-					JvmMem.getOldPool(),
-					ExternalMemory.getUsageReport()
-				));
+	private <T> void compute(Bounds<T> bounds, int maxNumConfs) {
+
+		PfuncArithmetic<T> arith = bounds.arith;
+		T stabilityThreshold = this.stabilityThreshold != null ? arith.of(this.stabilityThreshold) : null;
+
+		try {
+			for (int i=0; i<maxNumConfs; i++) {
+
+				ConfSearch.ScoredConf conf = astar.nextConf();
+				if (conf == null) {
+					status = Status.OutOfConformations;
+					break;
+				}
+
+				// confs are ordered by increasing score, so if we hit infinity, the rest of the confs are infinity too
+				if (conf.getScore() == Double.POSITIVE_INFINITY) {
+					status = Status.OutOfLowEnergies;
+					break;
+				}
+
+				// we did a conf! =D
+				numConfsEvaluated++;
+				BigInteger numConfsLeft = numConfsBeforePruning.subtract(BigInteger.valueOf(numConfsEvaluated));
+
+				if (confListener != null) {
+					confListener.onConf(conf);
+				}
+
+				if (reportProgress) {
+					System.out.println(String.format("conf:%4d, score:%12.6f, bounds:[%12e,%12e], delta:%.6f, time:%10s, heapMem:%s, extMem:%s",
+						numConfsEvaluated,
+						conf.getScore(),
+						arith.doubleValue(bounds.qstar), arith.doubleValue(arith.add(bounds.qstar, bounds.qprime)),
+						calcEffectiveEpsilon(bounds),
+						stopwatch.getTime(2),
+						JvmMem.getOldPool(),
+						ExternalMemory.getUsageReport()
+					));
+				}
+
+				// get the weight for this conf
+				T weight = arith.weight(conf.getScore());
+
+				// update pfunc values
+				bounds.qstar = arith.add(bounds.qstar, weight);
+				bounds.qprime = arith.mult(weight, arith.of(numConfsLeft));
+
+				// did we reach epsilon yet?
+				if (calcEffectiveEpsilon(bounds) <= epsilon) {
+					status = Status.Estimated;
+					break;
+				}
+
+				// are we unstable?
+				if (stabilityThreshold != null && arith.compare(arith.add(bounds.qstar, bounds.qprime), stabilityThreshold) < 0) {
+					status = Status.Unstable;
+					break;
+				}
 			}
 
-			// get the weight for this conf
-			BigDecimal weight = bcalc.calc(conf.getScore());
-
-			// update pfunc values
-			values.qstar = values.qstar.add(weight);
-			values.qprime = new BigMath(PartitionFunction.decimalPrecision)
-				.set(weight)
-				.mult(numConfsLeft)
-				.get();
+		} finally {
 
-			// did we reach epsilon yet?
-			if (values.getEffectiveEpsilon() <= epsilon) {
-				status = Status.Estimated;
-				break;
-			}
+			// only convert back to the pfunc values once per batch, conversions aren't cheap
+			values.qstar = arith.toBigDecimal(bounds.qstar);
+			values.qprime = arith.toBigDecimal(bounds.qprime);
+		}
+	}
 
-			// are we unstable?
-			if (stabilityThreshold != null && MathTools.isLessThan(values.calcUpperBound(), stabilityThreshold)) {
-				status = Status.Unstable;
-				break;
-			}
+	/** same as {@link Values#getEffectiveEpsilon()}, but with no pruned confs */
+	private static <T> double calcEffectiveEpsilon(Bounds<T> bounds) {
+		PfuncArithmetic<T> arith = bounds.arith;
+		if (arith.isInfinite(bounds.qprime)) {
+			return 1.0;
+		}
+		T upperBound = arith.add(bounds.qstar, bounds.qprime);
+		if (arith.isZero(upperBound)) {
+			return 1.0;
 		}
+		return arith.ratio(bounds.qprime, upperBound);
 	}
 }
@@ -0,0 +1,850 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.parallelism;
+
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.File;
+import java.io.IOException;
+import java.io.ObjectInputStream;
+import java.io.ObjectOutputStream;
+import java.io.Serializable;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.nio.charset.StandardCharsets;
+import java.security.GeneralSecurityException;
+import java.security.MessageDigest;
+import java.security.SecureRandom;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.CompletableFuture;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.LinkedBlockingDeque;
+import java.util.concurrent.Semaphore;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+
+import javax.crypto.Mac;
+import javax.crypto.spec.SecretKeySpec;
+
+
+/**
+ * Runs tasks on worker processes, on this machine or others, that connect to this coordinator over TCP.
+ *
+ * Start workers with {@link DistributedWorker}, either by hand on other machines, or with
+ * {@link #startLocalWorkers} on this machine. Workers connect to the coordinator, tell it how many
+ * tasks they can run at once, and then pull tasks from a shared queue as their threads free up.
+ * If a worker disconnects, the tasks it was running go back on the queue for the other workers.
+ *
+ * Only {@link RemoteTask} instances are sent to workers, since tasks must be serialized.
+ * All other tasks run on local threads in this process, so existing code that submits
+ * ordinary lambdas still works. Those local tasks can send work to the workers with {@link #call},
+ * which blocks until the result comes back. Either way, listeners are called one at a time
+ * on a single listener thread, just like {@link ThreadPoolTaskExecutor}.
+ *
+ * Large read-only objects that many tasks share (eg, conformation spaces) should be sent to
+ * workers once with {@link #putContext}, and then referenced in tasks by the returned {@link ContextRef}.
+ *
+ * Tasks are Java-serialized objects, so anyone who can talk to the coordinator or a worker can run code there.
+ * By default, the coordinator only listens on the loopback interface. Workers and the coordinator must
+ * also prove to each other that they know the same shared secret (see {@link #getSecret}) before
+ * either side deserializes anything. The secret itself is never sent over the network.
+ * Workers read the secret from the {@value #SecretEnvVar} environment variable.
+ */
+public class DistributedTaskExecutor extends TaskExecutor {
+
+	/** a task that can be serialized and sent to a worker process, its result must be serializable too */
+	public static interface RemoteTask<T> extends Task<T>, Serializable {}
+
+	/**
+	 * A reference to an object that was sent to all the workers by {@link #putContext}.
+	 * Serializing the reference only sends its id, so tasks can cheaply refer to large objects.
+	 */
+	public static class ContextRef<T extends Serializable> implements Serializable {
+
+		private static final long serialVersionUID = 4237640526133719046L;
+
+		public final long id;
+
+		private transient T value;
+
+		private ContextRef(long id, T value) {
+			this.id = id;
+			this.value = value;
+		}
+
+		@SuppressWarnings("unchecked")
+		public T get() {
+			if (value == null) {
+				value = (T)DistributedWorker.getContext(id);
+			}
+			return value;
+		}
+	}
+
+	// message types for the wire protocol
+	static final byte MsgHello = 1;
+	static final byte MsgContext = 2;
+	static final byte MsgTask = 3;
+	static final byte MsgResult = 4;
+	static final byte MsgError = 5;
+	static final byte MsgShutdown = 6;
+
+	/** the environment variable where workers look for the shared secret */
+	public static final String SecretEnvVar = "OSPREY_WORKER_SECRET";
+
+	/** connections must finish the handshake this quickly */
+	static final int HandshakeTimeoutMs = 10*1000;
+
+	private static final int NonceSize = 32;
+	static final int MaxHandshakePayloadSize = 1024;
+
+	static class Message {
+
+		final byte type;
+		final long id;
+		final byte[] payload;
+
+		Message(byte type, long id, byte[] payload) {
+			this.type = type;
+			this.id = id;
+			this.payload = payload;
+		}
+
+		void write(DataOutputStream out)
+		throws IOException {
+			out.writeByte(type);
+			out.writeLong(id);
+			out.writeInt(payload.length);
+			out.write(payload);
+			out.flush();
+		}
+
+		static Message read(DataInputStream in)
+		throws IOException {
+			return read(in, Integer.MAX_VALUE);
+		}
+
+		static Message read(DataInputStream in, int maxPayloadSize)
+		throws IOException {
+			byte type = in.readByte();
+			long id = in.readLong();
+			int size = in.readInt();
+			if (size < 0 || size > maxPayloadSize) {
+				throw new IOException("bad message size: " + size);
+			}
+			byte[] payload = new byte[size];
+			in.readFully(payload);
+			return new Message(type, id, payload);
+		}
+	}
+
+	static byte[] makeNonce() {
+		byte[] nonce = new byte[NonceSize];
+		new SecureRandom().nextBytes(nonce);
+		return nonce;
+	}
+
+	/** proves knowledge of the secret, without revealing it */
+	static byte[] sign(String secret, String role, byte[] nonce1, byte[] nonce2) {
+		try {
+			Mac mac = Mac.getInstance("HmacSHA256");
+			mac.init(new SecretKeySpec(secret.getBytes(StandardCharsets.UTF_8), "HmacSHA256"));
+			mac.update(role.getBytes(StandardCharsets.UTF_8));
+			mac.update(nonce1);
+			mac.update(nonce2);
+			return mac.doFinal();
+		} catch (GeneralSecurityException ex) {
+			throw new Error("can't compute HMAC", ex);
+		}
+	}
+
+	static void checkSignature(byte[] observed, String secret, String role, byte[] nonce1, byte[] nonce2)
+	throws IOException {
+		if (!MessageDigest.isEqual(observed, sign(secret, role, nonce1, nonce2))) {
+			throw new IOException("handshake failed, peer doesn't know the shared secret");
+		}
+	}
+
+	static byte[] concat(byte[] a, byte[] b) {
+		byte[] out = Arrays.copyOf(a, a.length + b.length);
+		System.arraycopy(b, 0, out, a.length, b.length);
+		return out;
+	}
+
+	static byte[] serialize(Object obj) {
+		ByteArrayOutputStream buf = new ByteArrayOutputStream();
+		try (ObjectOutputStream out = new ObjectOutputStream(buf)) {
+			out.writeObject(obj);
+		} catch (IOException ex) {
+			throw new RuntimeException("can't serialize " + obj.getClass().getName(), ex);
+		}
+		return buf.toByteArray();
+	}
+
+	static Object deserialize(byte[] bytes) {
+		try (ObjectInputStream in = new ObjectInputStream(new ByteArrayInputStream(bytes))) {
+			return in.readObject();
+		} catch (IOException | ClassNotFoundException ex) {
+			throw new RuntimeException("can't deserialize object", ex);
+		}
+	}
+
+	private static class Job {
+
+		final long id;
+		final byte[] task;
+		final CompletableFuture<Object> future = new CompletableFuture<>();
+
+		Job(long id, byte[] task) {
+			this.id = id;
+			this.task = task;
+		}
+	}
+
+	private class Connection {
+
+		final Socket socket;
+		final DataInputStream in;
+		final DataOutputStream out;
+		final int numThreads;
+		final Semaphore slots;
+		final Map<Long,Job> jobsInFlight = new ConcurrentHashMap<>();
+
+		private final Thread sender;
+		private final Thread receiver;
+		private volatile boolean isOpen = true;
+
+		Connection(Socket socket)
+		throws IOException {
+
+			this.socket = socket;
+			socket.setTcpNoDelay(true);
+			in = new DataInputStream(new BufferedInputStream(socket.getInputStream()));
+			out = new DataOutputStream(new BufferedOutputStream(socket.getOutputStream()));
+
+			// nothing gets deserialized until the worker proves it knows the secret
+			socket.setSoTimeout(HandshakeTimeoutMs);
+			try {
+
+				// the worker says hello first, with its number of threads and a nonce
+				Message hello = Message.read(in, MaxHandshakePayloadSize);
+				if (hello.type != MsgHello || hello.payload.length != NonceSize) {
+					throw new IOException("unexpected hello from worker");
+				}
+				byte[] workerNonce = hello.payload;
+
+				// prove we know the secret too, so the worker trusts our tasks
+				byte[] coordinatorNonce = makeNonce();
+				new Message(MsgHello, 0, concat(coordinatorNonce, sign(secret, "coordinator", workerNonce, coordinatorNonce))).write(out);
+
+				Message proof = Message.read(in, MaxHandshakePayloadSize);
+				if (proof.type != MsgHello) {
+					throw new IOException("unexpected message from worker: " + proof.type);
+				}
+				checkSignature(proof.payload, secret, "worker", coordinatorNonce, workerNonce);
+
+				numThreads = (int)hello.id;
+				if (numThreads <= 0) {
+					throw new IOException("bad number of worker threads: " + numThreads);
+				}
+
+			} catch (IOException ex) {
+				socket.close();
+				throw ex;
+			}
+			socket.setSoTimeout(0);
+			slots = new Semaphore(numThreads);
+
+			String name = socket.getRemoteSocketAddress().toString();
+			sender = makeThread("distributed-send-" + name, this::send);
+			receiver = makeThread("distributed-receive-" + name, this::receive);
+		}
+
+		void start() {
+			sender.start();
+			receiver.start();
+		}
+
+		void write(Message msg)
+		throws IOException {
+			synchronized (out) {
+				msg.write(out);
+			}
+		}
+
+		private void send() {
+			try {
+				while (isOpen) {
+
+					// wait for the worker to have a free thread, then wait for a job
+					slots.acquire();
+					Job job = jobs.take();
+
+					jobsInFlight.put(job.id, job);
+					try {
+						write(new Message(MsgTask, job.id, job.task));
+					} catch (IOException ex) {
+
+						// couldn't send the job, give it to another worker
+						if (jobsInFlight.remove(job.id) != null) {
+							jobs.addFirst(job);
+						}
+						close();
+					}
+				}
+			} catch (InterruptedException ex) {
+				// connection closed, we're done
+			}
+		}
+
+		private void receive() {
+			try {
+				while (isOpen) {
+					Message msg = Message.read(in);
+					Job job = jobsInFlight.remove(msg.id);
+					slots.release();
+					if (job == null) {
+						// job was already re-queued, ignore the result
+						continue;
+					}
+					try {
+						switch (msg.type) {
+							case MsgResult:
+								job.future.complete(deserialize(msg.payload));
+							break;
+							case MsgError:
+								job.future.completeExceptionally((Throwable)deserialize(msg.payload));
+							break;
+							default:
+								throw new IOException("unexpected message from worker: " + msg.type);
+						}
+					} catch (RuntimeException ex) {
+						job.future.completeExceptionally(ex);
+					}
+				}
+			} catch (IOException ex) {
+				// worker went away
+			} finally {
+				close();
+			}
+		}
+
+		void close() {
+
+			if (!isOpen) {
+				return;
+			}
+			isOpen = false;
+
+			synchronized (connections) {
+				connections.remove(this);
+				if (connections.isEmpty()) {
+					noWorkersSinceMs = System.currentTimeMillis();
+				}
+				connections.notifyAll();
+			}
+
+			try {
+				socket.close();
+			} catch (IOException ex) {
+				// don't care
+			}
+			sender.interrupt();
+
+			// send any unfinished jobs to the other workers
+			for (Long id : new ArrayList<>(jobsInFlight.keySet())) {
+				Job job = jobsInFlight.remove(id);
+				if (job != null) {
+					jobs.addFirst(job);
+				}
+			}
+		}
+	}
+
+	private static final AtomicInteger nextId = new AtomicInteger(0);
+
+	private final int executorId = nextId.getAndIncrement();
+	private final ServerSocket server;
+	private final String secret;
+	private volatile long workerTimeoutMs = DefaultWorkerTimeoutMs;
+	private volatile long noWorkersSinceMs = System.currentTimeMillis();
+	private final List<Connection> connections = new ArrayList<>();
+	private final Map<Long,byte[]> contexts = new LinkedHashMap<>();
+	private final LinkedBlockingDeque<Job> jobs = new LinkedBlockingDeque<>();
+	private final List<Process> processes = new ArrayList<>();
+	private final ExecutorService localThreads;
+	private final ExecutorService listenerThread;
+	private final AtomicLong nextJobId = new AtomicLong(0);
+	private final AtomicLong nextContextId = new AtomicLong(0);
+	private final AtomicLong numTasksStarted = new AtomicLong(0);
+	private final AtomicLong numTasksFinished = new AtomicLong(0);
+	private final AtomicReference<TaskException> exception = new AtomicReference<>(null);
+	private final Signal taskSignal = new Signal();
+	private volatile boolean isOpen = true;
+
+	/** by default, fail remote tasks if no workers have been connected for this long */
+	public static final long DefaultWorkerTimeoutMs = 5*60*1000;
+
+	/** listens for local workers on a port chosen by the operating system, see {@link #getPort} */
+	public DistributedTaskExecutor() {
+		this(0);
+	}
+
+	/** listens for local workers on the given port, using a random secret, see {@link #getSecret} */
+	public DistributedTaskExecutor(int port) {
+		this(InetAddress.getLoopbackAddress(), port, null);
+	}
+
+	/**
+	 * @param bindAddress The network interface where workers connect. Use the loopback address
+	 *                    for workers on this machine only, or the address of a trusted private network
+	 *                    for workers on other machines. Never use an untrusted network.
+	 * @param port The port where workers connect, or 0 to let the operating system choose.
+	 * @param secret The secret shared with the workers, or null to make a random one.
+	 */
+	public DistributedTaskExecutor(InetAddress bindAddress, int port, String secret) {
+
+		if (secret == null) {
+			StringBuilder buf = new StringBuilder();
+			for (byte b : makeNonce()) {
+				buf.append(String.format("%02x", b));
+			}
+			secret = buf.toString();
+		} else if (secret.isEmpty()) {
+			throw new IllegalArgumentException("secret can't be empty");
+		}
+		this.secret = secret;
+
+		try {
+			server = new ServerSocket(port, 50, bindAddress);
+		} catch (IOException ex) {
+			throw new RuntimeException("can't listen for workers on " + bindAddress + ":" + port, ex);
+		}
+
+		AtomicInteger localThreadId = new AtomicInteger(0);
+		localThreads = Executors.newCachedThreadPool((runnable) -> {
+			Thread thread = Executors.defaultThreadFactory().newThread(runnable);
+			thread.setDaemon(true);
+			thread.setName(String.format("distributed-%d-local-%d", executorId, localThreadId.getAndIncrement()));
+			return thread;
+		});
+		listenerThread = Executors.newSingleThreadExecutor((runnable) -> {
+			Thread thread = Executors.defaultThreadFactory().newThread(runnable);
+			thread.setDaemon(true);
+			thread.setName(String.format("distributed-%d-listener", executorId));
+			return thread;
+		});
+
+		makeThread(String.format("distributed-%d-accept", executorId), this::accept).start();
+	}
+
+	private static Thread makeThread(String name, Runnable runnable) {
+		Thread thread = new Thread(runnable);
+		thread.setDaemon(true);
+		thread.setName(name);
+		return thread;
+	}
+
+	private void accept() {
+		AtomicInteger handshakeId = new AtomicInteger(0);
+		while (isOpen) {
+			try {
+				Socket socket = server.accept();
+
+				// handshake on another thread, so slow clients can't hold up other workers
+				makeThread(
+					String.format("distributed-%d-handshake-%d", executorId, handshakeId.getAndIncrement()),
+					() -> connect(socket)
+				).start();
+
+			} catch (IOException ex) {
+				// server closed
+			}
+		}
+	}
+
+	private void connect(Socket socket) {
+		try {
+			Connection connection = new Connection(socket);
+
+			// send all the contexts before any jobs
+			synchronized (contexts) {
+				for (Map.Entry<Long,byte[]> entry : contexts.entrySet()) {
+					connection.write(new Message(MsgContext, entry.getKey(), entry.getValue()));
+				}
+				synchronized (connections) {
+					if (!isOpen) {
+						// executor closed during the handshake
+						connection.socket.close();
+						return;
+					}
+					connections.add(connection);
+					noWorkersSinceMs = Long.MAX_VALUE;
+					connections.notifyAll();
+				}
+			}
+
+			connection.start();
+
+		} catch (IOException ex) {
+			// the worker failed to connect
+			try {
+				socket.close();
+			} catch (IOException ex2) {
+				// don't care
+			}
+		}
+	}
+
+	/** the port where workers should connect */
+	public int getPort() {
+		return server.getLocalPort();
+	}
+
+	/**
+	 * The secret workers need to connect, pass it to workers in the {@value #SecretEnvVar} environment variable.
+	 * Keep it private, anyone who knows it can run code on the coordinator and the workers.
+	 */
+	public String getSecret() {
+		return secret;
+	}
+
+	/**
+	 * If no workers have been connected for this long, pending remote tasks fail
+	 * instead of waiting forever for a worker.
+	 */
+	public DistributedTaskExecutor setWorkerTimeout(long timeoutMs) {
+		workerTimeoutMs = timeoutMs;
+		return this;
+	}
+
+	public int getNumWorkers() {
+		synchronized (connections) {
+			return connections.size();
+		}
+	}
+
+	/**
+	 * Starts worker processes on this machine, using the same JVM and classpath as this process.
+	 * Use {@link #waitForWorkers} to wait for them to connect.
+	 */
+	public void startLocalWorkers(int numProcesses, int numThreadsPerProcess) {
+
+		String java = System.getProperty("java.home") + File.separator + "bin" + File.separator + "java";
+
+		for (int i=0; i<numProcesses; i++) {
+			List<String> command = new ArrayList<>();
+			command.add(java);
+			command.add("-cp");
+			command.add(System.getProperty("java.class.path"));
+			command.add("-Djava.library.path=" + System.getProperty("java.library.path"));
+			command.add(DistributedWorker.class.getName());
+			command.add("--host");
+			command.add(server.getInetAddress().isAnyLocalAddress() ? "localhost" : server.getInetAddress().getHostAddress());
+			command.add("--port");
+			command.add(Integer.toString(getPort()));
+			command.add("--threads");
+			command.add(Integer.toString(numThreadsPerProcess));
+			try {
+				ProcessBuilder builder = new ProcessBuilder(command)
+					.inheritIO();
+				// don't put the secret on the command line, where other users could see it
+				builder.environment().put(SecretEnvVar, secret);
+				Process process = builder.start();
+				synchronized (processes) {
+					processes.add(process);
+				}
+			} catch (IOException ex) {
+				throw new RuntimeException("can't start worker process", ex);
+			}
+		}
+	}
+
+	/** blocks until at least this many workers are connected */
+	public void waitForWorkers(int numWorkers, long timeoutMs) {
+		long stopTime = System.currentTimeMillis() + timeoutMs;
+		synchronized (connections) {
+			while (connections.size() < numWorkers) {
+				long waitMs = stopTime - System.currentTimeMillis();
+				if (waitMs <= 0) {
+					throw new RuntimeException(String.format("timed out waiting for workers, only %d of %d connected", connections.size(), numWorkers));
+				}
+				try {
+					connections.wait(waitMs);
+				} catch (InterruptedException ex) {
+					throw new Error(ex);
+				}
+			}
+		}
+	}
+
+	/**
+	 * Sends an object to all the workers, including ones that connect later.
+	 * Tasks can then use the returned reference to get the object without re-sending it.
+	 */
+	public <T extends Serializable> ContextRef<T> putContext(T value) {
+		long id = nextContextId.getAndIncrement();
+		byte[] bytes = serialize(value);
+		synchronized (contexts) {
+			contexts.put(id, bytes);
+			List<Connection> connections;
+			synchronized (this.connections) {
+				connections = new ArrayList<>(this.connections);
+			}
+			for (Connection connection : connections) {
+				try {
+					connection.write(new Message(MsgContext, id, bytes));
+				} catch (IOException ex) {
+					connection.close();
+				}
+			}
+		}
+		return new ContextRef<>(id, value);
+	}
+
+	private Job enqueue(RemoteTask<?> task) {
+		Job job = new Job(nextJobId.getAndIncrement(), serialize(task));
+		jobs.addLast(job);
+		return job;
+	}
+
+	/**
+	 * Runs the task on a worker and waits for the result.
+	 * Safe to call from any thread, including from inside local tasks.
+	 */
+	@SuppressWarnings("unchecked")
+	public <T> T call(RemoteTask<T> task) {
+		Job job = enqueue(task);
+		try {
+			while (true) {
+				try {
+					return (T)job.future.get(1, TimeUnit.SECONDS);
+				} catch (TimeoutException ex) {
+					checkWorkers();
+				}
+			}
+		} catch (InterruptedException ex) {
+			throw new Error(ex);
+		} catch (ExecutionException ex) {
+			if (ex.getCause() instanceof RuntimeException) {
+				throw (RuntimeException)ex.getCause();
+			}
+			throw new RuntimeException("task failed on worker", ex.getCause());
+		}
+	}
+
+	/** fails all the pending remote tasks if no workers have been connected for too long */
+	private void checkWorkers() {
+
+		long noWorkersSinceMs = this.noWorkersSinceMs;
+		if (noWorkersSinceMs == Long.MAX_VALUE || System.currentTimeMillis() - noWorkersSinceMs < workerTimeoutMs) {
+			return;
+		}
+
+		RuntimeException ex = new IllegalStateException(String.format("no workers connected for %d ms", workerTimeoutMs));
+		List<Job> pendingJobs = new ArrayList<>();
+		jobs.drainTo(pendingJobs);
+		for (Job job : pendingJobs) {
+			job.future.completeExceptionally(ex);
+		}
+	}
+
+	@Override
+	public int getParallelism() {
+		int numThreads = 0;
+		synchronized (connections) {
+			for (Connection connection : connections) {
+				numThreads += connection.numThreads;
+			}
+		}
+		return Math.max(1, numThreads);
+	}
+
+	@Override
+	public boolean isBusy() {
+		return getNumRunningTasks() >= getParallelism();
+	}
+
+	@Override
+	public boolean isWorking() {
+		return getNumRunningTasks() > 0;
+	}
+
+	public long getNumRunningTasks() {
+		return numTasksStarted.get() - numTasksFinished.get();
+	}
+
+	@Override
+	@SuppressWarnings("unchecked")
+	public <T> void submit(Task<T> task, TaskListener<T> listener) {
+
+		// wait for a free worker thread, like a thread pool with no queue
+		while (isBusy()) {
+
+			// check for exceptions
+			// NOTE: waitForFinish will throw the exception
+			if (exception.get() != null) {
+				waitForFinish();
+			}
+
+			checkWorkers();
+			taskSignal.waitForSignal(100);
+		}
+		if (exception.get() != null) {
+			waitForFinish();
+		}
+
+		numTasksStarted.incrementAndGet();
+
+		if (task instanceof RemoteTask) {
+
+			// send the task to a worker
+			enqueue((RemoteTask<T>)task).future.whenComplete((result, t) -> {
+				listenerThread.submit(() -> finish(task, listener, (T)result, t));
+			});
+
+		} else {
+
+			// run the task here
+			localThreads.submit(() -> {
+				T result;
+				try {
+					result = task.run();
+				} catch (Throwable t) {
+					finish(task, listener, null, t);
+					return;
+				}
+				listenerThread.submit(() -> finish(task, listener, result, null));
+			});
+		}
+	}
+
+	private <T> void finish(Task<T> task, TaskListener<T> listener, T result, Throwable t) {
+
+		if (t == null) {
+			try {
+				listener.onFinished(result);
+			} catch (Throwable t2) {
+				t = t2;
+			}
+		}
+
+		if (t != null) {
+			// record the exception, but don't overwrite any existing exceptions
+			exception.compareAndSet(null, new TaskException(task, listener, t));
+		}
+
+		// tell anyone waiting that we finished a task
+		numTasksFinished.incrementAndGet();
+		taskSignal.sendSignal();
+	}
+
+	@Override
+	public void waitForFinish() {
+
+		long numTasks = numTasksStarted.get();
+
+		while (numTasksFinished.get() < numTasks) {
+
+			// wait a bit before checking again, unless a task finishes
+			checkWorkers();
+			taskSignal.waitForSignal(100);
+		}
+
+		// check for exceptions
+		TaskException t = exception.get();
+		if (t != null) {
+			throw t;
+		}
+	}
+
+	/** tells all workers to exit, and stops any local worker processes */
+	@Override
+	public void clean() {
+
+		if (!isOpen) {
+			return;
+		}
+		isOpen = false;
+
+		try {
+			server.close();
+		} catch (IOException ex) {
+			// don't care
+		}
+
+		List<Connection> connections;
+		synchronized (this.connections) {
+			connections = new ArrayList<>(this.connections);
+		}
+		for (Connection connection : connections) {
+			try {
+				connection.write(new Message(MsgShutdown, 0, new byte[0]));
+			} catch (IOException ex) {
+				// worker is already gone
+			}
+			connection.close();
+		}
+
+		synchronized (processes) {
+			for (Process process : processes) {
+				try {
+					if (!process.waitFor(5, TimeUnit.SECONDS)) {
+						process.destroyForcibly();
+					}
+				} catch (InterruptedException ex) {
+					process.destroyForcibly();
+				}
+			}
+			processes.clear();
+		}
+
+		localThreads.shutdown();
+		listenerThread.shutdown();
+	}
+}
@@ -0,0 +1,198 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.parallelism;
+
+import static edu.duke.cs.osprey.parallelism.DistributedTaskExecutor.*;
+
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.IOException;
+import java.net.Socket;
+import java.util.Arrays;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.atomic.AtomicInteger;
+
+
+/**
+ * A worker process for {@link DistributedTaskExecutor}.
+ *
+ * Connects to the coordinator, runs the tasks it sends on a pool of threads,
+ * and sends back the results, until the coordinator says to stop or goes away.
+ *
+ * Usage: java -cp osprey.jar edu.duke.cs.osprey.parallelism.DistributedWorker --host coordinator --port 12345 [--threads N]
+ *
+ * The worker needs the same classpath as the coordinator, so it can deserialize the tasks.
+ * It also needs the coordinator's secret (see {@link DistributedTaskExecutor#getSecret}) in the
+ * {@value DistributedTaskExecutor#SecretEnvVar} environment variable. The worker won't deserialize
+ * anything until the coordinator proves it knows the secret too.
+ */
+public class DistributedWorker {
+
+	private static final Map<Long,Object> contexts = new ConcurrentHashMap<>();
+	private static volatile int numThreads = 1;
+
+	/** get an object sent by {@link DistributedTaskExecutor#putContext} */
+	public static Object getContext(long id) {
+		Object context = contexts.get(id);
+		if (context == null) {
+			throw new IllegalStateException("no context with id " + id + ", this should only be called by tasks running on a worker");
+		}
+		return context;
+	}
+
+	/** the number of tasks this worker runs at once */
+	public static int getNumThreads() {
+		return numThreads;
+	}
+
+	public static void main(String[] args)
+	throws IOException {
+
+		String host = "localhost";
+		Integer port = null;
+		int numThreads = Parallelism.getMaxNumCPUs();
+
+		for (int i=0; i<args.length; i++) {
+			switch (args[i]) {
+				case "--host": host = args[++i]; break;
+				case "--port": port = Integer.parseInt(args[++i]); break;
+				case "--threads": numThreads = Integer.parseInt(args[++i]); break;
+				default: throw new IllegalArgumentException("unrecognized argument: " + args[i]);
+			}
+		}
+		if (port == null) {
+			throw new IllegalArgumentException("--port is required");
+		}
+
+		String secret = System.getenv(SecretEnvVar);
+		if (secret == null || secret.isEmpty()) {
+			throw new IllegalArgumentException("the " + SecretEnvVar + " environment variable is required");
+		}
+
+		run(host, port, numThreads, secret);
+	}
+
+	public static void run(String host, int port, int numThreads, String secret)
+	throws IOException {
+
+		DistributedWorker.numThreads = numThreads;
+
+		AtomicInteger threadId = new AtomicInteger(0);
+		ExecutorService pool = Executors.newFixedThreadPool(numThreads, (runnable) -> {
+			Thread thread = Executors.defaultThreadFactory().newThread(runnable);
+			thread.setDaemon(true);
+			thread.setName("worker-" + threadId.getAndIncrement());
+			return thread;
+		});
+
+		try (Socket socket = new Socket(host, port)) {
+			socket.setTcpNoDelay(true);
+
+			DataInputStream in = new DataInputStream(new BufferedInputStream(socket.getInputStream()));
+			DataOutputStream out = new DataOutputStream(new BufferedOutputStream(socket.getOutputStream()));
+
+			// make sure the coordinator knows the secret before trusting anything it sends
+			socket.setSoTimeout(HandshakeTimeoutMs);
+			byte[] workerNonce = makeNonce();
+			new Message(MsgHello, numThreads, workerNonce).write(out);
+			Message hello = Message.read(in, MaxHandshakePayloadSize);
+			if (hello.type != MsgHello || hello.payload.length <= workerNonce.length) {
+				throw new IOException("unexpected hello from coordinator");
+			}
+			byte[] coordinatorNonce = Arrays.copyOf(hello.payload, workerNonce.length);
+			byte[] signature = Arrays.copyOfRange(hello.payload, workerNonce.length, hello.payload.length);
+			checkSignature(signature, secret, "coordinator", workerNonce, coordinatorNonce);
+			new Message(MsgHello, numThreads, sign(secret, "worker", coordinatorNonce, workerNonce)).write(out);
+			socket.setSoTimeout(0);
+
+			while (true) {
+
+				Message msg;
+				try {
+					msg = Message.read(in);
+				} catch (EOFException ex) {
+					// coordinator went away
+					break;
+				}
+
+				if (msg.type == MsgContext) {
+					contexts.put(msg.id, deserialize(msg.payload));
+				} else if (msg.type == MsgTask) {
+					pool.submit(() -> runTask(msg, out));
+				} else if (msg.type == MsgShutdown) {
+					break;
+				} else {
+					throw new IOException("unexpected message from coordinator: " + msg.type);
+				}
+			}
+
+		} finally {
+			pool.shutdownNow();
+			contexts.clear();
+		}
+	}
+
+	private static void runTask(Message msg, DataOutputStream out) {
+
+		Message reply;
+		try {
+			TaskExecutor.Task<?> task = (TaskExecutor.Task<?>)deserialize(msg.payload);
+			reply = new Message(MsgResult, msg.id, serialize(task.run()));
+		} catch (Throwable t) {
+			reply = new Message(MsgError, msg.id, serializeError(t));
+		}
+
+		try {
+			synchronized (out) {
+				reply.write(out);
+			}
+		} catch (IOException ex) {
+			// coordinator went away, nothing to do
+		}
+	}
+
+	private static byte[] serializeError(Throwable t) {
+		try {
+			return serialize(t);
+		} catch (RuntimeException ex) {
+			// the exception itself can't be serialized, so just send the message
+			return serialize(new RuntimeException(t.toString()));
+		}
+	}
+}
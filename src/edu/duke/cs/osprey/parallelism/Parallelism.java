@@ -47,6 +47,13 @@ public class Parallelism {
 		
 		/** The number of simultaneous tasks that should be given to each GPU */
 		private int numStreamsPerGpu = 1;
+
+		/**
+		 * True to run tasks with a {@link WorkStealingTaskExecutor},
+		 * which scales better to many threads than the default {@link ThreadPoolTaskExecutor}.
+		 * This picks the executor for all parallel tasks, so with GPUs, it applies to the GPU streams too.
+		 */
+		private boolean workStealing = false;
 		
 		public Builder setNumCpus(int val) {
 			numCpus = val;
@@ -63,8 +70,13 @@ public class Parallelism {
 			return this;
 		}
 		
+		public Builder setWorkStealing(boolean val) {
+			workStealing = val;
+			return this;
+		}
+
 		public Parallelism build() {
-			return new Parallelism(numCpus, numGpus, numStreamsPerGpu);
+			return new Parallelism(numCpus, numGpus, numStreamsPerGpu, workStealing);
 		}
 	}
 	
@@ -111,13 +123,19 @@ public class Parallelism {
 	public final int numThreads;
 	public final int numGpus;
 	public final int numStreamsPerGpu;
+	public final boolean workStealing;
 	
 	public final Type type;
 	
 	public Parallelism(int numThreads, int numGpus, int numStreamsPerGpu) {
+		this(numThreads, numGpus, numStreamsPerGpu, false);
+	}
+
+	public Parallelism(int numThreads, int numGpus, int numStreamsPerGpu, boolean workStealing) {
 		this.numThreads = numThreads;
 		this.numGpus = numGpus;
 		this.numStreamsPerGpu = numStreamsPerGpu;
+		this.workStealing = workStealing;
 		
 		// prefer gpus over threads
 		if (numGpus > 0) {
@@ -148,7 +166,14 @@ public class Parallelism {
 	 *                 false to only submit a task when a thread is ready (prevents extra tasks)
 	 */
 	public TaskExecutor makeTaskExecutor(Integer queueSize) {
-		if (getParallelism() > 1) {
+		if (getParallelism() > 1 && workStealing) {
+			WorkStealingTaskExecutor tasks = new WorkStealingTaskExecutor();
+			if (queueSize != null) {
+				tasks.queueSize = queueSize;
+			}
+			tasks.start(getParallelism());
+			return tasks;
+		} else if (getParallelism() > 1) {
 			ThreadPoolTaskExecutor tasks = new ThreadPoolTaskExecutor();
 			if (queueSize != null) {
 				tasks.queueSize = queueSize;
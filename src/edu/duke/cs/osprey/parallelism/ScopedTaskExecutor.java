@@ -0,0 +1,153 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.parallelism;
+
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+
+
+/**
+ * A view of another task executor that only tracks the tasks submitted through it.
+ *
+ * Lets many independent callers (e.g., partition functions for different sequences)
+ * share one thread pool, while {@link #waitForFinish()} only waits for this caller's
+ * tasks, rather than every task in the pool.
+ */
+public class ScopedTaskExecutor extends TaskExecutor {
+
+	private static class Outcome<T> {
+
+		final T result;
+		final Throwable error;
+
+		Outcome(T result, Throwable error) {
+			this.result = result;
+			this.error = error;
+		}
+	}
+
+	public final TaskExecutor parent;
+
+	private final AtomicLong numTasksStarted = new AtomicLong(0);
+	private final AtomicLong numTasksFinished = new AtomicLong(0);
+	private final AtomicReference<TaskException> exception = new AtomicReference<>(null);
+
+	public ScopedTaskExecutor(TaskExecutor parent) {
+		this.parent = parent;
+	}
+
+	@Override
+	public int getParallelism() {
+		return parent.getParallelism();
+	}
+
+	@Override
+	public boolean isBusy() {
+		return parent.isBusy();
+	}
+
+	@Override
+	public boolean isWorking() {
+		return getNumRunningTasks() > 0;
+	}
+
+	public long getNumRunningTasks() {
+		return numTasksStarted.get() - numTasksFinished.get();
+	}
+
+	@Override
+	public <T> void submit(Task<T> task, TaskListener<T> listener) {
+
+		// don't start new tasks if an old one failed
+		if (exception.get() != null) {
+			waitForFinish();
+		}
+
+		numTasksStarted.incrementAndGet();
+
+		// catch errors here, so failures in this scope don't poison the parent executor
+		parent.<Outcome<T>>submit(
+			() -> {
+				try {
+					return new Outcome<>(task.run(), null);
+				} catch (Throwable t) {
+					return new Outcome<>(null, t);
+				}
+			},
+			(outcome) -> {
+				try {
+					if (outcome.error != null) {
+						recordException(task, listener, outcome.error);
+					} else {
+						listener.onFinished(outcome.result);
+					}
+				} catch (Throwable t) {
+					recordException(task, listener, t);
+				} finally {
+					finishedTask();
+				}
+			}
+		);
+	}
+
+	@Override
+	public void waitForFinish() {
+
+		synchronized (this) {
+			while (numTasksFinished.get() < numTasksStarted.get()) {
+				try {
+					wait();
+				} catch (InterruptedException ex) {
+					throw new Error(ex);
+				}
+			}
+		}
+
+		// check for exceptions
+		TaskException t = exception.getAndSet(null);
+		if (t != null) {
+			throw t;
+		}
+	}
+
+	private void recordException(Task<?> task, TaskListener<?> listener, Throwable t) {
+		exception.compareAndSet(null, new TaskException(task, listener, t));
+	}
+
+	private void finishedTask() {
+		synchronized (this) {
+			numTasksFinished.incrementAndGet();
+			notifyAll();
+		}
+	}
+}
@@ -0,0 +1,287 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.parallelism;
+
+import java.util.concurrent.ConcurrentLinkedQueue;
+import java.util.concurrent.ForkJoinPool;
+import java.util.concurrent.ForkJoinWorkerThread;
+import java.util.concurrent.Semaphore;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+import java.util.concurrent.locks.ReentrantLock;
+
+import edu.duke.cs.tpie.Cleaner;
+import edu.duke.cs.tpie.Cleaner.Cleanable;
+import edu.duke.cs.tpie.Cleaner.GarbageDetectable;
+
+
+/**
+ * A drop-in alternative to {@link ThreadPoolTaskExecutor} that scales better to many threads.
+ *
+ * Tasks run on a work-stealing pool, so idle threads take work from busy threads instead
+ * of all threads contending on one shared queue.
+ *
+ * By default, listeners are still called one at a time, like {@link ThreadPoolTaskExecutor},
+ * so existing listeners don't need to be thread-safe. But instead of handing every result to a
+ * single listener thread, the task thread that finishes a task calls the waiting listeners itself,
+ * in a batch, if no other thread is calling listeners already.
+ *
+ * Listeners that are thread-safe (eg, they only update atomic or concurrent accumulators)
+ * can set {@link #concurrentListeners} to be called right away on the task thread, with no serialization at all.
+ */
+public class WorkStealingTaskExecutor extends TaskExecutor implements GarbageDetectable {
+
+	private static class Threads implements Cleanable {
+
+		private static int nextId = 0;
+
+		final int poolId = nextId++;
+		final ForkJoinPool pool;
+
+		public Threads(int numThreads) {
+			AtomicInteger threadId = new AtomicInteger(0);
+			pool = new ForkJoinPool(
+				numThreads,
+				(p) -> {
+					ForkJoinWorkerThread thread = ForkJoinPool.defaultForkJoinWorkerThreadFactory.newThread(p);
+					thread.setDaemon(true);
+					thread.setName(String.format("ws-%d-%d", poolId, threadId.getAndIncrement()));
+					return thread;
+				},
+				null,
+				true // FIFO scheduling, tasks never join each other
+			);
+		}
+
+		@Override
+		public void clean() {
+			pool.shutdown();
+		}
+
+		public void cleanAndWait(int timeoutMs) {
+			clean();
+			try {
+				pool.awaitTermination(timeoutMs, TimeUnit.MILLISECONDS);
+			} catch (InterruptedException ex) {
+				throw new Error(ex);
+			}
+		}
+	}
+
+	/**
+	 * Controls how many tasks can wait to be started, see {@link ThreadPoolTaskExecutor#queueSize}.
+	 * Set this before calling {@link #start(int)}.
+	 */
+	public int queueSize = 0;
+
+	/**
+	 * True to call listeners on task threads as soon as their tasks finish, possibly at the same time.
+	 * Only use this if all the listeners are thread-safe.
+	 * Set this before submitting tasks.
+	 */
+	public boolean concurrentListeners = false;
+
+	private Threads threads;
+	private Semaphore slots;
+	private final AtomicLong numTasksStarted;
+	private final AtomicLong numTasksFinished;
+	private final AtomicReference<TaskException> exception;
+
+	/** finished tasks waiting for their listeners to be called */
+	private final ConcurrentLinkedQueue<Runnable> finishedTasks;
+	private final ReentrantLock listenerLock;
+
+	/** waitForFinish() waits here until all the started tasks finish */
+	private final Object finishLatch;
+
+	public WorkStealingTaskExecutor() {
+		threads = null;
+		slots = null;
+		numTasksStarted = new AtomicLong(0);
+		numTasksFinished = new AtomicLong(0);
+		exception = new AtomicReference<>(null);
+		finishedTasks = new ConcurrentLinkedQueue<>();
+		listenerLock = new ReentrantLock();
+		finishLatch = new Object();
+	}
+
+	public void start(int numThreads) {
+		threads = new Threads(numThreads);
+		slots = new Semaphore(numThreads + Math.max(0, queueSize));
+		Cleaner.addCleaner(this, threads);
+	}
+
+	public void stop() {
+		if (threads != null) {
+			threads.clean();
+			threads = null;
+		}
+	}
+
+	public void stopAndWait(int timeoutMs) {
+		if (threads != null) {
+			threads.cleanAndWait(timeoutMs);
+			threads = null;
+		}
+	}
+
+	@Override
+	public void clean() {
+		stop();
+	}
+
+	@Override
+	public int getParallelism() {
+		return threads.pool.getParallelism();
+	}
+
+	@Override
+	public boolean isBusy() {
+		return getNumRunningTasks() >= getParallelism();
+	}
+
+	@Override
+	public boolean isWorking() {
+		return getNumRunningTasks() > 0;
+	}
+
+	@Override
+	public <T> void submit(Task<T> task, TaskListener<T> listener) {
+
+		// check for exceptions
+		// NOTE: waitForFinish will throw the exception
+		if (exception.get() != null) {
+			waitForFinish();
+		}
+
+		// wait for a thread (or a queue slot) to free up
+		// NOTE: task threads always give back their slots, even if the task fails
+		slots.acquireUninterruptibly();
+
+		numTasksStarted.incrementAndGet();
+		threads.pool.execute(() -> {
+
+			T result;
+			try {
+				result = task.run();
+			} catch (Throwable t) {
+				recordException(task, listener, t);
+
+				// the task failed, but still report finish
+				slots.release();
+				finishedTask();
+				return;
+			}
+
+			// the thread is free for more tasks now, even if the listener has to wait
+			slots.release();
+
+			Runnable callListener = () -> {
+				try {
+					listener.onFinished(result);
+				} catch (Throwable t) {
+					recordException(task, listener, t);
+				}
+				finishedTask();
+			};
+
+			if (concurrentListeners) {
+				callListener.run();
+			} else {
+				finishedTasks.add(callListener);
+				callListeners();
+			}
+		});
+	}
+
+	private void callListeners() {
+
+		// if another thread is already calling listeners, it will get ours too,
+		// otherwise, call all the waiting listeners in one batch
+		// NOTE: keep checking after unlocking, in case another thread added a listener
+		// after we ran out, but before we unlocked
+		while (!finishedTasks.isEmpty() && listenerLock.tryLock()) {
+			try {
+				Runnable callListener;
+				while ((callListener = finishedTasks.poll()) != null) {
+					callListener.run();
+				}
+			} finally {
+				listenerLock.unlock();
+			}
+		}
+	}
+
+	@Override
+	public void waitForFinish() {
+
+		synchronized (finishLatch) {
+			while (getNumRunningTasks() > 0) {
+				try {
+					finishLatch.wait();
+				} catch (InterruptedException ex) {
+					throw new Error(ex);
+				}
+			}
+		}
+
+		// check for exceptions
+		TaskException t = exception.get();
+		if (t != null) {
+			throw t;
+		}
+	}
+
+	public long getNumRunningTasks() {
+		return numTasksStarted.get() - numTasksFinished.get();
+	}
+
+	private void recordException(Task<?> task, TaskListener<?> listener, Throwable t) {
+
+		// record the exception, but don't overwrite any existing exceptions
+		exception.compareAndSet(null, new TaskException(task, listener, t));
+	}
+
+	private void finishedTask() {
+
+		// only wake up the waiting thread when the last running task finishes
+		if (numTasksFinished.incrementAndGet() == numTasksStarted.get()) {
+			synchronized (finishLatch) {
+				finishLatch.notifyAll();
+			}
+		}
+	}
+}
@@ -43,6 +43,9 @@ import edu.duke.cs.osprey.tools.Progress;
 
 import java.io.File;
 import java.math.BigInteger;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.Map;
 import java.util.concurrent.atomic.AtomicLong;
 import java.util.function.Consumer;
 
@@ -276,7 +279,7 @@ public class SimpleDEE {
 			{
 				SimpleDEE dee = new SimpleDEE(confSpace, emat, competitors);
 				if (singlesGoldsteinDiffThreshold != null) {
-					dee.pruneSinglesGoldstein(0, typeDependent);
+					dee.pruneSinglesGoldstein(0, typeDependent, parallelism);
 				}
 				if (pairsGoldsteinDiffThreshold != null) {
 					dee.prunePairsGoldstein(0, typeDependent, parallelism);
@@ -302,7 +305,7 @@ public class SimpleDEE {
 
 					// 3.1 Goldstein criterion
 					if (singlesGoldsteinDiffThreshold != null) {
-						dee.pruneSinglesGoldstein(singlesGoldsteinDiffThreshold, typeDependent);
+						dee.pruneSinglesGoldstein(singlesGoldsteinDiffThreshold, typeDependent, parallelism);
 						maybeReport.accept("Goldstein Singles");
 					}
 					if (pairsGoldsteinDiffThreshold != null) {
@@ -365,7 +368,7 @@ public class SimpleDEE {
 
 	public void pruneSinglesByThreshold(double energyThreshold) {
 		pmat.forEachUnprunedSingle((pos, rc) -> {
-			if (emat.getOneBody(pos, rc) > energyThreshold) {
+			if (emat.getOneBodyValue(pos, rc) > energyThreshold) {
 				pmat.pruneSingle(pos, rc);
 			}
 			return PruningMatrix.IteratorCommand.Continue;
@@ -374,7 +377,7 @@ public class SimpleDEE {
 
 	public void prunePairsByThreshold(double energyThreshold) {
 		pmat.forEachUnprunedPair((pos1, rc1, pos2, rc2) -> {
-			if (emat.getPairwise(pos1, rc1, pos2, rc2) > energyThreshold) {
+			if (emat.getPairwiseValue(pos1, rc1, pos2, rc2) > energyThreshold) {
 				pmat.prunePair(pos1, rc1, pos2, rc2);
 			}
 			return PruningMatrix.IteratorCommand.Continue;
@@ -382,78 +385,256 @@ public class SimpleDEE {
 	}
 
 	public void pruneSinglesGoldstein(double energyDiffThreshold, boolean typeDependent) {
+		pruneSinglesGoldstein(energyDiffThreshold, typeDependent, Parallelism.makeCpu(1));
+	}
 
-		// singles are so fast, we don't need to bother with parallelism and progress (right?)
+	public void pruneSinglesGoldstein(double energyDiffThreshold, boolean typeDependent, Parallelism parallelism) {
 
-		pmat.forEachUnprunedSingle((candidatePos, candidateRc) -> {
+		// compare template ids instead of template names in the inner loops
+		int[][] templateIds = typeDependent ? makeTemplateIds() : null;
 
-			// is there a competitor rc that has much lower energy?
-			PruningMatrix.IteratorCommand result = competitors.forEachUnprunedSingleAt(candidatePos, (competitorPos, competitorRc) -> {
+		try (TaskExecutor tasks = parallelism.makeTaskExecutor()) {
 
-				// don't compete against self
-				if (competitorRc == candidateRc) {
-					return PruningMatrix.IteratorCommand.Continue;
-				}
+			// visit candidate positions in order, so candidates see the witnesses pruned at earlier positions,
+			// just like a serial sweep over all the singles would
+			for (int candidatePos=0; candidatePos<confSpace.positions.size(); candidatePos++) {
 
-				// skip unmatched types if needed
-				if (typeDependent) {
-					if (!getTemplate(candidatePos, candidateRc).name.equals(getTemplate(competitorPos, competitorRc).name)) {
-						return PruningMatrix.IteratorCommand.Continue;
-					}
+				int[] candidateRcs = getUnprunedRCs(pmat, candidatePos);
+				if (candidateRcs.length == 0) {
+					continue;
 				}
 
-				// start with singles energy diff
-				double energyDiffSum = 0
-					+ emat.getOneBody(candidatePos, candidateRc)
-					- emat.getOneBody(competitorPos, competitorRc);
+				SinglesGoldstein goldstein = new SinglesGoldstein(candidatePos, energyDiffThreshold, templateIds);
+
+				// find the competitors for all the candidates in parallel
+				int[] competitorRcs = new int[candidateRcs.length];
+				int chunkSize = Math.max(1, (candidateRcs.length + tasks.getParallelism()*4 - 1)/(tasks.getParallelism()*4));
+				for (int start=0; start<candidateRcs.length; start+=chunkSize) {
+					final int fstart = start;
+					final int fstop = Math.min(start + chunkSize, candidateRcs.length);
+					tasks.submit(
+						() -> {
+							int[] chunkCompetitorRcs = new int[fstop - fstart];
+							for (int i=fstart; i<fstop; i++) {
+								chunkCompetitorRcs[i - fstart] = goldstein.findCompetitor(candidateRcs[i]);
+							}
+							return chunkCompetitorRcs;
+						},
+						(chunkCompetitorRcs) -> System.arraycopy(chunkCompetitorRcs, 0, competitorRcs, fstart, chunkCompetitorRcs.length)
+					);
+				}
+				tasks.waitForFinish();
 
-				// sum over witness positions
-				for (int witnessPos=0; witnessPos<confSpace.positions.size(); witnessPos++) {
+				// then prune the candidates in order
+				for (int i=0; i<candidateRcs.length; i++) {
 
-					// witness pos can't be candidate pos
-					if (witnessPos == candidatePos) {
+					int competitorRc = competitorRcs[i];
+					if (competitorRc < 0) {
 						continue;
 					}
 
-					// min over witness rcs
-					double minEnergyDiff = Double.POSITIVE_INFINITY;
-					int numWitnessRCs = confSpace.positions.get(witnessPos).resConfs.size();
-					for (int witnessRc=0; witnessRc<numWitnessRCs; witnessRc++) {
-
-						// skip pruned witnesses
-						if (pmat.isPairPruned(candidatePos, candidateRc, witnessPos, witnessRc)) {
+					// if the competitors are the candidates (eg, when choosing competitors),
+					// the competitor we found may have been pruned already, so look again
+					if (competitors.isSinglePruned(candidatePos, competitorRc)) {
+						competitorRc = goldstein.findCompetitor(candidateRcs[i]);
+						if (competitorRc < 0) {
 							continue;
 						}
+					}
+
+					pmat.pruneSingle(candidatePos, candidateRcs[i]);
+				}
+			}
+		}
+	}
+
+	private int[][] makeTemplateIds() {
+		Map<String,Integer> ids = new HashMap<>();
+		int[][] templateIds = new int[confSpace.positions.size()][];
+		for (int pos=0; pos<confSpace.positions.size(); pos++) {
+			int numRcs = confSpace.positions.get(pos).resConfs.size();
+			templateIds[pos] = new int[numRcs];
+			for (int rc=0; rc<numRcs; rc++) {
+				templateIds[pos][rc] = ids.computeIfAbsent(getTemplate(pos, rc).name, (name) -> ids.size());
+			}
+		}
+		return templateIds;
+	}
+
+	private static int[] getUnprunedRCs(PruningMatrix pmat, int pos) {
+		int[] rcs = new int[pmat.getNumConfAtPos(pos)];
+		int num = 0;
+		for (int rc=0; rc<rcs.length; rc++) {
+			if (!pmat.isSinglePruned(pos, rc)) {
+				rcs[num++] = rc;
+			}
+		}
+		return Arrays.copyOf(rcs, num);
+	}
+
+	/**
+	 * Goldstein singles criterion for all the candidates at one position,
+	 * with the pair energies for that position copied into contiguous arrays
+	 */
+	private class SinglesGoldstein {
+
+		// allow for roundoff error when bounding energy diffs
+		private static final double BoundEpsilon = 1e-6;
+
+		final int candidatePos;
+		final double energyDiffThreshold;
+		final int[] candidateTemplateIds;
+
+		final int numRcs;
+		final double[] oneBody;
+		final int[] witnessPositions;
+		final int[] numWitnessRcs;
+
+		/** pair energies between the candidate pos and each witness pos, indexed by [witness][rc*numWitnessRcs + witnessRc] */
+		final double[][] pairs;
+
+		/** min pair energy over all the rcs at each witness pos, indexed by [witness][rc] */
+		final double[][] minPairs;
+
+		SinglesGoldstein(int candidatePos, double energyDiffThreshold, int[][] templateIds) {
+
+			this.candidatePos = candidatePos;
+			this.energyDiffThreshold = energyDiffThreshold;
+			this.candidateTemplateIds = templateIds != null ? templateIds[candidatePos] : null;
+
+			numRcs = confSpace.positions.get(candidatePos).resConfs.size();
+			oneBody = new double[numRcs];
+			for (int rc=0; rc<numRcs; rc++) {
+				oneBody[rc] = emat.getOneBodyValue(candidatePos, rc);
+			}
 
-						// compute the energy diff between the candidate and competitor, from the point of view of the witness
-						double energyDiff = 0
-							+ emat.getPairwise(candidatePos, candidateRc, witnessPos, witnessRc)
-							- emat.getPairwise(competitorPos, competitorRc, witnessPos, witnessRc);
-						minEnergyDiff = Math.min(minEnergyDiff, energyDiff);
+			// witness pos can't be candidate pos
+			int numPos = confSpace.positions.size();
+			witnessPositions = new int[numPos - 1];
+			for (int i=0, pos=0; pos<numPos; pos++) {
+				if (pos != candidatePos) {
+					witnessPositions[i++] = pos;
+				}
+			}
+
+			numWitnessRcs = new int[witnessPositions.length];
+			pairs = new double[witnessPositions.length][];
+			minPairs = new double[witnessPositions.length][];
+			for (int w=0; w<witnessPositions.length; w++) {
+				int witnessPos = witnessPositions[w];
+				int n = confSpace.positions.get(witnessPos).resConfs.size();
+				numWitnessRcs[w] = n;
+				pairs[w] = new double[numRcs*n];
+				minPairs[w] = new double[numRcs];
+				double[] row = new double[n];
+				for (int rc=0; rc<numRcs; rc++) {
+					emat.getPairwiseRow(candidatePos, rc, witnessPos, row);
+					System.arraycopy(row, 0, pairs[w], rc*n, n);
+					double min = Double.POSITIVE_INFINITY;
+					for (double energy : row) {
+						min = Math.min(min, energy);
 					}
+					minPairs[w][rc] = min;
+				}
+			}
+		}
 
-					energyDiffSum += minEnergyDiff;
-					if (energyDiffSum == Double.POSITIVE_INFINITY) {
-						break;
+		/**
+		 * Returns the first unpruned competitor rc that lets us prune the candidate rc, or -1 if there is none
+		 */
+		int findCompetitor(int candidateRc) {
+
+			// collect the unpruned witnesses for this candidate,
+			// and the max candidate pair energy at each witness pos to bound the energy diffs
+			int[][] witnessRcs = new int[witnessPositions.length][];
+			double[] maxCandidatePairs = new double[witnessPositions.length];
+			for (int w=0; w<witnessPositions.length; w++) {
+				int n = numWitnessRcs[w];
+				int[] rcs = new int[n];
+				int num = 0;
+				double max = Double.NEGATIVE_INFINITY;
+				for (int witnessRc=0; witnessRc<n; witnessRc++) {
+					if (!pmat.isPairPruned(candidatePos, candidateRc, witnessPositions[w], witnessRc)) {
+						rcs[num++] = witnessRc;
+						max = Math.max(max, pairs[w][candidateRc*n + witnessRc]);
 					}
 				}
+				witnessRcs[w] = Arrays.copyOf(rcs, num);
+
+				// no witnesses means the min energy diff is infinite, so don't bound it
+				maxCandidatePairs[w] = num > 0 ? max : Double.POSITIVE_INFINITY;
+			}
+
+			for (int competitorRc=0; competitorRc<numRcs; competitorRc++) {
+
+				// skip pruned competitors, and don't compete against self
+				if (competitorRc == candidateRc || competitors.isSinglePruned(candidatePos, competitorRc)) {
+					continue;
+				}
 
-				// if we found a suitable competitor, stop searching
-				if (energyDiffSum > energyDiffThreshold) {
-					return PruningMatrix.IteratorCommand.Break;
-				} else {
-					return PruningMatrix.IteratorCommand.Continue;
+				// skip unmatched types if needed
+				if (candidateTemplateIds != null && candidateTemplateIds[candidateRc] != candidateTemplateIds[competitorRc]) {
+					continue;
 				}
-			});
 
-			// if the iteration terminated early (ie, we found a suitable competitor), then prune the candidate
-			if (result == PruningMatrix.IteratorCommand.Break) {
-				pmat.pruneSingle(candidatePos, candidateRc);
+				if (isCompetitor(candidateRc, competitorRc, witnessRcs, maxCandidatePairs)) {
+					return competitorRc;
+				}
 			}
 
-			// always go onto to check the next candidate
-			return PruningMatrix.IteratorCommand.Continue;
-		});
+			return -1;
+		}
+
+		private boolean isCompetitor(int candidateRc, int competitorRc, int[][] witnessRcs, double[] maxCandidatePairs) {
+
+			// upper bound the rest of the energy diff sum, so we can give up on this competitor early
+			// the min energy diff at a witness pos is at most the max candidate energy minus the min competitor energy
+			double remainingBound = 0;
+			for (int w=0; w<witnessPositions.length; w++) {
+				remainingBound += maxCandidatePairs[w] - minPairs[w][competitorRc];
+			}
+			boolean useBound = Double.isFinite(remainingBound);
+
+			// start with singles energy diff
+			double energyDiffSum = 0
+				+ oneBody[candidateRc]
+				- oneBody[competitorRc];
+
+			// sum over witness positions
+			for (int w=0; w<witnessPositions.length; w++) {
+
+				double[] witnessPairs = pairs[w];
+				int candidateOffset = candidateRc*numWitnessRcs[w];
+				int competitorOffset = competitorRc*numWitnessRcs[w];
+
+				// min over witness rcs
+				double minEnergyDiff = Double.POSITIVE_INFINITY;
+				for (int witnessRc : witnessRcs[w]) {
+
+					// compute the energy diff between the candidate and competitor, from the point of view of the witness
+					double energyDiff = 0
+						+ witnessPairs[candidateOffset + witnessRc]
+						- witnessPairs[competitorOffset + witnessRc];
+					minEnergyDiff = Math.min(minEnergyDiff, energyDiff);
+				}
+
+				energyDiffSum += minEnergyDiff;
+				if (energyDiffSum == Double.POSITIVE_INFINITY) {
+					break;
+				}
+
+				// if we can't make it past the threshold anymore, give up on this competitor
+				if (useBound) {
+					remainingBound -= maxCandidatePairs[w] - minPairs[w][competitorRc];
+					if (energyDiffSum + remainingBound < energyDiffThreshold - BoundEpsilon) {
+						return false;
+					}
+				}
+			}
+
+			// if we found a suitable competitor, stop searching
+			return energyDiffSum > energyDiffThreshold;
+		}
 	}
 
 	public void prunePairsGoldstein(double energyDiffThreshold, boolean typeDependent) {
@@ -494,12 +675,12 @@ public class SimpleDEE {
 
 							// start with fragment energy diff
 							double energyDiffSum = 0
-								+ emat.getOneBody(candidatePos1, candidateRc1)
-								+ emat.getOneBody(candidatePos2, candidateRc2)
-								+ emat.getPairwise(candidatePos1, candidateRc1, candidatePos2, candidateRc2)
-								- emat.getOneBody(competitorPos1, competitorRc1)
-								- emat.getOneBody(competitorPos2, competitorRc2)
-								- emat.getPairwise(competitorPos1, competitorRc1, competitorPos2, competitorRc2);
+								+ emat.getOneBodyValue(candidatePos1, candidateRc1)
+								+ emat.getOneBodyValue(candidatePos2, candidateRc2)
+								+ emat.getPairwiseValue(candidatePos1, candidateRc1, candidatePos2, candidateRc2)
+								- emat.getOneBodyValue(competitorPos1, competitorRc1)
+								- emat.getOneBodyValue(competitorPos2, competitorRc2)
+								- emat.getPairwiseValue(competitorPos1, competitorRc1, competitorPos2, competitorRc2);
 
 							// sum over witness positions
 							for (int witnessPos=0; witnessPos<confSpace.positions.size(); witnessPos++) {
@@ -522,10 +703,10 @@ public class SimpleDEE {
 
 									// compute the energy diff between the candidate and competitor, from the point of view of the witness
 									double energyDiff = 0
-										+ emat.getPairwise(candidatePos1, candidateRc1, witnessPos, witnessRc)
-										+ emat.getPairwise(candidatePos2, candidateRc2, witnessPos, witnessRc)
-										- emat.getPairwise(competitorPos1, competitorRc1, witnessPos, witnessRc)
-										- emat.getPairwise(competitorPos2, competitorRc2, witnessPos, witnessRc);
+										+ emat.getPairwiseValue(candidatePos1, candidateRc1, witnessPos, witnessRc)
+										+ emat.getPairwiseValue(candidatePos2, candidateRc2, witnessPos, witnessRc)
+										- emat.getPairwiseValue(competitorPos1, competitorRc1, witnessPos, witnessRc)
+										- emat.getPairwiseValue(competitorPos2, competitorRc2, witnessPos, witnessRc);
 									minEnergyDiff = Math.min(minEnergyDiff, energyDiff);
 								}
 								energyDiffSum += minEnergyDiff;
@@ -597,18 +778,18 @@ public class SimpleDEE {
 
 							// start with fragment energy diff
 							double energyDiffSum = 0
-								+ emat.getOneBody(candidatePos1, candidateRc1)
-								+ emat.getOneBody(candidatePos2, candidateRc2)
-								+ emat.getOneBody(candidatePos3, candidateRc3)
-								+ emat.getPairwise(candidatePos1, candidateRc1, candidatePos2, candidateRc2)
-								+ emat.getPairwise(candidatePos1, candidateRc1, candidatePos3, candidateRc3)
-								+ emat.getPairwise(candidatePos2, candidateRc2, candidatePos3, candidateRc3)
-								- emat.getOneBody(competitorPos1, competitorRc1)
-								- emat.getOneBody(competitorPos2, competitorRc2)
-								- emat.getOneBody(competitorPos3, competitorRc3)
-								- emat.getPairwise(competitorPos1, competitorRc1, competitorPos2, competitorRc2)
-								- emat.getPairwise(competitorPos1, competitorRc1, competitorPos3, competitorRc3)
-								- emat.getPairwise(competitorPos2, competitorRc2, competitorPos3, competitorRc3);
+								+ emat.getOneBodyValue(candidatePos1, candidateRc1)
+								+ emat.getOneBodyValue(candidatePos2, candidateRc2)
+								+ emat.getOneBodyValue(candidatePos3, candidateRc3)
+								+ emat.getPairwiseValue(candidatePos1, candidateRc1, candidatePos2, candidateRc2)
+								+ emat.getPairwiseValue(candidatePos1, candidateRc1, candidatePos3, candidateRc3)
+								+ emat.getPairwiseValue(candidatePos2, candidateRc2, candidatePos3, candidateRc3)
+								- emat.getOneBodyValue(competitorPos1, competitorRc1)
+								- emat.getOneBodyValue(competitorPos2, competitorRc2)
+								- emat.getOneBodyValue(competitorPos3, competitorRc3)
+								- emat.getPairwiseValue(competitorPos1, competitorRc1, competitorPos2, competitorRc2)
+								- emat.getPairwiseValue(competitorPos1, competitorRc1, competitorPos3, competitorRc3)
+								- emat.getPairwiseValue(competitorPos2, competitorRc2, competitorPos3, competitorRc3);
 
 							// sum over witness positions
 							for (int witnessPos=0; witnessPos<confSpace.positions.size(); witnessPos++) {
@@ -632,12 +813,12 @@ public class SimpleDEE {
 
 									// compute the energy diff between the candidate and competitor, from the point of view of the witness
 									double energyDiff = 0
-										+ emat.getPairwise(candidatePos1, candidateRc1, witnessPos, witnessRc)
-										+ emat.getPairwise(candidatePos2, candidateRc2, witnessPos, witnessRc)
-										+ emat.getPairwise(candidatePos3, candidateRc3, witnessPos, witnessRc)
-										- emat.getPairwise(competitorPos1, competitorRc1, witnessPos, witnessRc)
-										- emat.getPairwise(competitorPos2, competitorRc2, witnessPos, witnessRc)
-										- emat.getPairwise(competitorPos3, competitorRc3, witnessPos, witnessRc);
+										+ emat.getPairwiseValue(candidatePos1, candidateRc1, witnessPos, witnessRc)
+										+ emat.getPairwiseValue(candidatePos2, candidateRc2, witnessPos, witnessRc)
+										+ emat.getPairwiseValue(candidatePos3, candidateRc3, witnessPos, witnessRc)
+										- emat.getPairwiseValue(competitorPos1, competitorRc1, witnessPos, witnessRc)
+										- emat.getPairwiseValue(competitorPos2, competitorRc2, witnessPos, witnessRc)
+										- emat.getPairwiseValue(competitorPos3, competitorRc3, witnessPos, witnessRc);
 									minEnergyDiff = Math.min(minEnergyDiff, energyDiff);
 								}
 								energyDiffSum += minEnergyDiff;
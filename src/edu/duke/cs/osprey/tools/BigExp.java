@@ -0,0 +1,441 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.tools;
+
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.math.MathContext;
+
+
+/**
+ * An immutable real number with a double-double mantissa and a separate binary exponent,
+ * ie (hi + lo)*2^exp, for fast arithmetic on Boltzmann weights that are far outside the range of a double.
+ *
+ * The double-double mantissa carries about 106 bits (32 decimal digits) of precision.
+ * Each add, sub, and mult has a relative error of at most a few units of 2^-104,
+ * and div at most a few units of 2^-102, so summing N values has a relative error
+ * below about N*2^-100. {@link #exp(double)} has a relative error below 1e-24 for |x| < 1e6.
+ *
+ * Only the finite values and the infinities are represented, there's no NaN.
+ * Operations that would make a NaN throw an {@link ArithmeticException} instead.
+ */
+public final class BigExp implements Comparable<BigExp> {
+
+	public static final BigExp Zero = new BigExp(0.0, 0.0, 0);
+	public static final BigExp One = new BigExp(1.0, 0.0, 0);
+	public static final BigExp PositiveInfinity = new BigExp(Double.POSITIVE_INFINITY, 0.0, 0);
+	public static final BigExp NegativeInfinity = new BigExp(Double.NEGATIVE_INFINITY, 0.0, 0);
+
+	// double-double constants
+	private static final double Log2EHi = 1.4426950408889634;
+	private static final double Log2ELo = 2.0355273740931033e-17;
+	private static final double Ln2Hi = 0.6931471805599453;
+	private static final double Ln2Lo = 2.3190468138462996e-17;
+	private static final double Ln2 = Math.log(2.0);
+
+	/** longs with magnitudes up to here convert to doubles exactly */
+	private static final long MaxExactLong = 1L << 53;
+
+	/** for Dekker's product: 2^27 + 1 */
+	private static final double Splitter = 134217729.0;
+
+	/** 1/n! for the exp Taylor series */
+	private static final BigExp[] InvFactorials;
+	static {
+		InvFactorials = new BigExp[12];
+		InvFactorials[0] = One;
+		for (int n=1; n<InvFactorials.length; n++) {
+			InvFactorials[n] = InvFactorials[n - 1].div(valueOf(n));
+		}
+	}
+
+	/** the mantissa, normalized so 1 <= |hi| < 2 and |lo| <= ulp(hi)/2, or zero, or infinite */
+	public final double hi;
+	public final double lo;
+	public final long exp;
+
+	private BigExp(double hi, double lo, long exp) {
+		this.hi = hi;
+		this.lo = lo;
+		this.exp = exp;
+	}
+
+	private static BigExp make(double hi, double lo, long exp) {
+
+		if (hi == 0.0) {
+			if (lo == 0.0) {
+				return Zero;
+			}
+			hi = lo;
+			lo = 0.0;
+		}
+		if (Double.isInfinite(hi)) {
+			return hi > 0 ? PositiveInfinity : NegativeInfinity;
+		}
+		if (Double.isNaN(hi) || Double.isNaN(lo)) {
+			throw new ArithmeticException("result is not a number");
+		}
+
+		// move subnormals into the normal range first
+		if (Math.getExponent(hi) < Double.MIN_EXPONENT) {
+			hi = Math.scalb(hi, 64);
+			lo = Math.scalb(lo, 64);
+			exp -= 64;
+		}
+
+		int e = Math.getExponent(hi);
+		return new BigExp(Math.scalb(hi, -e), Math.scalb(lo, -e), exp + e);
+	}
+
+	public static BigExp valueOf(double val) {
+		return make(val, 0.0, 0);
+	}
+
+	public static BigExp valueOf(long val) {
+		if (val > MaxExactLong || val < -MaxExactLong) {
+			return valueOf(BigInteger.valueOf(val));
+		}
+		return make((double)val, 0.0, 0);
+	}
+
+	public static BigExp valueOf(BigInteger val) {
+
+		if (val.bitLength() <= 53) {
+			return make(val.doubleValue(), 0.0, 0);
+		}
+
+		// keep the top 106 bits, which are enough to fill the mantissa
+		int shift = Math.max(0, val.bitLength() - 106);
+		BigInteger top = val.shiftRight(shift);
+		double hi = top.doubleValue();
+		double lo = top.subtract(new BigDecimal(hi).toBigInteger()).doubleValue();
+		return make(hi, lo, shift);
+	}
+
+	public static BigExp valueOf(BigDecimal val) {
+
+		if (val == MathTools.BigPositiveInfinity) {
+			return PositiveInfinity;
+		} else if (val == MathTools.BigNegativeInfinity) {
+			return NegativeInfinity;
+		} else if (val == MathTools.BigNaN) {
+			throw new ArithmeticException("can't represent NaN");
+		} else if (val.signum() == 0) {
+			return Zero;
+		}
+
+		BigInteger unscaled = val.unscaledValue();
+		int scale = val.scale();
+		if (scale <= 0) {
+			return valueOf(unscaled.multiply(BigInteger.TEN.pow(-scale)));
+		}
+
+		// divide by the power of ten, with enough extra bits to fill the mantissa
+		BigInteger divisor = BigInteger.TEN.pow(scale);
+		int shift = Math.max(0, 110 + divisor.bitLength() - unscaled.bitLength());
+		BigExp quotient = valueOf(unscaled.shiftLeft(shift).divide(divisor));
+		return make(quotient.hi, quotient.lo, quotient.exp - shift);
+	}
+
+	/**
+	 * Returns e^x
+	 */
+	public static BigExp exp(double x) {
+
+		if (Double.isNaN(x)) {
+			throw new ArithmeticException("exp of NaN");
+		} else if (x == Double.POSITIVE_INFINITY) {
+			return PositiveInfinity;
+		} else if (x == Double.NEGATIVE_INFINITY) {
+			return Zero;
+		}
+
+		// convert to base 2: x*log2(e) = k + f, for integer k and fractional f
+		double th = x*Log2EHi;
+		double tl = twoProdErr(x, Log2EHi, th) + x*Log2ELo;
+		double h = th + tl;
+		tl = tl - (h - th);
+		th = h;
+		double k = Math.floor(th);
+		double fh = th - k;
+		double fl = tl;
+
+		// then back to base e: 2^f = e^r, for r = f*ln(2)
+		double rh = fh*Ln2Hi;
+		double rl = twoProdErr(fh, Ln2Hi, rh) + fh*Ln2Lo + fl*Ln2Hi;
+		h = rh + rl;
+		rl = rl - (h - rh);
+		rh = h;
+
+		// e^r = (e^(r/256))^256, and the Taylor series converges really fast for the small argument
+		BigExp s = make(rh/256.0, rl/256.0, 0);
+		BigExp p = InvFactorials[InvFactorials.length - 1];
+		for (int n=InvFactorials.length - 2; n>=0; n--) {
+			p = p.mult(s).add(InvFactorials[n]);
+		}
+		for (int i=0; i<8; i++) {
+			p = p.mult(p);
+		}
+
+		return make(p.hi, p.lo, p.exp + (long)k);
+	}
+
+	private static double twoProdErr(double a, double b, double p) {
+		double t = Splitter*a;
+		double ahi = t - (t - a);
+		double alo = a - ahi;
+		t = Splitter*b;
+		double bhi = t - (t - b);
+		double blo = b - bhi;
+		return ((ahi*bhi - p) + ahi*blo + alo*bhi) + alo*blo;
+	}
+
+	public boolean isZero() {
+		return hi == 0.0;
+	}
+
+	public boolean isInfinite() {
+		return Double.isInfinite(hi);
+	}
+
+	public boolean isFinite() {
+		return !isInfinite();
+	}
+
+	public int signum() {
+		if (hi > 0.0) {
+			return 1;
+		} else if (hi < 0.0) {
+			return -1;
+		}
+		return 0;
+	}
+
+	public BigExp negate() {
+		if (isZero()) {
+			return this;
+		}
+		return new BigExp(-hi, -lo, exp);
+	}
+
+	public BigExp add(BigExp other) {
+
+		if (isZero()) {
+			return other;
+		} else if (other.isZero()) {
+			return this;
+		}
+		if (isInfinite() || other.isInfinite()) {
+			if (isInfinite() && other.isInfinite() && hi != other.hi) {
+				throw new ArithmeticException("infinity minus infinity");
+			}
+			return isInfinite() ? this : other;
+		}
+
+		// align the smaller number to the exponent of the bigger one
+		BigExp a = this;
+		BigExp b = other;
+		if (a.exp < b.exp) {
+			a = other;
+			b = this;
+		}
+		long shift = a.exp - b.exp;
+		if (shift > 110) {
+			// b is below the precision of a
+			return a;
+		}
+		double bhi = Math.scalb(b.hi, (int)-shift);
+		double blo = Math.scalb(b.lo, (int)-shift);
+
+		// accurate double-double addition (see Hida, Li, Bailey's QD library)
+		double s = a.hi + bhi;
+		double bb = s - a.hi;
+		double e = (a.hi - (s - bb)) + (bhi - bb);
+		double t = a.lo + blo;
+		bb = t - a.lo;
+		double f = (a.lo - (t - bb)) + (blo - bb);
+		e += t;
+		double h = s + e;
+		e = e - (h - s);
+		e += f;
+		s = h + e;
+		e = e - (s - h);
+
+		return make(s, e, a.exp);
+	}
+
+	public BigExp sub(BigExp other) {
+		return add(other.negate());
+	}
+
+	public BigExp mult(BigExp other) {
+
+		if (isZero() || other.isZero()) {
+			return Zero;
+		}
+		if (isInfinite() || other.isInfinite()) {
+			return signum()*other.signum() > 0 ? PositiveInfinity : NegativeInfinity;
+		}
+
+		double p = hi*other.hi;
+		double e = twoProdErr(hi, other.hi, p);
+		e += hi*other.lo + lo*other.hi;
+		double h = p + e;
+		e = e - (h - p);
+
+		return make(h, e, exp + other.exp);
+	}
+
+	public BigExp div(BigExp other) {
+
+		if (other.isZero()) {
+			throw new ArithmeticException("division by zero");
+		}
+		if (isInfinite()) {
+			if (other.isInfinite()) {
+				throw new ArithmeticException("infinity divided by infinity");
+			}
+			return signum()*other.signum() > 0 ? PositiveInfinity : NegativeInfinity;
+		}
+		if (isZero() || other.isInfinite()) {
+			return Zero;
+		}
+
+		// start with the double reciprocal, then one Newton step doubles the bits of precision
+		BigExp x = make(1.0/other.hi, 0.0, -other.exp);
+		x = x.add(x.mult(One.sub(other.mult(x))));
+		return mult(x);
+	}
+
+	@Override
+	public int compareTo(BigExp other) {
+
+		int sign = signum();
+		int otherSign = other.signum();
+		if (sign != otherSign) {
+			return Integer.compare(sign, otherSign);
+		}
+		if (sign == 0) {
+			return 0;
+		}
+
+		// same sign, compare magnitudes
+		int cmp;
+		if (isInfinite() || other.isInfinite()) {
+			cmp = Boolean.compare(isInfinite(), other.isInfinite());
+		} else if (exp != other.exp) {
+			cmp = Long.compare(exp, other.exp);
+		} else if (hi != other.hi) {
+			cmp = Math.abs(hi) < Math.abs(other.hi) ? -1 : 1;
+		} else if (lo != other.lo) {
+			cmp = lo*sign < other.lo*sign ? -1 : 1;
+		} else {
+			cmp = 0;
+		}
+		return sign > 0 ? cmp : -cmp;
+	}
+
+	@Override
+	public boolean equals(Object other) {
+		return other instanceof BigExp && compareTo((BigExp)other) == 0;
+	}
+
+	@Override
+	public int hashCode() {
+		return HashCalculator.combineHashes(
+			Double.hashCode(hi + 0.0),
+			Double.hashCode(lo + 0.0),
+			Long.hashCode(exp)
+		);
+	}
+
+	/** the nearest double, which may overflow to infinity or underflow to zero */
+	public double doubleValue() {
+		if (isZero() || isInfinite()) {
+			return hi;
+		}
+		if (exp > Double.MAX_EXPONENT + 1) {
+			return hi > 0 ? Double.POSITIVE_INFINITY : Double.NEGATIVE_INFINITY;
+		} else if (exp < Double.MIN_EXPONENT - 64) {
+			return 0.0;
+		}
+		return Math.scalb(hi, (int)exp) + Math.scalb(lo, (int)exp);
+	}
+
+	/** the natural logarithm */
+	public double log() {
+		if (signum() < 0) {
+			throw new ArithmeticException("log of a negative number: " + this);
+		}
+		if (isZero()) {
+			return Double.NEGATIVE_INFINITY;
+		} else if (isInfinite()) {
+			return Double.POSITIVE_INFINITY;
+		}
+		return Math.log(hi) + lo/hi + exp*Ln2;
+	}
+
+	public double log10() {
+		return log()/Math.log(10.0);
+	}
+
+	public BigDecimal toBigDecimal(MathContext context) {
+
+		if (isZero()) {
+			return BigDecimal.ZERO;
+		} else if (hi == Double.POSITIVE_INFINITY) {
+			return MathTools.BigPositiveInfinity;
+		} else if (hi == Double.NEGATIVE_INFINITY) {
+			return MathTools.BigNegativeInfinity;
+		}
+
+		if (exp > 999999999 || exp < -999999999) {
+			throw new ArithmeticException("exponent too large for BigDecimal: " + exp);
+		}
+
+		// get a few more digits than needed, then round once at the end
+		MathContext extContext = new MathContext(context.getPrecision() + 10, context.getRoundingMode());
+		BigDecimal mantissa = new BigDecimal(hi).add(new BigDecimal(lo));
+		BigDecimal scale = new BigDecimal(2).pow((int)exp, extContext);
+		return mantissa.multiply(scale, extContext).round(context);
+	}
+
+	@Override
+	public String toString() {
+		if (isZero() || isInfinite()) {
+			return Double.toString(hi);
+		}
+		return toBigDecimal(new MathContext(17)).toString();
+	}
+}
@@ -0,0 +1,442 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.tools;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
+import edu.duke.cs.osprey.confspace.ConfDB;
+import edu.duke.cs.osprey.confspace.ConfSearch;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.gmec.SimpleGMECFinder;
+import edu.duke.cs.osprey.kstar.pfunc.GradientDescentPfunc;
+import edu.duke.cs.osprey.lute.LUTE;
+import edu.duke.cs.osprey.lute.UniformConfSampler;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.pruning.PruningMatrix;
+import edu.duke.cs.osprey.pruning.SimpleDEE;
+import edu.duke.cs.osprey.restypes.ResidueTemplateLibrary;
+import edu.duke.cs.osprey.structure.Molecule;
+import edu.duke.cs.osprey.structure.PDBIO;
+
+import java.io.File;
+import java.lang.management.GarbageCollectorMXBean;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.math.BigInteger;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Locale;
+import java.util.function.Supplier;
+
+
+/**
+ * Times each stage of a small, fixed design pipeline and reports
+ * throughput, peak heap usage, and GC time for each stage as JSON.
+ *
+ * The default design is a small 1CC8 conformation space bundled with Osprey,
+ * so results are comparable between machines and between Osprey versions.
+ *
+ * Run from the command line with {@code gradle benchmark} or {@code python -m osprey.bench}.
+ */
+public class DesignBenchmark {
+
+	public static final String DefaultPdbResource = "/benchmark/1CC8.ss.pdb";
+
+	public static class Builder {
+
+		/** PDB file for the design, or null to use the bundled 1CC8 structure */
+		private File pdbFile = null;
+
+		/** Parallelism for the energy calculator, DEE, and A* */
+		private Parallelism parallelism = Parallelism.makeCpu(1);
+
+		/** Number of conformations to enumerate in the A* stages */
+		private int numConfs = 1000;
+
+		/** Target epsilon for the partition function stage */
+		private double pfuncEpsilon = 0.1;
+
+		/** Random seed for LUTE conformation sampling */
+		private int randomSeed = 12345;
+
+		/** True to print progress info to the console while the benchmarks run */
+		private boolean showProgress = false;
+
+		public Builder setPdbFile(File val) {
+			pdbFile = val;
+			return this;
+		}
+
+		public Builder setParallelism(Parallelism val) {
+			parallelism = val;
+			return this;
+		}
+
+		public Builder setNumConfs(int val) {
+			numConfs = val;
+			return this;
+		}
+
+		public Builder setPfuncEpsilon(double val) {
+			pfuncEpsilon = val;
+			return this;
+		}
+
+		public Builder setRandomSeed(int val) {
+			randomSeed = val;
+			return this;
+		}
+
+		public Builder setShowProgress(boolean val) {
+			showProgress = val;
+			return this;
+		}
+
+		public DesignBenchmark build() {
+			return new DesignBenchmark(pdbFile, parallelism, numConfs, pfuncEpsilon, randomSeed, showProgress);
+		}
+	}
+
+	public static class StageResult {
+
+		public final String name;
+		public final double timeS;
+		public final long numItems;
+		public final String itemsUnit;
+		public final long peakHeapBytes;
+		public final long gcTimeMs;
+		public final long gcCount;
+
+		public StageResult(String name, double timeS, long numItems, String itemsUnit, long peakHeapBytes, long gcTimeMs, long gcCount) {
+			this.name = name;
+			this.timeS = timeS;
+			this.numItems = numItems;
+			this.itemsUnit = itemsUnit;
+			this.peakHeapBytes = peakHeapBytes;
+			this.gcTimeMs = gcTimeMs;
+			this.gcCount = gcCount;
+		}
+
+		public double getItemsPerS() {
+			return numItems/timeS;
+		}
+
+		@Override
+		public String toString() {
+			return String.format("%-22s %10.3f s   %12.1f %s/s   peak heap %10s   gc %6d ms (%d)",
+				name, timeS, getItemsPerS(), itemsUnit, MathTools.formatBytes(peakHeapBytes), gcTimeMs, gcCount
+			);
+		}
+	}
+
+	public static class Report {
+
+		public final List<StageResult> stages = new ArrayList<>();
+		public final int numCpus;
+		public final long maxHeapBytes;
+
+		public Report(int numCpus) {
+			this.numCpus = numCpus;
+			this.maxHeapBytes = Runtime.getRuntime().maxMemory();
+		}
+
+		public String toJson() {
+			StringBuilder buf = new StringBuilder();
+			buf.append("{\n");
+			buf.append(String.format(Locale.ROOT, "  \"java\": \"%s\",\n", escape(System.getProperty("java.version"))));
+			buf.append(String.format(Locale.ROOT, "  \"numCpus\": %d,\n", numCpus));
+			buf.append(String.format(Locale.ROOT, "  \"maxHeapBytes\": %d,\n", maxHeapBytes));
+			buf.append("  \"stages\": [");
+			for (int i=0; i<stages.size(); i++) {
+				StageResult stage = stages.get(i);
+				buf.append(i == 0 ? "\n" : ",\n");
+				buf.append(String.format(Locale.ROOT,
+					"    {\"name\": \"%s\", \"timeS\": %.6f, \"numItems\": %d, \"itemsUnit\": \"%s\", \"%sPerS\": %.3f, \"peakHeapBytes\": %d, \"gcTimeMs\": %d, \"gcCount\": %d}",
+					escape(stage.name), stage.timeS, stage.numItems, stage.itemsUnit, stage.itemsUnit, stage.getItemsPerS(),
+					stage.peakHeapBytes, stage.gcTimeMs, stage.gcCount
+				));
+			}
+			buf.append("\n  ]\n}\n");
+			return buf.toString();
+		}
+
+		private static String escape(String s) {
+			return s.replace("\\", "\\\\").replace("\"", "\\\"");
+		}
+	}
+
+	public final File pdbFile;
+	public final Parallelism parallelism;
+	public final int numConfs;
+	public final double pfuncEpsilon;
+	public final int randomSeed;
+	public final boolean showProgress;
+
+	private DesignBenchmark(File pdbFile, Parallelism parallelism, int numConfs, double pfuncEpsilon, int randomSeed, boolean showProgress) {
+		this.pdbFile = pdbFile;
+		this.parallelism = parallelism;
+		this.numConfs = numConfs;
+		this.pfuncEpsilon = pfuncEpsilon;
+		this.randomSeed = randomSeed;
+		this.showProgress = showProgress;
+	}
+
+	public Report run() {
+
+		Report report = new Report(parallelism.numThreads);
+
+		Molecule mol = stage(report, "pdbLoad", "residues", () -> {
+			Molecule m = pdbFile != null ? PDBIO.readFile(pdbFile) : PDBIO.readResource(DefaultPdbResource);
+			return new Counted<>(m, m.residues.size());
+		});
+
+		ForcefieldParams ffparams = new ForcefieldParams();
+		ResidueTemplateLibrary templateLib = stage(report, "templateLibrary", "templates", () -> {
+			ResidueTemplateLibrary lib = new ResidueTemplateLibrary.Builder(ffparams.forcefld).build();
+			return new Counted<>(lib, lib.templates.size());
+		});
+
+		// use the same small design as the GMEC examples, plus a few extra flexible residues
+		Strand strand = new Strand.Builder(mol)
+			.setTemplateLibrary(templateLib)
+			.build();
+		strand.flexibility.get("A2").setLibraryRotamers(Strand.WildType, "ALA", "GLY").addWildTypeRotamers().setContinuous();
+		strand.flexibility.get("A3").setLibraryRotamers(Strand.WildType, "VAL").addWildTypeRotamers().setContinuous();
+		strand.flexibility.get("A4").setLibraryRotamers(Strand.WildType).addWildTypeRotamers().setContinuous();
+		strand.flexibility.get("A5").setLibraryRotamers(Strand.WildType).addWildTypeRotamers().setContinuous();
+		strand.flexibility.get("A6").setLibraryRotamers(Strand.WildType).addWildTypeRotamers().setContinuous();
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, ffparams)
+			.setParallelism(parallelism)
+			.build()) {
+
+			ConfEnergyCalculator confEcalc = new ConfEnergyCalculator.Builder(confSpace, ecalc).build();
+
+			EnergyMatrix emat = stage(report, "energyMatrix", "fragments", () -> new Counted<>(
+				new SimplerEnergyMatrixCalculator.Builder(confEcalc)
+					.build()
+					.calcEnergyMatrix(),
+				confSpace.getNumResConfs() + confSpace.getNumResConfPairs()
+			));
+
+			PruningMatrix pmat = stage(report, "dee", "fragments", () -> new Counted<>(
+				new SimpleDEE.Runner()
+					.setGoldsteinDiffThreshold(10.0)
+					.setParallelism(parallelism)
+					.setShowProgress(showProgress)
+					.run(confSpace, emat),
+				confSpace.getNumResConfs() + confSpace.getNumResConfPairs()
+			));
+
+			stage(report, "astarTraditional", "confs", () -> new Counted<>(null, enumerate(
+				new ConfAStarTree.Builder(emat, pmat)
+					.setTraditional()
+					.build()
+			)));
+
+			stage(report, "astarMPLP", "confs", () -> new Counted<>(null, enumerate(
+				new ConfAStarTree.Builder(emat, pmat)
+					.setMPLP()
+					.build()
+			)));
+
+			stage(report, "gmecFinder", "confs", () -> {
+				ConfAStarTree astar = new ConfAStarTree.Builder(emat, pmat)
+					.setMPLP()
+					.build();
+
+				// count the confs the finder pulls from A* on its way to the GMEC
+				long[] numConfs = { 0 };
+				ConfSearch search = new ConfSearch() {
+
+					@Override
+					public ScoredConf nextConf() {
+						ScoredConf conf = astar.nextConf();
+						if (conf != null) {
+							numConfs[0]++;
+						}
+						return conf;
+					}
+
+					@Override
+					public BigInteger getNumConformations() {
+						return astar.getNumConformations();
+					}
+				};
+
+				new SimpleGMECFinder.Builder(search, confEcalc)
+					.setPrintToConsole(showProgress)
+					.build()
+					.find();
+				return new Counted<>(null, numConfs[0]);
+			});
+
+			stage(report, "pfunc", "confs", () -> {
+				ConfAStarTree astar = new ConfAStarTree.Builder(emat, pmat)
+					.setTraditional()
+					.build();
+				GradientDescentPfunc pfunc = new GradientDescentPfunc(confEcalc);
+				pfunc.setReportProgress(showProgress);
+				pfunc.init(astar, astar.getNumConformations(), pfuncEpsilon);
+				pfunc.compute();
+				return new Counted<>(null, pfunc.getNumConfsEvaluated());
+			});
+
+			stage(report, "luteTrain", "confs", () -> {
+				try (ConfDB confDB = new ConfDB(confSpace)) {
+					ConfDB.ConfTable confTable = confDB.new ConfTable("LUTE");
+					LUTE lute = new LUTE(confSpace);
+					lute.sampleTuplesAndFit(
+						confEcalc, emat, pmat, confTable,
+						new UniformConfSampler(confSpace, pmat, randomSeed),
+						LUTE.Fitter.OLSCG, 1.5, 0.1
+					);
+					return new Counted<>(null, lute.getTrainingSystem().confs.size());
+				}
+			});
+		}
+
+		return report;
+	}
+
+	private long enumerate(ConfSearch search) {
+		long count = 0;
+		while (count < numConfs) {
+			if (search.nextConf() == null) {
+				break;
+			}
+			count++;
+		}
+		return count;
+	}
+
+	private static class Counted<T> {
+
+		final T value;
+		final long count;
+
+		Counted(T value, long count) {
+			this.value = value;
+			this.count = count;
+		}
+	}
+
+	private <T> T stage(Report report, String name, String itemsUnit, Supplier<Counted<T>> task) {
+
+		List<MemoryPoolMXBean> heapPools = new ArrayList<>();
+		for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+			if (pool.getType() == MemoryType.HEAP && pool.isValid()) {
+				heapPools.add(pool);
+			}
+		}
+
+		// start each stage from a clean heap so peak usage reflects just this stage
+		System.gc();
+		for (MemoryPoolMXBean pool : heapPools) {
+			pool.resetPeakUsage();
+		}
+		long gcTimeMs = -getGcTimeMs();
+		long gcCount = -getGcCount();
+
+		Stopwatch stopwatch = new Stopwatch().start();
+		Counted<T> result = task.get();
+		stopwatch.stop();
+
+		gcTimeMs += getGcTimeMs();
+		gcCount += getGcCount();
+		long peakHeapBytes = 0;
+		for (MemoryPoolMXBean pool : heapPools) {
+			peakHeapBytes += pool.getPeakUsage().getUsed();
+		}
+
+		StageResult stage = new StageResult(name, stopwatch.getTimeS(), result.count, itemsUnit, peakHeapBytes, gcTimeMs, gcCount);
+		report.stages.add(stage);
+		if (showProgress) {
+			Log.log("%s", stage);
+		}
+		return result.value;
+	}
+
+	private static long getGcTimeMs() {
+		long sum = 0;
+		for (GarbageCollectorMXBean gc : ManagementFactory.getGarbageCollectorMXBeans()) {
+			sum += Math.max(0, gc.getCollectionTime());
+		}
+		return sum;
+	}
+
+	private static long getGcCount() {
+		long sum = 0;
+		for (GarbageCollectorMXBean gc : ManagementFactory.getGarbageCollectorMXBeans()) {
+			sum += Math.max(0, gc.getCollectionCount());
+		}
+		return sum;
+	}
+
+	public static void main(String[] args) {
+
+		Builder builder = new Builder();
+		File outFile = null;
+		for (int i=0; i<args.length; i++) {
+			switch (args[i]) {
+				case "--pdb": builder.setPdbFile(new File(args[++i])); break;
+				case "--out": outFile = new File(args[++i]); break;
+				case "--threads": builder.setParallelism(Parallelism.makeCpu(Integer.parseInt(args[++i]))); break;
+				case "--numConfs": builder.setNumConfs(Integer.parseInt(args[++i])); break;
+				case "--epsilon": builder.setPfuncEpsilon(Double.parseDouble(args[++i])); break;
+				case "--seed": builder.setRandomSeed(Integer.parseInt(args[++i])); break;
+				case "--progress": builder.setShowProgress(true); break;
+				default: throw new IllegalArgumentException("unrecognized argument: " + args[i]);
+			}
+		}
+
+		Report report = builder.build().run();
+
+		String json = report.toJson();
+		if (outFile != null) {
+			FileTools.writeFile(json, outFile);
+			Log.log("benchmark results written to %s", outFile.getAbsolutePath());
+		} else {
+			System.out.print(json);
+		}
+	}
+}
@@ -0,0 +1,154 @@
+package edu.duke.cs.osprey.astar;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarNode;
+import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
+import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.astar.conf.compact.CompactConfAStarQueue;
+import edu.duke.cs.osprey.confspace.ConfSearch;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.externalMemory.EMConfAStarNode;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.structure.PDBIO;
+import org.junit.Test;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.PriorityQueue;
+import java.util.Random;
+
+import static edu.duke.cs.osprey.TestBase.isAbsolutely;
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.assertThat;
+
+
+public class TestCompactConfAStarQueue {
+
+	@Test
+	public void randomHeap() {
+		randomHeap(false);
+	}
+
+	@Test
+	public void randomHeapOffHeap() {
+		randomHeap(true);
+	}
+
+	private static void randomHeap(boolean offHeap) {
+
+		// 5 positions with up to 300 RCs, so positions need 9 bits each
+		List<List<Integer>> rcsByPos = new ArrayList<>();
+		for (int pos=0; pos<5; pos++) {
+			List<Integer> rcs = new ArrayList<>();
+			for (int i=0; i<300; i++) {
+				rcs.add(i);
+			}
+			rcsByPos.add(rcs);
+		}
+		RCs rcs = new RCs(rcsByPos);
+
+		CompactConfAStarQueue q = new CompactConfAStarQueue(rcs, offHeap);
+		assertThat(q.bitsPerPos, is(9));
+
+		PriorityQueue<ConfAStarNode> expected = new PriorityQueue<>();
+		Random rand = new Random(12345);
+
+		for (int round=0; round<100; round++) {
+
+			// push a bunch of random nodes
+			for (int i=0; i<1000; i++) {
+				EMConfAStarNode node = new EMConfAStarNode(5);
+				for (int pos=0; pos<5; pos++) {
+					if (rand.nextBoolean()) {
+						node = node.assign(pos, rand.nextInt(300));
+					}
+				}
+				node.setGScore(rand.nextDouble()*100 - 50);
+				node.setHScore(rand.nextInt(100)); // use h-scores that are exact floats
+				q.push(node);
+				expected.add(node);
+			}
+
+			// pop some of them
+			for (int i=0; i<700; i++) {
+				assertNode(q.poll(), expected.poll());
+			}
+			assertThat(q.size(), is((long)expected.size()));
+		}
+
+		while (!expected.isEmpty()) {
+			assertNode(q.poll(), expected.poll());
+		}
+		assertThat(q.isEmpty(), is(true));
+		assertThat(q.poll(), is(nullValue()));
+	}
+
+	private static void assertNode(ConfAStarNode obs, ConfAStarNode exp) {
+		assertThat(obs.getScore(), is(exp.getScore()));
+		assertThat(obs.getGScore(), is(exp.getGScore()));
+		assertThat(obs.getHScore(), is(exp.getHScore()));
+		assertThat(obs.getLevel(), is(exp.getLevel()));
+	}
+
+	@Test
+	public void roundsHScoresDown() {
+
+		RCs rcs = new RCs(Arrays.asList(Arrays.asList(0, 1)));
+		CompactConfAStarQueue q = new CompactConfAStarQueue(rcs, false);
+
+		EMConfAStarNode node = new EMConfAStarNode(1);
+		node.setGScore(0.1);
+		node.setHScore(0.1);
+		q.push(node);
+
+		ConfAStarNode obs = q.poll();
+		assertThat(obs.getGScore(), is(0.1));
+		assertThat(obs.getHScore(), lessThanOrEqualTo(0.1));
+		assertThat(obs.getHScore(), isAbsolutely(0.1, 1e-7));
+	}
+
+	@Test
+	public void astar() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		for (String resNum : Arrays.asList("A2", "A3", "A4", "A5")) {
+			strand.flexibility.get(resNum).setLibraryRotamers("VAL", "LEU");
+		}
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		EnergyMatrix emat;
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(8))
+			.build()
+		) {
+			emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.build()
+				.calcEnergyMatrix();
+		}
+
+		List<ConfSearch.ScoredConf> expected = new ConfAStarTree.Builder(emat, confSpace)
+			.setTraditional()
+			.build()
+			.nextConfs(Double.POSITIVE_INFINITY);
+
+		for (boolean offHeap : Arrays.asList(false, true)) {
+			List<ConfSearch.ScoredConf> observed = new ConfAStarTree.Builder(emat, confSpace)
+				.setTraditional()
+				.useCompactMemory(offHeap)
+				.build()
+				.nextConfs(Double.POSITIVE_INFINITY);
+
+			assertThat(observed.size(), is(expected.size()));
+			for (int i=0; i<expected.size(); i++) {
+				assertThat(observed.get(i).getScore(), isAbsolutely(expected.get(i).getScore(), 1e-10));
+			}
+		}
+	}
+}
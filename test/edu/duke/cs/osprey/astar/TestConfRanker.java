@@ -41,6 +41,7 @@ import edu.duke.cs.osprey.confspace.ConfSearch;
 import edu.duke.cs.osprey.confspace.SimpleConfSpace;
 import edu.duke.cs.osprey.confspace.Strand;
 import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.NegatedEnergyMatrix;
 import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
 import edu.duke.cs.osprey.energy.EnergyCalculator;
 import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
@@ -116,6 +117,49 @@ public class TestConfRanker {
 	// dynamic heuristic:             rank 21039231, finished in 4.53 s
 	// optimized dynamic heuristic:   rank 21039231, finished in 1.16 s
 
+	@Test
+	public void negatedEmatPrimitives() {
+
+		// the ranker's heuristics read the negated emat through the primitive accessors,
+		// so they must negate exactly like the boxed accessors do
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder()
+			.addStrand(makeSmall1CC8())
+			.build();
+		EnergyMatrix emat;
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(4))
+			.build()) {
+
+			emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.build()
+				.calcEnergyMatrix();
+		}
+		NegatedEnergyMatrix negated = new NegatedEnergyMatrix(confSpace, emat);
+
+		for (int pos1=0; pos1<negated.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<negated.getNumConfAtPos(pos1); rc1++) {
+				assertThat(negated.getOneBodyValue(pos1, rc1), is(-emat.getOneBody(pos1, rc1)));
+				assertThat(negated.getOneBodyValue(pos1, rc1), is(negated.getOneBody(pos1, rc1)));
+				for (int pos2=0; pos2<negated.getNumPos(); pos2++) {
+					if (pos2 == pos1) {
+						continue;
+					}
+					int n2 = negated.getNumConfAtPos(pos2);
+					double[] row = negated.getPairwiseRow(pos1, rc1, pos2, new double[n2]);
+					int[] rcs2 = new int[n2];
+					double min = Double.POSITIVE_INFINITY;
+					for (int rc2=0; rc2<n2; rc2++) {
+						assertThat(negated.getPairwiseValue(pos1, rc1, pos2, rc2), is(-emat.getPairwise(pos1, rc1, pos2, rc2)));
+						assertThat(row[rc2], is(negated.getPairwise(pos1, rc1, pos2, rc2)));
+						rcs2[rc2] = rc2;
+						min = Math.min(min, negated.getPairwise(pos1, rc1, pos2, rc2));
+					}
+					assertThat(negated.minPairwise(pos1, rc1, pos2, rcs2), is(min));
+				}
+			}
+		}
+	}
+
 	private void checkEveryConf(Strand strand) {
 
 		SimpleConfSpace confSpace = new SimpleConfSpace.Builder()
@@ -6,6 +6,7 @@ import static org.junit.Assert.*;
 import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
 import edu.duke.cs.osprey.astar.conf.ConfSearchCache;
 import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.confspace.Conf;
 import edu.duke.cs.osprey.confspace.ConfSearch;
 import edu.duke.cs.osprey.confspace.SimpleConfSpace;
 import edu.duke.cs.osprey.confspace.Strand;
@@ -18,8 +19,12 @@ import edu.duke.cs.osprey.structure.PDBIO;
 import org.junit.BeforeClass;
 import org.junit.Test;
 
+import java.util.ArrayList;
 import java.util.Arrays;
+import java.util.Collections;
+import java.util.Iterator;
 import java.util.List;
+import java.util.Random;
 
 
 public class TestConfSearchCache {
@@ -186,4 +191,79 @@ public class TestConfSearchCache {
 		assertThat(tree2.isProtected(), is(false));
 		assertThat(tree3.isProtected(), is(true));
 	}
+
+	@Test
+	public void restrictedMemory() {
+
+		List<ConfSearch.ScoredConf> expectedConfs = new ConfAStarTree.Builder(emat, rcs)
+			.setTraditional()
+			.build()
+			.nextConfs(Double.POSITIVE_INFINITY);
+
+		// a zero budget only keeps the most recently used tree
+		ConfSearchCache cache = new ConfSearchCache(null, 0);
+
+		ConfSearchCache.Entry tree1 = cache.make(() ->
+			new ConfAStarTree.Builder(emat, rcs)
+				.setTraditional()
+				.build()
+		);
+		ConfSearchCache.Entry tree2 = cache.make(() ->
+			new ConfAStarTree.Builder(emat, rcs)
+				.setTraditional()
+				.build()
+		);
+
+		assertThat(tree1.nextConf(), is(expectedConfs.get(0)));
+		assertThat(cache.getNumProtectedBytes(), greaterThan(0L));
+		assertThat(tree2.nextConf(), is(expectedConfs.get(0)));
+		assertThat(tree1.isProtected(), is(false));
+		assertThat(tree2.isProtected(), is(true));
+
+		// evicted trees should pick up where they left off
+		for (int i=1; i<10; i++) {
+			assertThat(tree1.nextConf(), is(expectedConfs.get(i)));
+			assertThat(tree2.isProtected(), is(false));
+			assertThat(tree2.nextConf(), is(expectedConfs.get(i)));
+			assertThat(tree1.isProtected(), is(false));
+		}
+	}
+
+	@Test
+	public void replayTiesInAnyOrder() {
+
+		// make a search that returns tied confs in a different order each time it's instantiated,
+		// like A* with parallel node expansion can
+		Random rand = new Random(12345);
+		double[] scores = { 1, 1, 2, 2, 2, 2, 2, 2, 3, 3 };
+		ConfSearchCache cache = new ConfSearchCache(1);
+		ConfSearchCache.Entry tree = cache.make(() -> {
+			List<ConfSearch.ScoredConf> confs = new ArrayList<>();
+			for (int i=0; i<scores.length; i++) {
+				confs.add(new ConfSearch.ScoredConf(new int[] { i }, scores[i]));
+			}
+			Collections.shuffle(confs, rand);
+			confs.sort((a, b) -> Double.compare(a.getScore(), b.getScore()));
+			Iterator<ConfSearch.ScoredConf> iter = confs.iterator();
+			return () -> iter.hasNext() ? iter.next() : null;
+		});
+
+		// enumerate into the middle of the ties, then force re-instantiation a few times
+		Conf.Set returnedConfs = new Conf.Set();
+		double lastScore = Double.NEGATIVE_INFINITY;
+		for (int i=0; i<scores.length; i++) {
+			if (i == 3 || i == 5 || i == 7) {
+				tree.clearRefs();
+			}
+			ConfSearch.ScoredConf conf = tree.nextConf();
+			assertThat(conf, is(not(nullValue())));
+			assertThat(conf.getScore(), greaterThanOrEqualTo(lastScore));
+			lastScore = conf.getScore();
+
+			// no conf should ever come out twice
+			assertThat(returnedConfs.add(conf.getAssignments()), is(true));
+		}
+		assertThat(returnedConfs.size(), is(scores.length));
+		assertThat(tree.nextConf(), is(nullValue()));
+	}
 }
@@ -0,0 +1,113 @@
+package edu.duke.cs.osprey.astar;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
+import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.astar.conf.scoring.mplp.EdgeUpdater;
+import edu.duke.cs.osprey.astar.conf.scoring.mplp.MPLPUpdater;
+import edu.duke.cs.osprey.astar.conf.scoring.mplp.NodeUpdater;
+import edu.duke.cs.osprey.confspace.ConfSearch;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.structure.PDBIO;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+import java.util.Arrays;
+import java.util.List;
+
+import static edu.duke.cs.osprey.TestBase.isAbsolutely;
+import static org.hamcrest.Matchers.is;
+import static org.junit.Assert.assertThat;
+
+
+public class TestMPLPWarmStart {
+
+	private static SimpleConfSpace confSpace;
+	private static EnergyMatrix emat;
+	private static List<ConfSearch.ScoredConf> expected;
+
+	@BeforeClass
+	public static void beforeClass() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		for (String resNum : Arrays.asList("A2", "A3", "A4", "A5")) {
+			strand.flexibility.get(resNum).setLibraryRotamers("VAL", "LEU");
+		}
+		confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(8))
+			.build()
+		) {
+			emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.build()
+				.calcEnergyMatrix();
+		}
+
+		expected = new ConfAStarTree.Builder(emat, new RCs(confSpace))
+			.setTraditional()
+			.build()
+			.nextConfs(Double.POSITIVE_INFINITY);
+	}
+
+	private static List<ConfSearch.ScoredConf> enumerate(MPLPUpdater updater, int numIterations, int warmStartMiB, Integer numParallelNodes) {
+		ConfAStarTree astar = new ConfAStarTree.Builder(emat, new RCs(confSpace))
+			.setMPLP(new ConfAStarTree.MPLPBuilder()
+				.setUpdater(updater)
+				.setNumIterations(numIterations)
+				.setWarmStart(true)
+				.setWarmStartMiB(warmStartMiB)
+			)
+			.setNumParallelNodes(numParallelNodes)
+			.build();
+		if (numParallelNodes != null) {
+			astar.setParallelism(Parallelism.makeCpu(4));
+		}
+		return astar.nextConfs(Double.POSITIVE_INFINITY);
+	}
+
+	private static void checkScores(List<ConfSearch.ScoredConf> observed) {
+		assertThat(observed.size(), is(expected.size()));
+		for (int i=0; i<expected.size(); i++) {
+			assertThat(observed.get(i).getScore(), isAbsolutely(expected.get(i).getScore(), 1e-10));
+		}
+	}
+
+	@Test
+	public void edge1() {
+		checkScores(enumerate(new EdgeUpdater(), 1, 64, null));
+	}
+
+	@Test
+	public void edge5() {
+		checkScores(enumerate(new EdgeUpdater(), 5, 64, null));
+	}
+
+	@Test
+	public void node1() {
+		checkScores(enumerate(new NodeUpdater(), 1, 64, null));
+	}
+
+	@Test
+	public void node5() {
+		checkScores(enumerate(new NodeUpdater(), 5, 64, null));
+	}
+
+	@Test
+	public void noBudget() {
+		// only the newest messages are kept, so most parents get recomputed from scratch
+		checkScores(enumerate(new EdgeUpdater(), 5, 0, null));
+	}
+
+	@Test
+	public void parallel() {
+		checkScores(enumerate(new EdgeUpdater(), 5, 64, 8));
+	}
+}
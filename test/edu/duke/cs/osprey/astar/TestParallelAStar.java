@@ -0,0 +1,90 @@
+package edu.duke.cs.osprey.astar;
+
+import edu.duke.cs.osprey.astar.conf.ConfAStarTree;
+import edu.duke.cs.osprey.astar.conf.RCs;
+import edu.duke.cs.osprey.confspace.ConfSearch;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.structure.PDBIO;
+import edu.duke.cs.osprey.tools.MathTools;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+import java.util.Arrays;
+import java.util.List;
+
+import static edu.duke.cs.osprey.TestBase.isAbsolutely;
+import static org.hamcrest.Matchers.is;
+import static org.junit.Assert.assertThat;
+
+
+public class TestParallelAStar {
+
+	private static SimpleConfSpace confSpace;
+	private static EnergyMatrix emat;
+
+	@BeforeClass
+	public static void beforeClass() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		for (String resNum : Arrays.asList("A2", "A3", "A4", "A5")) {
+			strand.flexibility.get(resNum).setLibraryRotamers("VAL", "LEU");
+		}
+		confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(8))
+			.build()
+		) {
+			emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.build()
+				.calcEnergyMatrix();
+		}
+	}
+
+	private static List<ConfSearch.ScoredConf> enumerate(Integer numParallelNodes, boolean deterministic, MathTools.Optimizer optimizer) {
+		ConfAStarTree astar = new ConfAStarTree.Builder(emat, new RCs(confSpace))
+			.setTraditionalOpt(optimizer)
+			.setNumParallelNodes(numParallelNodes)
+			.setDeterministic(deterministic)
+			.build();
+		astar.setParallelism(Parallelism.makeCpu(4));
+		return astar.nextConfs(optimizer.initDouble());
+	}
+
+	@Test
+	public void sameScoresAsClassic() {
+		for (MathTools.Optimizer optimizer : MathTools.Optimizer.values()) {
+			List<ConfSearch.ScoredConf> expected = enumerate(null, false, optimizer);
+			checkScores(expected, enumerate(1, false, optimizer));
+			checkScores(expected, enumerate(8, false, optimizer));
+			checkScores(expected, enumerate(8, true, optimizer));
+		}
+	}
+
+	@Test
+	public void deterministic() {
+		List<ConfSearch.ScoredConf> expected = enumerate(8, true, MathTools.Optimizer.Minimize);
+		for (int i=0; i<4; i++) {
+			List<ConfSearch.ScoredConf> observed = enumerate(8, true, MathTools.Optimizer.Minimize);
+			checkScores(expected, observed);
+			for (int j=0; j<expected.size(); j++) {
+				assertThat(observed.get(j).getAssignments(), is(expected.get(j).getAssignments()));
+			}
+		}
+	}
+
+	private static void checkScores(List<ConfSearch.ScoredConf> expected, List<ConfSearch.ScoredConf> observed) {
+		assertThat(observed.size(), is(expected.size()));
+		for (int i=0; i<expected.size(); i++) {
+			assertThat(observed.get(i).getScore(), isAbsolutely(expected.get(i).getScore(), 1e-10));
+		}
+	}
+}
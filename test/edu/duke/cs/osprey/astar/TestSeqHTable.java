@@ -0,0 +1,121 @@
+package edu.duke.cs.osprey.astar;
+
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.astar.seq.nodes.SeqAStarNode;
+import edu.duke.cs.osprey.astar.seq.scoring.SeqHTable;
+import edu.duke.cs.osprey.confspace.SeqSpace;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.ematrix.EnergyMatrix;
+import edu.duke.cs.osprey.ematrix.SimplerEnergyMatrixCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.structure.PDBIO;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+import java.util.ArrayList;
+import java.util.List;
+
+
+public class TestSeqHTable {
+
+	private static SimpleConfSpace confSpace;
+	private static EnergyMatrix emat;
+
+	@BeforeClass
+	public static void beforeClass() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		strand.flexibility.get("A2").setLibraryRotamers(Strand.WildType, "VAL", "ALA");
+		strand.flexibility.get("A3").setLibraryRotamers(Strand.WildType);
+		strand.flexibility.get("A4").setLibraryRotamers(Strand.WildType, "LEU");
+
+		confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(4))
+			.build()
+		) {
+			emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.build()
+				.calcEnergyMatrix();
+		}
+	}
+
+	/** the heuristic computed directly, without any tables */
+	private static double calcDirect(SeqAStarNode.Assignments assignments) {
+
+		SeqSpace seqSpace = confSpace.seqSpace;
+
+		double score = 0.0;
+		for (SimpleConfSpace.Position pos1 : confSpace.positions) {
+			double bestPos1Energy = Double.POSITIVE_INFINITY;
+			for (SimpleConfSpace.ResidueConf rc1 : getRCs(seqSpace, pos1, assignments)) {
+				double rc1Energy = emat.getEnergy(pos1, rc1);
+				for (int i2=0; i2<pos1.index; i2++) {
+					SimpleConfSpace.Position pos2 = confSpace.positions.get(i2);
+					double bestRC2Energy = Double.POSITIVE_INFINITY;
+					for (SimpleConfSpace.ResidueConf rc2 : getRCs(seqSpace, pos2, assignments)) {
+						bestRC2Energy = Math.min(bestRC2Energy, emat.getEnergy(pos1, rc1, pos2, rc2));
+					}
+					rc1Energy += bestRC2Energy;
+				}
+				bestPos1Energy = Math.min(bestPos1Energy, rc1Energy);
+			}
+			score += bestPos1Energy;
+		}
+		return score;
+	}
+
+	private static List<SimpleConfSpace.ResidueConf> getRCs(SeqSpace seqSpace, SimpleConfSpace.Position pos, SeqAStarNode.Assignments assignments) {
+		SeqSpace.Position seqPos = seqSpace.getPosition(pos.resNum);
+		if (seqPos == null) {
+			return pos.resConfs;
+		}
+		Integer rt = assignments.getAssignment(seqPos.index);
+		List<SimpleConfSpace.ResidueConf> rcs = new ArrayList<>();
+		for (SimpleConfSpace.ResidueConf rc : pos.resConfs) {
+			if (rt == null ? seqPos.getResType(rc.template.name) != null : rc.template.name.equals(seqPos.resTypes.get(rt).name)) {
+				rcs.add(rc);
+			}
+		}
+		return rcs;
+	}
+
+	@Test
+	public void matchesDirect() {
+
+		SeqSpace seqSpace = confSpace.seqSpace;
+		SeqHTable table = new SeqHTable(confSpace, seqSpace, emat);
+
+		SeqAStarNode.Assignments assignments = new SeqAStarNode.Assignments(seqSpace.positions.size());
+
+		// no assignments
+		assertThat(table.calc(assignments), closeTo(calcDirect(assignments), 1e-9));
+
+		// every combination of assignments
+		for (SeqSpace.Position pos1 : seqSpace.positions) {
+			for (SeqSpace.ResType rt1 : pos1.resTypes) {
+				assignments.assign(pos1.index, rt1.index);
+				assertThat(table.calc(assignments), closeTo(calcDirect(assignments), 1e-9));
+				for (SeqSpace.Position pos2 : seqSpace.positions) {
+					if (pos2.index <= pos1.index) {
+						continue;
+					}
+					for (SeqSpace.ResType rt2 : pos2.resTypes) {
+						assignments.assign(pos2.index, rt2.index);
+						assertThat(table.calc(assignments), closeTo(calcDirect(assignments), 1e-9));
+						assignments.unassign(pos2.index);
+					}
+				}
+				assignments.unassign(pos1.index);
+			}
+		}
+	}
+}
@@ -0,0 +1,348 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.confspace;
+
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import com.google.common.collect.Lists;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.util.Iterator;
+import java.util.function.Consumer;
+
+import edu.duke.cs.osprey.structure.PDBIO;
+
+
+public class TestCompactConfDB {
+
+	private static SimpleConfSpace confSpace;
+
+	private static File file = new File("conf.cdb");
+	private static File mapdbFile = new File("conf.db");
+
+	@BeforeClass
+	public static void beforeClass() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		strand.flexibility.get("A5").setLibraryRotamers(Strand.WildType, "ALA").addWildTypeRotamers();
+		strand.flexibility.get("A7").setLibraryRotamers(Strand.WildType, "ALA").addWildTypeRotamers();
+		strand.flexibility.get("A9").setLibraryRotamers(Strand.WildType, "ALA").addWildTypeRotamers();
+
+		confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+	}
+
+	private static void cleanDB(File file) {
+		if (file.exists()) {
+			file.delete();
+		}
+		assertThat(file.exists(), is(false));
+	}
+
+	private static void withDBTwice(Consumer<ConfDB> block1, Consumer<ConfDB> block2) {
+		cleanDB(file);
+		try {
+			try (ConfDB db = new ConfDB(confSpace, file)) {
+				assertThat(db.engine, is(ConfDB.Engine.Compact));
+				block1.accept(db);
+			}
+			try (ConfDB db = new ConfDB(confSpace, file)) {
+				assertThat(db.engine, is(ConfDB.Engine.Compact));
+				block2.accept(db);
+			}
+		} finally {
+			cleanDB(file);
+		}
+	}
+
+	private static void assertConf(ConfDB.Conf conf, int[] assignments, double lower, long lowerNs, double upper, long upperNs) {
+		assertThat(conf.assignments, is(assignments));
+		assertThat(conf.lower.energy, is(lower));
+		assertThat(conf.lower.timestampNs, is(lowerNs));
+		assertThat(conf.upper.energy, is(upper));
+		assertThat(conf.upper.timestampNs, is(upperNs));
+	}
+
+	private static void assertConfUpper(ConfDB.Conf conf, int[] assignments, double upper, long timestampNs) {
+		assertThat(conf.assignments, is(assignments));
+		assertThat(conf.lower, is(nullValue()));
+		assertThat(conf.upper.energy, is(upper));
+		assertThat(conf.upper.timestampNs, is(timestampNs));
+	}
+
+	@Test
+	public void engineForFile() {
+		assertThat(ConfDB.Engine.forFile(null), is(ConfDB.Engine.MapDB));
+		assertThat(ConfDB.Engine.forFile(new File("foo.db")), is(ConfDB.Engine.MapDB));
+		assertThat(ConfDB.Engine.forFile(new File("foo.cdb")), is(ConfDB.Engine.Compact));
+	}
+
+	@Test
+	public void writeCloseReadAFewConfs() {
+		Sequence sequence = confSpace.makeWildTypeSequence();
+		withDBTwice((db) -> {
+
+			ConfDB.SequenceDB sdb = db.getSequence(sequence);
+			sdb.setUpperBound(new int[] { 1, 2, 3 }, 7.9, 42L);
+			sdb.setUpperBound(new int[] { 7, 9, 8 }, 3.2, 54L);
+			sdb.setUpperBound(new int[] { 4, 0, 5 }, 2.3, 69L);
+			sdb.setLowerEnergyOfUnsampledConfs(4.2);
+
+		}, (db) -> {
+
+			assertThat(Lists.newArrayList(db.getSequences()), contains(sequence));
+
+			ConfDB.SequenceDB sdb = db.getSequence(sequence);
+			assertThat(sdb.size(), is(3L));
+			assertThat(sdb.getLowerEnergyOfUnsampledConfs(), is(4.2));
+
+			// confs should come out in lexicographic order of the assignments
+			Iterator<ConfDB.Conf> confs = sdb.iterator();
+			assertConfUpper(confs.next(), new int[] { 1, 2, 3 }, 7.9, 42L);
+			assertConfUpper(confs.next(), new int[] { 4, 0, 5 }, 2.3, 69L);
+			assertConfUpper(confs.next(), new int[] { 7, 9, 8 }, 3.2, 54L);
+			assertThat(confs.hasNext(), is(false));
+		});
+	}
+
+	@Test
+	public void overwriteAndRemove() {
+		withDBTwice((db) -> {
+
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+			table.setLowerBound(new int[] { 1, 2, 3 }, 1.0, 5L);
+			table.setUpperBound(new int[] { 1, 2, 3 }, 2.0, 6L);
+			table.setBounds(new int[] { 3, 2, 1 }, 3.0, 4.0, 7L);
+			table.remove(new int[] { 3, 2, 1 });
+
+			assertConf(table.get(new int[] { 1, 2, 3 }), new int[] { 1, 2, 3 }, 1.0, 5L, 2.0, 6L);
+			assertThat(table.get(new int[] { 3, 2, 1 }), is(nullValue()));
+
+		}, (db) -> {
+
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+			assertThat(table.size(), is(1L));
+			assertConf(table.get(new int[] { 1, 2, 3 }), new int[] { 1, 2, 3 }, 1.0, 5L, 2.0, 6L);
+			assertThat(table.get(new int[] { 3, 2, 1 }), is(nullValue()));
+		});
+	}
+
+	@Test
+	public void partialConfs() {
+		int[] assignments = { -1, 4, -1 };
+		withDBTwice((db) -> {
+			db.new ConfTable("foo").setBounds(assignments, 1.0, 2.0, 5L);
+		}, (db) -> {
+			assertConf(db.new ConfTable("foo").get(assignments), assignments, 1.0, 5L, 2.0, 5L);
+		});
+	}
+
+	@Test
+	public void energyIndices() {
+
+		int[][] assignments = {
+			{ 0, 0, 0 },
+			{ 1, 2, 3 },
+			{ 3, 2, 1 },
+		};
+
+		withDBTwice((db) -> {
+
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+			table.setBounds(assignments[0], 7.0, 27.0, 5L);
+			table.setBounds(assignments[1], 6.0, 25.0, 6L);
+			table.setBounds(assignments[2], 5.0, 26.0, 7L);
+
+		}, (db) -> {
+
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+
+			assertThat(table.energiedConfs(ConfDB.SortOrder.Score), contains(
+				new ConfSearch.EnergiedConf(assignments[2], 5.0, 26.0),
+				new ConfSearch.EnergiedConf(assignments[1], 6.0, 25.0),
+				new ConfSearch.EnergiedConf(assignments[0], 7.0, 27.0)
+			));
+
+			assertThat(table.energiedConfs(ConfDB.SortOrder.Energy), contains(
+				new ConfSearch.EnergiedConf(assignments[1], 6.0, 25.0),
+				new ConfSearch.EnergiedConf(assignments[2], 5.0, 26.0),
+				new ConfSearch.EnergiedConf(assignments[0], 7.0, 27.0)
+			));
+
+			assertThat(table.lowerBounds(), contains(5.0, 6.0, 7.0));
+			assertThat(table.upperBounds(), contains(25.0, 26.0, 27.0));
+
+			Iterator<ConfDB.Conf> iter = table.getConfsByUpperBound(26.0).iterator();
+			assertConf(iter.next(), assignments[2], 5.0, 7L, 26.0, 7L);
+			assertThat(iter.hasNext(), is(false));
+			assertThat(table.getConfsByLowerBound(4.0), is(nullValue()));
+
+			// changing an energy should update the index
+			table.setBounds(assignments[1], 10.0, 50.0, 10L);
+			assertThat(table.lowerBounds(), contains(5.0, 7.0, 10.0));
+		});
+	}
+
+	@Test
+	public void manyConfsInBatches() {
+
+		// write enough confs to fill a few batches
+		int n = 100000;
+		withDBTwice((db) -> {
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+			for (int i=0; i<n; i++) {
+				table.setBounds(makeConf(i), i, 2*i, i + 1);
+			}
+		}, (db) -> {
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+			assertThat(table.size(), is((long)numDistinctConfs(n)));
+			for (int i=n - numDistinctConfs(n); i<n; i++) {
+				ConfDB.Conf conf = table.get(makeConf(i));
+				assertConf(conf, makeConf(i), i, i + 1, 2*i, i + 1);
+			}
+		});
+	}
+
+	private static int[] makeConf(int i) {
+		int[] conf = new int[confSpace.positions.size()];
+		for (SimpleConfSpace.Position pos : confSpace.positions) {
+			int numRCs = pos.resConfs.size();
+			conf[pos.index] = i % numRCs;
+			i /= numRCs;
+		}
+		return conf;
+	}
+
+	private static int numDistinctConfs(int n) {
+		int numConfs = 1;
+		for (SimpleConfSpace.Position pos : confSpace.positions) {
+			numConfs *= pos.resConfs.size();
+		}
+		return Math.min(n, numConfs);
+	}
+
+	@Test
+	public void dropIncompleteBatch()
+	throws IOException {
+
+		cleanDB(file);
+		try {
+
+			try (ConfDB db = new ConfDB(confSpace, file)) {
+				db.new ConfTable("foo").setBounds(new int[] { 1, 2, 3 }, 1.0, 2.0, 5L);
+			}
+			long length = file.length();
+
+			// simulate a crash in the middle of writing a batch
+			try (FileOutputStream out = new FileOutputStream(file, true)) {
+				out.write(new byte[] { 2, 0, 1, 2, 3 });
+			}
+
+			try (ConfDB db = new ConfDB(confSpace, file)) {
+				ConfDB.ConfTable table = db.new ConfTable("foo");
+				assertThat(table.size(), is(1L));
+				assertConf(table.get(new int[] { 1, 2, 3 }), new int[] { 1, 2, 3 }, 1.0, 5L, 2.0, 5L);
+			}
+			assertThat(file.length(), is(length));
+
+		} finally {
+			cleanDB(file);
+		}
+	}
+
+	@Test
+	public void flushAndFlushLater()
+	throws Exception {
+
+		cleanDB(file);
+		try (ConfDB db = new ConfDB(confSpace, file)) {
+			ConfDB.ConfTable table = db.new ConfTable("foo");
+
+			// flush should always commit
+			table.setBounds(new int[] { 1, 2, 3 }, 1.0, 2.0, 5L);
+			long length = file.length();
+			table.flush();
+			assertThat(file.length(), greaterThan(length));
+
+			// flushLater should wait for the commit interval, but not forever
+			table.setBounds(new int[] { 4, 5, 6 }, 1.0, 2.0, 5L);
+			length = file.length();
+			table.flushLater();
+			assertThat(file.length(), is(length));
+			Thread.sleep(CompactConfStore.DefaultCommitIntervalMs*3);
+			assertThat(file.length(), greaterThan(length));
+
+		} finally {
+			cleanDB(file);
+		}
+	}
+
+	@Test
+	public void convertFromMapDB() {
+
+		cleanDB(mapdbFile);
+		cleanDB(file);
+		try {
+
+			Sequence sequence = confSpace.makeWildTypeSequence();
+			try (ConfDB db = new ConfDB(confSpace, mapdbFile)) {
+				assertThat(db.engine, is(ConfDB.Engine.MapDB));
+				ConfDB.SequenceDB sdb = db.getSequence(sequence);
+				sdb.setBounds(new int[] { 1, 2, 3 }, 1.0, 2.0, 5L);
+				sdb.setUpperBound(new int[] { 4, 0, 5 }, 2.3, 69L);
+				sdb.setLowerEnergyOfUnsampledConfs(4.2);
+
+				db.exportTo(file, ConfDB.Engine.Compact);
+			}
+
+			try (ConfDB db = new ConfDB(confSpace, file)) {
+				assertThat(db.engine, is(ConfDB.Engine.Compact));
+				ConfDB.SequenceDB sdb = db.getSequence(sequence);
+				assertThat(sdb.size(), is(2L));
+				assertThat(sdb.getLowerEnergyOfUnsampledConfs(), is(4.2));
+				assertConf(sdb.get(new int[] { 1, 2, 3 }), new int[] { 1, 2, 3 }, 1.0, 5L, 2.0, 5L);
+				assertConfUpper(sdb.get(new int[] { 4, 0, 5 }), new int[] { 4, 0, 5 }, 2.3, 69L);
+			}
+
+		} finally {
+			cleanDB(mapdbFile);
+			cleanDB(file);
+		}
+	}
+}
@@ -0,0 +1,203 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import static edu.duke.cs.osprey.TestBase.TempFile;
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.tools.FileTools;
+import org.junit.Test;
+
+import java.io.IOException;
+
+
+public class TestEnergyMatrixIO {
+
+	private static EnergyMatrix makeEmat() {
+		EnergyMatrix emat = new EnergyMatrix(3, new int[] { 2, 1, 3 }, Double.POSITIVE_INFINITY);
+		double val = 0.5;
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				emat.setOneBody(pos1, rc1, val);
+				val += 1.25;
+				for (int pos2=0; pos2<pos1; pos2++) {
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						emat.setPairwise(pos1, rc1, pos2, rc2, -val);
+						val += 0.75;
+					}
+				}
+			}
+		}
+		emat.setConstTerm(4.2);
+		return emat;
+	}
+
+	@Test
+	public void magic()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrixIO.write(makeEmat(), EnergyMatrixIO.NoFingerprint, file);
+
+			byte[] bytes = FileTools.readFileBytes(file);
+			assertThat((char)bytes[0], is('E'));
+			assertThat((char)bytes[1], is('M'));
+			assertThat((char)bytes[2], is('A'));
+			assertThat((char)bytes[3], is('T'));
+			assertThat(EnergyMatrixIO.isBinaryFile(file), is(true));
+		}
+	}
+
+	@Test
+	public void roundTrip()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			EnergyMatrixIO.write(emat, 42L, file);
+			EnergyMatrix mapped = EnergyMatrixIO.read(file);
+
+			assertThat(mapped, instanceOf(MappedEnergyMatrix.class));
+			assertThat(mapped, is(emat));
+			assertThat(mapped.getConstTerm(), is(emat.getConstTerm()));
+			assertThat(mapped.sum(), is(emat.sum()));
+		}
+	}
+
+	private static void assertPrimitivesMatch(EnergyMatrix emat) {
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				assertThat(emat.getOneBodyValue(pos1, rc1), is(emat.getOneBody(pos1, rc1)));
+				for (int pos2=0; pos2<emat.getNumPos(); pos2++) {
+					if (pos2 == pos1) {
+						continue;
+					}
+					int n2 = emat.getNumConfAtPos(pos2);
+					double[] row = emat.getPairwiseRow(pos1, rc1, pos2, new double[n2]);
+					int[] rcs2 = new int[n2];
+					double min = Double.POSITIVE_INFINITY;
+					for (int rc2=0; rc2<n2; rc2++) {
+						assertThat(emat.getPairwiseValue(pos1, rc1, pos2, rc2), is(emat.getPairwise(pos1, rc1, pos2, rc2)));
+						assertThat(row[rc2], is(emat.getPairwise(pos1, rc1, pos2, rc2)));
+						rcs2[rc2] = rc2;
+						min = Math.min(min, row[rc2]);
+					}
+					assertThat(emat.minPairwise(pos1, rc1, pos2, rcs2), is(min));
+				}
+			}
+		}
+	}
+
+	@Test
+	public void primitiveAccessors()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			assertPrimitivesMatch(emat);
+
+			EnergyMatrixIO.write(emat, 42L, file);
+			assertPrimitivesMatch(EnergyMatrixIO.read(file));
+		}
+	}
+
+	@Test
+	public void copyOnWrite()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			EnergyMatrixIO.write(emat, 42L, file);
+
+			// changing the mapped matrix shouldn't change the file
+			EnergyMatrix mapped = EnergyMatrixIO.read(file);
+			mapped.setOneBody(0, 0, 100.0);
+			mapped.setPairwise(2, 1, 0, 1, 200.0);
+			assertThat(mapped.getOneBody(0, 0), is(100.0));
+			assertThat(mapped.getPairwise(0, 1, 2, 1), is(200.0));
+
+			assertThat(EnergyMatrixIO.read(file), is(emat));
+		}
+	}
+
+	@Test
+	public void heapCopy()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			EnergyMatrixIO.write(emat, 42L, file);
+
+			EnergyMatrix copy = new EnergyMatrix(EnergyMatrixIO.read(file));
+			assertThat(copy, is(emat));
+			assertThat(copy.getConstTerm(), is(emat.getConstTerm()));
+		}
+	}
+
+	@Test
+	public void readWriteAutoDetect()
+	throws Exception {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			EnergyMatrix.write(emat, file);
+
+			assertThat(EnergyMatrixIO.isBinaryFile(file), is(true));
+			assertThat(EnergyMatrix.read(file), is(emat));
+		}
+	}
+
+	@Test
+	public void keys()
+	throws IOException {
+		try (TempFile file = new TempFile("emat.dat")) {
+
+			EnergyMatrix emat = makeEmat();
+			long[][] rcKeys = { { 1, 2 }, { 3 }, { 4, 5, 6 } };
+			long[][] singleKeys = { { 7, 8 }, { 9 }, { 10, 11, 12 } };
+			EnergyMatrixIO.write(emat, 42L, new FragmentKeys(13L, rcKeys, singleKeys), file);
+
+			assertThat(EnergyMatrixIO.read(file), is(emat));
+
+			FragmentKeys keys = EnergyMatrixIO.readKeys(file);
+			assertThat(keys.pairsContext, is(13L));
+			assertThat(keys.rcKeys, is(rcKeys));
+			assertThat(keys.singleKeys, is(singleKeys));
+
+			// no keys
+			EnergyMatrixIO.write(emat, 42L, file);
+			assertThat(EnergyMatrixIO.readKeys(file), is(nullValue()));
+		}
+	}
+}
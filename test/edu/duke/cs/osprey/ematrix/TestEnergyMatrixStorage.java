@@ -0,0 +1,119 @@
+package edu.duke.cs.osprey.ematrix;
+
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.pruning.PruningMatrix;
+import org.junit.Test;
+
+
+public class TestEnergyMatrixStorage {
+
+	private static final int[] NumConfAtPos = { 2, 1, 3 };
+
+	private static void fill(EnergyMatrix emat) {
+		double val = 0.1;
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				emat.setOneBody(pos1, rc1, val);
+				val += 1.3;
+				for (int pos2=0; pos2<pos1; pos2++) {
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						emat.setPairwise(pos1, rc1, pos2, rc2, -val);
+						val += 0.7;
+					}
+				}
+			}
+		}
+	}
+
+	@Test
+	public void floatPrecision() {
+
+		EnergyMatrix expected = new EnergyMatrix(NumConfAtPos.length, NumConfAtPos, Double.POSITIVE_INFINITY);
+		fill(expected);
+		FloatEnergyMatrix emat = new FloatEnergyMatrix(NumConfAtPos.length, NumConfAtPos);
+		fill(emat);
+
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				assertThat(emat.getOneBody(pos1, rc1), is(expected.getOneBody(pos1, rc1)));
+				for (int pos2=0; pos2<emat.getNumPos(); pos2++) {
+					if (pos2 == pos1) {
+						continue;
+					}
+					double[] row = emat.getPairwiseRow(pos1, rc1, pos2, new double[emat.getNumConfAtPos(pos2)]);
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						double energy = emat.getPairwiseValue(pos1, rc1, pos2, rc2);
+						double expectedEnergy = expected.getPairwise(pos1, rc1, pos2, rc2);
+
+						// float energies should be rounded down, but be close
+						assertThat(energy, lessThanOrEqualTo(expectedEnergy));
+						assertThat(energy, closeTo(expectedEnergy, 1e-5));
+						assertThat(emat.getPairwise(pos1, rc1, pos2, rc2), is(energy));
+						assertThat(row[rc2], is(energy));
+					}
+				}
+			}
+		}
+
+		// infinities should stay infinite
+		emat.setPairwise(2, 1, 0, 1, Double.POSITIVE_INFINITY);
+		assertThat(emat.getPairwiseValue(0, 1, 2, 1), is(Double.POSITIVE_INFINITY));
+	}
+
+	@Test
+	public void sparse() {
+
+		// pos 2 doesn't interact with pos 0
+		SparseEnergyMatrix emat = new SparseEnergyMatrix(NumConfAtPos.length, NumConfAtPos, (pos1, pos2) -> !(pos1 == 2 && pos2 == 0));
+		assertThat(emat.storesPairwise(1, 0), is(true));
+		assertThat(emat.storesPairwise(2, 1), is(true));
+		assertThat(emat.storesPairwise(2, 0), is(false));
+		assertThat(emat.storesPairwise(0, 2), is(false));
+		assertThat(emat.getNumStoredPairwise(), is((long)(2*1 + 1*3)));
+
+		EnergyMatrix expected = new EnergyMatrix(NumConfAtPos.length, NumConfAtPos, Double.POSITIVE_INFINITY);
+		fill(expected);
+		fill(emat);
+
+		for (int pos1=0; pos1<emat.getNumPos(); pos1++) {
+			for (int rc1=0; rc1<emat.getNumConfAtPos(pos1); rc1++) {
+				assertThat(emat.getOneBody(pos1, rc1), is(expected.getOneBody(pos1, rc1)));
+				for (int pos2=0; pos2<emat.getNumPos(); pos2++) {
+					if (pos2 == pos1) {
+						continue;
+					}
+					double[] row = emat.getPairwiseRow(pos1, rc1, pos2, new double[emat.getNumConfAtPos(pos2)]);
+					for (int rc2=0; rc2<emat.getNumConfAtPos(pos2); rc2++) {
+						double expectedEnergy = emat.storesPairwise(pos1, pos2) ? expected.getPairwise(pos1, rc1, pos2, rc2) : 0.0;
+						assertThat(emat.getPairwise(pos1, rc1, pos2, rc2), is(expectedEnergy));
+						assertThat(emat.getPairwiseValue(pos1, rc1, pos2, rc2), is(expectedEnergy));
+						assertThat(row[rc2], is(expectedEnergy));
+					}
+				}
+			}
+		}
+	}
+
+	@Test
+	public void sparsePruning() {
+
+		PruningMatrix pmat = new PruningMatrix(NumConfAtPos.length, NumConfAtPos, 0);
+		assertThat(pmat.countPrunedPairs(), is(0));
+
+		pmat.prunePair(2, 1, 0, 1);
+		pmat.prunePair(1, 0, 2, 2);
+		assertThat(pmat.isPairPruned(0, 1, 2, 1), is(true));
+		assertThat(pmat.isPairPruned(2, 2, 1, 0), is(true));
+		assertThat(pmat.isPairPruned(2, 0, 0, 1), is(false));
+		assertThat(pmat.isPairPruned(1, 0, 0, 0), is(false));
+		assertThat(pmat.countPrunedPairs(), is(2));
+
+		// copies shouldn't share storage
+		PruningMatrix copy = new PruningMatrix(pmat);
+		copy.setPairwise(2, 1, 0, 1, false);
+		assertThat(copy.isPairPruned(2, 1, 0, 1), is(false));
+		assertThat(pmat.isPairPruned(2, 1, 0, 1), is(true));
+	}
+}
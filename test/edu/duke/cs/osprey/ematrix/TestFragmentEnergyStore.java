@@ -0,0 +1,131 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.ematrix;
+
+import static edu.duke.cs.osprey.TestBase.TempFile;
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.confspace.RCTuple;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.structure.Molecule;
+import edu.duke.cs.osprey.structure.PDBIO;
+import org.junit.Test;
+
+
+public class TestFragmentEnergyStore {
+
+	@Test
+	public void putFlushRead() {
+		try (TempFile file = new TempFile("frag.dat")) {
+
+			FragmentEnergyStore store = new FragmentEnergyStore(file);
+			assertThat(store.size(), is(0));
+
+			store.put(new FragmentEnergyStore.Key(1, 2), 4.2);
+			store.put(new FragmentEnergyStore.Key(3, 4), -1.5);
+			assertThat(store.get(new FragmentEnergyStore.Key(1, 2)), is(4.2));
+			assertThat(store.get(new FragmentEnergyStore.Key(5, 6)), is(nullValue()));
+			store.flush();
+
+			FragmentEnergyStore store2 = new FragmentEnergyStore(file);
+			assertThat(store2.size(), is(2));
+			assertThat(store2.get(new FragmentEnergyStore.Key(1, 2)), is(4.2));
+			assertThat(store2.get(new FragmentEnergyStore.Key(3, 4)), is(-1.5));
+		}
+	}
+
+	@Test
+	public void sharedAppends() {
+		try (TempFile file = new TempFile("frag.dat")) {
+
+			FragmentEnergyStore store1 = new FragmentEnergyStore(file);
+			FragmentEnergyStore store2 = new FragmentEnergyStore(file);
+
+			store1.put(new FragmentEnergyStore.Key(1, 2), 4.2);
+			store1.flush();
+			store2.put(new FragmentEnergyStore.Key(3, 4), -1.5);
+			store2.flush();
+
+			// each store sees the other's energies after a refresh
+			assertThat(store2.get(new FragmentEnergyStore.Key(1, 2)), is(4.2));
+			store1.refresh();
+			assertThat(store1.get(new FragmentEnergyStore.Key(3, 4)), is(-1.5));
+
+			assertThat(new FragmentEnergyStore(file).size(), is(2));
+		}
+	}
+
+	@Test
+	public void energyMatrix() {
+
+		Molecule mol = PDBIO.readFile("examples/python.GMEC/1CC8.ss.pdb");
+		Strand strand = new Strand.Builder(mol).build();
+		strand.flexibility.get("A2").setLibraryRotamers("ALA", "GLY");
+		strand.flexibility.get("A3").setLibraryRotamers(Strand.WildType, "VAL");
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder().addStrand(strand).build();
+
+		EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams()).build();
+		ConfEnergyCalculator confEcalc = new ConfEnergyCalculator.Builder(confSpace, ecalc).build();
+
+		try (TempFile file = new TempFile("frag.dat")) {
+
+			EnergyMatrix emat = new SimplerEnergyMatrixCalculator.Builder(confEcalc)
+				.setFragmentStoreFile(file)
+				.build()
+				.calcEnergyMatrix();
+
+			FragmentEnergyStore store = new FragmentEnergyStore(file);
+			assertThat(store.size(), is(confSpace.getNumResConfs() + confSpace.getNumResConfPairs()));
+
+			// keys should be stable
+			FragmentEnergyStore.Hasher hasher = store.hasher(confEcalc);
+			assertThat(
+				store.get(hasher.make(new RCTuple(0, 0), confEcalc.makeSingleInters(0, 0))),
+				is(emat.getOneBody(0, 0))
+			);
+
+			// the second time, all the energies should come from the store
+			EnergyMatrix emat2 = new SimplerEnergyMatrixCalculator.Builder(confEcalc)
+				.setFragmentStoreFile(file)
+				.build()
+				.calcEnergyMatrix();
+			assertThat(emat2, is(emat));
+			assertThat(new FragmentEnergyStore(file).size(), is(store.size()));
+		}
+	}
+}
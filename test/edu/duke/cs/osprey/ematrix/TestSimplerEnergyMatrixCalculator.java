@@ -35,8 +35,12 @@ package edu.duke.cs.osprey.ematrix;
 import static org.hamcrest.Matchers.*;
 import static org.junit.Assert.*;
 
+import java.io.File;
+import java.io.IOException;
 import java.util.ArrayList;
 import java.util.Arrays;
+import java.util.List;
+import java.util.concurrent.atomic.AtomicInteger;
 
 import edu.duke.cs.osprey.restypes.ResidueTemplateLibrary;
 import org.junit.Test;
@@ -48,10 +52,13 @@ import edu.duke.cs.osprey.confspace.SimpleConfSpace;
 import edu.duke.cs.osprey.confspace.Strand;
 import edu.duke.cs.osprey.dof.deeper.DEEPerSettings;
 import edu.duke.cs.osprey.ematrix.epic.EPICSettings;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
 import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.ResidueInteractions;
 import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
 import edu.duke.cs.osprey.structure.Molecule;
 import edu.duke.cs.osprey.structure.PDBIO;
+import edu.duke.cs.osprey.tools.ObjectIO;
 import edu.duke.cs.osprey.tupexp.LUTESettings;
 
 public class TestSimplerEnergyMatrixCalculator extends TestBase {
@@ -816,6 +823,153 @@ public class TestSimplerEnergyMatrixCalculator extends TestBase {
 		);
 	}
 	
+	@Test
+	public void discreteGLYtoGLUIncremental()
+	throws IOException {
+		try (TempFile cacheFile = new TempFile("emat.dat")) {
+			
+			// compute an energy matrix for a smaller conf space first
+			SimpleConfSpace smallConfSpace = makeConfSpace(false, "GLY", "SER", "ASN");
+			makeEmatCalc(smallConfSpace, cacheFile).calcEnergyMatrix();
+			
+			// then add a position, which should reuse the old pair energies
+			SimpleConfSpace confSpace = makeConfSpace(false, "GLY", "SER", "ASN", "GLU");
+			EnergyMatrix emat = makeEmatCalc(confSpace, cacheFile).calcEnergyMatrix();
+			assertEnergyMatrix(confSpace, makeExpectedEmatDiscreteGLYtoGLU(confSpace), emat);
+			
+			// and the cache should be up-to-date now
+			assertThat(EnergyMatrixIO.read(cacheFile, confSpace), is(emat));
+		}
+	}
+	
+	@Test
+	public void cacheWithDifferentStorage()
+	throws IOException {
+		try (TempFile cacheFile = new TempFile("emat.dat")) {
+			
+			SimpleConfSpace confSpace = makeConfSpace(false, "GLY", "SER", "ASN", "GLU");
+			
+			// compute an energy matrix that skips pairs, which get stored as zero
+			makeEmatCalc(confSpace, cacheFile, 0.1).calcEnergyMatrix();
+			
+			// without the cutoff, the skipped pairs shouldn't be reused from the cache
+			EnergyMatrix emat = makeEmatCalc(confSpace, cacheFile).calcEnergyMatrix();
+			assertEnergyMatrix(confSpace, makeExpectedEmatDiscreteGLYtoGLU(confSpace), emat);
+			assertThat(EnergyMatrixIO.read(cacheFile, confSpace), is(emat));
+			
+			// and the cutoff matrix shouldn't be read as the full one either
+			try {
+				makeEmatCalc(confSpace, cacheFile, 0.1).calcEnergyMatrix();
+				EnergyMatrixIO.read(cacheFile, confSpace);
+				fail("should have thrown");
+			} catch (EnergyMatrixIO.FingerprintMismatchException ex) {
+				// expected
+			}
+		}
+	}
+	
+	@Test
+	public void cacheKeepsStorage()
+	throws IOException {
+		try (TempFile cacheFile = new TempFile("emat.dat")) {
+			
+			SimpleConfSpace confSpace = makeConfSpace(false, "GLY", "SER", "ASN", "GLU");
+			
+			// reading a sparse cache should give back a sparse matrix
+			EnergyMatrix emat = makeEmatCalc(confSpace, cacheFile, 0.1).calcEnergyMatrix();
+			assertThat(emat, instanceOf(SparseEnergyMatrix.class));
+			EnergyMatrix cached = makeEmatCalc(confSpace, cacheFile, 0.1).calcEnergyMatrix();
+			assertThat(cached, instanceOf(SparseEnergyMatrix.class));
+			assertThat(cached, is(emat));
+		}
+		try (TempFile cacheFile = new TempFile("emat.dat")) {
+			
+			SimpleConfSpace confSpace = makeConfSpace(false, "GLY", "SER", "ASN", "GLU");
+			
+			// and same for float32
+			EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+				.setType(EnergyCalculator.Type.CpuOriginalCCD)
+				.build();
+			EnergyMatrix emat = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.setCacheFile(cacheFile)
+				.setFloatPrecision(true)
+				.build()
+				.calcEnergyMatrix();
+			assertThat(emat, instanceOf(FloatEnergyMatrix.class));
+			EnergyMatrix cached = new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+				.setCacheFile(cacheFile)
+				.setFloatPrecision(true)
+				.build()
+				.calcEnergyMatrix();
+			assertThat(cached, instanceOf(FloatEnergyMatrix.class));
+			assertThat(cached, is(emat));
+		}
+	}
+	
+	@Test
+	public void upgradeLegacyCacheWithStorage()
+	throws Exception {
+		try (TempFile cacheFile = new TempFile("emat.dat")) {
+			
+			SimpleConfSpace confSpace = makeConfSpace(false, "GLY", "SER", "ASN", "GLU");
+			EnergyMatrix emat = makeEmatCalc(confSpace).calcEnergyMatrix();
+			ObjectIO.write(emat, cacheFile);
+			
+			// upgrading the old cache format should keep the requested storage, so the next read matches
+			String storage = "sparse cutoff=0.1";
+			EnergyMatrixIO.readOrMake(cacheFile, confSpace, storage, null, (oldEmat, oldKeys) -> {
+				throw new AssertionError("shouldn't recompute the energy matrix");
+			});
+			assertThat(EnergyMatrixIO.isBinaryFile(cacheFile), is(true));
+			assertThat(EnergyMatrixIO.read(cacheFile, confSpace, storage), is(emat));
+		}
+	}
+	
+	@Test
+	public void batchedEnergies() {
+		
+		Molecule mol = PDBIO.readFile("examples/python.GMEC/1CC8.ss.pdb");
+		Strand strand = new Strand.Builder(mol).build();
+		strand.flexibility.get("A10").setLibraryRotamers("ALA", "VAL", "LEU");
+		strand.flexibility.get("A11").setLibraryRotamers("PRO", "SER");
+		strand.flexibility.get("A12").setLibraryRotamers("THR").setContinuous();
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder().addStrand(strand).build();
+		ConfEnergyCalculator confEcalc = makeEmatCalc(confSpace).confEcalc;
+		
+		// batched energies should exactly match the one-at-a-time energies, rigid or not
+		List<RCTuple> frags = new ArrayList<>();
+		List<ResidueInteractions> inters = new ArrayList<>();
+		for (int pos1=0; pos1<confSpace.positions.size(); pos1++) {
+			for (int pos2=0; pos2<pos1; pos2++) {
+				for (int rc1=0; rc1<confSpace.positions.get(pos1).resConfs.size(); rc1++) {
+					for (int rc2=0; rc2<confSpace.positions.get(pos2).resConfs.size(); rc2++) {
+						frags.add(new RCTuple(pos1, rc1, pos2, rc2));
+						inters.add(confEcalc.makePairInters(pos1, rc1, pos2, rc2));
+					}
+				}
+			}
+		}
+		double[] energies = confEcalc.calcEnergies(frags, inters);
+		for (int i=0; i<frags.size(); i++) {
+			assertThat(frags.get(i).toString(), energies[i], is(confEcalc.calcEnergy(frags.get(i), inters.get(i)).energy));
+		}
+
+		// subclasses that override calcEnergy should see every fragment, even the rigid ones
+		AtomicInteger numCalls = new AtomicInteger(0);
+		ConfEnergyCalculator subEcalc = new ConfEnergyCalculator(confEcalc) {
+			@Override
+			public EnergyCalculator.EnergiedParametricMolecule calcEnergy(RCTuple frag, ResidueInteractions inters) {
+				numCalls.incrementAndGet();
+				return super.calcEnergy(frag, inters);
+			}
+		};
+		energies = subEcalc.calcEnergies(frags, inters);
+		assertThat(numCalls.get(), is(frags.size()));
+		for (int i=0; i<frags.size(); i++) {
+			assertThat(frags.get(i).toString(), energies[i], is(confEcalc.calcEnergy(frags.get(i), inters.get(i)).energy));
+		}
+	}
+	
 	private SimpleConfSpace makeConfSpace(boolean doMinimize, String ... aminoAcids) {
 		return makeConfSpace(doMinimize, 10, aminoAcids);
 	}
@@ -844,10 +998,20 @@ public class TestSimplerEnergyMatrixCalculator extends TestBase {
 	}
 	
 	private SimplerEnergyMatrixCalculator makeEmatCalc(SimpleConfSpace confSpace) {
+		return makeEmatCalc(confSpace, null);
+	}
+	
+	private SimplerEnergyMatrixCalculator makeEmatCalc(SimpleConfSpace confSpace, File cacheFile) {
+		return makeEmatCalc(confSpace, cacheFile, null);
+	}
+	
+	private SimplerEnergyMatrixCalculator makeEmatCalc(SimpleConfSpace confSpace, File cacheFile, Double pairDistanceCutoff) {
 		EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
 			.setType(EnergyCalculator.Type.CpuOriginalCCD) // use original CCD implementation to match old code energies
 			.build();
 		return new SimplerEnergyMatrixCalculator.Builder(confSpace, ecalc)
+			.setCacheFile(cacheFile)
+			.setPairDistanceCutoff(pairDistanceCutoff)
 			.build();
 	}
 	
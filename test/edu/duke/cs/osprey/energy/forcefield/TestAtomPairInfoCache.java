@@ -0,0 +1,212 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.energy.forcefield;
+
+import static edu.duke.cs.osprey.TestBase.*;
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.energy.ResidueInteractions;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams.SolvationForcefield;
+import edu.duke.cs.osprey.energy.forcefield.ResPairCache.AtomPairInfo;
+import edu.duke.cs.osprey.parallelism.Parallelism;
+import edu.duke.cs.osprey.structure.AtomConnectivity;
+import edu.duke.cs.osprey.structure.Residues;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+public class TestAtomPairInfoCache {
+
+	@BeforeClass
+	public static void before() {
+		TestForcefieldEnergy.before();
+	}
+
+	private static Residues makeResidues() {
+		TestForcefieldEnergy.TestResidues r = new TestForcefieldEnergy.TestResidues();
+		return new Residues(r.gly06, r.gly15, r.ser17, r.trp18, r.arg22);
+	}
+
+	private static ResPairCache makeResPairCache(Residues residues, ForcefieldParams ffparams, AtomPairInfoCache sharedInfos) {
+		AtomConnectivity connectivity = new AtomConnectivity.Builder()
+			.addTemplates(residues)
+			.setParallelism(Parallelism.makeCpu(1))
+			.build();
+		return new ResPairCache(ffparams, connectivity, sharedInfos);
+	}
+
+	private static AtomPairInfo getInfo(ResPairCache resPairCache, Residues residues, String resNum1, String resNum2) {
+		SolvationForcefield.ResiduesInfo solvInfo = resPairCache.ffparams.solvationForcefield.makeInfo(resPairCache.ffparams, residues);
+		ResidueInteractions.Pair pair = new ResidueInteractions.Pair(resNum1, resNum2, ResidueInteractions.Pair.IdentityWeight, ResidueInteractions.Pair.IdentityOffset);
+		return resPairCache.get(residues, pair, solvInfo).info;
+	}
+
+	private static double calcEnergy(ResPairCache resPairCache, Residues residues) {
+		ResidueInteractions inters = TestForcefieldEnergy.IntersType.AllPairs.makeInters(residues);
+		return new ResidueForcefieldEnergy(resPairCache, inters, residues).getEnergy();
+	}
+
+	@Test
+	public void sharedAcrossResPairCaches() {
+
+		ForcefieldParams ffparams = new ForcefieldParams();
+		AtomPairInfoCache cache = new AtomPairInfoCache(AtomPairInfoCache.DefaultMaxBytes);
+
+		// use different molecules and connectivities, so nothing is shared by identity
+		Residues residues1 = makeResidues();
+		Residues residues2 = makeResidues();
+		ResPairCache resPairCache1 = makeResPairCache(residues1, ffparams, cache);
+		ResPairCache resPairCache2 = makeResPairCache(residues2, ffparams, cache);
+
+		AtomPairInfo info1 = getInfo(resPairCache1, residues1, "17", "18");
+		long numMisses = cache.getNumMisses();
+		AtomPairInfo info2 = getInfo(resPairCache2, residues2, "17", "18");
+		assertThat(info2, sameInstance(info1));
+		assertThat(cache.getNumMisses(), is(numMisses));
+
+		// different residue pairs shouldn't share
+		assertThat(getInfo(resPairCache2, residues2, "18", "22"), not(sameInstance(info1)));
+
+		// but identical residues at different positions can
+		assertThat(getInfo(resPairCache1, residues1, "6", "6"), sameInstance(getInfo(resPairCache1, residues1, "15", "15")));
+
+		// energies should match the unshared cache exactly
+		ResPairCache unshared = makeResPairCache(residues1, ffparams, null);
+		assertThat(unshared.sharedInfos, is(nullValue()));
+		assertThat(calcEnergy(resPairCache1, residues1), is(calcEnergy(unshared, residues1)));
+		assertThat(calcEnergy(resPairCache2, residues2), is(calcEnergy(unshared, residues1)));
+	}
+
+	@Test
+	public void differentForcefieldParams() {
+
+		AtomPairInfoCache cache = new AtomPairInfoCache(AtomPairInfoCache.DefaultMaxBytes);
+		Residues residues = makeResidues();
+
+		ForcefieldParams ffparams1 = new ForcefieldParams();
+		ForcefieldParams ffparams2 = new ForcefieldParams();
+		ffparams2.solvScale = ffparams1.solvScale/2;
+
+		assertThat(AtomPairInfoCache.hashForcefieldParams(ffparams1), is(AtomPairInfoCache.hashForcefieldParams(new ForcefieldParams())));
+		assertThat(AtomPairInfoCache.hashForcefieldParams(ffparams1), is(not(AtomPairInfoCache.hashForcefieldParams(ffparams2))));
+
+		AtomPairInfo info1 = getInfo(makeResPairCache(residues, ffparams1, cache), residues, "17", "18");
+		AtomPairInfo info2 = getInfo(makeResPairCache(residues, ffparams2, cache), residues, "17", "18");
+		assertThat(info2, not(sameInstance(info1)));
+	}
+
+	@Test
+	public void memoryBudget() {
+
+		Residues residues = makeResidues();
+		AtomPairInfo info = getInfo(makeResPairCache(residues, new ForcefieldParams(), null), residues, "17", "18");
+		long numBytes = AtomPairInfoCache.estimateNumBytes(info);
+
+		// room for two infos
+		AtomPairInfoCache cache = new AtomPairInfoCache(numBytes*2);
+		AtomPairInfoCache.Key key1 = new AtomPairInfoCache.Key(1, 1);
+		AtomPairInfoCache.Key key2 = new AtomPairInfoCache.Key(2, 2);
+		AtomPairInfoCache.Key key3 = new AtomPairInfoCache.Key(3, 3);
+		cache.put(key1, info);
+		cache.put(key2, info);
+		assertThat(cache.size(), is(2));
+		assertThat(cache.getNumBytes(), is(numBytes*2));
+
+		// using key1 should make key2 the least recently used
+		assertThat(cache.get(key1), sameInstance(info));
+		cache.put(key3, info);
+		assertThat(cache.size(), is(2));
+		assertThat(cache.get(key1), sameInstance(info));
+		assertThat(cache.get(key2), is(nullValue()));
+		assertThat(cache.get(key3), sameInstance(info));
+		assertThat(cache.getNumBytes(), lessThanOrEqualTo(cache.maxBytes));
+	}
+
+	@Test
+	public void clearWhenUnused() {
+
+		Residues residues = makeResidues();
+		AtomPairInfo info = getInfo(makeResPairCache(residues, new ForcefieldParams(), null), residues, "17", "18");
+		AtomPairInfoCache.Key key = new AtomPairInfoCache.Key(1, 1);
+
+		AtomPairInfoCache cache = new AtomPairInfoCache(AtomPairInfoCache.DefaultMaxBytes, true);
+		cache.addUser();
+		cache.addUser();
+		cache.put(key, info);
+
+		// the tables should stay until the last user is gone
+		cache.removeUser();
+		assertThat(cache.get(key), sameInstance(info));
+		cache.removeUser();
+		assertThat(cache.size(), is(0));
+		assertThat(cache.getNumBytes(), is(0L));
+
+		// the default budget should scale with the heap
+		assertThat(AtomPairInfoCache.DefaultMaxBytes, lessThanOrEqualTo(Math.max(Runtime.getRuntime().maxMemory()/8, 512L*1024L*1024L)));
+	}
+
+	@Test
+	public void saveLoad() {
+
+		ForcefieldParams ffparams = new ForcefieldParams();
+		Residues residues = makeResidues();
+		AtomPairInfoCache cache = new AtomPairInfoCache(AtomPairInfoCache.DefaultMaxBytes);
+		ResPairCache resPairCache = makeResPairCache(residues, ffparams, cache);
+		double energy = calcEnergy(resPairCache, residues);
+
+		try (TempFile file = new TempFile("atomPairInfos.dat")) {
+
+			cache.save(file);
+
+			AtomPairInfoCache loaded = new AtomPairInfoCache(AtomPairInfoCache.DefaultMaxBytes);
+			assertThat(loaded.load(file), is(cache.size()));
+			assertThat(loaded.size(), is(cache.size()));
+			assertThat(loaded.getNumBytes(), is(cache.getNumBytes()));
+
+			// a new run shouldn't have to precompute anything
+			Residues residues2 = makeResidues();
+			ResPairCache resPairCache2 = makeResPairCache(residues2, ffparams, loaded);
+			assertThat(calcEnergy(resPairCache2, residues2), is(energy));
+			assertThat(loaded.getNumMisses(), is(0L));
+			assertThat(loaded.getNumHits(), greaterThan(0L));
+
+			AtomPairInfo info = getInfo(resPairCache, residues, "17", "18");
+			AtomPairInfo loadedInfo = getInfo(resPairCache2, residues2, "17", "18");
+			assertThat(loadedInfo.numAtomPairs, is(info.numAtomPairs));
+			assertThat(loadedInfo.numPrecomputedPerAtomPair, is(info.numPrecomputedPerAtomPair));
+			assertThat(loadedInfo.flags, is(info.flags));
+			assertThat(loadedInfo.precomputed, is(info.precomputed));
+		}
+	}
+}
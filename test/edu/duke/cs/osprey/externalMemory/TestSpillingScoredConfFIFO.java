@@ -0,0 +1,150 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.externalMemory;
+
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.confspace.ConfSearch.ScoredConf;
+import org.junit.Test;
+
+import java.io.File;
+
+
+public class TestSpillingScoredConfFIFO {
+
+	// two positions cost 64 bytes per conf, so this fits 3 confs in memory
+	private static final long MaxBytes = 3*64;
+
+	private static ScoredConf makeConf(int i) {
+		return new ScoredConf(new int[] { i, -i }, i*0.1);
+	}
+
+	private static void assertConf(ScoredConf conf, int i) {
+		assertThat(conf.getAssignments(), is(new int[] { i, -i }));
+		assertThat(conf.getScore(), is(i*0.1));
+	}
+
+	@Test
+	public void inMemory() {
+		try (SpillingScoredConfFIFO q = new SpillingScoredConfFIFO(MaxBytes)) {
+
+			for (int i=0; i<3; i++) {
+				q.push(makeConf(i));
+			}
+			assertThat(q.size(), is(3L));
+			assertThat(q.getMaxNumSpilled(), is(0L));
+
+			for (int i=0; i<3; i++) {
+				assertConf(q.poll(), i);
+			}
+			assertThat(q.isEmpty(), is(true));
+			assertThat(q.poll(), is(nullValue()));
+		}
+	}
+
+	@Test
+	public void spillAll() {
+		try (SpillingScoredConfFIFO q = new SpillingScoredConfFIFO(MaxBytes)) {
+
+			final int n = 10000;
+			for (int i=0; i<n; i++) {
+				q.push(makeConf(i));
+			}
+			assertThat(q.size(), is((long)n));
+			assertThat(q.getNumSpilled(), is(n - 3L));
+
+			for (int i=0; i<n; i++) {
+				assertConf(q.poll(), i);
+			}
+			assertThat(q.isEmpty(), is(true));
+			assertThat(q.getNumSpilled(), is(0L));
+		}
+	}
+
+	@Test
+	public void deleteFileWhenDrained() {
+		File file;
+		try (SpillingScoredConfFIFO q = new SpillingScoredConfFIFO(MaxBytes)) {
+
+			for (int i=0; i<10; i++) {
+				q.push(makeConf(i));
+			}
+			file = q.getSpillFile();
+			assertThat(file.exists(), is(true));
+
+			// draining the spilled confs should delete the file
+			for (int i=0; i<10; i++) {
+				assertConf(q.poll(), i);
+			}
+			assertThat(q.getSpillFile(), is(nullValue()));
+			assertThat(file.exists(), is(false));
+
+			// spilling again should make a new file
+			for (int i=0; i<10; i++) {
+				q.push(makeConf(i));
+			}
+			file = q.getSpillFile();
+			assertThat(file.exists(), is(true));
+			assertConf(q.poll(), 0);
+		}
+
+		// and closing should delete it
+		assertThat(file.exists(), is(false));
+	}
+
+	@Test
+	public void interleaved() {
+		try (SpillingScoredConfFIFO q = new SpillingScoredConfFIFO(MaxBytes)) {
+
+			// push faster than we pop, so the queue keeps crossing the spill boundary
+			int numPushed = 0;
+			int numPopped = 0;
+			for (int round=0; round<1000; round++) {
+				for (int i=0; i<3; i++) {
+					q.push(makeConf(numPushed++));
+				}
+				for (int i=0; i<2; i++) {
+					assertConf(q.poll(), numPopped++);
+				}
+				assertThat(q.size(), is((long)(numPushed - numPopped)));
+			}
+			assertThat(q.getMaxNumSpilled(), greaterThan(0L));
+
+			while (!q.isEmpty()) {
+				assertConf(q.poll(), numPopped++);
+			}
+			assertThat(numPopped, is(numPushed));
+		}
+	}
+}
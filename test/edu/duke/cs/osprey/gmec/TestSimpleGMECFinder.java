@@ -89,6 +89,16 @@ public class TestSimpleGMECFinder {
 			.build();
 		}
 
+		public SimpleGMECFinder makePipelinedFinder() {
+			return new SimpleGMECFinder.Builder(
+				new ConfAStarTree.Builder(emat, confSpace).build(),
+				confEcalc
+			)
+			.setPipelined(true)
+			.setPipelineQueueSize(2)
+			.build();
+		}
+
 		public SimpleGMECFinder makeExternalFinder() {
 			return new SimpleGMECFinder.Builder(
 				new ConfAStarTree.Builder(emat, confSpace)
@@ -239,6 +249,53 @@ public class TestSimpleGMECFinder {
 		assertThat(conf.getScore(), isAbsolutely(-38.254643, EnergyEpsilon));
 	}
 	
+	@Test
+	public void findDiscreteWindowOnePipelined() {
+		Queue<EnergiedConf> confs = problemDiscrete.makePipelinedFinder().find(1);
+		assertThat(confs.size(), is(4L));
+
+		EnergiedConf conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 3, 4 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-30.705504, EnergyEpsilon));
+
+		conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 3, 5 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-30.241032, EnergyEpsilon));
+
+		conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 6, 4 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-29.981955, EnergyEpsilon));
+
+		conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 7, 4 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-29.748971, EnergyEpsilon));
+	}
+
+	@Test
+	public void findContinuousWindowPipelined() {
+		Queue<EnergiedConf> confs = problemContinuous.makePipelinedFinder().find(0.3);
+		assertThat(confs.size(), is(3L));
+
+		EnergiedConf conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 26, 0 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-38.465807, EnergyEpsilon));
+
+		conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 25, 0 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-38.243730, EnergyEpsilon));
+
+		conf = confs.poll();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 29, 0 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-38.166219, EnergyEpsilon));
+	}
+
+	@Test
+	public void findContinuousPipelined() {
+		EnergiedConf conf = problemContinuous.makePipelinedFinder().find();
+		assertThat(conf.getAssignments(), is(new int[] { 1, 26, 0 }));
+		assertThat(conf.getEnergy(), isAbsolutely(-38.465807, EnergyEpsilon));
+	}
+	
 	@Test
 	public void findContinuousWindowExternal() {
 		ExternalMemory.use(64, () -> {
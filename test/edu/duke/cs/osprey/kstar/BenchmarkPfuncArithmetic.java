@@ -0,0 +1,124 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.kstar;
+
+import edu.duke.cs.osprey.kstar.pfunc.PartitionFunction;
+import edu.duke.cs.osprey.kstar.pfunc.PfuncArithmetic;
+import edu.duke.cs.osprey.tools.MathTools;
+import edu.duke.cs.osprey.tools.Stopwatch;
+
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.math.MathContext;
+import java.util.Arrays;
+import java.util.Random;
+
+
+/**
+ * Times the partition function arithmetic alone, without A* or minimization,
+ * by running the per-conformation bound updates on made-up conformation energies.
+ */
+public class BenchmarkPfuncArithmetic {
+
+	public static void main(String[] args) {
+
+		// make some conf energies, in A* order
+		final int numConfs = 1000000;
+		Random rand = new Random(12345);
+		double[] energies = new double[numConfs];
+		for (int i=0; i<numConfs; i++) {
+			energies[i] = -60.0 + 40.0*rand.nextDouble();
+		}
+		Arrays.sort(energies);
+		BigInteger numConfsBeforePruning = BigInteger.TEN.pow(30);
+
+		// warm up the JIT
+		for (PartitionFunction.Arithmetic arithmetic : PartitionFunction.Arithmetic.values()) {
+			benchmark(arithmetic.make(), Arrays.copyOf(energies, numConfs/10), numConfsBeforePruning);
+		}
+
+		BigDecimal[] bigBounds = null;
+		for (PartitionFunction.Arithmetic arithmetic : PartitionFunction.Arithmetic.values()) {
+
+			Stopwatch stopwatch = new Stopwatch().start();
+			BigDecimal[] bounds = benchmark(arithmetic.make(), energies, numConfsBeforePruning);
+			stopwatch.stop();
+
+			System.out.println(String.format("%-14s %10s   %12.0f confs/s   bounds [%s, %s]",
+				arithmetic, stopwatch.getTime(2),
+				numConfs/stopwatch.getTimeS(),
+				bounds[0].round(new MathContext(10)), bounds[1].round(new MathContext(10))
+			));
+
+			if (arithmetic == PartitionFunction.Arithmetic.Big) {
+				bigBounds = bounds;
+			} else if (bigBounds != null) {
+				System.out.println(String.format("%14s relative difference from Big: lower %.3e, upper %.3e",
+					"",
+					relativeDifference(bounds[0], bigBounds[0]),
+					relativeDifference(bounds[1], bigBounds[1])
+				));
+			}
+		}
+	}
+
+	/** the same updates LUTEPfunc does for each conformation */
+	private static <T> BigDecimal[] benchmark(PfuncArithmetic<T> arith, double[] energies, BigInteger numConfsBeforePruning) {
+
+		T qstar = arith.zero();
+		T qprime = arith.of(MathTools.BigPositiveInfinity);
+		double epsilon = 1.0;
+
+		for (int i=0; i<energies.length; i++) {
+
+			BigInteger numConfsLeft = numConfsBeforePruning.subtract(BigInteger.valueOf(i + 1));
+
+			T weight = arith.weight(energies[i]);
+			qstar = arith.add(qstar, weight);
+			qprime = arith.mult(weight, arith.of(numConfsLeft));
+
+			// compute the effective epsilon too, but never stop early
+			epsilon = Math.min(epsilon, arith.ratio(qprime, arith.add(qstar, qprime)));
+		}
+
+		return new BigDecimal[] {
+			arith.toBigDecimal(qstar),
+			arith.toBigDecimal(arith.add(qstar, qprime))
+		};
+	}
+
+	private static double relativeDifference(BigDecimal observed, BigDecimal expected) {
+		return MathTools.bigDivide(observed.subtract(expected).abs(), expected, PartitionFunction.decimalPrecision).doubleValue();
+	}
+}
@@ -59,6 +59,10 @@ public class TestBBKStar {
 	}
 
 	public static Results runBBKStar(TestKStar.ConfSpaces confSpaces, int numSequences, double epsilon, String confdbPattern, int maxSimultaneousMutations) {
+		return runBBKStar(confSpaces, numSequences, epsilon, confdbPattern, maxSimultaneousMutations, null, 1);
+	}
+
+	public static Results runBBKStar(TestKStar.ConfSpaces confSpaces, int numSequences, double epsilon, String confdbPattern, int maxSimultaneousMutations, Integer confTreesMiB, int sequenceParallelism) {
 
 		Parallelism parallelism = Parallelism.makeCpu(4);
 
@@ -82,11 +86,13 @@ public class TestBBKStar {
 				.setEpsilon(epsilon)
 				.setStabilityThreshold(null)
 				.setMaxSimultaneousMutations(maxSimultaneousMutations)
+				.setSequenceParallelism(sequenceParallelism)
 				.addScoreConsoleWriter(testFormatter)
 				.build();
 			BBKStar.Settings bbkstarSettings = new BBKStar.Settings.Builder()
 				.setNumBestSequences(numSequences)
 				.setNumConfsPerBatch(8)
+				.setConfTreesMiB(confTreesMiB)
 				.build();
 			BBKStar bbkstar = new BBKStar(confSpaces.protein, confSpaces.ligand, confSpaces.complex, kstarSettings, bbkstarSettings);
 			for (BBKStar.ConfSpaceInfo info : bbkstar.confSpaceInfos()) {
@@ -147,6 +153,31 @@ public class TestBBKStar {
 		assert2RL0(results, numSequences);
 	}
 
+	@Test
+	public void test2RL0TinyConfTreesBudget() {
+
+		TestKStar.ConfSpaces confSpaces = TestKStar.make2RL0();
+		final double epsilon = 0.99;
+		final int numSequences = 25;
+
+		// a zero budget drops every tree as soon as BBK* moves on to another pfunc,
+		// so re-instantiated trees should still give the same answers
+		Results results = runBBKStar(confSpaces, numSequences, epsilon, null, 1, 0, 1);
+
+		assert2RL0(results, numSequences);
+	}
+
+	@Test
+	public void test2RL0ParallelNodes() {
+
+		TestKStar.ConfSpaces confSpaces = TestKStar.make2RL0();
+		final double epsilon = 0.99;
+		final int numSequences = 25;
+		Results results = runBBKStar(confSpaces, numSequences, epsilon, null, 1, null, 4);
+
+		assert2RL0(results, numSequences);
+	}
+
 	private void assert2RL0(Results results, int numSequences) {
 
 		// K* bounds collected with e = 0.1 from original K* algo
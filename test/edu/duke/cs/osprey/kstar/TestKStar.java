@@ -57,6 +57,7 @@ import edu.duke.cs.osprey.tools.Stopwatch;
 import org.junit.Test;
 
 import java.io.File;
+import java.nio.file.Files;
 import java.util.List;
 import java.util.function.Function;
 
@@ -76,6 +77,14 @@ public class TestKStar {
 	}
 
 	public static Result runKStar(ConfSpaces confSpaces, double epsilon, String confDBPattern, boolean useExternalMemory, int maxSimultaneousMutations) {
+		return runKStar(confSpaces, epsilon, confDBPattern, useExternalMemory, maxSimultaneousMutations, 1);
+	}
+
+	public static Result runKStar(ConfSpaces confSpaces, double epsilon, String confDBPattern, boolean useExternalMemory, int maxSimultaneousMutations, int sequenceParallelism) {
+		return runKStar(confSpaces, epsilon, confDBPattern, useExternalMemory, maxSimultaneousMutations, sequenceParallelism, null);
+	}
+
+	public static Result runKStar(ConfSpaces confSpaces, double epsilon, String confDBPattern, boolean useExternalMemory, int maxSimultaneousMutations, int sequenceParallelism, File checkpointFile) {
 
 		Parallelism parallelism = Parallelism.makeCpu(4);
 
@@ -113,6 +122,8 @@ public class TestKStar {
 				.addScoreConsoleWriter(testFormatter)
 				.setExternalMemory(useExternalMemory)
 				.setMaxSimultaneousMutations(maxSimultaneousMutations)
+				.setSequenceParallelism(sequenceParallelism)
+				.setCheckpointFile(checkpointFile)
 				//.setShowPfuncProgress(true)
 				.build();
 			KStar kstar = new KStar(confSpaces.protein, confSpaces.ligand, confSpaces.complex, settings);
@@ -219,6 +230,101 @@ public class TestKStar {
 		});
 	}
 
+	@Test
+	public void test2RL0WithSequenceParallelism() {
+
+		double epsilon = 0.95;
+		Result result = runKStar(make2RL0(), epsilon, null, false, 1, 4);
+		assert2RL0(result, epsilon);
+	}
+
+	@Test
+	public void test2RL0WithCheckpoint()
+	throws Exception {
+
+		double epsilon = 0.95;
+		ConfSpaces confSpaces = make2RL0();
+
+		try (TempFile checkpointFile = new TempFile("kstar.checkpoint")) {
+
+			// run from scratch
+			Result result = runKStar(confSpaces, epsilon, null, false, 1, 1, checkpointFile);
+			assert2RL0(result, epsilon);
+			List<String> lines = Files.readAllLines(checkpointFile.toPath());
+			assertThat(lines.size(), greaterThan(1));
+
+			// simulate an interruption halfway through writing a record
+			String contents = String.join("\n", lines);
+			Files.write(checkpointFile.toPath(), contents.substring(0, contents.length()/2).getBytes());
+
+			// resume, and the results should be the same
+			result = runKStar(confSpaces, epsilon, null, false, 1, 1, checkpointFile);
+			assert2RL0(result, epsilon);
+
+			// the checkpoint should be whole again
+			assertThat(Files.readAllLines(checkpointFile.toPath()).stream()
+				.filter(line -> line.startsWith("pfunc") && line.endsWith("\tend"))
+				.count(),
+				is(lines.stream()
+					.filter(line -> line.startsWith("pfunc") && line.endsWith("\tend"))
+					.count()
+				)
+			);
+
+			// resume from a finished design
+			result = runKStar(confSpaces, epsilon, null, false, 1, 1, checkpointFile);
+			assert2RL0(result, epsilon);
+		}
+	}
+
+	@Test
+	public void checkpointRejectsDifferentConfSpaceOfSameSize()
+	throws Exception {
+
+		// make conf spaces with the same sizes, but different flexible residues
+		Function<String,ConfSpaces> makeConfSpaces = (ligandResNum) -> {
+			ConfSpaces confSpaces = new ConfSpaces();
+			confSpaces.ffparams = new ForcefieldParams();
+			Molecule mol = PDBIO.readResource("/2RL0.min.reduce.pdb");
+			ResidueTemplateLibrary templateLib = new ResidueTemplateLibrary.Builder(confSpaces.ffparams.forcefld).build();
+			Strand protein = new Strand.Builder(mol)
+				.setTemplateLibrary(templateLib)
+				.setResidues("G648", "G654")
+				.build();
+			protein.flexibility.get("G654").setLibraryRotamers(Strand.WildType).setContinuous();
+			Strand ligand = new Strand.Builder(mol)
+				.setTemplateLibrary(templateLib)
+				.setResidues("A155", "A194")
+				.build();
+			ligand.flexibility.get(ligandResNum).setLibraryRotamers("VAL").setContinuous();
+			confSpaces.protein = new SimpleConfSpace.Builder().addStrand(protein).build();
+			confSpaces.ligand = new SimpleConfSpace.Builder().addStrand(ligand).build();
+			confSpaces.complex = new SimpleConfSpace.Builder().addStrands(protein, ligand).build();
+			return confSpaces;
+		};
+		ConfSpaces a = makeConfSpaces.apply("A193");
+		ConfSpaces b = makeConfSpaces.apply("A172");
+		assertThat(b.complex.positions.size(), is(a.complex.positions.size()));
+		assertThat(b.complex.getNumResConfs(), is(a.complex.getNumResConfs()));
+
+		KStar.Settings settings = new KStar.Settings.Builder().build();
+		try (TempFile checkpointFile = new TempFile("kstar.checkpoint")) {
+
+			new KStarCheckpoint(checkpointFile, settings, a.protein, a.ligand, a.complex).close();
+
+			// the same design can resume
+			new KStarCheckpoint(checkpointFile, settings, a.protein, a.ligand, a.complex).close();
+
+			// but a different design can't
+			try {
+				new KStarCheckpoint(checkpointFile, settings, b.protein, b.ligand, b.complex).close();
+				fail("expected a DifferentDesignException");
+			} catch (KStarCheckpoint.DifferentDesignException ex) {
+				// expected
+			}
+		}
+	}
+
 	private static void assert2RL0(Result result, double epsilon) {
 		// check the results (values collected with e = 0.01 and 64 digits precision)
 		// NOTE: these values don't match the ones in the TestKSImplLinear test because the conf spaces are slightly different
@@ -130,6 +130,11 @@ public class TestSimplePartitionFunction {
 
 	private static PfuncFactory simplePfuncs = (confEcalc) -> new SimplePartitionFunction(confEcalc);
 	private static PfuncFactory gdPfuncs = (confEcalc) -> new GradientDescentPfunc(confEcalc);
+	private static PfuncFactory gdDDPfuncs = (confEcalc) -> {
+		GradientDescentPfunc pfunc = new GradientDescentPfunc(confEcalc);
+		pfunc.setArithmetic(PartitionFunction.Arithmetic.DoubleDouble);
+		return pfunc;
+	};
 
 	public static void testStrand(ForcefieldParams ffparams, SimpleConfSpace confSpace, Parallelism parallelism, double targetEpsilon, String approxQStar, EnergyMatrix emat, PfuncFactory pfuncs) {
 
@@ -213,6 +218,7 @@ public class TestSimplePartitionFunction {
 	@Test public void test2RL0ProteinGD2Cpus() { calc2RL0Protein(gdPfuncs, Parallelism.make(2, 0, 0)); }
 	@Test public void test2RL0ProteinGD1GpuStream() { calc2RL0Protein(gdPfuncs, Parallelism.make(1, 1, 1)); }
 	@Test public void test2RL0ProteinGD4GpuStreams() { calc2RL0Protein(gdPfuncs, Parallelism.make(2, 1, 4)); }
+	@Test public void test2RL0ProteinGDDoubleDouble1Cpu() { calc2RL0Protein(gdDDPfuncs, Parallelism.make(1, 0, 0)); }
 
 	private static EnergyMatrix calc2RL0LigandEmat = null;
 	public void calc2RL0LigandPfunc(PfuncFactory pfuncs, Parallelism parallelism) {
@@ -235,6 +241,7 @@ public class TestSimplePartitionFunction {
 	@Test public void test2RL0LigandGD2Cpus() { calc2RL0LigandPfunc(gdPfuncs, Parallelism.make(2, 0, 0)); }
 	@Test public void test2RL0LigandGD1GpuStream() { calc2RL0LigandPfunc(gdPfuncs, Parallelism.make(1, 1, 1)); }
 	@Test public void test2RL0LigandGD4GpuStreams() { calc2RL0LigandPfunc(gdPfuncs, Parallelism.make(2, 1, 4)); }
+	@Test public void test2RL0LigandGDDoubleDouble1Cpu() { calc2RL0LigandPfunc(gdDDPfuncs, Parallelism.make(1, 0, 0)); }
 
 	private static EnergyMatrix calc2RL0ComplexEmat = null;
 	public void calc2RL0Complex(PfuncFactory pfuncs, Parallelism parallelism) {
@@ -267,6 +274,8 @@ public class TestSimplePartitionFunction {
 	@Test public void test2RL0ComplexGD4Cpus() { calc2RL0Complex(gdPfuncs, Parallelism.make(4, 0, 0)); }
 	@Test public void test2RL0ComplexGD1GpuStream() { calc2RL0Complex(gdPfuncs, Parallelism.make(1, 1, 1)); }
 	@Test public void test2RL0ComplexGD4GpuStreams() { calc2RL0Complex(gdPfuncs, Parallelism.make(2, 1, 4)); }
+	@Test public void test2RL0ComplexGDDoubleDouble1Cpu() { calc2RL0Complex(gdDDPfuncs, Parallelism.make(1, 0, 0)); }
+	@Test public void test2RL0ComplexGDDoubleDouble4Cpus() { calc2RL0Complex(gdDDPfuncs, Parallelism.make(4, 0, 0)); }
 
 
 	public static TestInfo make1GUA11TestInfo() {
@@ -350,6 +359,7 @@ public class TestSimplePartitionFunction {
 	}
 	@Test public void calc1GUA11ComplexSimple() { calc1GUA11Complex(simplePfuncs, Parallelism.makeCpu(4)); }
 	@Test public void calc1GUA11ComplexGD() { calc1GUA11Complex(gdPfuncs, Parallelism.makeCpu(4)); }
+	@Test public void calc1GUA11ComplexGDDoubleDouble() { calc1GUA11Complex(gdDDPfuncs, Parallelism.makeCpu(4)); }
 
 	public void calcWithConfDB(PfuncFactory pfuncs) {
 
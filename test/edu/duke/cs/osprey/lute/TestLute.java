@@ -58,6 +58,7 @@ import edu.duke.cs.osprey.structure.PDBIO;
 import org.junit.BeforeClass;
 import org.junit.Test;
 
+import java.util.ArrayList;
 import java.util.Comparator;
 import java.util.List;
 import java.util.function.Function;
@@ -323,12 +324,15 @@ public class TestLute {
 	}
 
 	private static LUTEConfEnergyCalculator train(SimpleConfSpace confSpace, ConfEnergyCalculator confEcalc, EnergyMatrix emat, PruningMatrix pmat) {
+		return train(confSpace, confEcalc, emat, pmat, LUTE.Fitter.OLSCG);
+	}
+
+	private static LUTEConfEnergyCalculator train(SimpleConfSpace confSpace, ConfEnergyCalculator confEcalc, EnergyMatrix emat, PruningMatrix pmat, LUTE.Fitter fitter) {
 
 		try (ConfDB confdb = new ConfDB(confSpace)) {
 			ConfDB.ConfTable confTable = confdb.new ConfTable("lute");
 
 			final int randomSeed = 12345;
-			final LUTE.Fitter fitter = LUTE.Fitter.OLSCG;
 			final double maxOverfittingScore = 1.5;
 			final double maxRMSE = 0.1;
 
@@ -372,6 +376,88 @@ public class TestLute {
 		}
 	}
 
+	private void astarFitter(LUTE.Fitter fitter) {
+
+		SimpleConfSpace confSpace = complex;
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, ffparams)
+			.setParallelism(Parallelism.makeCpu(4))
+			.build()) {
+
+			ConfEnergyCalculator confEcalc = makeConfEcalc(confSpace, ecalc);
+			EnergyMatrix emat = calcEmat(confEcalc);
+			PruningMatrix pmat = calcPmat(confSpace, emat);
+
+			// train LUTE
+			LUTEConfEnergyCalculator luteEcalc = train(confSpace, confEcalc, emat, pmat, fitter);
+
+			ConfAStarTree astar = new ConfAStarTree.Builder(null, pmat)
+				.setLUTE(luteEcalc)
+				.build();
+
+			final double epsilon = 1e-1;
+			assertConf(astar.nextConf(), new int[] { 13,13,11 }, -29.037828, epsilon);
+			assertConf(astar.nextConf(), new int[] { 13,13,40 }, -28.836836, epsilon);
+			assertConf(astar.nextConf(), new int[] { 11,13,11 }, -28.321740, epsilon);
+			assertConf(astar.nextConf(), new int[] { 11,13,40 }, -28.152335, epsilon);
+			assertConf(astar.nextConf(), new int[] { 13,13,9 }, -27.791179, epsilon);
+			assertConf(astar.nextConf(), new int[] { 13,13,10 }, -27.072290, epsilon);
+		}
+	}
+
+	@Test
+	public void astarOLSPCG() {
+		astarFitter(LUTE.Fitter.OLSPCG);
+	}
+
+	@Test
+	public void astarLASSOCD() {
+		astarFitter(LUTE.Fitter.LASSOCD);
+	}
+
+	@Test
+	public void astarParallel() {
+
+		SimpleConfSpace confSpace = complex;
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, ffparams)
+			.setParallelism(Parallelism.makeCpu(4))
+			.build()) {
+
+			ConfEnergyCalculator confEcalc = makeConfEcalc(confSpace, ecalc);
+			EnergyMatrix emat = calcEmat(confEcalc);
+			PruningMatrix pmat = calcPmat(confSpace, emat);
+
+			// train LUTE, then evaluate it with more threads
+			LUTEConfEnergyCalculator trainedEcalc = train(confSpace, confEcalc, emat, pmat);
+			try (LUTEConfEnergyCalculator luteEcalc = new LUTEConfEnergyCalculator(confSpace, trainedEcalc.state, Parallelism.makeCpu(4))) {
+
+				ConfAStarTree astar = LUTEGMECFinder.makeAStar(pmat, luteEcalc);
+
+				final double epsilon = 1e-1;
+				List<ConfSearch.ScoredConf> confs = new ArrayList<>();
+				for (int i=0; i<6; i++) {
+					confs.add(astar.nextConf());
+				}
+				assertConf(confs.get(0), new int[] { 13,13,11 }, -29.037828, epsilon);
+				assertConf(confs.get(1), new int[] { 13,13,40 }, -28.836836, epsilon);
+				assertConf(confs.get(2), new int[] { 11,13,11 }, -28.321740, epsilon);
+				assertConf(confs.get(3), new int[] { 11,13,40 }, -28.152335, epsilon);
+				assertConf(confs.get(4), new int[] { 13,13,9 }, -27.791179, epsilon);
+				assertConf(confs.get(5), new int[] { 13,13,10 }, -27.072290, epsilon);
+
+				// batched energies should match the one-at-a-time energies exactly
+				double[] energies = luteEcalc.calcEnergies(confs.stream()
+					.map(conf -> conf.getAssignments())
+					.collect(Collectors.toList())
+				);
+				for (int i=0; i<confs.size(); i++) {
+					assertThat(energies[i], is(trainedEcalc.calcEnergy(confs.get(i).getAssignments())));
+				}
+			}
+		}
+	}
+
 	@Test
 	public void gmec() {
 
@@ -87,7 +87,7 @@ public class BenchmarkTaskExecutor {
 	
 	private static void benchmark(TaskFactory factory) {
 		
-		int[] numThreadsList = { 1, 2, 4 };//, 8, 16, 32 };
+		int[] numThreadsList = { 1, 2, 4, 8, 16, 32 };//, 64 };
 		int numTrials = 6;
 		
 		long baseNs = Long.MAX_VALUE;
@@ -108,6 +108,12 @@ public class BenchmarkTaskExecutor {
 		System.out.println("\tLast half avg time " + TimeFormatter.format(totalNs*2/numTrials, 2));
 		
 		for (int numThreads : numThreadsList) {
+
+			// speedups past the number of cores don't mean anything
+			if (numThreads > Runtime.getRuntime().availableProcessors()) {
+				break;
+			}
+
 			totalNs = 0;
 			for (int i=0; i<numTrials; i++) {
 		
@@ -136,6 +142,35 @@ public class BenchmarkTaskExecutor {
 				TimeFormatter.format(avgNs, 2),
 				(float)baseNs*numThreads/avgNs
 			));
+
+			totalNs = 0;
+			for (int i=0; i<numTrials; i++) {
+
+				System.out.print(String.format("Benchmarking %2d threads, work stealing...  ", numThreads));
+
+				WorkStealingTaskExecutor tasks = new WorkStealingTaskExecutor();
+				tasks.queueSize = factory.numRuns;
+				tasks.start(numThreads);
+
+				Stopwatch stopwatch = benchmark(factory, tasks, baseNs);
+
+				System.out.println(String.format("Finished in %s, speedup: %.2fx",
+					stopwatch.getTime(2),
+					(float)baseNs*numThreads/stopwatch.getTimeNs()
+				));
+
+				if (i >= numTrials/2) {
+					totalNs += stopwatch.getTimeNs();
+				}
+
+				// cleanup
+				tasks.stopAndWait(10000);
+			}
+			avgNs = totalNs*2/numTrials;
+			System.out.println(String.format("\tLast half avg time %s, speedup: %.2fx",
+				TimeFormatter.format(avgNs, 2),
+				(float)baseNs*numThreads/avgNs
+			));
 		}
 	}
 	
@@ -0,0 +1,311 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+package edu.duke.cs.osprey.parallelism;
+
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import edu.duke.cs.osprey.confspace.RCTuple;
+import edu.duke.cs.osprey.confspace.SimpleConfSpace;
+import edu.duke.cs.osprey.confspace.Strand;
+import edu.duke.cs.osprey.energy.ConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.DistributedConfEnergyCalculator;
+import edu.duke.cs.osprey.energy.EnergyCalculator;
+import edu.duke.cs.osprey.energy.forcefield.ForcefieldParams;
+import edu.duke.cs.osprey.handlempi.MPIMaster;
+import edu.duke.cs.osprey.handlempi.MPISlaveTask;
+import edu.duke.cs.osprey.parallelism.DistributedTaskExecutor.RemoteTask;
+import edu.duke.cs.osprey.parallelism.TaskExecutor.TaskException;
+import edu.duke.cs.osprey.structure.PDBIO;
+import org.junit.AfterClass;
+import org.junit.BeforeClass;
+import org.junit.Test;
+
+import java.io.IOException;
+import java.net.Socket;
+import java.util.ArrayList;
+
+
+public class TestDistributedTaskExecutor {
+
+	private static DistributedTaskExecutor tasks;
+
+	@BeforeClass
+	public static void beforeClass() {
+
+		// start a couple of worker processes on this machine
+		tasks = new DistributedTaskExecutor();
+		tasks.startLocalWorkers(2, 2);
+		tasks.waitForWorkers(2, 60*1000);
+	}
+
+	@AfterClass
+	public static void afterClass() {
+		tasks.clean();
+	}
+
+	@Test
+	public void parallelism() {
+		assertThat(tasks.getNumWorkers(), is(2));
+		assertThat(tasks.getParallelism(), is(4));
+	}
+
+	@Test
+	public void squares() {
+
+		long[] sums = { 0, 0 };
+		for (int i=0; i<100; i++) {
+			final long n = i;
+			tasks.submit(
+				(RemoteTask<Long>)() -> n*n,
+				(result) -> sums[0] += result
+			);
+			sums[1] += n*n;
+		}
+		tasks.waitForFinish();
+
+		assertThat(sums[0], is(sums[1]));
+	}
+
+	@Test
+	public void localAndRemote() {
+
+		// local tasks can make remote calls too
+		int[] count = { 0 };
+		for (int i=0; i<20; i++) {
+			final int n = i;
+			tasks.submit(
+				() -> tasks.call((RemoteTask<Integer>)() -> n + 1),
+				(result) -> {
+					assertThat(result, is(n + 1));
+					count[0]++;
+				}
+			);
+		}
+		tasks.waitForFinish();
+
+		assertThat(count[0], is(20));
+	}
+
+	@Test
+	public void context() {
+
+		DistributedTaskExecutor.ContextRef<String> ref = tasks.putContext("hello");
+		String result = tasks.call((RemoteTask<String>)() -> ref.get() + " world");
+		assertThat(result, is("hello world"));
+	}
+
+	@Test
+	public void remoteException() {
+		try {
+			tasks.call((RemoteTask<Integer>)() -> {
+				throw new IllegalArgumentException("oops");
+			});
+			fail("should have thrown");
+		} catch (IllegalArgumentException ex) {
+			assertThat(ex.getMessage(), is("oops"));
+		}
+	}
+
+	@Test
+	public void remoteExceptionInSubmit() {
+
+		DistributedTaskExecutor tasks = new DistributedTaskExecutor();
+		tasks.startLocalWorkers(1, 1);
+		tasks.waitForWorkers(1, 60*1000);
+		try {
+
+			tasks.submit(
+				(RemoteTask<Integer>)() -> {
+					throw new IllegalArgumentException("oops");
+				},
+				(result) -> {}
+			);
+			try {
+				tasks.waitForFinish();
+				fail("should have thrown");
+			} catch (TaskException ex) {
+				assertThat(ex.getCause(), instanceOf(IllegalArgumentException.class));
+			}
+
+		} finally {
+			tasks.clean();
+		}
+	}
+
+	@Test
+	public void wrongSecret() {
+
+		DistributedTaskExecutor tasks = new DistributedTaskExecutor();
+		try {
+
+			// the coordinator should refuse the worker, and the worker should refuse the coordinator
+			try {
+				DistributedWorker.run("localhost", tasks.getPort(), 1, "not the secret");
+				fail("should have thrown");
+			} catch (IOException ex) {
+				// expected
+			}
+			assertThat(tasks.getNumWorkers(), is(0));
+
+		} finally {
+			tasks.clean();
+		}
+	}
+
+	@Test
+	public void slowHandshake()
+	throws IOException {
+
+		DistributedTaskExecutor tasks = new DistributedTaskExecutor();
+		try (Socket silent = new Socket("localhost", tasks.getPort())) {
+
+			// a client that never says hello shouldn't keep real workers from connecting
+			Thread worker = new Thread(() -> {
+				try {
+					DistributedWorker.run("localhost", tasks.getPort(), 1, tasks.getSecret());
+				} catch (IOException ex) {
+					// coordinator went away
+				}
+			});
+			worker.setDaemon(true);
+			worker.start();
+
+			tasks.waitForWorkers(1, DistributedTaskExecutor.HandshakeTimeoutMs/2);
+			assertThat(tasks.getNumWorkers(), is(1));
+
+		} finally {
+			tasks.clean();
+		}
+	}
+
+	@Test
+	public void noWorkers() {
+
+		DistributedTaskExecutor tasks = new DistributedTaskExecutor()
+			.setWorkerTimeout(100);
+		try {
+
+			// remote calls should fail rather than wait forever
+			try {
+				tasks.call((RemoteTask<Integer>)() -> 5);
+				fail("should have thrown");
+			} catch (IllegalStateException ex) {
+				// expected
+			}
+
+			tasks.submit((RemoteTask<Integer>)() -> 5, (result) -> {});
+			try {
+				tasks.waitForFinish();
+				fail("should have thrown");
+			} catch (TaskException ex) {
+				assertThat(ex.getCause(), instanceOf(IllegalStateException.class));
+			}
+
+		} finally {
+			tasks.clean();
+		}
+	}
+
+	private static class SquareTask implements MPISlaveTask {
+
+		private static final long serialVersionUID = 1L;
+
+		final int n;
+
+		SquareTask(int n) {
+			this.n = n;
+		}
+
+		@Override
+		public Object doCalculation() {
+			return n*n;
+		}
+	}
+
+	@Test
+	public void mpiMaster() {
+
+		ArrayList<MPISlaveTask> slaveTasks = new ArrayList<>();
+		for (int i=0; i<10; i++) {
+			slaveTasks.add(new SquareTask(i));
+		}
+
+		MPIMaster.setExecutor(tasks);
+		try {
+			ArrayList<Object> results = MPIMaster.getInstance().handleTasks(slaveTasks);
+			for (int i=0; i<10; i++) {
+				assertThat(results.get(i), is(i*i));
+			}
+		} finally {
+			MPIMaster.setExecutor(null);
+		}
+	}
+
+	@Test
+	public void energies() {
+
+		Strand strand = new Strand.Builder(PDBIO.readResource("/1CC8.ss.pdb")).build();
+		strand.flexibility.get("A2").setLibraryRotamers(Strand.WildType, "ALA").setContinuous();
+		strand.flexibility.get("A3").setLibraryRotamers(Strand.WildType).setContinuous();
+		SimpleConfSpace confSpace = new SimpleConfSpace.Builder()
+			.addStrand(strand)
+			.build();
+
+		try (EnergyCalculator ecalc = new EnergyCalculator.Builder(confSpace, new ForcefieldParams())
+			.setParallelism(Parallelism.makeCpu(1))
+			.build()
+		) {
+			ConfEnergyCalculator confEcalc = new ConfEnergyCalculator.Builder(confSpace, ecalc).build();
+			DistributedConfEnergyCalculator distConfEcalc = new DistributedConfEnergyCalculator(confEcalc, tasks);
+
+			for (SimpleConfSpace.Position pos1 : confSpace.positions) {
+				for (SimpleConfSpace.ResidueConf rc1 : pos1.resConfs) {
+
+					RCTuple single = new RCTuple(pos1.index, rc1.index);
+					assertThat(distConfEcalc.calcEnergy(single).energy, closeTo(confEcalc.calcEnergy(single).energy, 1e-9));
+
+					for (SimpleConfSpace.Position pos2 : confSpace.positions) {
+						if (pos2.index >= pos1.index) {
+							continue;
+						}
+						for (SimpleConfSpace.ResidueConf rc2 : pos2.resConfs) {
+							RCTuple pair = new RCTuple(pos1.index, rc1.index, pos2.index, rc2.index);
+							assertThat(distConfEcalc.calcEnergy(pair).energy, closeTo(confEcalc.calcEnergy(pair).energy, 1e-9));
+						}
+					}
+				}
+			}
+		}
+	}
+}
@@ -230,6 +230,18 @@ public class TestSimpleDEE extends TestBase {
 		assertThat(pmat, is(readPmat(confSpace, "----+---+++++++++------------------------------------------------------++++++++++++++++++++++++++++++++----------------++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")));
 	}
 
+	@Test
+	public void test1CC8_3Pos_SinglesGoldsteinParallel() {
+		SimpleConfSpace confSpace = make1CC8_3Pos();
+		PruningMatrix pmat = calcPmat(confSpace, (runner) -> {
+			runner.setSinglesThreshold(null);
+			runner.setPairsThreshold(null);
+			runner.setSinglesGoldsteinDiffThreshold(100.0);
+			runner.setParallelism(Parallelism.makeCpu(4));
+		});
+		assertThat(pmat, is(readPmat(confSpace, "----+---+++++++++------------------------------------------------------++++++++++++++++++++++++++++++++----------------++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")));
+	}
+
 	@Test
 	public void test1CC8_3Pos_PairsGoldstein() {
 		SimpleConfSpace confSpace = make1CC8_3Pos();
@@ -0,0 +1,137 @@
+/*
+** This file is part of OSPREY 3.0
+** 
+** OSPREY Protein Redesign Software Version 3.0
+** Copyright (C) 2001-2018 Bruce Donald Lab, Duke University
+** 
+** OSPREY is free software: you can redistribute it and/or modify
+** it under the terms of the GNU General Public License version 2
+** as published by the Free Software Foundation.
+** 
+** You should have received a copy of the GNU General Public License
+** along with OSPREY.  If not, see <http://www.gnu.org/licenses/>.
+** 
+** OSPREY relies on grants for its development, and since visibility
+** in the scientific literature is essential for our success, we
+** ask that users of OSPREY cite our papers. See the CITING_OSPREY
+** document in this distribution for more information.
+** 
+** Contact Info:
+**    Bruce Donald
+**    Duke University
+**    Department of Computer Science
+**    Levine Science Research Center (LSRC)
+**    Durham
+**    NC 27708-0129
+**    USA
+**    e-mail: www.cs.duke.edu/brd/
+** 
+** <signature of Bruce Donald>, Mar 1, 2018
+** Bruce Donald, Professor of Computer Science
+*/
+
+
+package edu.duke.cs.osprey.tools;
+
+import static edu.duke.cs.osprey.TestBase.*;
+import static org.hamcrest.Matchers.*;
+import static org.junit.Assert.*;
+
+import org.junit.Test;
+
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.math.MathContext;
+import java.math.RoundingMode;
+
+
+public class TestBigExp {
+
+	private static final MathContext context = new MathContext(50, RoundingMode.HALF_EVEN);
+
+	private static void assertRelative(BigExp observed, BigDecimal expected, double epsilon) {
+		BigDecimal err = observed.toBigDecimal(context).subtract(expected).abs();
+		if (expected.signum() != 0) {
+			err = err.divide(expected.abs(), context);
+		}
+		assertThat(err.doubleValue(), lessThanOrEqualTo(epsilon));
+	}
+
+	@Test
+	public void expMatchesDoubles() {
+		for (double x : new double[] { -700.0, -100.0, -10.0, -1.0, -1e-9, 0.0, 1e-9, 1.0, 10.0, 100.0, 700.0 }) {
+			assertThat(BigExp.exp(x).doubleValue(), isRelatively(Math.exp(x), 1e-15));
+		}
+	}
+
+	@Test
+	public void expE() {
+		assertRelative(BigExp.exp(1.0), new BigDecimal("2.718281828459045235360287471352662497757"), 1e-30);
+	}
+
+	@Test
+	public void expOutsideDoubleRange() {
+
+		// e^a*e^b = e^(a + b), even way past where doubles overflow and underflow
+		for (double a : new double[] { -1e6, -12345.678, 800.0, 1e6 }) {
+			BigExp observed = BigExp.exp(a).mult(BigExp.exp(a));
+			assertThat(observed.log(), isRelatively(2.0*a, 1e-15));
+			assertRelative(observed.div(BigExp.exp(2.0*a)), BigDecimal.ONE, 1e-25);
+		}
+	}
+
+	@Test
+	public void arithmeticMatchesBigDecimal() {
+
+		double[] vals = { 1.0, -3.5, Math.PI, 1e-300, 7.25e200, -1.0/3.0, 12345678.9 };
+		for (double a : vals) {
+			for (double b : vals) {
+
+				BigExp ea = BigExp.valueOf(a);
+				BigExp eb = BigExp.valueOf(b);
+				BigDecimal da = new BigDecimal(a);
+				BigDecimal db = new BigDecimal(b);
+
+				assertRelative(ea.mult(eb), da.multiply(db, context), 1e-30);
+				assertRelative(ea.div(eb), da.divide(db, context), 1e-30);
+
+				// sums can cancel, so compare absolutely, relative to the biggest term
+				double scale = Math.max(Math.abs(a), Math.abs(b));
+				BigDecimal sumErr = ea.add(eb).toBigDecimal(context).subtract(da.add(db, context)).abs();
+				assertThat(sumErr.doubleValue()/scale, lessThanOrEqualTo(1e-30));
+				BigDecimal diffErr = ea.sub(eb).toBigDecimal(context).subtract(da.subtract(db, context)).abs();
+				assertThat(diffErr.doubleValue()/scale, lessThanOrEqualTo(1e-30));
+			}
+		}
+	}
+
+	@Test
+	public void bigDecimalRoundTrip() {
+		for (String s : new String[] { "1", "0.1", "-42.000001", "1.234567890123456789012345678901e-5000", "9.87654321e4321" }) {
+			BigDecimal val = new BigDecimal(s);
+			assertRelative(BigExp.valueOf(val), val, 1e-30);
+		}
+		assertRelative(BigExp.valueOf(BigInteger.TEN.pow(100).add(BigInteger.ONE)), new BigDecimal(BigInteger.TEN.pow(100)), 1e-30);
+		assertRelative(BigExp.valueOf(Long.MAX_VALUE), new BigDecimal(Long.MAX_VALUE), 1e-30);
+	}
+
+	@Test
+	public void specialValues() {
+
+		assertThat(BigExp.valueOf(MathTools.BigPositiveInfinity), sameInstance(BigExp.PositiveInfinity));
+		assertThat(BigExp.PositiveInfinity.toBigDecimal(context), sameInstance(MathTools.BigPositiveInfinity));
+		assertThat(BigExp.exp(Double.NEGATIVE_INFINITY).isZero(), is(true));
+		assertThat(BigExp.exp(Double.POSITIVE_INFINITY).isInfinite(), is(true));
+
+		assertThat(BigExp.One.add(BigExp.PositiveInfinity).isInfinite(), is(true));
+		assertThat(BigExp.PositiveInfinity.mult(BigExp.valueOf(2.0)).isInfinite(), is(true));
+		assertThat(BigExp.One.sub(BigExp.One).isZero(), is(true));
+		assertThat(BigExp.Zero.toBigDecimal(context).signum(), is(0));
+
+		assertThat(BigExp.exp(-1000.0).compareTo(BigExp.exp(-1001.0)), is(1));
+		assertThat(BigExp.exp(-1000.0).compareTo(BigExp.Zero), is(1));
+		assertThat(BigExp.exp(-1000.0).negate().compareTo(BigExp.Zero), is(-1));
+		assertThat(BigExp.PositiveInfinity.compareTo(BigExp.exp(1e6)), is(1));
+		assertThat(BigExp.valueOf(3L), is(BigExp.valueOf(3.0)));
+	}
+}